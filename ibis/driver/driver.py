@@ -2,12 +2,15 @@
 import getpass
 import json
 import os
-import subprocess
 import time
 import traceback
+from collections import OrderedDict
 import prettytable
+from requests.exceptions import RequestException
 
 from ibis.custom_logging import get_logger
+from ibis.inventor.dag_workflow_generator import DagWorkflowGenerator
+from ibis.inventor.dsl_parser import DSLParser
 from ibis.inventor.workflow_generator import WorkflowGenerator
 from ibis.inventory.cb_inventory import CheckBalancesInventory
 from ibis.inventory.automation_ids_inventory import AUTOInventory
@@ -20,15 +23,37 @@ from ibis.inventory.request_inventory import RequestInventory, \
     OPTIONAL_FIELDS_EXPORT
 from ibis.model.exporttable import ItTableExport
 from ibis.model.table import ItTable
+from ibis.utilities.build_manifest import BuildManifest, file_hash
+from ibis.utilities.ddl_cache import DDLCache
+from ibis.utilities.eval_server import EvalServer
 from ibis.utilities.file_parser import parse_file_by_sections
+from ibis.utilities.hdfs import get_hdfs
 from ibis.utilities.it_table_generation import create, Get_Auto_Split
 from ibis.utilities.run_parallel import SqoopCacheManager, \
-    DryRunWorkflowManager
+    DryRunWorkflowManager, ParallelExecutor
+from ibis.utilities import sqoop_helper
+from ibis.utilities.sqoop_helper import SqoopHelper
 from ibis.utilities.sqoop_auth_check import AuthTest
 from ibis.utilities.utilities import Utilities, WorkflowTablesMapper
 from ibis.utilities.vizoozie import VizOozie
 
 
+def parallel_gen_schedule_request(info):
+    """Generate the workflow of a table in a pool process.
+    For sake of multiprocessing.Pool, this needs to be a top level function
+    The pool is forked after the ddl caching, the sqoop caches of the
+    parent are inherited.
+    Args:
+        info: List[cfg_mgr, it_table row, wf_name, appl_id]
+    Returns:
+        list of generated files
+    """
+    cfg_mgr, meta_dict, wf_name, appl_id = info
+    driver = Driver(cfg_mgr)
+    table = ItTable(meta_dict, cfg_mgr)
+    return driver.gen_schedule_request([table], wf_name, appl_id)
+
+
 class Driver(object):
 
     """Drive the ibis egg by providing methods to be accessed via the CLI."""
@@ -108,72 +133,81 @@ class Driver(object):
             return msg
 
         tables = self.it_inventory.parse_requests(request_tables)
+        mappings = self.it_inventory.get_table_mappings(
+            [(table.database, table.table_name, table.db_env)
+             for table in tables])
+        args_list = []
+        for table in tables:
+            key = (table.database, table.table_name, table.db_env)
+            args_list.append((table, mappings[key]))
+        results = self.it_inventory.execute_concurrent(
+            self._build_it_table_row, args_list)
+        rows = [row for row, modified in results if modified]
+        existing_keys = set([key for key in mappings if mappings[key]])
+        for _, row_msg in self.it_inventory.upsert(rows, existing_keys):
+            msg += '\n' + row_msg
+        # source connection or table may have changed
+        ddl_cache = DDLCache(self.cfg_mgr)
+        for table in tables:
+            ddl_cache.invalidate(table.database, table.table_name)
+        return msg
 
-        for modified_table_obj in tables:
-            new_table = False
-            table_dict = self.it_inventory.get_table_mapping(
-                modified_table_obj.database, modified_table_obj.table_name,
-                modified_table_obj.db_env)
-
-            if table_dict:
-                existing_table_obj = ItTable(table_dict, self.cfg_mgr)
-            else:
-                new_table = True
-                _table = {'source_table_name': modified_table_obj.table_name,
-                          'source_database_name': modified_table_obj.database,
-                          'db_env': modified_table_obj.db_env}
-                existing_table_obj = ItTable(_table, self.cfg_mgr)
-            modified_columns, modified_values = \
-                self.get_table_diff(modified_table_obj, existing_table_obj)
-
-            self.determine_auto_domain(existing_table_obj)
-            self.add_env_to_domain(existing_table_obj)
-
-            split_by = None
-            if modified_table_obj.split_by == 'null':
-                split_by = "no-split"
-            elif (not bool(existing_table_obj.split_by) and not
-                  existing_table_obj.is_oracle and
-                  bool(existing_table_obj.jdbcurl)):
-                split_by = self.it_table_generation.get_split_by_column(
-                    existing_table_obj)
-            else:
-                self.logger.info('No split by required')
-
-            if split_by is not None:
-                if split_by == "no-split":
-                    existing_table_obj.mappers = 1
-                    modified_columns.append('mappers')
-                    modified_values.append(str(1))
-                    self.logger.info('Modified mappers to 1')
-                else:
-                    existing_table_obj.split_by = split_by
-                    modified_columns.append('split_by')
-                    modified_values.append(split_by)
-                    self.logger.info('Modified split-by to:' + split_by)
-
-            if modified_columns:
-                self.logger.info('Modified columns: ' +
-                                 ', '.join(modified_columns))
-                self.logger.info('Modified values: ' +
-                                 ', '.join(modified_values))
-            if new_table:
-                # insert
-                success, msgg = self.it_inventory.insert(existing_table_obj)
-                msg += '\n' + msgg
+    def _build_it_table_row(self, modified_table_obj, table_dict):
+        """Merges the requested table into its existing it table row
+        Args:
+            modified_table_obj: instance of ibis.model.table.ItTable
+            table_dict: existing it table mapping, empty if it is a new table
+        Returns:
+            ibis.model.table.ItTable row, True if it has to be written
+        """
+        new_table = False
+        if table_dict:
+            existing_table_obj = ItTable(table_dict, self.cfg_mgr)
+        else:
+            new_table = True
+            _table = {'source_table_name': modified_table_obj.table_name,
+                      'source_database_name': modified_table_obj.database,
+                      'db_env': modified_table_obj.db_env}
+            existing_table_obj = ItTable(_table, self.cfg_mgr)
+        modified_columns, modified_values = \
+            self.get_table_diff(modified_table_obj, existing_table_obj)
+
+        self.determine_auto_domain(existing_table_obj)
+        self.add_env_to_domain(existing_table_obj)
+
+        split_by = None
+        if modified_table_obj.split_by == 'null':
+            split_by = "no-split"
+        elif (not bool(existing_table_obj.split_by) and not
+              existing_table_obj.is_oracle and
+              bool(existing_table_obj.jdbcurl)):
+            split_by = self.it_table_generation.get_split_by_column(
+                existing_table_obj)
+        else:
+            self.logger.info('No split by required')
+
+        if split_by is not None:
+            if split_by == "no-split":
+                existing_table_obj.mappers = 1
+                modified_columns.append('mappers')
+                modified_values.append(str(1))
+                self.logger.info('Modified mappers to 1')
             else:
-                # update
-                if modified_columns:
-                    success, msgg = self.it_inventory.update(
-                        existing_table_obj)
-                    if success:
-                        self.logger.info('Updated: {0}'.format(
-                            existing_table_obj.db_table_name))
-                        msg += '\n' + msgg
-                else:
-                    self.logger.warning('Nothing to update: {0}'.format(
-                        existing_table_obj.db_table_name))
-        return msg
+                existing_table_obj.split_by = split_by
+                modified_columns.append('split_by')
+                modified_values.append(split_by)
+                self.logger.info('Modified split-by to:' + split_by)
+
+        if modified_columns:
+            self.logger.info('Modified columns: ' +
+                             ', '.join(modified_columns))
+            self.logger.info('Modified values: ' +
+                             ', '.join(modified_values))
+        if not new_table and not modified_columns:
+            self.logger.warning('Nothing to update: {0}'.format(
+                existing_table_obj.db_table_name))
+            return existing_table_obj, False
+        return existing_table_obj, True
 
     def get_table_diff(self, modified_table_obj, existing_table_obj):
         """Return the diff between new table and existing table in
@@ -527,13 +561,21 @@ class Driver(object):
                 .xml, _job.properties, .ksh, _props_job.xml, .pdf
         """
         gen_files = []
-        workflow_gen = WorkflowGenerator(wf_name, self.cfg_mgr)
+        if self.cfg_mgr.workflow_backend == 'dag':
+            workflow_gen = DagWorkflowGenerator(wf_name, self.cfg_mgr)
+        else:
+            workflow_gen = WorkflowGenerator(wf_name, self.cfg_mgr)
         table_names = [tbl.table_name for tbl in tables]
-        loads_map = workflow_gen.sort_table_prop_by_load(tables)
-        pipelines = workflow_gen.gen_pipelines(loads_map)
+        try:
+            pipelines = workflow_gen.plan_pipelines(tables)
+            if pipelines:
+                workflow_gen.gen_workflow_from_pipelines(pipelines)
+        finally:
+            # pool processes generate many tables, do not leak the
+            # workflow file of a failed generation
+            workflow_gen.file_out.close()
 
         if pipelines:
-            workflow_gen.gen_workflow_from_pipelines(pipelines)
             self.build_table_wf_map(tables, wf_name)
             # Generate xml workflow diagram in pdf format
             self.vizoozie.visualizeXML(wf_name)
@@ -566,8 +608,7 @@ class Driver(object):
         """
         gen_files = []
         gen = WorkflowGenerator(sub_wf_file_name, self.cfg_mgr)
-        loads_map = gen.sort_table_prop_by_load(tables)
-        pipelines = gen.gen_pipelines(loads_map, is_sub=True)
+        pipelines = gen.plan_pipelines(tables, is_sub=True)
 
         if pipelines:
             self.build_table_wf_map(tables, sub_wf_file_name, False, True)
@@ -701,8 +742,57 @@ class Driver(object):
             if appl_id is not None and appl_id not in appl_ids:
                 appl_ids.append(appl_id)
         self.logger.info('Appl ids: {0}'.format(appl_ids))
-        for appl_id in appl_ids:
-            status, msg, git_files = self.gen_prod_workflow(appl_id)
+        self.gen_prod_workflows(appl_ids)
+
+    def _table_ddl_cache(self, table):
+        """Cached source DDL of a table
+        Args:
+            table: ibis.model.table.ItTable
+        Returns:
+            SQOOP_CACHE and SQOOP_CACHE_VIEW entries of the table
+        """
+        sqoop = SqoopHelper(self.cfg_mgr)
+        ddl = {}
+        ddl_view = {}
+        query = sqoop.get_ddl_query(table.jdbcurl, table.database,
+                                    table.table_name, table.schema)
+        if query in sqoop_helper.SQOOP_CACHE:
+            ddl[query] = sqoop_helper.SQOOP_CACHE[query]
+        if table.is_oracle:
+            query = sqoop.get_ddl_table_view(table.jdbcurl, table.database,
+                                             table.table_name)
+            if query in sqoop_helper.SQOOP_CACHE_VIEW:
+                ddl_view[query] = sqoop_helper.SQOOP_CACHE_VIEW[query]
+        return ddl, ddl_view
+
+    def _table_build_hash(self, manifest, table):
+        """Hash of the inputs of the generated files of a table
+        Args:
+            manifest: ibis.utilities.build_manifest.BuildManifest
+            table: ibis.model.table.ItTable
+        Returns:
+            input hash, None if the source DDL is not cached
+        """
+        ddl, ddl_view = self._table_ddl_cache(table)
+        if not ddl:
+            return None
+        ddl = ddl.values()[0]
+        ddl_view = ddl_view.values()[0] if ddl_view else None
+        actions = {}
+        if table.actions:
+            # DSL config and the custom scripts it runs
+            parser = DSLParser(self.cfg_mgr, [], self.cfg_mgr.requests_dir)
+            paths = [table.actions] + [
+                action for action in parser.parse_file(
+                    os.path.join(self.cfg_mgr.requests_dir, table.actions))
+                if '.hql' in action or '.sh' in action]
+            for path in paths:
+                full_path = os.path.join(self.cfg_mgr.requests_dir,
+                                         path.lstrip('/'))
+                if os.path.isfile(full_path):
+                    actions[path] = file_hash(full_path)
+        return manifest.input_hash(table.get_meta_dict(), ddl, ddl_view,
+                                   actions)
 
     def gen_prod_workflow(self, appl_id, no_git=False):
         """For a given appl_id, generate workflows for all the
@@ -716,12 +806,76 @@ class Driver(object):
                 list of generated files of workflows and subworkflows:
                 .xml, _job.properties, .ksh, _props_job.xml, .wld, .pdf
         """
+        return self.gen_prod_workflows([appl_id])[0]
+
+    def gen_prod_workflows(self, appl_ids):
+        """For the given appl_ids, generate workflows for all the
+           associated tables. The tables of all the appl_ids are
+           generated in one fan out over the process pool and merged
+           back per appl_id in table order
+        Args:
+            appl_ids: List[automation appl id]
+        Returns:
+            List[(status, msg, git_files)] in the order of appl_ids,
+            see gen_prod_workflow
+        """
         self._set_prod_table()
+        builds = [self._prepare_prod_workflow(appl_id)
+                  for appl_id in appl_ids]
+        pending = [build for build in builds if build['result'] is None]
+        if pending:
+            self._cache_prod_ddl(pending)
+        # one manifest for all the appl_ids, saved once they are done
+        manifest = BuildManifest(self.cfg_mgr)
+        requests = []
+        for build in pending:
+            self._plan_prod_workflow(build, manifest)
+            requests.extend(build['requests'])
+        results = self._gen_tables_workflows(requests)
+        for build in pending:
+            build_results = results[:len(build['requests'])]
+            results = results[len(build['requests']):]
+            if build['result'] is None:
+                self._finish_prod_workflow(build, build_results)
+        manifest.save()
+        return [build['result'] for build in builds]
+
+    def record_delivered(self):
+        """Confirm the delivery of the files returned by the last
+        gen_prod_workflows run, e.g. after they are committed to git.
+        Later runs do not dry run or return them while they are unchanged
+        Returns:
+            number of delivered files
+        """
+        manifest = BuildManifest(self.cfg_mgr)
+        if not manifest.enabled:
+            return 0
+        delivered = manifest.record_delivered()
+        manifest.save()
+        self.logger.info('Recorded {0} delivered files'.format(delivered))
+        return delivered
+
+    def _prod_workflow_error(self, build):
+        """Fail a prod workflow build with the current exception"""
+        err_msg = "Error generating workflow for " \
+                  "automation_appl_id: '{id}'\n".format(id=build['appl_id'])
+        err_msg += traceback.format_exc()
+        err_msg = 'Error found in driver.gen_prod_workflow - ' \
+                  'reason: \n{0}'.format(err_msg)
+        self.logger.error(err_msg)
+        build['result'] = (False, err_msg, build['git_files'])
+
+    def _prepare_prod_workflow(self, appl_id):
+        """Fetch the tables and the automation row of an appl_id
+        Args:
+            appl_id: automation appl id
+        Returns:
+            build state of the appl_id, its result is set when there is
+            nothing to generate
+        """
+        build = {'appl_id': appl_id, 'result': None, 'git_files': [],
+                 'requests': []}
         msg = ''
-        status = False
-        git_files = []
-        generated_workflows = []
-
         try:
             tables = self.it_inventory.get_all_tables_for_automation(appl_id)
             if len(tables) == 0:
@@ -730,7 +884,8 @@ class Driver(object):
                         id=appl_id)
                 msg += "No workflow generated!\n"
                 self.logger.warning(msg)
-                return status, msg, git_files
+                build['result'] = (False, msg, [])
+                return build
 
             appl_refs = self.automation_inventory.get_tables_by_id(appl_id)
             if len(appl_refs) == 0:
@@ -741,16 +896,44 @@ class Driver(object):
                     tbl=self.cfg_mgr.automation_ids_table)
                 msg += "No workflow generated!\n"
                 self.logger.warning(msg)
-                return status, msg, git_files
+                build['result'] = (False, msg, [])
+                return build
 
             self.logger.info("Generating workflow(s) for {id}".format(
                 id=appl_id))
-            # fetch ddl query results in parallel
+            build['tables'] = tables
+            build['appl_refs'] = appl_refs
+        except Exception:
+            self._prod_workflow_error(build)
+        return build
+
+    def _cache_prod_ddl(self, builds):
+        """Fetch the ddl query results of all the tables in parallel"""
+        tables = [table for build in builds for table in build['tables']]
+        try:
             self.sqoop_cache.cache_ddl_queries(tables)
             self.sqoop_cache.cache_ddl_views(tables)
-            workflow_names = []
-            # Generate workflow(s)
-            for table in tables:
+        except Exception:
+            for build in builds:
+                self._prod_workflow_error(build)
+
+    def _plan_prod_workflow(self, build, manifest):
+        """Restore the unchanged tables of an appl_id and queue the
+        workflow generation of the others
+        Args:
+            build: build state of the appl_id
+            manifest: ibis.utilities.build_manifest.BuildManifest shared
+                by the appl_ids of the run
+        """
+        if build['result'] is not None:
+            return
+        build['manifest'] = manifest
+        # per table, in order: [table, wf_name, restored files or None,
+        #                       input hash, perf hql needed]
+        build['slots'] = []
+        try:
+            for table in build['tables']:
+                perf_hql = False
                 if self.cfg_mgr.env.lower() == 'perf' or \
                         self.cfg_mgr.env.lower() == 'dev_perf':
                     all_views = table.views_list
@@ -775,52 +958,147 @@ class Driver(object):
                                                                    [freq],
                                                                    [full_tb_nm],
                                                                    ['default'])
+                    perf_hql = self.cfg_mgr.env.lower() == 'perf' or \
+                        len(all_views) != len(domain)
 
                 wf_name = self._get_prod_table_workflow_name(table)
+                inputs_hash = None
+                gen_files = None
+                if manifest.enabled:
+                    inputs_hash = self._table_build_hash(manifest, table)
+                    if inputs_hash:
+                        gen_files = manifest.restore(wf_name, inputs_hash)
+                if gen_files is None:
+                    build['requests'].append(
+                        [table, wf_name, build['appl_id']])
+                build['slots'].append([table, wf_name, gen_files,
+                                       inputs_hash, perf_hql])
+        except Exception:
+            build['requests'] = []
+            self._prod_workflow_error(build)
+
+    def _finish_prod_workflow(self, build, results):
+        """Merge the generated table workflows of an appl_id, generate its
+        incremental workflows, subworkflows and wld file and dry run them
+        Args:
+            build: build state of the appl_id
+            results: List[(success, generated files or error message)]
+                in the order of build['requests']
+        """
+        appl_id = build['appl_id']
+        tables = build['tables']
+        manifest = build['manifest']
+        msg = ''
+        status = False
+        git_files = build['git_files']
+        generated_workflows = []
+        workflow_names = []
+        # tables generated in this run: {wf_name: [input hash, files]}
+        built = OrderedDict()
+        changed_tables = []
+        results = iter(results)
+        try:
+            for table, wf_name, gen_files, inputs_hash, perf_hql in \
+                    build['slots']:
                 workflow_names.append(wf_name)
-                # Generate workflow for each table
-                gen_files = self.gen_schedule_request([table], wf_name,
-                                                      appl_id)
-                git_files += gen_files
-                if self.cfg_mgr.env.lower() == 'perf' or \
-                        self.cfg_mgr.env.lower() == 'dev_perf'and\
-                        len(all_views) != len(domain):
-                    hql_name = self.perf_inventory.save_perf_hql(table)
-                    git_files.extend(hql_name)
                 generated_workflows.append([table, wf_name])
+                if gen_files is not None:
+                    self.build_table_wf_map([table], wf_name)
+                    incr_fname = self._get_incr_workflow_name(table)
+                    if incr_fname + '.xml' in gen_files:
+                        self.build_table_wf_map([table], incr_fname, True)
+                    git_files += gen_files
+                    continue
+                success, gen_files = next(results)
+                if not success:
+                    raise ValueError('Workflow generation failed for '
+                                     '{0}:\n{1}'.format(wf_name, gen_files))
+                if perf_hql:
+                    hql_name = self.perf_inventory.save_perf_hql(table)
+                    gen_files = gen_files + hql_name
+                git_files += gen_files
+                changed_tables.append(table)
+                built[wf_name] = [inputs_hash, gen_files]
                 _msg = 'Generated workflow {path}{file_name}.xml\n'
                 _msg = _msg.format(path=self.cfg_mgr.files,
                                    file_name=wf_name)
                 self.logger.info(_msg)
                 msg += _msg
 
-            incr_files = self.gen_incr_workflow_files(tables)
+            incr_files = self.gen_incr_workflow_files(changed_tables)
             if incr_files:
                 git_files += incr_files
+            for table in changed_tables:
+                # incremental workflow files belong to the table artifact
+                incr_fname = self._get_incr_workflow_name(table)
+                incr_names = [incr_fname + suffix for suffix in (
+                    '.xml', '_job.properties', '.ksh', '_props_job.xml')]
+                built[self._get_prod_table_workflow_name(table)][1] += [
+                    name for name in incr_names if name in incr_files]
 
             workflows_chunks = self._group_workflows(generated_workflows)
             gen_files, _msg = self.gen_subworkflow(
-                workflows_chunks, tables, appl_refs[0]['ksh_name'], appl_id)
+                workflows_chunks, tables, build['appl_refs'][0]['ksh_name'],
+                appl_id)
             git_files.extend(gen_files)
-            if not self.dryrun_parallel.run_all(git_files):
+            # only files that changed since the last successful run
+            if not self.dryrun_parallel.run_all(manifest.changed(git_files)):
                 err_msg = 'Dryrun failed. Fix the workflow!'
-                return status, err_msg, git_files
+                build['result'] = (status, err_msg, git_files)
+                return
             msg += _msg
             # Generate wld file
             wld_file = self.automation_inventory.gen_wld_tables(
                 appl_id, tables, workflow_names)
             git_files.append(wld_file)
             self.utilities.chmod_files(git_files)
+            if manifest.enabled:
+                for wf_name, (inputs_hash, files) in built.items():
+                    if inputs_hash:
+                        manifest.store(wf_name, inputs_hash, files)
+                changed_files = manifest.changed(git_files)
+                # delivered once the caller confirms with record_delivered
+                manifest.stage_outputs(changed_files)
+                msg += '{0} of {1} files changed\n'.format(
+                    len(changed_files), len(git_files))
+                git_files = changed_files
             status = True
+            build['result'] = (status, msg, git_files)
         except Exception:
-            err_msg = "Error generating workflow for " \
-                      "automation_appl_id: '{id}'\n".format(id=appl_id)
-            err_msg += traceback.format_exc()
-            err_msg = 'Error found in driver.gen_prod_workflow - ' \
-                      'reason: \n{0}'.format(err_msg)
-            self.logger.error(err_msg)
-            msg = err_msg
-        return status, msg, git_files
+            self._prod_workflow_error(build)
+
+    def _gen_tables_workflows(self, requests):
+        """Generate the workflows of tables. Runs in the process pool when
+        parallel_workflow_procs is more than 1
+        Args:
+            requests: List[[ibis.model.table.ItTable, wf_name, appl_id]]
+        Returns:
+            List[(success, generated files or error message)] in the
+            order of requests
+        """
+        if self.cfg_mgr.parallel_workflow_procs <= 1 or len(requests) < 2:
+            results = []
+            for table, wf_name, appl_id in requests:
+                try:
+                    results.append((True, self.gen_schedule_request(
+                        [table], wf_name, appl_id)))
+                except Exception:
+                    results.append((False, traceback.format_exc()))
+            return results
+
+        pool_info = [[self.cfg_mgr, table.get_meta_dict(), wf_name, appl_id]
+                     for table, wf_name, appl_id in requests]
+        # generation failures are not transient, no retries
+        executor = ParallelExecutor(
+            self.cfg_mgr, processes=self.cfg_mgr.parallel_workflow_procs,
+            retries=0)
+        results = executor.map(parallel_gen_schedule_request, pool_info)
+        for (table, wf_name, _), (success, gen_files) in zip(requests,
+                                                             results):
+            if success and gen_files:
+                # the table map of the pool process is lost
+                self.build_table_wf_map([table], wf_name)
+        return results
 
     def generate_subworkflow(self, workflow_name, file_names):
         """Generate subworkflows with file.
@@ -1010,6 +1288,22 @@ class Driver(object):
             box_msg = Utilities.print_box_msg(msg, border_char='x')
             raise ValueError(box_msg)
 
+    def run_eval_server(self):
+        """Serve sqoop eval queries from a warm JVM until interrupted"""
+        server = EvalServer(self.cfg_mgr)
+        try:
+            server.start_jvm()
+        except ImportError:
+            msg = ('Eval server not started, it needs JPype1 '
+                   '(pip install JPype1). Queries fall back to sqoop eval')
+            self.logger.error(msg)
+            print msg
+            return
+        msg = 'Eval server listening on {0}'.format(server.socket_path)
+        self.logger.info(msg)
+        print msg
+        server.serve_forever()
+
     def parse_request_file(self, request_file):
         """Print tables in request file as json. Useful for web app
         Args:
@@ -1033,60 +1327,40 @@ class Driver(object):
             if tar_dir:
                 backup_dir = '/user/data/backup/{tar_dir}'.\
                     format(tar_dir=tar_dir)
+                hdfs = get_hdfs(self.cfg_mgr)
                 try:
                     # Check if path exists
-                    if self.utilities.run_subprocess(['hadoop', 'fs',
-                                                      '-test', '-e',
-                                                      backup_dir]) == 0:
+                    if hdfs.exists(backup_dir):
                         # Check if gen and live directory exists
                         gen_dir = '/user/data/{tar_dir}/gen/'.\
                             format(tar_dir=tar_dir)
                         live_dir = '/user/data/{tar_dir}/live/'.\
                             format(tar_dir=tar_dir)
-                        if self.utilities.run_subprocess(
-                                ['hadoop', 'fs', '-test', '-e', gen_dir]) != 0:
-                            subprocess.call(['hadoop', 'fs', '-mkdir',
-                                             '-p', gen_dir])
-                        if self.utilities.run_subprocess(
-                                ['hadoop', 'fs', '-test', '-e', live_dir]) \
-                                != 0:
-                            subprocess.call(['hadoop', 'fs', '-mkdir',
-                                             '-p', live_dir])
+                        if not hdfs.exists(gen_dir):
+                            hdfs.mkdir(gen_dir)
+                        if not hdfs.exists(live_dir):
+                            hdfs.mkdir(live_dir)
 
                         # Copy files
-                        if self.utilities.\
-                                run_subprocess(['hadoop',
-                                                'fs', '-cp', '-f',
-                                                backup_dir +
-                                                '/gen/parquet_live.hql',
-                                                gen_dir]) != 0:
+                        if not hdfs.cp(backup_dir + '/gen/parquet_live.hql',
+                                       gen_dir):
                             msg += 'Failed to copy parquet_live.hql\n'
-                        if self.utilities.\
-                                run_subprocess(['hadoop', 'fs', '-cp', '-f',
-                                                backup_dir +
-                                                '/gen/avro_parquet.hql',
-                                                gen_dir]) != 0:
+                        if not hdfs.cp(backup_dir + '/gen/avro_parquet.hql',
+                                       gen_dir):
                             msg += 'Failed to copy avro_parquet.hql\n'
 
-                        if self.utilities.run_subprocess(['hadoop', 'fs',
-                                                          '-cp', '-f',
-                                                          backup_dir + '/*',
-                                                          live_dir]) != 0:
+                        if not hdfs.cp(backup_dir + '/*', live_dir):
                             msg += 'Failed to copy files to live.\n'
                         else:  # Clean up
-                            self.utilities.run_subprocess(['hadoop', 'fs',
-                                                           '-rm', '-r',
-                                                           live_dir + '_gen'])
-                            self.utilities.run_subprocess(['hadoop', 'fs',
-                                                           '-rm', '-r',
-                                                           live_dir + 'gen'])
+                            hdfs.rm(live_dir + '_gen', recursive=True)
+                            hdfs.rm(live_dir + 'gen', recursive=True)
                     else:
                         msg += 'Backup doesn\'t exist.\n'
-                except subprocess.CalledProcessError as e:
+                except RequestException as e:
                     self.logger.error('Error found in driver.retrieve'
                                       '_backup, exit '
                                       'from process with errors. '
-                                      'Subprocess error: %s' % e.message)
+                                      'HDFS error: %s' % e)
                     raise ValueError('Failed')
             else:
                 msg += 'Target directory doesn\'t exist in it_table.\n'
@@ -1157,11 +1431,14 @@ class Driver(object):
             return msg
 
         tables = self.export_it_inventory.parse_requests_export(request_tables)
+        mappings = self.export_it_inventory.get_table_mappings(
+            [(table.database, table.table_name, table.db_env)
+             for table in tables])
 
         for modified_table_obj in tables:
-            table_dict = self.export_it_inventory.get_table_mapping(
-                modified_table_obj.database, modified_table_obj.table_name,
-                modified_table_obj.db_env)
+            table_dict = mappings[(modified_table_obj.database,
+                                   modified_table_obj.table_name,
+                                   modified_table_obj.db_env)]
             existing_table_obj = \
                 ItTableExport(table_dict, self.cfg_mgr) if table_dict else {}
             modified_columns, modified_values = \
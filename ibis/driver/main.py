@@ -7,6 +7,7 @@ from ibis.custom_logging import get_logger
 from ibis.driver.driver import Driver
 from ibis.utilities.config_manager import ConfigManager
 from ibis.inventory import inventory
+from ibis.utilities import template_cache
 from ibis.utilities.utilities import Utilities
 
 driver = None
@@ -248,6 +249,13 @@ def main():
                         help='Get the ingest version used for the xml')
     parser.add_argument('--kite-ingest', type=FileType('r'),
                         help='Used to generate kite-ingest workflow')
+    parser.add_argument('--record-delivered', action='store_true',
+                        help='Run after the files of '
+                             '--gen-automation-workflow are committed to '
+                             'git, unchanged files are then skipped')
+    parser.add_argument('--eval-server', action='store_true',
+                        help='Start the eval server which keeps JDBC '
+                             'connections warm for sqoop eval queries')
 
     args = parser.parse_args()
 
@@ -277,7 +285,9 @@ def main():
         'auth_test': auth_test,
         'ingest_version': ingest_version,
         'parse_request_file': parse_request_file,
-        'kite_ingest': gen_kite_workflow
+        'kite_ingest': gen_kite_workflow,
+        'eval_server': eval_server,
+        'record_delivered': record_delivered
     }
 
     is_failed = False
@@ -311,6 +321,7 @@ def main():
                     if success is False:
                         is_failed = True
             inventory.Inventory.close()
+            template_cache.log_cache_stats(logger)
         except Exception:
             logger.error('\n' + traceback.format_exc())
             is_failed = True
@@ -401,13 +412,18 @@ def wipe_perf_env(args):
 def gen_automation_workflow(args):
     """Handler for automation workflows."""
     if args.gen_automation_workflow:
-        for automation_id in args.gen_automation_workflow:
-            success, msg, git_files = driver.gen_prod_workflow(automation_id)
+        results = driver.gen_prod_workflows(args.gen_automation_workflow)
+        for success, msg, git_files in results:
             print msg
     else:
         print "--gen-automation-workflow requires at least one automation id."
 
 
+def record_delivered(args):
+    """Handler for confirming the delivery of automation workflows."""
+    print 'Recorded {0} delivered files'.format(driver.record_delivered())
+
+
 def retrieve_backup(args):
     """Handler for backup."""
     if args.db and args.table:
@@ -483,6 +499,11 @@ def gen_kite_workflow(args):
     driver.gen_kite_workflow(args.kite_ingest)
 
 
+def eval_server(args):
+    """Serve sqoop eval queries until interrupted"""
+    driver.run_eval_server()
+
+
 def export_request(args):
     """Generate workflow export request. """
     status, msg = driver.export_request(args.export_request, args.no_git)
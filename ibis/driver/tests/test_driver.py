@@ -1,8 +1,12 @@
 """Driver tests."""
 import copy
 import difflib
+import json
 import os
+import pickle
+import shutil
 import sys
+import tempfile
 import time
 import unittest
 
@@ -23,6 +27,8 @@ from ibis.settings import UNIT_TEST_ENV
 from ibis.utilities.config_manager import ConfigManager
 from ibis.utilities.file_parser import parse_file_by_sections
 from ibis.utilities.it_table_generation import Get_Auto_Split
+from ibis.utilities import sqoop_helper
+from ibis.utilities.sqoop_helper import SqoopHelper
 from ibis.utilities.utilities import Utilities
 from ibis.utilities.vizoozie import VizOozie
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -104,13 +110,18 @@ class DriverFunctionsTest(unittest.TestCase):
         self.driver.req_inventory.parse_file.return_value = \
             ([Request(mock_table_mapping_val, self.cfg_mgr)],
              'Parse File Success')
-        self.driver.it_inventory.get_table_mapping = \
-            MagicMock(spec=ITInventory.get_table_mapping)
-        self.driver.it_inventory.get_table_mapping.return_value = {}
-        self.driver.it_inventory.insert = MagicMock(spec=ITInventory.insert)
-        self.driver.it_inventory.insert.return_value = (True, 'Insert Success')
+        self.driver.it_inventory.get_table_mappings = \
+            MagicMock(spec=ITInventory.get_table_mappings)
+        self.driver.it_inventory.get_table_mappings.side_effect = \
+            lambda keys: dict((key, {}) for key in keys)
+        self.driver.it_inventory.upsert = MagicMock(spec=ITInventory.upsert)
+        self.driver.it_inventory.upsert.return_value = [
+            (True, 'Insert Success')]
         result = self.driver.submit_it_file('test')
         self.assertEquals(result, 'Parse File Success\nInsert Success')
+        rows, existing_keys = self.driver.it_inventory.upsert.call_args[0]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(existing_keys, set())
 
     def test_submit_it_file_export_insert(self):
         """Test submit it file with a valid it table file."""
@@ -118,9 +129,10 @@ class DriverFunctionsTest(unittest.TestCase):
         self.driver.req_inventory.parse_file_export.return_value = \
             ([Request(mock_table_mapping_val_export, self.cfg_mgr)],
              'Parse File Success')
-        self.driver.export_it_inventory.get_table_mapping = \
-            MagicMock(spec=ExportITInventory.get_table_mapping)
-        self.driver.export_it_inventory.get_table_mapping.return_value = {}
+        self.driver.export_it_inventory.get_table_mappings = \
+            MagicMock(spec=ExportITInventory.get_table_mappings)
+        self.driver.export_it_inventory.get_table_mappings.side_effect = \
+            lambda keys: dict((key, {}) for key in keys)
         self.driver.export_it_inventory.insert_export = \
             MagicMock(spec=ExportITInventory.insert_export)
         self.driver.export_it_inventory.insert_export.return_value = \
@@ -136,17 +148,21 @@ class DriverFunctionsTest(unittest.TestCase):
             ([Request(mock_table_mapping_val, self.cfg_mgr)],
              'Parse File Success')
 
-        self.driver.it_inventory.insert = MagicMock(spec=ITInventory.insert)
-        self.driver.it_inventory.update = MagicMock(spec=ITInventory.update)
-        self.driver.it_inventory.get_table_mapping = MagicMock(
-            spec=ITInventory.get_table_mapping)
-        self.driver.it_inventory.update.return_value = (True, 'Update Success')
+        self.driver.it_inventory.upsert = MagicMock(spec=ITInventory.upsert)
+        self.driver.it_inventory.get_table_mappings = MagicMock(
+            spec=ITInventory.get_table_mappings)
+        self.driver.it_inventory.upsert.return_value = [
+            (True, 'Update Success')]
         updated_table = copy.deepcopy(mock_table_mapping_val)
         updated_table['db_username'] = 'updated_user'
-        self.driver.it_inventory.get_table_mapping.return_value = updated_table
+        self.driver.it_inventory.get_table_mappings.side_effect = \
+            lambda keys: dict((key, updated_table) for key in keys)
         result = self.driver.submit_it_file('test')
         self.assertEquals(result,
                           'Parse File Success\nUpdate Success')
+        rows, existing_keys = self.driver.it_inventory.upsert.call_args[0]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(existing_keys), 1)
 
     def test_submit_it_file_export_update(self):
         """Test submit it file with an updated it table file."""
@@ -159,14 +175,14 @@ class DriverFunctionsTest(unittest.TestCase):
             MagicMock(spec=ExportITInventory.insert_export)
         self.driver.export_it_inventory.update_export = \
             MagicMock(spec=ExportITInventory.update_export)
-        self.driver.export_it_inventory.get_table_mapping = \
-            MagicMock(spec=ExportITInventory.get_table_mapping)
+        self.driver.export_it_inventory.get_table_mappings = \
+            MagicMock(spec=ExportITInventory.get_table_mappings)
         self.driver.export_it_inventory.update_export.return_value = \
             (True, 'Update Success')
         updated_table = copy.deepcopy(mock_table_mapping_val_export)
         updated_table['db_username'] = 'updated_user'
-        self.driver.export_it_inventory.get_table_mapping.return_value = \
-            updated_table
+        self.driver.export_it_inventory.get_table_mappings.side_effect = \
+            lambda keys: dict((key, updated_table) for key in keys)
         result = self.driver.submit_it_file_export('test')
         self.assertEquals(result,
                           'Parse File Success\nUpdate Success')
@@ -547,6 +563,234 @@ class DriverFunctionsTest(unittest.TestCase):
         self.assertIn('subworkflow:', msg)
         self.assertTrue(status)
 
+    @patch('ibis.utilities.run_parallel.DryRunWorkflowManager.run_all',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_views',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_queries',
+           autospec=True)
+    @patch.object(ITInventory, 'get_all_tables_for_automation', autospec=True)
+    @patch.object(AUTOInventory, 'get_tables_by_id', autospec=True)
+    @patch('ibis.inventory.inventory.Inventory._connect', autospec=True)
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    @patch.object(VizOozie, 'visualizeXML', autospec=True)
+    def test_gen_prod_workflow_manifest(self, m_v_xml, m_eval, m_c, m_get_id,
+                                        m_get_t_automation, m_sqoop_cache,
+                                        m_sqoop_cache_view, m_dryrun_all):
+        """Tests unchanged tables are restored from the build manifest"""
+        saves = tempfile.mkdtemp()
+        self.cfg_mgr.saves = saves
+        self.cfg_mgr.build_manifest = True
+        m_eval.return_value = [['Col1', 'varchar'], ['Col2', 'varchar']]
+        m_get_id.return_value = appl_ref_id_tbl_01
+        m_dryrun_all.return_value = True
+
+        def cache_ddl(manager, tables):
+            for tbl in tables:
+                query = SqoopHelper(self.cfg_mgr).get_ddl_query(
+                    tbl.jdbcurl, tbl.database, tbl.table_name, tbl.schema)
+                sqoop_helper.SQOOP_CACHE[query] = [['Col1', 'varchar']]
+
+        m_sqoop_cache.side_effect = cache_ddl
+        rows = copy.deepcopy(mock_automation_tables_01)
+        # incremental workflow for the first table
+        rows[0]['check_column'] = 'Col1'
+        m_get_t_automation.side_effect = lambda *args: [
+            ItTable(tbl, self.cfg_mgr) for tbl in rows]
+        try:
+            status, _, git_files = self.driver.gen_prod_workflow('FAKED001')
+            self.assertTrue(status)
+            self.assertEquals(m_v_xml.call_count, len(rows))
+            dryrun_files = m_dryrun_all.call_args[0][1]
+            self.assertEquals(dryrun_files, git_files[:-1])
+
+            wf_map = dict((key, (obj.full_wf, obj.incr_wf)) for key, obj in
+                          self.driver.table_workflows.items())
+            self.assertTrue(any(incr for _, incr in wf_map.values()))
+
+            # not delivered: the files are dry run and returned again
+            m_v_xml.reset_mock()
+            self.driver.table_workflows = {}
+            status, _, files = self.driver.gen_prod_workflow('FAKED001')
+            self.assertTrue(status)
+            self.assertEquals(m_v_xml.call_count, 0)
+            # restored tables keep their full and incremental mapping
+            restored_map = dict(
+                (key, (obj.full_wf, obj.incr_wf)) for key, obj in
+                self.driver.table_workflows.items())
+            self.assertEquals(restored_map, wf_map)
+            self.assertEquals(sorted(files), sorted(git_files))
+            self.assertEquals(self.driver.record_delivered(),
+                              len(git_files))
+
+            # nothing changed: no table generated, dry run or staged
+            m_v_xml.reset_mock()
+            status, msg, git_files = self.driver.gen_prod_workflow(
+                'FAKED001')
+            self.assertTrue(status)
+            self.assertEquals(m_v_xml.call_count, 0)
+            self.assertEquals(m_dryrun_all.call_args[0][1], [])
+            self.assertEquals(git_files, [])
+            self.assertIn('0 of', msg)
+
+            # one it_table row changed
+            rows[0]['mappers'] = 8
+            status, _, git_files = self.driver.gen_prod_workflow('FAKED001')
+            self.assertTrue(status)
+            self.assertEquals(m_v_xml.call_count, 1)
+            table = ItTable(rows[0], self.cfg_mgr)
+            wf_name = Utilities.replace_special_chars(table.db_table_name)
+            incr_name = self.driver._get_incr_workflow_name(table)
+            self.assertEquals(
+                sorted(name for name in git_files if name.endswith('.xml')),
+                sorted([wf_name + '.xml', incr_name + '.xml']))
+        finally:
+            sqoop_helper.SQOOP_CACHE.clear()
+            shutil.rmtree(saves)
+
+    @patch('ibis.utilities.run_parallel.DryRunWorkflowManager.run_all',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_views',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_queries',
+           autospec=True)
+    @patch.object(ITInventory, 'get_all_tables_for_automation', autospec=True)
+    @patch.object(AUTOInventory, 'get_tables_by_id', autospec=True)
+    @patch('ibis.inventory.inventory.Inventory._connect', autospec=True)
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    @patch.object(VizOozie, 'visualizeXML', autospec=True)
+    def test_gen_prod_workflows_parallel(self, m_v_xml, m_eval, m_c,
+                                         m_get_id, m_get_t_automation,
+                                         m_sqoop_cache, m_sqoop_cache_view,
+                                         m_dryrun_all):
+        """Tests the tables of two automation ids generated in the pool
+        match the tables generated in process"""
+        m_eval.return_value = [['Col1', 'varchar'], ['Col2', 'varchar']]
+        m_dryrun_all.return_value = True
+        refs = {'FAKED001': appl_ref_id_tbl_01,
+                'FAKED002': [dict(appl_ref_id_tbl_02[0],
+                                  ksh_name='call2_fake_database_daily')]}
+        rows = {'FAKED001': mock_automation_tables_01[:3],
+                'FAKED002': mock_automation_tables_01[3:]}
+        m_get_id.side_effect = lambda inventory, appl_id: refs[appl_id]
+        m_get_t_automation.side_effect = lambda inventory, appl_id: [
+            ItTable(tbl, self.cfg_mgr) for tbl in rows[appl_id]]
+
+        def cache_ddl(manager, tables):
+            for tbl in tables:
+                query = SqoopHelper(self.cfg_mgr).get_ddl_query(
+                    tbl.jdbcurl, tbl.database, tbl.table_name, tbl.schema)
+                sqoop_helper.SQOOP_CACHE[query] = [['Col1', 'varchar']]
+
+        def cache_views(manager, tables):
+            for tbl in tables:
+                query = SqoopHelper(self.cfg_mgr).get_ddl_table_view(
+                    tbl.jdbcurl, tbl.database, tbl.table_name)
+                sqoop_helper.SQOOP_CACHE_VIEW[query] = [['TABLE']]
+
+        def pool_map(executor, func, tasks):
+            """pickles the tasks like the pool"""
+            return [(True, func(pickle.loads(pickle.dumps(task))))
+                    for task in tasks]
+
+        def contents(git_files):
+            """generated xml workflows"""
+            xmls = {}
+            for name in git_files:
+                if name.endswith('.xml') and \
+                        not name.endswith('_props_job.xml'):
+                    with open(os.path.join(self.cfg_mgr.files, name)) as f_h:
+                        xmls[name] = f_h.read()
+            return xmls
+
+        m_sqoop_cache.side_effect = cache_ddl
+        m_sqoop_cache_view.side_effect = cache_views
+        try:
+            serial = self.driver.gen_prod_workflows(['FAKED001', 'FAKED002'])
+            serial_xmls = contents(serial[0][2] + serial[1][2])
+            self.cfg_mgr.parallel_workflow_procs = 3
+            with patch('ibis.driver.driver.ParallelExecutor.map',
+                       autospec=True) as m_map:
+                m_map.side_effect = pool_map
+                m_eval.reset_mock()
+                parallel = self.driver.gen_prod_workflows(
+                    ['FAKED001', 'FAKED002'])
+            self.assertEquals(m_map.call_count, 1)
+            self.assertEquals(m_map.call_args[0][0].processes, 3)
+            self.assertEquals(len(m_map.call_args[0][2]),
+                              len(mock_automation_tables_01))
+            # the pool inherits the cached ddl, nothing is queried again
+            self.assertEquals(m_eval.call_count, 0)
+            self.assertEquals(parallel, serial)
+            self.assertTrue(all(status for status, _, _ in parallel))
+            self.assertEquals(contents(parallel[0][2] + parallel[1][2]),
+                              serial_xmls)
+        finally:
+            sqoop_helper.SQOOP_CACHE.clear()
+            sqoop_helper.SQOOP_CACHE_VIEW.clear()
+
+    @patch('ibis.utilities.run_parallel.DryRunWorkflowManager.run_all',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_views',
+           autospec=True)
+    @patch('ibis.utilities.run_parallel.SqoopCacheManager.cache_ddl_queries',
+           autospec=True)
+    @patch.object(ITInventory, 'get_all_tables_for_automation', autospec=True)
+    @patch.object(AUTOInventory, 'get_tables_by_id', autospec=True)
+    @patch('ibis.inventory.inventory.Inventory._connect', autospec=True)
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    @patch.object(VizOozie, 'visualizeXML', autospec=True)
+    def test_gen_prod_workflows_manifest(self, m_v_xml, m_eval, m_c,
+                                         m_get_id, m_get_t_automation,
+                                         m_sqoop_cache, m_sqoop_cache_view,
+                                         m_dryrun_all):
+        """Tests the build manifest keeps the tables of every automation
+        id of a run"""
+        saves = tempfile.mkdtemp()
+        self.cfg_mgr.saves = saves
+        self.cfg_mgr.build_manifest = True
+        m_eval.return_value = [['Col1', 'varchar'], ['Col2', 'varchar']]
+        m_dryrun_all.return_value = True
+        refs = {'FAKED001': appl_ref_id_tbl_01,
+                'FAKED002': [dict(appl_ref_id_tbl_02[0],
+                                  ksh_name='call2_fake_database_daily')]}
+        rows = {'FAKED001': mock_automation_tables_01[:3],
+                'FAKED002': mock_automation_tables_01[3:]}
+        m_get_id.side_effect = lambda inventory, appl_id: refs[appl_id]
+        m_get_t_automation.side_effect = lambda inventory, appl_id: [
+            ItTable(tbl, self.cfg_mgr) for tbl in rows[appl_id]]
+
+        def cache_ddl(manager, tables):
+            for tbl in tables:
+                query = SqoopHelper(self.cfg_mgr).get_ddl_query(
+                    tbl.jdbcurl, tbl.database, tbl.table_name, tbl.schema)
+                sqoop_helper.SQOOP_CACHE[query] = [['Col1', 'varchar']]
+
+        m_sqoop_cache.side_effect = cache_ddl
+        try:
+            results = self.driver.gen_prod_workflows(['FAKED001', 'FAKED002'])
+            self.assertTrue(all(status for status, _, _ in results))
+            self.assertEquals(m_v_xml.call_count,
+                              len(mock_automation_tables_01))
+            self.driver.record_delivered()
+            with open(os.path.join(saves, 'build_manifest.json')) as file_h:
+                manifest = json.load(file_h)
+            self.assertEquals(len(manifest['artifacts']),
+                              len(mock_automation_tables_01))
+            self.assertEquals(manifest['pending'], {})
+            delivered = set(results[0][2] + results[1][2])
+            self.assertEquals(set(manifest['outputs']), delivered)
+
+            # nothing changed in either automation id
+            m_v_xml.reset_mock()
+            results = self.driver.gen_prod_workflows(['FAKED001', 'FAKED002'])
+            self.assertEquals(m_v_xml.call_count, 0)
+            self.assertEquals([git_files for _, _, git_files in results],
+                              [[], []])
+        finally:
+            sqoop_helper.SQOOP_CACHE.clear()
+            shutil.rmtree(saves)
+
     @patch.object(ITInventory, 'get_all_tables_for_automation', autospec=True)
     @patch.object(AUTOInventory, 'get_tables_by_id', autospec=True)
     @patch('ibis.inventory.inventory.Inventory._connect', autospec=True)
@@ -775,25 +1019,25 @@ class DriverFunctionsTest(unittest.TestCase):
 
     @patch('ibis.driver.driver.RequestInventory.get_available_requests',
            autospec=True)
-    @patch('ibis.driver.driver.Driver.gen_prod_workflow',
+    @patch('ibis.driver.driver.Driver.gen_prod_workflows',
            autospec=True)
     @patch('ibis.driver.driver.Driver.update_it_table', autospec=True)
     def test_gen_prod_workflow_tables(self, m_s_it_file,
-                                      gen_prod_workflow,
+                                      gen_prod_workflows,
                                       mock_get_available_requests):
         mock_get_available_requests.return_value = \
             ([ItTable(mock_table_mapping_val, self.cfg_mgr)], [], [])
-        gen_prod_workflow.return_value = (None, None, None)
+        gen_prod_workflows.return_value = [(None, None, None)]
         file_h = open(
             os.path.join(BASE_DIR, 'test_resources/request_test_valid.txt'),
             'r')
         self.assertTrue(self.driver.gen_prod_workflow_tables(file_h))
 
-    @patch('ibis.driver.driver.subprocess', autospec=True)
+    @patch('ibis.driver.driver.get_hdfs', autospec=True)
     @patch.object(Inventory, 'get_table_mapping',
                   return_value=fake_fct_tbl_prop)
     def test_retrieve_backup(self, mock_get_table_mapping,
-                             mock_subprocess):
+                             mock_get_hdfs):
         """test retrieve_backup"""
         tbl = fake_fct_tbl_prop
         msg = self.driver.retrieve_backup(tbl['source_database_name'],
@@ -804,16 +1048,16 @@ class DriverFunctionsTest(unittest.TestCase):
            autospec=True)
     @patch('ibis.driver.driver.RequestInventory.get_available_requests',
            autospec=True)
-    @patch('ibis.driver.driver.Driver.gen_prod_workflow',
+    @patch('ibis.driver.driver.Driver.gen_prod_workflows',
            autospec=True)
     @patch('ibis.driver.driver.Driver.update_it_table', autospec=True)
     def test_gen_prod_workflow_tables_noapp(self, m_s_it_file,
-                                            gen_prod_workflow,
+                                            gen_prod_workflows,
                                             mock_get_available_requests,
                                             mock_update):
         mock_get_available_requests.return_value = \
             ([ItTable(mock_table_mapping_val_app, self.cfg_mgr)], [], [])
-        gen_prod_workflow.return_value = (None, None, None)
+        gen_prod_workflows.return_value = [(None, None, None)]
         file_h = open(
             os.path.join(BASE_DIR, 'test_resources/request_test_valid.txt'),
             'r')
@@ -850,8 +1094,8 @@ class DriverFunctionsTest(unittest.TestCase):
                                     "target_database_name",
                                     "user_name", "password_alias")
 
-    @patch('subprocess.call')
-    def test_retrieve_backup_notarget(self, mock_call):
+    @patch('ibis.driver.driver.get_hdfs', autospec=True)
+    def test_retrieve_backup_notarget(self, mock_get_hdfs):
         """
         Given arguments for retrieve_back up
         expects print statement
@@ -860,16 +1104,13 @@ class DriverFunctionsTest(unittest.TestCase):
             spec=ITInventory.get_table_mapping)
         self.driver.it_inventory.get_table_mapping.return_value = \
             mock_table_mapping_val
-        self.driver.utilities.run_subprocess = \
-            MagicMock(spec=Utilities.run_subprocess)
-        self.driver.utilities.run_subprocess.side_effect = [0, 1, 1, 1, 1, 1]
         msg = self.driver.retrieve_backup("db_name", "table_name")
         self.assertEqual(msg, "Retrieving backup for " +
                          "db_name_table_name\nTarget directory doesn't " +
                          "exist in it_table.\n")
 
-    @patch('subprocess.call')
-    def test_retrieve_backup_iftarget(self, mock_popen):
+    @patch('ibis.driver.driver.get_hdfs', autospec=True)
+    def test_retrieve_backup_iftarget(self, mock_get_hdfs):
         """
         Given arguments for retrieve_back up
         expects print statement
@@ -878,13 +1119,15 @@ class DriverFunctionsTest(unittest.TestCase):
             spec=ITInventory.get_table_mapping)
         self.driver.it_inventory.get_table_mapping.return_value = \
             heavy_3_prop_exp
-        self.driver.utilities.run_subprocess = \
-            MagicMock(spec=Utilities.run_subprocess)
-        self.driver.utilities.run_subprocess.side_effect = [0, 1, 1, 1, 1, 1]
+        hdfs = mock_get_hdfs.return_value
+        hdfs.exists.side_effect = [True, False, False]
+        hdfs.cp.return_value = False
         msg = self.driver.retrieve_backup("db_name", "table_name")
         self.assertEqual(msg, "Retrieving backup for db_name_table_name\n" +
                          "Failed to copy parquet_live.hql\nFailed to copy " +
                          "avro_parquet.hql\nFailed to copy files to live.\n")
+        self.assertEqual(hdfs.mkdir.call_count, 2)
+        self.assertFalse(hdfs.rm.called)
 
     @patch('subprocess.call')
     def test_retrieve_backup_iftable(self, mock_popen):
@@ -1002,5 +1245,16 @@ class DriverFunctionsTest(unittest.TestCase):
         self.assertTrue('Team name provided is Domain, please \
              provide your team name' in str(context.exception))
 
+    @patch('ibis.driver.driver.EvalServer.serve_forever', autospec=True)
+    @patch('ibis.driver.driver.EvalServer.start_jvm', autospec=True)
+    def test_run_eval_server_no_jpype(self, m_start_jvm, m_serve):
+        """test the eval server is not started without jpype"""
+        m_start_jvm.side_effect = ImportError('No module named jpype')
+        self.driver.run_eval_server()
+        self.assertFalse(m_serve.called)
+        m_start_jvm.side_effect = None
+        self.driver.run_eval_server()
+        self.assertTrue(m_serve.called)
+
 if __name__ == "__main__":
     unittest.main()
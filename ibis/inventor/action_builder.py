@@ -27,14 +27,18 @@ class ActionBuilder(object):
             'import_prep', 'import', 'avro', 'avro_parquet',
             'quality_assurance', 'qa_data_sampling', 'parquet_swap',
             'parquet_live', 'views', 'refresh')
+        # Direct to parquet pipeline, opt in through the DSL:
+        # import_prep -> import_parquet -> parquet_stage -> quality_assurance
+        self.parquet_actions = ('import_parquet', 'parquet_stage')
         self.custom_action_scripts = []
         self.error_to_action = 'kill'
         self.auto_query = False
         self.action_names = OrderedDict()
         self._set_action_names()
-        self.dsl_parser = DSLParser(self.cfg_mgr, self.default_actions,
-                                    self.cfg_mgr.requests_dir)
-        self.rules = self.dsl_parser.generate_rules(self.action_names)
+        self.dsl_parser = DSLParser(
+            self.cfg_mgr, self.default_actions + self.parquet_actions,
+            self.cfg_mgr.requests_dir)
+        self.rules = self.dsl_parser.generate_rules(self.default_actions)
         self.request_oracle_view = False
 
     def _set_action_names(self):
@@ -49,7 +53,9 @@ class ActionBuilder(object):
         self.action_names['parquet_live'] = 'parquet_live'
         self.action_names['views'] = 'views'
         self.action_names['refresh'] = 'refresh'
-        for action in self.default_actions:
+        self.action_names['import_parquet'] = 'import_parquet'
+        self.action_names['parquet_stage'] = 'parquet_stage'
+        for action in self.default_actions + self.parquet_actions:
             if action not in self.action_names.keys():
                 raise ValueError('Unrecognized action name: ' + action)
 
@@ -66,22 +72,32 @@ class ActionBuilder(object):
         _xml = _xml.format(property_name=prop_name, property_value=prop_value)
         return _xml
 
-    def gen_fork_xml(self, name, paths, fork_type, is_sub=False):
-        """Returns fork xml. Fork type option staggered or concurrent"""
+    def gen_fork_xml(self, name, paths, fork_type, is_sub=False,
+                     tables=None):
+        """Returns fork xml. Fork type option staggered or concurrent
+        Args:
+            name: fork name
+            paths: table names or, for subworkflows, action names
+            fork_type: staggered or concurrent
+            is_sub: paths are the action names
+            tables: List[ibis.model.table.ItTable] of the paths, the paths
+                start at the first action of their DSL rules
+        """
         # Assumption: Fork goes to multiple import_prep or to
         #  an avro and import_prep
         fork = ''
         if fork_type == 'concurrent':
             fork = '\n\t<fork name=\"{name}\">\n'.format(name=name)
-            for path in paths:
-                if not is_sub:
-                    _tmp = '\t\t<path start=\"{path}_{action_name}\"/>\n'
-                    _tmp = _tmp.format(
+            for index, path in enumerate(paths):
+                if is_sub:
+                    start = path
+                elif tables:
+                    start = self.get_entry_action_name(tables[index])
+                else:
+                    start = '{path}_{action_name}'.format(
                         path=path,
                         action_name=self.action_names['import_prep'])
-                    fork += _tmp
-                else:
-                    fork += '\t\t<path start=\"{path}\"/>\n'.format(path=path)
+                fork += '\t\t<path start=\"{path}\"/>\n'.format(path=start)
             fork += '\t</fork>\n'
         elif fork_type == 'staggered':
             if len(paths) > 2:
@@ -89,7 +105,11 @@ class ActionBuilder(object):
                           'more than two tables {paths}'
                 err_msg = err_msg.format(paths=paths)
                 self.logger.error(err_msg)
-            if not is_sub:
+            if not is_sub and tables:
+                # the sqoop import of the first table goes to the fork
+                paths = [self.get_import_ok_name(tables[0]),
+                         self.get_entry_action_name(tables[1])]
+            elif not is_sub:
                 paths[0] += '_' + self.action_names['avro']
                 paths[1] += '_' + self.action_names['import_prep']
             fork = '\t<fork name=\"{name}\">\n'.format(name=name)
@@ -359,9 +379,11 @@ class ActionBuilder(object):
         sqoop_args.append(self.it_table.split_by)
 
     def gen_import_action(self, action_name, fields_terminated_by=None,
-                          incremental=None, sqoop_where_query=None):
+                          incremental=None, sqoop_where_query=None,
+                          as_parquet=False):
         """Returns the import action xml
         Args:
+            as_parquet: sqoop writes parquet files instead of avro
         """
         args = []
         config = [{'fs.hdfs.impl.disable.cache': 'true'}]
@@ -381,9 +403,11 @@ class ActionBuilder(object):
         else:
             args += ['--password-file', password]
 
-        # Either ingest as AVRO or use tab delimited files
+        # Either ingest as AVRO, PARQUET or use tab delimited files
         if fields_terminated_by:
             args += ['--fields-terminated-by', fields_terminated_by]
+        elif as_parquet:
+            args.insert(1, '--as-parquetfile')
         else:
             args.insert(1, '--as-avrodatafile')
 
@@ -854,6 +878,22 @@ class ActionBuilder(object):
         sqoop = Sqoop(**sqoop_params)
         return sqoop.generate_action()
 
+    def gen_parquet_stage_action(self, action_name):
+        """Returns the parquet stage action xml. Loads the parquet_stage
+        table from the sqoop parquet files with one impala CTAS"""
+        params = {
+            'cfg_mgr': self.cfg_mgr, 'action_type': 'shell',
+            'name': action_name, 'ok': 'unknown',
+            'error': self.error_to_action, 'execute': 'parquet_stage.sh',
+            'env_var': ['target_dir={0}'.format(self.it_table.target_dir),
+                        'hive2_jdbc_url=${hive2_jdbc_url}',
+                        'HADOOP_CONF_DIR=/etc/hadoop/conf',
+                        'hdfs_ingest_path={0}'.format(
+                            self.get_hdfs_files_path())],
+            'file': [self.get_hdfs_files_path() +
+                     'parquet_stage.sh#parquet_stage.sh']}
+        return Shell(**params)
+
     def gen_avro_parquet_action(self, action_name):
         """Returns the avro parquet action xml"""
         params = {'cfg_mgr': self.cfg_mgr, 'action_type': 'hive',
@@ -1058,12 +1098,53 @@ class ActionBuilder(object):
         table_name = Utilities.replace_special_chars(table_name)
         return table_name + '_' + suffix_name
 
+    def get_ingest_actions(self, it_table):
+        """Action ids and names of the ingest actions of a table, in the
+        order gen_full_table_ingest chains them
+        Args:
+            it_table: instance of ibis.model.table.ItTable
+        Returns:
+            List[(action id, action name)]
+        """
+        rules = self.dsl_parser.get_custom_rules(it_table.actions) or \
+            self.rules
+        table_name = Utilities.replace_special_chars(it_table.table_name)
+        actions = []
+        for index, rule in enumerate(rules):
+            if rule.action_id in self.action_names:
+                suffix = self.action_names[rule.action_id]
+            elif rule.action_id == 'hive_script':
+                suffix = 'hive_' + str(index)
+            elif rule.action_id == 'shell_script':
+                suffix = 'shell_' + str(index)
+            else:
+                continue
+            actions.append((rule.action_id, table_name + '_' + suffix))
+        return actions
+
+    def get_entry_action_name(self, it_table):
+        """Name of the first ingest action of a table, e.g. a custom
+        script run before import_prep"""
+        return self.get_ingest_actions(it_table)[0][1]
+
+    def get_import_ok_name(self, it_table):
+        """Name of the action following the sqoop import of a table"""
+        actions = self.get_ingest_actions(it_table)
+        for index, (action_id, _) in enumerate(actions[:-1]):
+            if action_id in ('import', 'import_parquet'):
+                return actions[index + 1][1]
+        raise ValueError('No action follows the sqoop import of {0}'.format(
+            it_table.full_name))
+
     def gen_full_table_ingest(self, it_table, sqoop_to=None, final_ok_to=None):
         """Returns the xml of all of the actions required for an ingest.
         Typical ingestion flow:
             import_prep -> import -> avro -> avro_parquet ->
             quality_assurance -> qa_data_sampling -> parquet_swap ->
             parquet_live -> views -> refresh
+        Direct to parquet flow, when the DSL config asks for it:
+            import_prep -> import_parquet -> parquet_stage ->
+            quality_assurance -> ...
         Args:
             it_table: instance of ibis.model.table.ItTable
             sqoop_to: used for stagger sets sqoop action to value
@@ -1071,16 +1152,18 @@ class ActionBuilder(object):
         Returns:
             ingest_xml: concatnated xml of all actions
         """
-        custom_rules = self.dsl_parser.get_custom_rules(it_table.actions)
-        if custom_rules:
+        # the DSL rules only apply to this table
+        rules = self.dsl_parser.get_custom_rules(it_table.actions)
+        if rules:
             self.logger.info('DSL config provided.')
-            self.rules = custom_rules
+        else:
+            rules = self.rules
 
         self.it_table = it_table
         self.error_to_action = 'oozie_cb_fail'
         final_ok_to = final_ok_to if final_ok_to else 'oozie_cb_ok'
         final_ok_to = Utilities.replace_special_chars(final_ok_to)
-        sqoop_ok_to = it_table.table_name + '_avro'
+        sqoop_ok_to = None
         if sqoop_to:
             sqoop_ok_to = Utilities.replace_special_chars(sqoop_to)
 
@@ -1088,10 +1171,6 @@ class ActionBuilder(object):
         import_prep_action = self.gen_import_prep_action(
             self._get_action_name(self.action_names['import_prep']))
 
-        # SQOOP IMPORT ACTION
-        import_action = self.gen_import_action(
-            self._get_action_name(self.action_names['import']))
-
         # AVRO ACTION
         avro_action = self.gen_avro_action(
             self._get_action_name(self.action_names['avro']))
@@ -1100,6 +1179,10 @@ class ActionBuilder(object):
         avro_parquet_action = self.gen_avro_parquet_action(
             self._get_action_name(self.action_names['avro_parquet']))
 
+        # PARQUET STAGE ACTION
+        parquet_stage_action = self.gen_parquet_stage_action(
+            self._get_action_name(self.action_names['parquet_stage']))
+
         # Quality Assurance Action
         quality_assurance_action = self.gen_quality_assurance_action(
             self._get_action_name(self.action_names['quality_assurance']),
@@ -1128,15 +1211,24 @@ class ActionBuilder(object):
         actions = []
         ingest_xml = ''
 
-        for index, rule in enumerate(self.rules):
+        for index, rule in enumerate(rules):
             if rule.action_id == self.action_names['import_prep']:
                 actions.append(import_prep_action)
             elif rule.action_id == self.action_names['import']:
-                actions.append(import_action)
+                # SQOOP IMPORT ACTION, built on demand: sqoop evals the
+                # column types
+                actions.append(self.gen_import_action(
+                    self._get_action_name(self.action_names['import'])))
+            elif rule.action_id == self.action_names['import_parquet']:
+                actions.append(self.gen_import_action(
+                    self._get_action_name(self.action_names['import_parquet']),
+                    as_parquet=True))
             elif rule.action_id == self.action_names['avro']:
                 actions.append(avro_action)
             elif rule.action_id == self.action_names['avro_parquet']:
                 actions.append(avro_parquet_action)
+            elif rule.action_id == self.action_names['parquet_stage']:
+                actions.append(parquet_stage_action)
             elif rule.action_id == self.action_names['quality_assurance']:
                 actions.append(quality_assurance_action)
             elif rule.action_id == self.action_names['qa_data_sampling']:
@@ -1167,7 +1259,7 @@ class ActionBuilder(object):
                 actions.append(shell_action)
 
         for current_action, next_action in Utilities.pairwise(actions):
-            if current_action.get_action_type() == 'sqoop':
+            if current_action.get_action_type() == 'sqoop' and sqoop_ok_to:
                 current_action.ok = sqoop_ok_to
             else:
                 current_action.ok = next_action.get_name()
@@ -1240,15 +1332,18 @@ class ActionBuilder(object):
         # replace / with _ to make it a unique file name
         new_file_name = custom_script_path.replace('/', '_')
         final_save_path = os.path.join(self.cfg_mgr.files, new_file_name)
-        # copy file to files dir to save to git
-        shutil.copy(unix_script_path, final_save_path)
+        # copy file to files dir to save to git. Tables generated in
+        # parallel may share a script: write a temp file and rename it
+        tmp_save_path = '{0}.{1}.tmp'.format(final_save_path, os.getpid())
+        shutil.copy(unix_script_path, tmp_save_path)
         if rule.is_hive_script:
-            with open(final_save_path, 'r+') as file_h:
+            with open(tmp_save_path, 'r+') as file_h:
                 current_content = file_h.read()
                 file_h.seek(0, 0)
                 new_content = self.gen_hive_connect_settings() + '\n' + \
                     current_content
                 file_h.write(new_content)
+        os.rename(tmp_save_path, final_save_path)
         self.custom_action_scripts.append(new_file_name)
         return new_file_name
 
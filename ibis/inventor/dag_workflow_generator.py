@@ -0,0 +1,204 @@
+"""Create oozie workflows from a dependency DAG of table ingests."""
+import collections
+from ibis.inventor.workflow_generator import WorkflowGenerator, \
+    DEFAULT_RUN_TIMES
+from ibis.utilities.utilities import Utilities
+
+LANES_FORK = 'lanes'
+LANES_JOIN = 'lanes_join'
+HEAVY_LANES = 2  # max heavy tables ingested at the same time
+
+
+class IngestDag(object):
+
+    """Dependency DAG of table ingests. A table depends on at most one
+    other table, so every root starts a lane of tables ingested back to
+    back and lanes run concurrently without waiting on each other.
+    """
+
+    def __init__(self):
+        self.tables = collections.OrderedDict()
+        self.parent = {}
+        self.children = collections.defaultdict(list)
+
+    @classmethod
+    def from_lanes(cls, lanes):
+        """Builds a DAG with a chain of tables per lane
+        Args:
+            lanes: List[List[ibis.model.table.ItTable]]
+        """
+        dag = cls()
+        for lane in lanes:
+            previous = None
+            for table in lane:
+                dag.add_table(table, previous)
+                previous = table
+        return dag
+
+    @staticmethod
+    def node_name(table):
+        """Oozie actions of a table are named after the table name"""
+        return Utilities.replace_special_chars(table.table_name)
+
+    def add_table(self, table, depends_on=None):
+        """Add a table ingest
+        Args:
+            table: ibis.model.table.ItTable
+            depends_on: ibis.model.table.ItTable ingested before the table
+        """
+        name = self.node_name(table)
+        if name in self.tables:
+            err_msg = 'Table {0} requested twice in a workflow'.format(name)
+            raise ValueError(Utilities.print_box_msg(err_msg, 'x'))
+        parent = None
+        if depends_on is not None:
+            parent = self.node_name(depends_on)
+            if parent not in self.tables:
+                err_msg = 'Table {0} depends on unknown table {1}'
+                raise ValueError(Utilities.print_box_msg(
+                    err_msg.format(name, parent), 'x'))
+            if self.children[parent]:
+                err_msg = 'Table {0} already has a dependent table'
+                raise ValueError(Utilities.print_box_msg(
+                    err_msg.format(parent), 'x'))
+            self.children[parent].append(name)
+        self.tables[name] = table
+        self.parent[name] = parent
+
+    def next_table(self, table):
+        """Returns the table ingested after a table or None"""
+        children = self.children.get(self.node_name(table))
+        return self.tables[children[0]] if children else None
+
+    def roots(self):
+        """Tables without dependencies"""
+        return [table for name, table in self.tables.iteritems()
+                if self.parent[name] is None]
+
+    def lanes(self):
+        """Returns List[List[ibis.model.table.ItTable]], a chain of tables
+        per root"""
+        lanes = []
+        for table in self.roots():
+            lane = []
+            while table is not None:
+                lane.append(table)
+                table = self.next_table(table)
+            lanes.append(lane)
+        return lanes
+
+
+class DagWorkflowGenerator(WorkflowGenerator):
+
+    """Generates a workflow with up to workflow_lanes concurrent lanes.
+    Tables of a lane are ingested back to back, the only join waits for
+    all lanes before the checks and balances action. Subworkflows are
+    generated with pipelines.
+    """
+
+    def get_lane_run_times(self, tables):
+        """Run times used to balance the lanes. Historical run times with
+        the cost pipeline scheduler, load based defaults otherwise.
+        Returns:
+            dict of db_table_name to (pull_time, parquet_time)
+        """
+        if self.cfg_mgr.pipeline_scheduler == 'cost':
+            return self.get_run_times(tables)
+        return dict((table.db_table_name, DEFAULT_RUN_TIMES.get(
+            table.load, DEFAULT_RUN_TIMES['010'])) for table in tables)
+
+    def build_dag(self, tables):
+        """Assigns tables to lanes, longest table first to the lane that
+        finishes first. Heavy tables only go to the first HEAVY_LANES lanes
+        so that no more than HEAVY_LANES heavy sqoop imports run at once.
+        Args:
+            tables: List[ibis.model.table.ItTable]
+        Returns:
+            IngestDag
+        """
+        for table in tables:
+            if not (table.is_small or table.is_medium or table.is_heavy):
+                err_msg = "Unknown key '{load}' in load column"
+                err_msg = err_msg.format(load=table.load)
+                raise ValueError(Utilities.print_box_msg(err_msg, 'x'))
+        run_times = self.get_lane_run_times(tables)
+
+        def run_time(table):
+            """pull and parquet time of a table"""
+            return sum(run_times[table.db_table_name])
+
+        num_lanes = max(1, min(self.cfg_mgr.workflow_lanes, len(tables)))
+        lanes = [[] for _ in range(num_lanes)]
+        finish = [0.0] * num_lanes
+        by_cost = sorted(tables, key=lambda tbl: (-run_time(tbl),
+                                                  tbl.table_name))
+        for table in by_cost:
+            eligible = range(num_lanes)
+            if table.is_heavy:
+                eligible = eligible[:HEAVY_LANES]
+            index = min(eligible, key=lambda i: (finish[i], i))
+            lanes[index].append(table)
+            finish[index] += run_time(table)
+        lanes = [lane for lane in lanes if lane]
+        msg = 'Predicted makespan: {0:.0f}s for {1} tables in {2} lanes'
+        self.logger.info(msg.format(max(finish), len(tables), len(lanes)))
+        return IngestDag.from_lanes(lanes)
+
+    def plan_pipelines(self, tables, is_sub=False):
+        """Returns the lanes of the table DAG, pipelines for subworkflows
+        Args:
+            tables: List[ibis.model.table.ItTable]
+            is_sub: boolean for if subworkflow
+        Returns:
+            List[List[ibis.model.table.ItTable]]
+        """
+        if is_sub:
+            return super(DagWorkflowGenerator, self).plan_pipelines(
+                tables, is_sub)
+        return self.build_dag(tables).lanes()
+
+    def gen_workflow_from_pipelines(self, pipelines, is_sub=False):
+        """Generates a workflow with a concurrent lane per list of tables
+        Args:
+            pipelines: List[List[ibis.model.table.ItTable]], lanes
+            is_sub: boolean if it is for subworkflow
+        """
+        if is_sub:
+            super(DagWorkflowGenerator, self).gen_workflow_from_pipelines(
+                pipelines, is_sub)
+            return
+        self.gen_workflow_from_dag(IngestDag.from_lanes(pipelines))
+
+    def gen_workflow_from_dag(self, dag):
+        """Generates a workflow from an IngestDag
+        Args:
+            dag: IngestDag
+        """
+        roots = dag.roots()
+        oozie_cb_ok_to = 'oozie_cb_ok'
+        lanes_end = LANES_JOIN if len(roots) > 1 else oozie_cb_ok_to
+        self.gen_workflow_start()
+        self.file_out.write('\n')
+        if len(roots) > 1:
+            self.file_out.write('\t<start to="{0}"/>\n'.format(LANES_FORK))
+            fork_xml = self.action_builder.gen_fork_xml(
+                LANES_FORK, [dag.node_name(table) for table in roots],
+                'concurrent', tables=roots)
+            self.file_out.write(fork_xml)
+        else:
+            self.file_out.write('\t<start to="{0}"/>\n'.format(
+                self.action_builder.get_entry_action_name(roots[0])))
+        self.workflow_started = True
+        for table in dag.tables.values():
+            next_table = dag.next_table(table)
+            end_to = lanes_end
+            if next_table is not None:
+                end_to = self.action_builder.get_entry_action_name(
+                    next_table)
+            self.gen_full_ingest_actions(table, {
+                'sqoop_to': None, 'end_to': end_to})
+        if len(roots) > 1:
+            self.file_out.write(self.action_builder.gen_join_xml(
+                LANES_JOIN, oozie_cb_ok_to))
+        self.gen_oozie_cb_action()
+        self.gen_workflow_end()
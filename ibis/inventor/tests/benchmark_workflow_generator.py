@@ -0,0 +1,269 @@
+"""Workflow generation benchmark on synthetic it table inventories.
+Usage:
+    python -m ibis.inventor.tests.benchmark_workflow_generator
+        [--sizes 10 100 1000 10000] [--output workflow_benchmark.json]
+        [--baseline workflow_benchmark_old.json] [--tolerance 0.2]
+Every size runs in a new process so that its peak memory is its own.
+Sqoop eval and impala connections are stubbed: the source DDL is cached
+up front like gen_prod_workflow does, sqoop eval answers from the same
+synthetic DDL and impala queries return no rows.
+"""
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, SUPPRESS
+from mock import patch, MagicMock
+from ibis.inventor.action_builder import ActionBuilder
+from ibis.inventor.workflow_generator import WorkflowGenerator
+from ibis.inventory.automation_ids_inventory import AUTOInventory
+from ibis.model.table import ItTable
+from ibis.settings import UNIT_TEST_ENV
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities import sqoop_helper
+from ibis.utilities.sqoop_helper import SqoopHelper
+from ibis.utilities.utilities import Utilities
+
+MODULE = 'ibis.inventor.tests.benchmark_workflow_generator'
+SIZES = [10, 100, 1000, 10000]
+STAGES = ['gen_full_table_ingest', 'gen_pipelines', 'generate',
+          'job_properties', 'wld']
+APPL_ID = 'BENCH001'
+COLUMNS = 20
+# vendor: (jdbc url, schema, column types)
+VENDORS = {
+    'oracle': ('jdbc:oracle:thin:@//fake.oracle:1521/fake_servicename', '',
+               ['NUMBER', 'VARCHAR2', 'DATE', 'TIMESTAMP(6)', 'CLOB']),
+    'db2': ('jdbc:db2://fake.db2:50200/fake_servicename', '',
+            ['INTEGER', 'VARCHAR', 'TIMESTMP', 'DECIMAL', 'BLOB']),
+    'sqlserver': ('jdbc:sqlserver://fake.sqlserver:5016;'
+                  'database=fake_database', 'dbo',
+                  ['int', 'varchar', 'datetime', 'decimal', 'ntext']),
+    'teradata': ('jdbc:teradata://fake.teradata/database=fake_database', '',
+                 ['I', 'CV', 'DA', 'TS', 'D']),
+    'mysql': ('jdbc:mysql://fake.mysql/ibis', '',
+              ['int', 'varchar', 'time', 'year', 'text']),
+    'postgresql': ('jdbc:postgresql://fake.postgresql:5432/fake_database',
+                   'public', ['integer', 'varchar', 'timestamp', 'json',
+                              'uuid']),
+}
+# small, medium and heavy
+LOADS = ['100', '010', '001']
+# daily, weekly, monthly
+FREQUENCIES = ['101', '100', '010']
+
+
+def synthetic_rows(count):
+    """it table rows spread over all source vendors and load buckets
+    Args:
+        count: number of rows
+    Returns:
+        list of it table rows
+    """
+    vendors = sorted(VENDORS)
+    rows = []
+    for index in range(count):
+        vendor = vendors[index % len(vendors)]
+        jdbcurl, schema, _ = VENDORS[vendor]
+        load = LOADS[(index // len(vendors)) % len(LOADS)]
+        frequency = FREQUENCIES[index % len(FREQUENCIES)]
+        table_name = 'bench_{0}_tbl_{1:05d}'.format(vendor, index)
+        database = 'bench_{0}_db'.format(vendor)
+        rows.append({
+            'source_database_name': database,
+            'source_table_name': table_name,
+            'source_schema_name': schema,
+            'full_table_name': 'bench.{0}_{1}'.format(database, table_name),
+            'domain': 'bench', 'db_env': 'dev',
+            'jdbcurl': jdbcurl, 'db_username': 'fake_username',
+            'password_file': 'jceks://hdfs/user/dev/fake.passwords.jceks'
+                             '#fake.password.alias',
+            'load': frequency + load,
+            'mappers': 2 if load == '100' else 10,
+            'split_by': 'COL_0' if load != '100' else '',
+            'fetch_size': 50000, 'hold': 0,
+            'automation_appl_id': APPL_ID,
+            'views': 'bench_view_{0}'.format(index % 3),
+            'target_dir': 'mdm/bench/{0}/{1}'.format(database, table_name),
+            'connection_factories': '',
+            'check_column': '', 'automation_group': ''})
+    return rows
+
+
+def synthetic_ddl(jdbcurl):
+    """Column types of every synthetic table of a source"""
+    for _, (vendor_url, _, types) in VENDORS.items():
+        if vendor_url == jdbcurl:
+            return [['COL_{0}'.format(num), types[num % len(types)]]
+                    for num in range(COLUMNS)]
+    raise ValueError('Unknown synthetic source {0}'.format(jdbcurl))
+
+
+def cache_ddl(cfg_mgr, tables):
+    """Fill the sqoop caches like SqoopCacheManager does"""
+    sqoop = SqoopHelper(cfg_mgr)
+    for table in tables:
+        query = sqoop.get_ddl_query(table.jdbcurl, table.database,
+                                    table.table_name, table.schema)
+        sqoop_helper.SQOOP_CACHE[query] = synthetic_ddl(table.jdbcurl)
+        if table.is_oracle:
+            query = sqoop.get_ddl_table_view(table.jdbcurl, table.database,
+                                             table.table_name)
+            sqoop_helper.SQOOP_CACHE_VIEW[query] = [['TABLE']]
+
+
+def stub_eval(sqoop, jdbc, sql_stmt, db_username, password_file):
+    """sqoop eval of a synthetic source"""
+    return synthetic_ddl(jdbc)
+
+
+def run_size(size, env=UNIT_TEST_ENV):
+    """Time the workflow generation stages of a synthetic inventory
+    Args:
+        size: number of it table rows
+        env: properties file of the config
+    Returns:
+        dict of size, seconds per stage, sqoop evals and peak rss in kB
+    """
+    cfg_mgr = ConfigManager(env)
+    work_dir = tempfile.mkdtemp()
+    cfg_mgr.files = work_dir + '/'
+    cfg_mgr.saves = work_dir + '/'
+    seconds = {}
+    try:
+        with patch.object(SqoopHelper, 'eval', autospec=True,
+                          side_effect=stub_eval) as m_eval, \
+                patch('ibis.inventory.inventory.connect',
+                      return_value=MagicMock()):
+            tables = [ItTable(row, cfg_mgr) for row in synthetic_rows(size)]
+            names = [Utilities.replace_special_chars(table.db_table_name)
+                     for table in tables]
+            cache_ddl(cfg_mgr, tables)
+
+            start = time.time()
+            builder = ActionBuilder(cfg_mgr)
+            builder.workflowName = 'benchmark_actions'
+            for table in tables:
+                builder.gen_full_table_ingest(table)
+            seconds['gen_full_table_ingest'] = time.time() - start
+
+            start = time.time()
+            generator = WorkflowGenerator('benchmark_pipelines', cfg_mgr)
+            generator.gen_pipelines(generator.sort_table_prop_by_load(tables))
+            generator.file_out.close()
+            seconds['gen_pipelines'] = time.time() - start
+
+            start = time.time()
+            WorkflowGenerator('benchmark', cfg_mgr).generate(tables)
+            seconds['generate'] = time.time() - start
+
+            start = time.time()
+            utilities = Utilities(cfg_mgr)
+            for table, name in zip(tables, names):
+                utilities.gen_job_properties(name, [table.table_name],
+                                             APPL_ID, table)
+            seconds['job_properties'] = time.time() - start
+
+            start = time.time()
+            AUTOInventory(cfg_mgr).gen_wld_tables(APPL_ID, tables, names)
+            seconds['wld'] = time.time() - start
+            sqoop_evals = m_eval.call_count
+    finally:
+        sqoop_helper.SQOOP_CACHE.clear()
+        sqoop_helper.SQOOP_CACHE_VIEW.clear()
+        shutil.rmtree(work_dir)
+    return {'size': size,
+            'seconds': dict((stage, round(seconds[stage], 4))
+                            for stage in STAGES),
+            'sqoop_evals': sqoop_evals,
+            # kilobytes on linux
+            'peak_rss_kb': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss}
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    """Regressions of results against a baseline
+    Args:
+        results: benchmark results
+        baseline: benchmark results of an earlier run
+        tolerance: allowed relative slow down, 0.2 is 20%
+        min_seconds: stage slow downs below this are noise
+    Returns:
+        list of regression messages
+    """
+    regressions = []
+    old_runs = dict((run['size'], run) for run in baseline['results'])
+    for run in results['results']:
+        old = old_runs.get(run['size'])
+        if old is None:
+            continue
+        for stage in STAGES:
+            new_sec = run['seconds'][stage]
+            old_sec = old['seconds'].get(stage)
+            if old_sec is not None and new_sec > old_sec * (1 + tolerance) \
+                    and new_sec - old_sec > min_seconds:
+                msg = '{0} tables {1}: {2:.3f}s -> {3:.3f}s'
+                regressions.append(msg.format(run['size'], stage, old_sec,
+                                              new_sec))
+        if run['peak_rss_kb'] > old['peak_rss_kb'] * (1 + tolerance):
+            regressions.append('{0} tables peak rss: {1}kB -> {2}kB'.format(
+                run['size'], old['peak_rss_kb'], run['peak_rss_kb']))
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmark sizes in new processes and write the results
+    Returns:
+        exit code, 1 on regressions against the baseline
+    """
+    parser = ArgumentParser(description='Workflow generation benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--env', default=UNIT_TEST_ENV,
+                        help='properties file of the config')
+    parser.add_argument('--output', default='workflow_benchmark.json',
+                        help='json results file')
+    parser.add_argument('--baseline', help='json results of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative slow down')
+    # internal, runs one size and prints its results
+    parser.add_argument('--run-size', type=int, help=SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_size:
+        print json.dumps(run_size(args.run_size, args.env))
+        return 0
+
+    results = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(),
+               'host': platform.node(), 'env': args.env,
+               'stages': STAGES, 'results': []}
+    for size in args.sizes:
+        output = subprocess.check_output([
+            sys.executable, '-m', MODULE, '--run-size', str(size),
+            '--env', args.env])
+        run = json.loads(output.strip().splitlines()[-1])
+        results['results'].append(run)
+        print '{0:>6} tables: {1} peak rss {2}kB'.format(
+            size, ', '.join('{0} {1:.3f}s'.format(stage, run['seconds'][stage])
+                            for stage in STAGES), run['peak_rss_kb'])
+    with open(args.output, 'w') as file_h:
+        json.dump(results, file_h, indent=1, sort_keys=True)
+    print 'Results written to {0}'.format(os.path.abspath(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as file_h:
+            regressions = compare(results, json.load(file_h), args.tolerance)
+        for regression in regressions:
+            print 'Regression: {0}'.format(regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -382,6 +382,17 @@ full_ingest_tbl_custom_config = {
     'actions': 'custom_config_no_views.dsl',
     'source_database_name': 'fake_database', 'source_table_name': 'fake_mem_tablename'}
 
+full_ingest_tbl_parquet = {
+    'domain': 'member', 'db_username': 'fake_username', 'db_env': 'dev',
+    'jdbcurl': 'jdbc:oracle:thin:@//fake.oracle:1521/'
+               'fake_servicename',
+    'password_file': 'jceks://hdfs/user/dev/fake.passwords.jceks#'
+                     'fake.password.alias',
+    'load': '000001', 'fetch_size': 50000, 'hold': 0, 'views': 'fake_view_im',
+    'actions': 'parquet_config.dsl',
+    'source_database_name': 'fake_database',
+    'source_table_name': 'fake_mem_tablename'}
+
 fake_algnmt_tbl = {
     'domain': 'member',
     'target_dir': 'mdm/member/fake_database/fake_algnmt_tablename',
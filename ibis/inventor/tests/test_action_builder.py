@@ -7,9 +7,11 @@ from mock import patch
 from ibis.inventor.action_builder import ActionBuilder
 from ibis.inventor.dsl_parser import WorkflowRule
 from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.utilities import Utilities
 from ibis.model.table import ItTable
 from ibis.inventor.tests.fixture_workflow_generator import full_ingest_tbl, \
     fake_algnmt_tbl, full_ingest_tbl_custom_config, fake_fact_tbl_prop, \
+    full_ingest_tbl_parquet, \
     sqlserver_fake_tablename, td_fake_tablename, db2_fake_tablename, \
     fake_fact_tbl_prop_mysql, dollar_fake_tablename
 from ibis.settings import UNIT_TEST_ENV
@@ -88,6 +90,35 @@ class ActionBuilderFunctionsTest(unittest.TestCase):
         self.assertTrue(self.compare_files(gen_fork_concur1, expected1))
         self.assertTrue(self.compare_files(gen_fork_stag, expected2))
 
+    def test_gen_fork_xml_tables(self):
+        """Test fork paths start at the first DSL action of each table"""
+        self.cfg_mgr.requests_dir = os.path.join(
+            self.cfg_mgr.files, 'requests')
+        os.makedirs(self.cfg_mgr.requests_dir)
+        self.builder.dsl_parser.scripts_dir = self.cfg_mgr.requests_dir
+        shutil.copy(
+            os.path.join(BASE_DIR, 'test_resources/parquet_config.dsl'),
+            self.cfg_mgr.requests_dir)
+        parquet_tbl = ItTable(full_ingest_tbl_parquet, self.cfg_mgr)
+        avro_tbl = ItTable(fake_fact_tbl_prop, self.cfg_mgr)
+        parquet_name = Utilities.replace_special_chars(
+            parquet_tbl.table_name)
+        avro_name = Utilities.replace_special_chars(avro_tbl.table_name)
+        self.assertEqual(self.builder.get_entry_action_name(parquet_tbl),
+                         parquet_name + '_import_prep')
+        self.assertEqual(self.builder.get_import_ok_name(parquet_tbl),
+                         parquet_name + '_parquet_stage')
+        self.assertEqual(self.builder.get_import_ok_name(avro_tbl),
+                         avro_name + '_avro')
+        gen_fork_stag = self.builder.gen_fork_xml(
+            'pipeline1', [parquet_name, avro_name], 'staggered',
+            tables=[parquet_tbl, avro_tbl])
+        expected = '\t<fork name=\"pipeline1\">\n\t\t<path ' \
+                   'start=\"{0}_parquet_stage\"/>\n\t\t<path start=' \
+                   '\"{1}_import_prep\"/>\n\t</fork>'.format(parquet_name,
+                                                              avro_name)
+        self.assertTrue(self.compare_files(gen_fork_stag, expected))
+
     def test_gen_join_xml(self):
         """Test join xml generation."""
         gen_join = self.builder.gen_join_xml("pipeline1_join", "pipeline2")
@@ -851,6 +882,34 @@ class ActionBuilderFunctionsTest(unittest.TestCase):
             expected = my_file.read()
         self.assertTrue(self.compare_files(ingest_xml, expected))
 
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    @patch('ibis.inventor.action_builder.ActionBuilder.get_col_types',
+           autospec=True)
+    def test_gen_full_table_ingest_parquet(self, m_get_col_types, mock_eval):
+        """Test the direct to parquet ingest: sqoop writes parquet and
+        parquet_stage replaces the avro and avro_parquet actions"""
+        m_get_col_types.return_value = [('trans_time', 'TIMESTAMP')]
+        mock_eval.return_value = [['table']]
+        real_host = self.cfg_mgr.host
+        self.builder.cfg_mgr.host = 'fake.workflow.host'
+        self.cfg_mgr.requests_dir = os.path.join(
+            self.cfg_mgr.files, 'requests')
+        os.makedirs(self.cfg_mgr.requests_dir)
+        self.builder.dsl_parser.scripts_dir = self.cfg_mgr.requests_dir
+        shutil.copy(
+            os.path.join(BASE_DIR, 'test_resources/parquet_config.dsl'),
+            self.cfg_mgr.requests_dir)
+        table_obj = ItTable(full_ingest_tbl_parquet, self.cfg_mgr)
+        ingest_xml = self.builder.gen_full_table_ingest(table_obj)
+        self.builder.cfg_mgr.host = real_host  # Return host to real value
+        # one sqoop eval of the column types for the single import
+        self.assertEqual(m_get_col_types.call_count, 1)
+        path = os.path.join(
+            BASE_DIR, 'expected_workflows/full_ingest_parquet.xml')
+        with open(path, 'r') as my_file:
+            expected = my_file.read()
+        self.assertTrue(self.compare_files(ingest_xml, expected))
+
     def test_get_sqoop_query(self):
         """test special chars"""
         ora_tbl = ItTable(fake_fact_tbl_prop, self.cfg_mgr)
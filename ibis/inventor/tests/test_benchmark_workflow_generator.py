@@ -0,0 +1,55 @@
+"""Workflow generation benchmark tests."""
+import unittest
+from ibis.inventor.tests.benchmark_workflow_generator import run_size, \
+    synthetic_rows, compare, STAGES, VENDORS, LOADS
+from ibis.model.table import ItTable
+from ibis.settings import UNIT_TEST_ENV
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities import sqoop_helper
+
+
+class BenchmarkWorkflowGeneratorTest(unittest.TestCase):
+    """Tests the workflow generation benchmark"""
+
+    def test_synthetic_rows(self):
+        """test rows cover every source vendor and load bucket"""
+        cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        tables = [ItTable(row, cfg_mgr) for row in synthetic_rows(18)]
+        sources = set()
+        for table in tables:
+            for vendor in VENDORS:
+                if getattr(table, 'is_' + vendor):
+                    sources.add(vendor)
+        self.assertEqual(sources, set(VENDORS))
+        self.assertEqual(set(table.load for table in tables), set(LOADS))
+        self.assertEqual(len(set(table.db_table_name for table in tables)),
+                         18)
+
+    def test_run_size(self):
+        """test every stage is timed without sqoop or impala"""
+        run = run_size(6)
+        self.assertEqual(run['size'], 6)
+        self.assertEqual(sorted(run['seconds']), sorted(STAGES))
+        self.assertEqual(run['sqoop_evals'], 0)
+        self.assertGreater(run['peak_rss_kb'], 0)
+        self.assertEqual(sqoop_helper.SQOOP_CACHE, {})
+        self.assertEqual(sqoop_helper.SQOOP_CACHE_VIEW, {})
+
+    def test_compare(self):
+        """test slow downs above the tolerance and noise are reported"""
+        seconds = dict((stage, 1.0) for stage in STAGES)
+        baseline = {'results': [{'size': 10, 'seconds': seconds,
+                                 'peak_rss_kb': 1000}]}
+        slower = dict(seconds, generate=1.5, wld=1.1)
+        results = {'results': [{'size': 10, 'seconds': slower,
+                                'peak_rss_kb': 1300},
+                               {'size': 100, 'seconds': seconds,
+                                'peak_rss_kb': 1000}]}
+        self.assertEqual(compare(results, baseline, 0.2), [
+            '10 tables generate: 1.000s -> 1.500s',
+            '10 tables peak rss: 1000kB -> 1300kB'])
+        self.assertEqual(compare(results, baseline, 0.6), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
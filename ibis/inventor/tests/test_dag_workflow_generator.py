@@ -0,0 +1,133 @@
+"""DAG workflow generator tests."""
+import os
+import shutil
+import unittest
+import xml.etree.ElementTree as ET
+from mock import patch
+from ibis.inventor.tests.fixture_workflow_generator import *
+from ibis.inventor.dag_workflow_generator import DagWorkflowGenerator, \
+    IngestDag
+from ibis.inventory import inventory
+from ibis.model.table import ItTable
+from ibis.settings import UNIT_TEST_ENV
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.workflow_validator import WorkflowValidator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def local_name(tag):
+    """Strip the xml namespace of a tag"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class DagWorkflowGeneratorFunctionsTest(unittest.TestCase):
+
+    """Tests the DAG workflow generator"""
+
+    @patch.object(inventory.Inventory, '_connect', autospec=True)
+    def setUp(self, mock_connect):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.cfg_mgr.workflow_lanes = 3
+        self.generator = DagWorkflowGenerator('test_dag_workflow',
+                                              self.cfg_mgr)
+        self.generator.action_builder.cfg_mgr.host = 'fake.workflow.host'
+        self.tables = [ItTable(prop, self.cfg_mgr) for prop in [
+            fake_ben_tbl_prop, fake_cens_tbl_prop, fake_fct_tbl_prop,
+            fake_fact_tbl_prop, fake_prof_tbl_prop, heavy_2_prop,
+            heavy_3_prop]]
+
+    def tearDown(self):
+        self.generator.file_out.close()
+        if os.path.exists(self.generator.wf_file_path):
+            os.remove(self.generator.wf_file_path)
+
+    def test_ingest_dag(self):
+        """Test lanes of the dependency DAG"""
+        ben, cens, fct = self.tables[:3]
+        dag = IngestDag.from_lanes([[ben, cens], [fct]])
+        self.assertEqual(dag.roots(), [ben, fct])
+        self.assertEqual(dag.next_table(ben), cens)
+        self.assertIsNone(dag.next_table(cens))
+        self.assertEqual(dag.lanes(), [[ben, cens], [fct]])
+        with self.assertRaises(ValueError):
+            dag.add_table(ItTable(fake_ben_tbl_prop, self.cfg_mgr))
+        with self.assertRaises(ValueError):
+            dag.add_table(self.tables[3], depends_on=ben)
+
+    def test_plan_pipelines(self):
+        """Test longest tables go first to the lane finishing first"""
+        ben, cens, fct, fact, prof, heavy_2, heavy_3 = self.tables
+        lanes = self.generator.plan_pipelines(self.tables)
+        # heavy tables are kept to two lanes
+        self.assertEqual(lanes, [[prof, heavy_3], [heavy_2],
+                                 [fct, fact, ben, cens]])
+        self.cfg_mgr.workflow_lanes = 1
+        self.assertEqual(len(self.generator.plan_pipelines(self.tables)), 1)
+
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    def test_generate(self, m_eval):
+        """Test the workflow has a single fork and join"""
+        m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'varchar']]
+        self.generator.generate(self.tables)
+        root = ET.parse(self.generator.wf_file_path).getroot()
+        nodes = dict((node.get('name'), node) for node in root
+                     if node.get('name'))
+        forks = [node for node in root if local_name(node.tag) == 'fork']
+        joins = [node for node in root if local_name(node.tag) == 'join']
+        self.assertEqual(len(forks), 1)
+        self.assertEqual(len(joins), 1)
+        self.assertEqual(joins[0].get('to'), 'oozie_cb_ok')
+        paths = [path.get('start') for path in forks[0]]
+        self.assertEqual(paths, ['fake_prof_tablename_import_prep',
+                                 'heavy_2_import_prep',
+                                 'fake_fct_tablename_import_prep'])
+        # tables of a lane run back to back, every transition is a node
+        targets = [element.get('to') for element in root.iter()
+                   if element.get('to')]
+        self.assertIn('risk_fake_tablename_import_prep', targets)
+        self.assertIn('lanes_join', targets)
+        for target in targets:
+            self.assertIn(target, nodes.keys() + ['end', 'kill'])
+        self.assertEqual(WorkflowValidator(self.cfg_mgr).validate_file(
+            self.generator.wf_file_path), [])
+
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    def test_generate_custom_scripts(self, m_eval):
+        """Test lanes start and continue at a custom script run before
+        import_prep"""
+        m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'varchar']]
+        self.cfg_mgr.requests_dir = os.path.join(self.cfg_mgr.files,
+                                                 'requests')
+        os.makedirs(os.path.join(self.cfg_mgr.requests_dir, 'DEV'))
+        self.addCleanup(shutil.rmtree, self.cfg_mgr.requests_dir)
+        for name in ['custom_config_no_views_2.dsl', 'shell_test.sh']:
+            shutil.copy(os.path.join(BASE_DIR, 'test_resources', name),
+                        self.cfg_mgr.requests_dir)
+        shutil.copy(os.path.join(BASE_DIR, 'test_resources/hive_test.hql'),
+                    os.path.join(self.cfg_mgr.requests_dir, 'DEV'))
+        custom = ItTable(dict(full_ingest_tbl_custom_config,
+                              actions='custom_config_no_views_2.dsl'),
+                         self.cfg_mgr)
+        for lanes in [3, 1]:
+            self.cfg_mgr.workflow_lanes = lanes
+            self.generator.file_out.close()
+            with patch.object(inventory.Inventory, '_connect',
+                              autospec=True):
+                self.generator = DagWorkflowGenerator('test_dag_workflow',
+                                                      self.cfg_mgr)
+            self.generator.action_builder.dsl_parser.scripts_dir = \
+                self.cfg_mgr.requests_dir
+            self.generator.generate([self.tables[0], custom])
+            root = ET.parse(self.generator.wf_file_path).getroot()
+            targets = [element.get('to') or element.get('start')
+                       for element in root.iter()]
+            self.assertIn('fake_mem_tablename_shell_0', targets)
+            self.assertNotIn('fake_mem_tablename_import_prep', [
+                element.get('start') for element in root.iter()])
+            self.assertEqual(WorkflowValidator(self.cfg_mgr).validate_file(
+                self.generator.wf_file_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ from ibis.inventory.request_inventory import RequestInventory, Request
 from ibis.model.table import ItTable
 from ibis.settings import UNIT_TEST_ENV
 from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.workflow_validator import WorkflowValidator
 from ibis.driver.driver import Driver
 from ibis.model.exporttable import ItTableExport
 
@@ -19,6 +20,11 @@ from ibis.model.exporttable import ItTableExport
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+def mappings_in_order(*mappings):
+    """get_table_mappings side effect, maps the keys to mappings in order"""
+    return lambda _, keys: dict(zip([tuple(key) for key in keys], mappings))
+
+
 class WorkflowGeneratorFunctionsTest(unittest.TestCase):
 
     """Tests the functionality of the Workflow Generator class..."""
@@ -225,6 +231,38 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
                            ItTable(fake_fact_tbl_prop, self.cfg_mgr)],
                           [ItTable(fake_prof_tbl_prop, self.cfg_mgr)]])
 
+    @patch('ibis.inventor.workflow_generator.CheckBalancesInventory',
+           autospec=True)
+    def test_gen_cost_pipelines(self, m_cb):
+        """Tests pipelines packed by historical run times"""
+        m_cb.return_value.get_run_times.return_value = {
+            'fake_database_fake_fct_tablename': (100.0, 50.0, 1000),
+            'fake_database_fake_ben_tablename': (900.0, 100.0, 10),
+            'fake_database_fake_cens_tablename': (0.0, 0.0, 0),
+            'fake_database_fake_prof_tablename': (3000.0, 1000.0, 5)}
+        self.cfg_mgr.max_pipeline_tables = 2
+        self.cfg_mgr.pipeline_scheduler = 'cost'
+        ben = ItTable(fake_ben_tbl_prop, self.cfg_mgr)
+        cens = ItTable(fake_cens_tbl_prop, self.cfg_mgr)
+        fct = ItTable(fake_fct_tbl_prop, self.cfg_mgr)
+        fact = ItTable(fake_fact_tbl_prop, self.cfg_mgr)
+        prof = ItTable(fake_prof_tbl_prop, self.cfg_mgr)
+        tables = [fct, prof, fact, ben, cens]
+        run_times = self.generator.get_run_times(tables)
+        # no history, median of the tables with the same load
+        self.assertEqual(run_times['fake_database_risk_fake_tablename'],
+                         (100.0, 50.0))
+        self.assertEqual(run_times['fake_database_fake_cens_tablename'],
+                         (900.0, 100.0))
+        pipelines = self.generator.plan_pipelines(tables)
+        self.assertEqual(pipelines, [[prof], [ben, cens], [fct, fact]])
+        self.assertEqual(
+            self.generator.predict_makespan(pipelines, run_times), 5150.0)
+        # staggered heavy pair starts the second table after the first pull
+        prof_2 = ItTable(fake_prof_tbl_prop, self.cfg_mgr)
+        self.assertEqual(self.generator.pipeline_run_time(
+            [prof, prof_2], run_times), 7000.0)
+
     def test_get_pipeline_weight(self):
         """Tests the method for checking a pipeline's weight"""
         light_pipeline = [ItTable(fake_ben_tbl_prop, self.cfg_mgr)]
@@ -443,15 +481,15 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
         self.assertTrue(bool_test)
 
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
-    def test_generate_one_req(self, mock_connect, mock_get_table_mapping,
+    def test_generate_one_req(self, mock_connect, mock_get_table_mappings,
                               m_eval):
         """Tests the full workflow generation for one table request"""
         m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'TIMESTAMP'],
                                ['Col3', 'varchar']]
-        mock_get_table_mapping.side_effect = [fake_cens_tbl_prop,
-                                              fake_cens_tbl_prop]
+        mock_get_table_mappings.side_effect = mappings_in_order(
+            fake_cens_tbl_prop)
         all_req = [Request(light_req_1, self.cfg_mgr)]
         available_tables, _, _ = self.req_inventory.get_available_requests(
             all_req)
@@ -464,17 +502,17 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
     @patch('ibis.inventor.action_builder.ActionBuilder.get_col_types',
            autospec=True)
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
     def test_generate_one_req_custom_scripts(
-            self, mock_connect, mock_get_table_mapping, mock_eval,
+            self, mock_connect, mock_get_table_mappings, mock_eval,
             m_get_col_types):
         """Tests the full workflow generation for one table request"""
         m_get_col_types.return_value = [('trans_time', 'TIMESTAMP')]
         full_ingest_tbl_custom_config['actions'] = \
             'custom_config_no_views_2.dsl'
-        mock_get_table_mapping.side_effect = [full_ingest_tbl_custom_config,
-                                              full_ingest_tbl_custom_config]
+        mock_get_table_mappings.side_effect = mappings_in_order(
+            full_ingest_tbl_custom_config)
         all_req = [Request(full_ingest_tbl_custom_config_req, self.cfg_mgr)]
         # setup alternative requests dir
         self.cfg_mgr.requests_dir = os.path.join(
@@ -503,17 +541,16 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
         self.assertTrue(bool_test)
 
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
     def test_generate_light_groupings_even(self, mock_connect,
-                                           mock_get_table_mapping, m_eval):
+                                           mock_get_table_mappings, m_eval):
         """Tests the full workflow generation for grouping light tables even
         into four tables and run concurrent ingestion"""
         m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'TIMESTAMP'],
                                ['Col3', 'varchar']]
-        mock_get_table_mapping.side_effect = [
-            fake_cens_tbl_prop, fake_ben_tbl_prop, light_3_prop, light_4_prop,
-            fake_cens_tbl_prop, fake_ben_tbl_prop, light_3_prop, light_4_prop]
+        mock_get_table_mappings.side_effect = mappings_in_order(
+            fake_cens_tbl_prop, fake_ben_tbl_prop, light_3_prop, light_4_prop)
         all_req = [Request(light_req_1, self.cfg_mgr),
                    Request(light_req_2, self.cfg_mgr),
                    Request(light_req_3, self.cfg_mgr),
@@ -528,18 +565,17 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
         self.assertTrue(bool_test)
 
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
     def test_generate_light_groupings_odd(self, mock_connect,
-                                          mock_get_table_mapping, m_eval):
+                                          mock_get_table_mappings, m_eval):
         """Tests the full workflow generation for grouping light tables odd
         into four tables and run concurrent ingestion"""
         m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'TIMESTAMP'],
                                ['Col3', 'varchar']]
-        mock_get_table_mapping.side_effect = [
+        mock_get_table_mappings.side_effect = mappings_in_order(
             fake_cens_tbl_prop, fake_ben_tbl_prop, light_3_prop, light_4_prop,
-            light_5_prop, fake_cens_tbl_prop, fake_ben_tbl_prop, light_3_prop,
-            light_4_prop, light_5_prop]
+            light_5_prop)
         all_req = [Request(light_req_1, self.cfg_mgr),
                    Request(light_req_2, self.cfg_mgr),
                    Request(light_req_3, self.cfg_mgr),
@@ -555,18 +591,17 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
         self.assertTrue(bool_test)
 
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
     def test_generate_medium_groupings(self, mock_connect,
-                                       mock_get_table_mapping, m_eval):
+                                       mock_get_table_mappings, m_eval):
         """Tests the full workflow generation for grouping medium
         tables into two tables
         and run concurrent ingestion"""
         m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'TIMESTAMP'],
                                ['Col3', 'varchar']]
-        mock_get_table_mapping.side_effect = [
-            fake_fact_tbl_prop, fake_fct_tbl_prop, med_3_prop,
-            fake_fact_tbl_prop, fake_fct_tbl_prop, med_3_prop]
+        mock_get_table_mappings.side_effect = mappings_in_order(
+            fake_fact_tbl_prop, fake_fct_tbl_prop, med_3_prop)
         all_req = [Request(med_req_1, self.cfg_mgr),
                    Request(med_req_2, self.cfg_mgr),
                    Request(med_req_3, self.cfg_mgr)]
@@ -579,18 +614,16 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
         self.assertTrue(bool_test)
 
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
-    @patch.object(inventory.Inventory, 'get_table_mapping', autospec=True)
+    @patch.object(inventory.Inventory, 'get_table_mappings', autospec=True)
     @patch.object(inventory.Inventory, '_connect', autospec=True)
     def test_generate_heavy_groupings(self, mock_connect,
-                                      mock_get_table_mapping, m_eval):
+                                      mock_get_table_mappings, m_eval):
         """Tests the full workflow generation for grouping heavy tables
         into two tables and run staggered ingestion"""
         m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'TIMESTAMP'],
                                ['Col3', 'varchar']]
-        # get_table_mapping is called twice
-        mock_get_table_mapping.side_effect = [
-            fake_prof_tbl_prop, heavy_2_prop, heavy_3_prop, fake_prof_tbl_prop,
-            heavy_2_prop, heavy_3_prop]
+        mock_get_table_mappings.side_effect = mappings_in_order(
+            fake_prof_tbl_prop, heavy_2_prop, heavy_3_prop)
         all_req = [Request(heavy_req_1, self.cfg_mgr),
                    Request(heavy_req_2, self.cfg_mgr),
                    Request(heavy_req_3, self.cfg_mgr)]
@@ -602,6 +635,30 @@ class WorkflowGeneratorFunctionsTest(unittest.TestCase):
             os.path.join(BASE_DIR, 'expected_workflows/heavy_grouping.xml'))
         self.assertTrue(bool_test)
 
+    @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
+    def test_generate_parquet_groupings(self, m_eval):
+        """Tests direct to parquet tables in staggered and concurrent
+        pipelines have no transition to a missing avro action"""
+        m_eval.return_value = [['Col1', 'TIMESTAMP'], ['Col2', 'varchar']]
+        self.cfg_mgr.requests_dir = os.path.join(
+            self.cfg_mgr.files, 'requests')
+        os.makedirs(self.cfg_mgr.requests_dir)
+        self.addCleanup(shutil.rmtree, self.cfg_mgr.requests_dir)
+        self.generator.action_builder.dsl_parser.scripts_dir = \
+            self.cfg_mgr.requests_dir
+        shutil.copy(
+            os.path.join(BASE_DIR, 'test_resources/parquet_config.dsl'),
+            self.cfg_mgr.requests_dir)
+        parquet_light = dict(full_ingest_tbl_parquet, load='000100',
+                             source_table_name='parquet_light')
+        tables = [ItTable(prop, self.cfg_mgr) for prop in [
+            full_ingest_tbl_parquet, heavy_2_prop, parquet_light,
+            fake_ben_tbl_prop]]
+        self.generator.generate(tables)
+        errors = WorkflowValidator(self.cfg_mgr).validate_file(
+            os.path.join(self.cfg_mgr.files, 'test_workflow.xml'))
+        self.assertEqual(errors, [])
+
     @patch('ibis.inventor.action_builder.SqoopHelper.eval', autospec=True)
     def test_generate_incremental(self, m_eval):
         """test incremental workflow generation"""
@@ -1,11 +1,25 @@
 """Create oozie workflows."""
 import collections
 from pkg_resources import resource_filename
-from mako.template import Template
 from ibis.custom_logging import get_logger
 from ibis.inventor.action_builder import ActionBuilder
 from ibis.utilities.utilities import *
 from ibis.inventor.dsl_parser import DSLParser
+from ibis.inventory.cb_inventory import CheckBalancesInventory
+from ibis.utilities.template_cache import get_template
+
+# (pull_time, parquet_time) seconds of a table without run history
+DEFAULT_RUN_TIMES = {'100': (240.0, 60.0), '010': (1200.0, 600.0),
+                     '001': (5400.0, 1800.0)}
+
+
+def _median(values):
+    """Median of a non empty list"""
+    values = sorted(values)
+    mid = len(values) / 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
 
 
 class WorkflowGenerator(object):
@@ -147,19 +161,146 @@ class WorkflowGenerator(object):
             pipelines[index] = pipeline
         return pipelines
 
+    def plan_pipelines(self, tables, is_sub=False):
+        """Pack tables into pipelines with the configured pipeline scheduler
+        Args:
+            tables: List[ibis.model.table.ItTable]
+            is_sub: boolean for if subworkflow
+        Returns:
+            pipelines: List[List[ibis.model.table.ItTable]]
+        """
+        if self.cfg_mgr.pipeline_scheduler == 'cost':
+            return self.gen_cost_pipelines(tables, is_sub)
+        loads_map = self.sort_table_prop_by_load(tables)
+        return self.gen_pipelines(loads_map, is_sub)
+
+    def get_run_times(self, tables):
+        """Estimate the pull and parquet times of tables from the checks and
+        balances history. Tables with rows but no recorded times are
+        estimated from the median seconds per row, tables without history
+        from the median of the tables with the same load.
+        Args:
+            tables: List[ibis.model.table.ItTable]
+        Returns:
+            dict of db_table_name to (pull_time, parquet_time)
+        """
+        names = [table.db_table_name for table in tables]
+        try:
+            history = CheckBalancesInventory(self.cfg_mgr).get_run_times(
+                names)
+        except Exception as ex:
+            self.logger.warning(
+                'Run time history not available: {0}'.format(ex))
+            history = {}
+        timed = dict((name, times) for name, times in history.iteritems()
+                     if times[0] + times[1] > 0)
+        per_row = [(times[0] / times[2], times[1] / times[2])
+                   for times in timed.values() if times[2] > 0]
+        run_times = {}
+        for table in tables:
+            name = table.db_table_name
+            times = history.get(name)
+            if name in timed:
+                run_times[name] = timed[name][:2]
+            elif times and times[2] > 0 and per_row:
+                run_times[name] = (
+                    times[2] * _median([rate[0] for rate in per_row]),
+                    times[2] * _median([rate[1] for rate in per_row]))
+        for table in tables:
+            name = table.db_table_name
+            if name in run_times:
+                continue
+            same_load = [run_times[tbl.db_table_name] for tbl in tables
+                         if tbl.load == table.load and
+                         tbl.db_table_name in timed]
+            if same_load:
+                run_times[name] = (_median([val[0] for val in same_load]),
+                                   _median([val[1] for val in same_load]))
+            else:
+                run_times[name] = DEFAULT_RUN_TIMES.get(
+                    table.load, DEFAULT_RUN_TIMES['010'])
+        self.logger.info('Run time history found for {0} of {1} tables'.format(
+            len(timed), len(set(names))))
+        return run_times
+
+    def gen_cost_pipelines(self, tables, is_sub=False):
+        """Pack tables into pipelines by their historical run times.
+        Pipelines run one after another and take as long as their slowest
+        table, so tables sorted by run time are chunked into pipelines of
+        max_pipeline_tables. Heavy tables are packed separately in pairs,
+        one for subworkflows, to keep the staggered heavy sqoop imports.
+        Args:
+            tables: List[ibis.model.table.ItTable]
+            is_sub: boolean for if subworkflow
+        Returns:
+            pipelines: List[List[ibis.model.table.ItTable]]
+        """
+        run_times = self.get_run_times(tables)
+
+        def run_time(table):
+            """pull and parquet time of a table"""
+            return sum(run_times[table.db_table_name])
+
+        for table in tables:
+            if not (table.is_small or table.is_medium or table.is_heavy):
+                err_msg = "Unknown key '{load}' in load column"
+                err_msg = err_msg.format(load=table.load)
+                raise ValueError(Utilities.print_box_msg(err_msg, 'x'))
+        by_cost = sorted(tables, key=lambda tbl: (-run_time(tbl),
+                                                  tbl.table_name))
+        heavy_tables = [table for table in by_cost if table.is_heavy]
+        other_tables = [table for table in by_cost if not table.is_heavy]
+        max_tables = max(1, self.cfg_mgr.max_pipeline_tables)
+        h_max = 1 if is_sub else 2
+        pipelines = list(self.list_chunks(heavy_tables, h_max))
+        pipelines += list(self.list_chunks(other_tables, max_tables))
+        pipelines = sorted(
+            pipelines, key=lambda pipe: -self.pipeline_run_time(pipe,
+                                                                run_times))
+        loads_map = self.sort_table_prop_by_load(tables)
+        load_makespan = self.predict_makespan(
+            self.gen_pipelines(loads_map, is_sub), run_times)
+        msg = ('Predicted makespan: {0:.0f}s for {1} tables in {2} '
+               'pipelines, load based pipelines: {3:.0f}s')
+        self.logger.info(msg.format(
+            self.predict_makespan(pipelines, run_times), len(tables),
+            len(pipelines), load_makespan))
+        return pipelines
+
+    def pipeline_run_time(self, pipeline, run_times):
+        """Predicted run time of a pipeline. A heavy pipeline starts the
+        second table after the sqoop import of the first one.
+        Args:
+            pipeline: List[ibis.model.table.ItTable]
+            run_times: dict of db_table_name to (pull_time, parquet_time)
+        """
+        times = [run_times[table.db_table_name] for table in pipeline]
+        _, _, is_heavy = self.get_pipeline_weight(pipeline)
+        if is_heavy and len(pipeline) > 1:
+            return times[0][0] + max([times[0][1]] +
+                                     [sum(time) for time in times[1:]])
+        return max([sum(time) for time in times])
+
+    def predict_makespan(self, pipelines, run_times):
+        """Predicted run time of a workflow, pipelines run one after another
+        Args:
+            pipelines: List[List[ibis.model.table.ItTable]]
+            run_times: dict of db_table_name to (pull_time, parquet_time)
+        """
+        return sum([self.pipeline_run_time(pipeline, run_times)
+                    for pipeline in pipelines])
+
     def gen_workflow_start(self):
         """Generates the start of the workflow according to
         self.cfg_mgr.start_template template"""
-        template = Template(filename=self.cfg_mgr.start_template,
-                            format_exceptions=True)
+        template = get_template(self.cfg_mgr, self.cfg_mgr.start_template)
         xml = template.render(workflowName=self.workflow_name)
         self.file_out.write(xml)
 
     def gen_workflow_end(self):
         """Generates the end of the workflow with the appropriate nodes
         according to the self.cfg_mgr.end_template template"""
-        template = Template(filename=self.cfg_mgr.end_template,
-                            format_exceptions=True)
+        template = get_template(self.cfg_mgr, self.cfg_mgr.end_template)
         end_xml = template.render()
         self.file_out.write('\n')
         self.file_out.write(end_xml)
@@ -169,7 +310,7 @@ class WorkflowGenerator(object):
         """Generate oozie checks and balances action to workflow"""
         template_file = resource_filename('resources.templates',
                                           'oozie_cb.xml.mako')
-        template = Template(filename=template_file, format_exceptions=True)
+        template = get_template(self.cfg_mgr, template_file)
         oozie_cb_xml = template.render(
             hdfs_ingest_path=self.action_builder.get_hdfs_files_path(),
             workflowName=self.workflow_name)
@@ -179,8 +320,8 @@ class WorkflowGenerator(object):
     def gen_workflow_export_end(self):
         """Generates the end of the workflow with the appropriate nodes
         according to the self.cfg_mgr.end_template template"""
-        template = Template(filename=self.cfg_mgr.export_end_template,
-                            format_exceptions=True)
+        template = get_template(self.cfg_mgr,
+                                self.cfg_mgr.export_end_template)
         xml = template.render(
             hdfs_export_path=self.action_builder.get_hdfs_files_path(),
             workflowName=self.workflow_name)
@@ -233,9 +374,8 @@ class WorkflowGenerator(object):
             if len(pipe) == 1 or contains_heavy:
                 if not is_sub:
                     # table workflow
-                    table = pipe[0]
-                    action_name = table.table_name + '_import_prep'
-                    action_name = Utilities.replace_special_chars(action_name)
+                    action_name = self.action_builder.get_entry_action_name(
+                        pipe[0])
                     self.file_out.write('\t<start to="{0}"/>\n'.format(
                         action_name))
                 else:
@@ -270,13 +410,13 @@ class WorkflowGenerator(object):
         for table in pipeline:
             paths.append(table.table_name)
         fork_xml = self.action_builder.gen_fork_xml(pipeline_name, paths,
-                                                    'concurrent', is_sub)
+                                                    'concurrent', is_sub,
+                                                    pipeline)
         self.file_out.write(fork_xml)
         for table in pipeline:
             if not is_sub:
                 self.gen_full_ingest_actions(table, {
-                    'sqoop_to': table.table_name + '_avro',
-                    'end_to': pipeline_name + '_join'})
+                    'sqoop_to': None, 'end_to': pipeline_name + '_join'})
             else:
                 ok_to = pipeline_name + '_join'
                 wf_name = self._filter_wf(table)
@@ -287,7 +427,8 @@ class WorkflowGenerator(object):
         Expects a pipeline with a pair of tables one being heavy"""
         paths = [table.table_name for table in pipeline]
         fork_xml = self.action_builder.gen_fork_xml(pipeline_name, paths,
-                                                    'staggered', is_sub)
+                                                    'staggered', is_sub,
+                                                    pipeline)
         self.file_out.write(fork_xml)
 
         if not is_sub:
@@ -295,7 +436,7 @@ class WorkflowGenerator(object):
                 pipeline[0], {'sqoop_to': pipeline_name,
                               'end_to': pipeline_name + '_join'})
             self.gen_full_ingest_actions(
-                pipeline[1], {'sqoop_to': pipeline[1].table_name + '_avro',
+                pipeline[1], {'sqoop_to': None,
                               'end_to': pipeline_name + '_join'})
         else:
             ok_to = pipeline_name + '_join'
@@ -313,8 +454,7 @@ class WorkflowGenerator(object):
             # more than one table in pipeline
             ok_to = 'pipeline' + str(cur_index + 1)
         else:
-            table = to_pipeline[0]
-            ok_to = table.table_name + '_import_prep'
+            ok_to = self.action_builder.get_entry_action_name(to_pipeline[0])
         return ok_to
 
     def gen_oracle_export(self, source_table_name, source_database_name,
@@ -387,8 +527,7 @@ class WorkflowGenerator(object):
                     # Only pipeline in pipelines list
                     if not is_sub:
                         self.gen_full_ingest_actions(table, {
-                            'sqoop_to': table.table_name + '_avro',
-                            'end_to': oozie_cb_ok_to})
+                            'sqoop_to': None, 'end_to': oozie_cb_ok_to})
                     else:
                         wf_name = self._filter_wf(table)
                         self._write_subwf('job_{id}'.format(id=i),
@@ -423,9 +562,9 @@ class WorkflowGenerator(object):
                         is_light, is_medium, is_heavy = \
                             self.get_pipeline_weight(pipelines[i + 1])
                         if (not is_sub) and is_heavy:
-                            pipeline = pipelines[i + 1]
-                            table = pipeline[0]
-                            next_import = table.table_name + '_import_prep'
+                            next_import = \
+                                self.action_builder.get_entry_action_name(
+                                    pipelines[i + 1][0])
                             join_xml = self.action_builder.gen_join_xml(
                                 pipeline_name + '_join',
                                 next_import)
@@ -441,7 +580,7 @@ class WorkflowGenerator(object):
                     if len(pipelines) - 1 == i:
                         if not is_sub:
                             self.gen_full_ingest_actions(
-                                table, {'sqoop_to': table.table_name + '_avro',
+                                table, {'sqoop_to': None,
                                         'end_to': oozie_cb_ok_to})
                         else:
                             wf_name = self._filter_wf(table)
@@ -452,7 +591,7 @@ class WorkflowGenerator(object):
                             next_pipeline = self.to_pipeline(pipelines[i + 1],
                                                              i)
                             self.gen_full_ingest_actions(
-                                table, {'sqoop_to': table.table_name + '_avro',
+                                table, {'sqoop_to': None,
                                         'end_to': next_pipeline})
                         else:
                             wf_name = self._filter_wf(table)
@@ -501,10 +640,8 @@ class WorkflowGenerator(object):
         Args:
             tables: List of ibis.model.table.ItTable
         """
-        # Sorts table properties by load
-        loads_map = self.sort_table_prop_by_load(tables)
         # Generates pipeline list
-        pipelines = self.gen_pipelines(loads_map)
+        pipelines = self.plan_pipelines(tables)
         self.gen_workflow_from_pipelines(pipelines)
 
     def generate_subworkflow(self, workflow_list):
@@ -521,7 +658,7 @@ class WorkflowGenerator(object):
                          'ok': 'job_{id}'.format(id=i + 1)}
             else:
                 props = {'action_name': 'job_{id}'.format(id=i),
-                         'xml_file': workflow, 'ok': 'oozie_cb_ok'}
+                         'xml_file': workflow, 'ok': 'end'}
             for line in sub_workflow_template:
                 self.file_out.write(
                     string.Formatter().vformat(line, (), SafeDict(**props)))
@@ -660,7 +797,7 @@ class WorkflowGenerator(object):
 
         template_file = resource_filename('resources.templates',
                                           'incr_wf.xml.mako')
-        template = Template(filename=template_file, format_exceptions=True)
+        template = get_template(self.cfg_mgr, template_file)
         incr_xml = template.render(
             it_table_obj=table, sqoop_xml=sqoop_xml, qa_xml=qa_xml,
             jceks=jceks, password_alias=password,
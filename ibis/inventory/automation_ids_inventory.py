@@ -1,7 +1,7 @@
 """Automation IDS inventory."""
 import os
-from mako.template import Template
 from ibis.inventory.inventory import Inventory
+from ibis.utilities.template_cache import get_template
 
 
 class AUTOInventory(Inventory):
@@ -221,8 +221,7 @@ class AUTOInventory(Inventory):
     def write_wld_file(self, appl_id, wld_file_name, first_wld_job,
                        remaining_wld_jobs):
         """Write WLD file"""
-        template = Template(filename=self.cfg_mgr.wld_template_mako,
-                            format_exceptions=True)
+        template = get_template(self.cfg_mgr, self.cfg_mgr.wld_template_mako)
         wld_content = template.render(
             appl_id=appl_id,
             host_name_prefix=self.cfg_mgr.edge_node.split('.', 1)[0],
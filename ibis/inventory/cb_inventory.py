@@ -1,5 +1,5 @@
 """Checks and balances module."""
-from ibis.inventory.inventory import Inventory
+from ibis.inventory.inventory import Inventory, BULK_LOOKUP_SIZE
 
 req_keys = ['directory', 'pull_time', 'avro_size', 'ingest_timestamp',
             'parquet_time', 'parquet_size', 'rows', 'lifespan', 'ack',
@@ -66,3 +66,29 @@ class CheckBalancesInventory(Inventory):
             tbl = tbls[0]
             return tbl[6]
         return 0
+
+    def get_run_times(self, table_names):
+        """Return the average run times of many tables.
+
+        Fetches the history with one query per BULK_LOOKUP_SIZE tables.
+        Args:
+            table_names: list of db name + '_' + table name
+        Returns:
+            dict of table name to (pull_time, parquet_time, rows), tables
+            without history are left out
+        """
+        run_times = {}
+        names = sorted(set(table_names))
+        query = ("SELECT `table`, AVG(pull_time), AVG(parquet_time), "
+                 "MAX(`rows`) FROM {table} WHERE `table` IN ({names}) "
+                 "GROUP BY `table`")
+        for start in range(0, len(names), BULK_LOOKUP_SIZE):
+            batch = names[start:start + BULK_LOOKUP_SIZE]
+            in_list = ', '.join(["'{0}'".format(name) for name in batch])
+            rows = self.get_rows(query.format(table=self.table,
+                                              names=in_list))
+            for name, pull_time, parquet_time, row_count in rows or []:
+                run_times[name] = (float(pull_time or 0),
+                                   float(parquet_time or 0),
+                                   int(row_count or 0))
+        return run_times
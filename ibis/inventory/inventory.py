@@ -1,10 +1,137 @@
 """Generalized Hive table interface. Not specific to any hive table."""
+import os
+import Queue
+import sys
+import threading
 import traceback
-from impala.dbapi import connect
-from thrift.transport.TTransport import TTransportException
 from ibis.custom_logging import get_logger
 
-IMPALA_CONN = None
+IMPALA_POOL = None
+_POOL_LOCK = threading.Lock()
+# max tables looked up by one get_table_mappings query
+BULK_LOOKUP_SIZE = 200
+
+
+def connect(**kwargs):
+    """impala.dbapi.connect. impyla and thrift are slow to import and most
+    cli commands and workflow generation never connect"""
+    from impala.dbapi import connect as impala_connect
+    return impala_connect(**kwargs)
+
+
+class ImpalaConnectionPool(object):
+    """Bounded pool of impala connections shared by the inventory classes.
+    A thread keeps its connection until release(), so serial callers
+    reuse one connection the same way the single global connection did.
+    """
+
+    def __init__(self, host, port, use_kerberos, max_size):
+        """init"""
+        self.host = host
+        self.port = port
+        self.use_kerberos = use_kerberos
+        self.max_size = max_size
+        self.idle = Queue.Queue()
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = set()
+        # forked processes must not share the sockets of their parent
+        self.pid = os.getpid()
+
+    def _new_connection(self):
+        """Open a new impala connection"""
+        conn = connect(host=self.host, port=self.port, timeout=600,
+                       use_kerberos=self.use_kerberos)
+        with self.lock:
+            self.connections.add(conn)
+        return conn
+
+    def get(self):
+        """Returns the connection of the current thread. Acquires a
+        healthy connection from the pool, blocks if pool is exhausted"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            return conn
+        self.slots.acquire()
+        try:
+            while conn is None:
+                try:
+                    conn = self.idle.get_nowait()
+                except Queue.Empty:
+                    conn = self._new_connection()
+                    break
+                if not self.is_valid(conn):
+                    self.close(conn)
+                    conn = None
+        except Exception:
+            self.slots.release()
+            raise
+        self.local.conn = conn
+        return conn
+
+    def release(self):
+        """Returns the connection of the current thread to the pool"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return
+        self.local.conn = None
+        self.idle.put(conn)
+        self.slots.release()
+
+    def reconnect(self):
+        """Replace the broken connection of the current thread"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return self.get()
+        self.close(conn)
+        try:
+            self.local.conn = self._new_connection()
+        except Exception:
+            self.local.conn = None
+            self.slots.release()
+            raise
+        return self.local.conn
+
+    def close_all(self):
+        """Close every connection opened by the pool"""
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            self.close(conn)
+        self.local.conn = None
+
+    @classmethod
+    def is_valid(cls, conn):
+        """Health check of an idle connection"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute('select 1')
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def close(self, conn):
+        """Close connection ignoring errors"""
+        with self.lock:
+            self.connections.discard(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(host, port, use_kerberos, max_size):
+    """Returns the impala connection pool of the process. A process
+    forked by multiprocessing gets a new pool, the inherited connections
+    belong to the parent"""
+    global IMPALA_POOL
+    with _POOL_LOCK:
+        if IMPALA_POOL is None or IMPALA_POOL.pid != os.getpid():
+            IMPALA_POOL = ImpalaConnectionPool(host, port, use_kerberos,
+                                               max_size)
+    return IMPALA_POOL
 
 
 class Inventory(object):
@@ -16,18 +143,35 @@ class Inventory(object):
         self.cfg_mgr = cfg_mgr  # ConfigManager object
         self.table = None
         self.logger = get_logger(self.cfg_mgr)
+        self._local = threading.local()
+
+    @property
+    def _cursor(self):
+        """impala cursor of the current thread"""
+        return getattr(self._local, 'cursor', None)
+
+    @_cursor.setter
+    def _cursor(self, cursor):
+        """Setter _cursor"""
+        self._local.cursor = cursor
+
+    def _get_pool(self):
+        """Returns the shared impala connection pool"""
+        return get_pool(self.cfg_mgr.host, self.cfg_mgr.port,
+                        self.cfg_mgr.use_kerberos,
+                        self.cfg_mgr.impala_pool_size)
 
     def _connect(self, host, port, use_kerberos):
         """Use impala to connect to host."""
-        global IMPALA_CONN
+        from thrift.transport.TTransport import TTransportException
+        pool = get_pool(host, port, use_kerberos,
+                        self.cfg_mgr.impala_pool_size)
         try:
-            if not IMPALA_CONN:
-                IMPALA_CONN = connect(host=host, port=port, timeout=600,
-                                      use_kerberos=use_kerberos)
-                info_msg = "Connection to the host: {host} successful"
-                info_msg = info_msg.format(host=host)
-                self.logger.info(info_msg)
-            self._cursor = IMPALA_CONN.cursor()
+            try:
+                self._cursor = pool.get().cursor()
+            except TTransportException:
+                self.logger.warning('Impala connection lost, reconnecting')
+                self._cursor = pool.reconnect().cursor()
         except (AttributeError, TTransportException):
             err_msg = ("Can't connect to host: {host}, port:"
                        " {port}, error: {error}")
@@ -38,15 +182,72 @@ class Inventory(object):
 
     @classmethod
     def close(cls):
-        """Close impala connection."""
-        global IMPALA_CONN
-        if IMPALA_CONN:
-            IMPALA_CONN.close()
+        """Close impala connections."""
+        global IMPALA_POOL
+        with _POOL_LOCK:
+            if IMPALA_POOL:
+                IMPALA_POOL.close_all()
+                IMPALA_POOL = None
+
+    def execute_concurrent(self, func, args_list, max_workers=None):
+        """Run func(*args) for every args in args_list on a thread pool.
+        Every thread queries impala through its own pooled connection.
+        Args:
+            func: callable, usually a bound inventory method
+            args_list: list of argument tuples
+            max_workers: defaults to impala_pool_size
+        Returns:
+            list of results in the order of args_list
+        """
+        workers = min(max_workers or self.cfg_mgr.impala_pool_size,
+                      len(args_list))
+        if workers <= 1:
+            return [func(*args) for args in args_list]
+        pool = self._get_pool()
+        # don't hold a connection while the workers wait for one
+        pool.release()
+        tasks = Queue.Queue()
+        for index, args in enumerate(args_list):
+            tasks.put((index, args))
+        results = [None] * len(args_list)
+        errors = []
+
+        def _worker():
+            """Run tasks until none are left. The thread keeps its pooled
+            connection for the whole batch and gives it back once"""
+            try:
+                while not errors:
+                    try:
+                        index, args = tasks.get_nowait()
+                    except Queue.Empty:
+                        return
+                    try:
+                        results[index] = func(*args)
+                    except Exception:
+                        errors.append(sys.exc_info())
+            finally:
+                pool.release()
+
+        threads = [threading.Thread(target=_worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            exc_type, exc_value, exc_tb = errors[0]
+            raise exc_type, exc_value, exc_tb
+        return results
 
     def _execute(self, query):
-        """impala cursor.execute"""
-        self._cursor.execute(
-            query, configuration={'request_pool': self.cfg_mgr.queue_name})
+        """impala cursor.execute, reconnects once on a lost connection"""
+        from thrift.transport.TTransport import TTransportException
+        configuration = {'request_pool': self.cfg_mgr.queue_name}
+        try:
+            self._cursor.execute(query, configuration=configuration)
+        except TTransportException:
+            self.logger.warning('Impala connection lost, reconnecting')
+            self._cursor = self._get_pool().reconnect().cursor()
+            self._cursor.execute(query, configuration=configuration)
 
     def get_all(self, where_condition):
         """Return all records matching the where condition.
@@ -165,3 +366,45 @@ class Inventory(object):
                                      db_env=db_env)
             self.logger.warning(err_msg)
         return mapping
+
+    def get_table_mappings(self, keys):
+        """Bulk version of get_table_mapping. Fetches the rows of all
+        tables with one query per BULK_LOOKUP_SIZE tables.
+        Args:
+            keys: list of (db_name, table_name, db_env) tuples
+        Returns:
+            dict of (db_name, table_name, db_env) to the table mapping,
+            an empty dict for tables which do not exist
+        """
+        mappings = dict((tuple(key), {}) for key in keys)
+        if not mappings:
+            return mappings
+        self._connect(self.cfg_mgr.host, self.cfg_mgr.port,
+                      self.cfg_mgr.use_kerberos)
+        meta = self.get_metadata()
+        key_indexes = [meta.index(col) for col in
+                       ['source_database_name', 'source_table_name',
+                        'db_env']]
+        condition = ("(source_database_name='{0}' and "
+                     "source_table_name='{1}' and db_env='{2}')")
+        unique_keys = mappings.keys()
+        for start in range(0, len(unique_keys), BULK_LOOKUP_SIZE):
+            batch = unique_keys[start:start + BULK_LOOKUP_SIZE]
+            where_condition = ' or '.join(
+                [condition.format(*key) for key in batch])
+            for results in self.get_all(where_condition):
+                key = tuple([results[i] for i in key_indexes])
+                if mappings.get(key, True):
+                    # unknown key or first row of the table already mapped
+                    continue
+                if len(meta) != len(results):
+                    err_msg = ('Number of metadata values does not match '
+                               'values for mapping {0} {1} {2}')
+                    self.logger.error(err_msg.format(*key))
+                    continue
+                mappings[key] = dict(zip(meta, results))
+        missing = [' '.join(key) for key in unique_keys if not mappings[key]]
+        if missing:
+            err_msg = 'Requested meta values for non existent tables: {0}'
+            self.logger.warning(err_msg.format(', '.join(missing)))
+        return mappings
@@ -5,6 +5,9 @@ import os
 from ibis.inventory.inventory import Inventory
 from ibis.model.table import ItTable
 
+# max rows written by one upsert statement
+UPSERT_BATCH_SIZE = 100
+
 
 class ITInventory(Inventory):
 
@@ -141,6 +144,83 @@ class ITInventory(Inventory):
             self.logger.warning(msg)
         return updated, msg
 
+    def _upsert_query(self, rows, overwrite):
+        """Multi-row insert with dynamic partitioning
+        Args:
+            rows: list of ibis.model.table.ItTable
+            overwrite: INSERT OVERWRITE replaces the written partitions
+        """
+        values = []
+        for row in rows:
+            values.append("({values}, '{db}', '{tbl}', '{db_env}')".format(
+                values=self._build_values_clause(row), db=row.database,
+                tbl=row.table_name, db_env=row.db_env))
+        query = ("INSERT {mode} TABLE {it_tbl} PARTITION "
+                 "(source_database_name, source_table_name, db_env) "
+                 "VALUES {values}")
+        query = query.format(mode='OVERWRITE' if overwrite else 'INTO',
+                             it_tbl=self.table, values=', '.join(values))
+        return query
+
+    def upsert(self, it_tables, existing_keys=None,
+               batch_size=UPSERT_BATCH_SIZE):
+        """Inserts new and overwrites existing it table rows. Rows are
+        written batch_size rows per statement and the it table metadata
+        is invalidated once at the end.
+        Args:
+            it_tables: list of ibis.model.table.ItTable
+            existing_keys: set of (database, table_name, db_env) already in
+                the it table. Looked up with get_table_mappings if None
+        Returns:
+            list of (success, msg) in the order of it_tables
+        """
+        from impala.error import Error as ImpalaError
+        keys = [(row.database, row.table_name, row.db_env)
+                for row in it_tables]
+        if existing_keys is None:
+            mappings = self.get_table_mappings(keys)
+            existing_keys = set([key for key in mappings if mappings[key]])
+        results = [None] * len(it_tables)
+        last_index = dict((key, index) for index, key in enumerate(keys))
+        inserts = []
+        updates = []
+        for index, key in enumerate(keys):
+            if last_index[key] != index:
+                msg = 'Table {0} {1} {2} NOT WRITTEN. Requested again!'
+                results[index] = (False, msg.format(*key))
+            elif key in existing_keys:
+                updates.append(index)
+            else:
+                inserts.append(index)
+
+        for indexes, overwrite in [(inserts, False), (updates, True)]:
+            if overwrite:
+                ok_msg = 'Updated table {0} {1} {2} in {3}'
+            else:
+                ok_msg = 'Inserted new record {0} {1} {2} into {3}'
+            for start in range(0, len(indexes), batch_size):
+                batch = indexes[start:start + batch_size]
+                query = self._upsert_query(
+                    [it_tables[index] for index in batch], overwrite)
+                try:
+                    self.run_query(query, self.table, refresh=False)
+                    success, msg = True, ok_msg
+                except (ValueError, ImpalaError):
+                    self.logger.error('Failed running: {0}'.format(query))
+                    success = False
+                    msg = 'Table {0} {1} {2} NOT WRITTEN into {3}. Failed!'
+                for index in batch:
+                    results[index] = (success,
+                                      msg.format(*(keys[index] +
+                                                   (self.table,))))
+                    if success:
+                        self.logger.info(results[index][1])
+                    else:
+                        self.logger.error(results[index][1])
+        if inserts or updates:
+            self.run_query('INVALIDATE METADATA {0}'.format(self.table))
+        return results
+
     def parse_requests(self, requests):
         """Return a list of dictionaries of table representation.
         Args:
@@ -313,6 +313,20 @@ class RequestInventory(object):
             temp_reqs = [Request(req, self.cfg_mgr) for req in requests]
         return temp_reqs, msg
 
+    def _get_mapping_keys(self, requests):
+        """Returns (database, table_name, db_env) of every request
+        Args:
+            requests: list(ibis.inventory.request_inventory.Request) objects
+        """
+        keys = []
+        for req_obj in requests:
+            if req_obj.db_env:
+                db_env = req_obj.db_env
+            else:
+                db_env = self.cfg_mgr.default_db_env.lower()
+            keys.append((req_obj.database, req_obj.table_name, db_env))
+        return keys
+
     def get_available_requests(self, requests):
         """Given a list[{Request}] return a List[{ItTable}]
         of tables available, not on hold in the it table, and a
@@ -328,15 +342,10 @@ class RequestInventory(object):
         available_tables = []
         hold_tables = []
         unavailable_requests = []
-        for req_obj in requests:
-            src_db = req_obj.database
-            src_table = req_obj.table_name
-            if req_obj.db_env:
-                db_env = req_obj.db_env
-            else:
-                db_env = self.cfg_mgr.default_db_env.lower()
-            table = self.it_inventory.get_table_mapping(src_db, src_table,
-                                                        db_env)
+        keys = self._get_mapping_keys(requests)
+        mappings = self.it_inventory.get_table_mappings(keys)
+        for req_obj, key in zip(requests, keys):
+            table = mappings[key]
             if table:
                 # A record of the table exists in the it table
                 if table['hold'] == 0:
@@ -371,16 +380,10 @@ class RequestInventory(object):
         """
         tables = []
         unavailable_requests = []
-        for req_obj in requests:
-            src_db = req_obj.database
-            src_table = req_obj.table_name
-            if req_obj.db_env:
-                db_env = req_obj.db_env
-            else:
-                db_env = self.cfg_mgr.default_db_env.lower()
-            table = self.export_it_inventory.get_table_mapping(src_db,
-                                                               src_table,
-                                                               db_env)
+        keys = self._get_mapping_keys(requests)
+        mappings = self.export_it_inventory.get_table_mappings(keys)
+        for req_obj, key in zip(requests, keys):
+            table = mappings[key]
             if table:
                 # A record of the table exists in the it table
                 tables.append(ItTableExport(table, self.cfg_mgr))
@@ -39,6 +39,19 @@ class CBInventoryFunctionsTest(unittest.TestCase):
         msg = self.inventory.update(tbl)
         self.assertIn('Updated table,', msg)
 
+    @patch.object(CheckBalancesInventory, 'get_rows', autospec=True)
+    def test_get_run_times(self, mock_rows):
+        """Test run times of many tables"""
+        mock_rows.return_value = [('db_tbl_1', 120.5, 30, 100),
+                                  ('db_tbl_2', None, None, None)]
+        run_times = self.inventory.get_run_times(['db_tbl_1', 'db_tbl_2',
+                                                  'db_tbl_3'])
+        self.assertEqual(run_times, {'db_tbl_1': (120.5, 30.0, 100),
+                                     'db_tbl_2': (0.0, 0.0, 0)})
+        query = mock_rows.call_args[0][1]
+        self.assertIn("IN ('db_tbl_1', 'db_tbl_2', 'db_tbl_3')", query)
+        self.assertIn('GROUP BY `table`', query)
+
 
 if __name__ == "__main__":
     unittest.main()
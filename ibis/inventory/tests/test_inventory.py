@@ -2,9 +2,11 @@
 import os
 import unittest
 
-from mock import patch
+from mock import patch, MagicMock
 from mock.mock import Mock
-from ibis.inventory.inventory import Inventory
+from thrift.transport.TTransport import TTransportException
+from ibis.inventory import inventory
+from ibis.inventory.inventory import Inventory, ImpalaConnectionPool
 from ibis.utilities.config_manager import ConfigManager
 from ibis.settings import UNIT_TEST_ENV
 
@@ -112,6 +114,131 @@ class InventoryFunctionsTest(unittest.TestCase):
             'dev')
         self.assertDictEqual(expected, result)
 
+    @patch.object(Inventory, '_connect', autospec=True)
+    def test_get_table_mappings(self, mock_connect):
+        """test bulk table mapping."""
+        self.inventory._cursor.fetchall.side_effect = [
+            [('col1',), ('source_database_name',), ('source_table_name',),
+             ('db_env',)],
+            [['val1', 'db_1', 'tbl_1', 'dev'],
+             ['val2', 'db_2', 'tbl_2', 'dev'],
+             ['val3', 'db_1', 'tbl_1', 'dev']]]
+        keys = [('db_1', 'tbl_1', 'dev'), ('db_2', 'tbl_2', 'dev'),
+                ('db_3', 'tbl_3', 'dev')]
+        result = self.inventory.get_table_mappings(keys)
+        self.assertEqual(result[keys[0]]['col1'], 'val1')
+        self.assertEqual(result[keys[1]]['source_table_name'], 'tbl_2')
+        self.assertDictEqual(result[keys[2]], {})
+        # one describe and one select for all tables
+        self.assertEqual(self.inventory._cursor.execute.call_count, 2)
+        query = self.inventory._cursor.execute.call_args[0][0]
+        self.assertIn("(source_database_name='db_3' and "
+                      "source_table_name='tbl_3' and db_env='dev')", query)
+
+    def test_execute_concurrent(self):
+        """test results keep the order of the arguments"""
+        Inventory.close()
+        with patch.object(inventory, 'connect', autospec=True):
+            results = self.inventory.execute_concurrent(
+                lambda x, y: x * y, [(1, 2), (3, 4), (5, 6)])
+        self.assertEqual(results, [2, 12, 30])
+        Inventory.close()
+
+    def test_execute_concurrent_connections(self):
+        """test every worker keeps one connection for the whole batch"""
+        Inventory.close()
+        pool = self.inventory._get_pool()
+        conns = []
+
+        def lookup(value):
+            conns.append(pool.get())
+            return value
+
+        with patch.object(inventory, 'connect', autospec=True) as m_conn, \
+                patch.object(ImpalaConnectionPool, 'is_valid',
+                             autospec=True) as m_valid:
+            m_conn.side_effect = lambda **kwargs: MagicMock()
+            results = self.inventory.execute_concurrent(
+                lookup, [(num,) for num in range(20)], max_workers=2)
+        self.assertEqual(results, range(20))
+        self.assertLessEqual(len(set(conns)), 2)
+        self.assertFalse(m_valid.called)
+        self.assertEqual(pool.idle.qsize(), len(set(conns)))
+        Inventory.close()
+
+    def test_execute_concurrent_error(self):
+        """test the error of a task is raised"""
+        Inventory.close()
+
+        def lookup(value):
+            if value == 3:
+                raise ValueError('lookup failed')
+            return value
+
+        with patch.object(inventory, 'connect', autospec=True):
+            self.assertRaises(ValueError, self.inventory.execute_concurrent,
+                              lookup, [(num,) for num in range(6)])
+        Inventory.close()
+
+    @patch.object(Inventory, '_connect', autospec=True)
+    def test_execute_reconnect(self, mock_connect):
+        """test query is retried on a new connection"""
+        self.inventory._cursor.execute.side_effect = TTransportException()
+        new_conn = MagicMock()
+        with patch.object(ImpalaConnectionPool, 'reconnect',
+                          return_value=new_conn):
+            self.inventory.run_query('query')
+        self.assertTrue(new_conn.cursor().execute.called)
+        Inventory.close()
+
+
+class ImpalaConnectionPoolTest(unittest.TestCase):
+
+    """Tests the impala connection pool"""
+
+    @patch.object(inventory, 'connect', autospec=True)
+    def test_get_release(self, mock_connect):
+        """test a thread reuses its connection until released"""
+        conn_1 = MagicMock()
+        conn_2 = MagicMock()
+        mock_connect.side_effect = [conn_1, conn_2]
+        pool = ImpalaConnectionPool('host', 25003, True, 2)
+        self.assertEqual(pool.get(), conn_1)
+        self.assertEqual(pool.get(), conn_1)
+        pool.release()
+        self.assertEqual(pool.get(), conn_1)
+        pool.release()
+        conn_1.cursor.side_effect = TTransportException()
+        self.assertEqual(pool.get(), conn_2)
+        self.assertTrue(conn_1.close.called)
+        pool.close_all()
+        self.assertTrue(conn_2.close.called)
+
+    @patch.object(inventory, 'connect', autospec=True)
+    def test_reconnect(self, mock_connect):
+        """test broken connection is replaced"""
+        conn_1 = MagicMock()
+        conn_2 = MagicMock()
+        mock_connect.side_effect = [conn_1, conn_2]
+        pool = ImpalaConnectionPool('host', 25003, True, 1)
+        self.assertEqual(pool.get(), conn_1)
+        self.assertEqual(pool.reconnect(), conn_2)
+        self.assertEqual(pool.get(), conn_2)
+        self.assertTrue(conn_1.close.called)
+
+    @patch.object(inventory.os, 'getpid', autospec=True)
+    def test_get_pool_forked(self, mock_getpid):
+        """test a forked process does not use the pool of its parent"""
+        mock_getpid.return_value = 100
+        Inventory.close()
+        pool = inventory.get_pool('host', 25003, True, 2)
+        self.assertIs(inventory.get_pool('host', 25003, True, 2), pool)
+        mock_getpid.return_value = 101
+        forked = inventory.get_pool('host', 25003, True, 2)
+        self.assertIsNot(forked, pool)
+        self.assertEqual(forked.pid, 101)
+        Inventory.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -96,6 +96,45 @@ class ITInventoryFunctionsTest(unittest.TestCase):
         test_ret, _ = self.inventory.update(table_dict)
         self.assertEquals(test_ret, False)
 
+    @patch.object(ITInventory, 'run_query', autospec=True)
+    def test_upsert(self, mock_run_query):
+        """Test batched insert and overwrite."""
+        tables = []
+        for name in ['tbl_1', 'tbl_2', 'tbl_3', 'tbl_1']:
+            tbl_dict = dict(mock_claim_tbl_dict[0])
+            tbl_dict['source_table_name'] = name
+            tables.append(ItTable(tbl_dict, self.cfg_mgr))
+        existing_keys = set([('fake_database', 'tbl_2', 'sys')])
+        results = self.inventory.upsert(tables, existing_keys, batch_size=1)
+        self.assertEqual([success for success, _ in results],
+                         [False, True, True, True])
+        self.assertIn('Updated table fake_database tbl_2 sys', results[1][1])
+        self.assertIn('Inserted new record fake_database tbl_3 sys',
+                      results[2][1])
+        queries = [call[0][1] for call in mock_run_query.call_args_list]
+        # two inserts, one overwrite and one invalidate
+        self.assertEqual(len(queries), 4)
+        insert = ('INSERT INTO TABLE {0} PARTITION (source_database_name, '
+                  'source_table_name, db_env) VALUES (')
+        self.assertTrue(queries[0].startswith(
+            insert.format(self.inventory.table)))
+        self.assertTrue(queries[0].endswith(
+            "'fake_database', 'tbl_3', 'sys')"))
+        self.assertTrue(queries[2].startswith('INSERT OVERWRITE TABLE'))
+        self.assertEqual(queries[3], 'INVALIDATE METADATA {0}'.format(
+            self.inventory.table))
+        self.assertEqual(mock_run_query.call_args_list[0][1],
+                         {'refresh': False})
+
+    @patch.object(ITInventory, 'run_query', autospec=True)
+    def test_upsert_failed_batch(self, mock_run_query):
+        """Test rows of a failed statement are reported."""
+        mock_run_query.side_effect = [ValueError('failed'), None]
+        tables = [ItTable(mock_claim_tbl_dict[0], self.cfg_mgr)]
+        results = self.inventory.upsert(tables, set())
+        self.assertFalse(results[0][0])
+        self.assertIn('NOT WRITTEN', results[0][1])
+
     @patch.object(ITInventory, 'get_rows', autospec=True)
     def test_get_all_tables(self, mock_rows):
         """test get all tables"""
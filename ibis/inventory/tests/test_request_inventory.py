@@ -82,8 +82,8 @@ class RequestInventoryFunctionsTest(unittest.TestCase):
         self.assertTrue((results[1]).frequency_readable == 'weekly')
         self.assertTrue((results[2]).frequency_readable == 'biweekly')
 
-    @patch.object(Inventory, 'get_table_mapping', autospec=True)
-    def test_get_available_requests(self, mock_get_table_mapping):
+    @patch.object(Inventory, 'get_table_mappings', autospec=True)
+    def test_get_available_requests(self, mock_get_table_mappings):
         """Tests the retrieval of available and unavailable
         for workflow generation"""
         valid_req = {'db_username': 'fake_username', 'password_file': 'test',
@@ -128,15 +128,19 @@ class RequestInventoryFunctionsTest(unittest.TestCase):
             'jdbcurl': 'jdbc:oracle:thin:@//fake.oracle:1521/'
                        'fake_servicename',
             'fetch_size': 50000}
-        mock_get_table_mapping.side_effect = [mock_ret_val, mock_ret_val_2, {}]
+        mock_get_table_mappings.return_value = {
+            ('fake_database', 'clm_fact', 'dev'): mock_ret_val,
+            ('onhold_req', 'onhold_req', 'dev'): mock_ret_val_2,
+            ('invalid_req', 'invalid_req', 'dev'): {}}
         available_tables, onhold_tables, unavailable_requests = \
             self.inventory.get_available_requests(reqs)
         self.assertEqual((available_tables[0]).database, 'fake_database')
         self.assertEqual((onhold_tables[0]).database, 'invalid_db')
         self.assertEqual((unavailable_requests[0]).database, 'invalid_req')
 
-    @patch.object(Inventory, 'get_table_mapping', autospec=True)
-    def test_get_available_requests_export(self, mock_get_table_mapping):
+    @patch.object(Inventory, 'get_table_mappings', autospec=True)
+    def test_get_available_requests_export(self,
+                                           mock_get_table_mappings):
         """Tests the retrieval of available and unavailable for
         export workflow generation"""
         valid_req = {'db_username': 'valid_user', 'password_file': 'test',
@@ -159,7 +163,9 @@ class RequestInventoryFunctionsTest(unittest.TestCase):
             'load': '33', 'mappers': 1, 'domain': 'valid_member',
             'source_database_name': 'db_valid'}
 
-        mock_get_table_mapping.side_effect = [mock_ret_val, {}]
+        mock_get_table_mappings.return_value = {
+            ('db_valid', 'qa_test_valid', 'dev'): mock_ret_val,
+            ('db_invalid', 'qa_test_invalid', 'dev'): {}}
 
         available_tables, unavailable_requests =\
             self.inventory.get_available_requests_export(reqs)
@@ -177,7 +183,8 @@ class RequestInventoryFunctionsTest(unittest.TestCase):
         mock_tab_ret_val = {'load': '44', 'mappers': 3,
                             'domain': 'valid_table',
                             'source_database_name': 'db_valid'}
-        mock_get_table_mapping.side_effect = [mock_tab_ret_val]
+        mock_get_table_mappings.return_value = {
+            ('db_valid', 'qa_test_valid', 'dev'): mock_tab_ret_val}
         available_tables, unavailable_requests =\
             self.inventory.get_available_requests_export(reqs)
         self.assertEqual((available_tables[0]).database, 'db_valid')
@@ -2,6 +2,7 @@
 from pkg_resources import resource_filename
 from ibis.utilities.utilities import *
 from ibis.custom_logging import get_logger
+from ibis.utilities.template_cache import get_template
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -41,5 +42,5 @@ class Action(object):
         template_file = resource_filename('resources.templates',
                                           '{action}.xml.mako'.
                                           format(action=self.action_type))
-        template = Template(filename=template_file, format_exceptions=True)
+        template = get_template(self.cfg_mgr, template_file)
         return template.render(node=self)
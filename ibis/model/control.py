@@ -1,7 +1,7 @@
 import os
 from ibis.custom_logging import get_logger
 from pkg_resources import resource_filename
-from mako.template import Template
+from ibis.utilities.template_cache import get_template
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -33,5 +33,5 @@ class Control(object):
         template_file = resource_filename('resources.templates',
                                           '{action}.xml.mako'.
                                           format(action=self.action_type))
-        template = Template(filename=template_file, format_exceptions=True)
+        template = get_template(self.cfg_mgr, template_file)
         return template.render(node=self)
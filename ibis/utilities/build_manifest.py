@@ -0,0 +1,232 @@
+"""Build manifest of generated workflow artifacts.
+Maps every generated table artifact (workflow, properties, ksh, pdf, ...)
+to a hash of its inputs: the it_table row, the cached source DDL, the
+templates, the generator code and the config. Unchanged tables are restored
+from the saves directory instead of being generated again, and only files
+whose content changed since the last delivery are dry run and handed to git.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pkg_resources import resource_filename
+import ibis
+from ibis.custom_logging import get_logger
+
+MANIFEST_FILE = 'build_manifest.json'
+ARTIFACT_DIR = 'build_artifacts'
+# config attributes that change on every run
+VOLATILE_CONFIG = ('files', 'logs', 'log_file')
+# ibis code that renders the generated files, relative to the package
+GENERATOR_CODE = ('inventor', 'model', 'utilities/utilities.py',
+                  'utilities/vizoozie.py')
+# sha1 of the templates and of the generator code, computed once per process
+_TEMPLATES_HASH = []
+_CODE_HASH = []
+_LOCK = threading.Lock()
+
+
+def file_hash(path):
+    """sha1 of a file content"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file_h:
+        for chunk in iter(lambda: file_h.read(65536), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_hash(base_dir, paths, suffixes=None):
+    """sha1 of the names and contents of files and directory trees
+    Args:
+        base_dir: directory the paths are relative to
+        paths: files or directories, tests directories are skipped
+        suffixes: only hash files with these suffixes, all files if None
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        full_path = os.path.join(base_dir, path)
+        if os.path.isfile(full_path):
+            files = [full_path]
+        else:
+            files = []
+            for root, dirs, names in os.walk(full_path):
+                dirs[:] = sorted(name for name in dirs if name != 'tests')
+                files.extend(os.path.join(root, name)
+                             for name in sorted(names))
+        for file_path in files:
+            if suffixes and not file_path.endswith(suffixes):
+                continue
+            digest.update(os.path.relpath(file_path, base_dir))
+            digest.update(file_hash(file_path))
+    return digest.hexdigest()
+
+
+def templates_hash():
+    """sha1 of the names and contents of all workflow templates"""
+    with _LOCK:
+        if not _TEMPLATES_HASH:
+            _TEMPLATES_HASH.append(tree_hash(
+                resource_filename('resources', 'templates'), ['']))
+        return _TEMPLATES_HASH[0]
+
+
+def code_hash():
+    """sha1 of the ibis modules that render the generated files, so that
+    an ibis upgrade regenerates every table"""
+    with _LOCK:
+        if not _CODE_HASH:
+            _CODE_HASH.append(tree_hash(
+                os.path.dirname(os.path.abspath(ibis.__file__)),
+                GENERATOR_CODE, ('.py',)))
+        return _CODE_HASH[0]
+
+
+class BuildManifest(object):
+    """Input hashes of the generated artifacts and content hashes of the
+    files delivered to git, kept in {saves}/build_manifest.json. Files of
+    an artifact are kept under {saves}/build_artifacts/{artifact}/
+    Files that passed the dry run are pending until the caller confirms
+    their delivery with record_delivered()
+    """
+
+    def __init__(self, cfg_mgr, path=None):
+        """init
+        Args:
+            cfg_mgr: ibis.utilities.config_manager.ConfigManager
+            path: manifest file, defaults to {saves}/build_manifest.json
+        """
+        self.cfg_mgr = cfg_mgr
+        self.logger = get_logger(self.cfg_mgr)
+        self.path = path or os.path.join(self.cfg_mgr.saves, MANIFEST_FILE)
+        self.artifacts_dir = os.path.join(os.path.dirname(self.path),
+                                          ARTIFACT_DIR)
+        self.enabled = self.cfg_mgr.build_manifest
+        self.manifest = {'artifacts': {}, 'outputs': {}, 'pending': {}}
+        if self.enabled:
+            self.load()
+
+    def load(self):
+        """Read the manifest file, a missing or broken file is empty"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as file_h:
+                manifest = json.load(file_h)
+            self.manifest['artifacts'] = manifest.get('artifacts', {})
+            self.manifest['outputs'] = manifest.get('outputs', {})
+            self.manifest['pending'] = manifest.get('pending', {})
+        except (IOError, ValueError) as ex:
+            self.logger.warning('Build manifest read failed: {0}'.format(ex))
+
+    def save(self):
+        """Write the manifest file atomically"""
+        if not self.enabled:
+            return
+        tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as file_h:
+            json.dump(self.manifest, file_h, indent=1, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+    def config_inputs(self):
+        """Config values that go into every artifact hash"""
+        return dict((key, value) for key, value in vars(self.cfg_mgr).items()
+                    if key not in VOLATILE_CONFIG)
+
+    def input_hash(self, *inputs):
+        """sha1 of the artifact inputs, the templates, the generator code
+        and the config
+        Args:
+            inputs: json serializable inputs of an artifact
+        """
+        payload = json.dumps([inputs, templates_hash(), code_hash(),
+                              self.config_inputs()],
+                             sort_keys=True, default=repr)
+        return hashlib.sha1(payload).hexdigest()
+
+    def restore(self, artifact, inputs_hash):
+        """Copy the files of an unchanged artifact into the files dir
+        Args:
+            artifact: artifact name
+            inputs_hash: input_hash() of the artifact
+        Returns:
+            list of restored file names or None if the artifact changed
+        """
+        if not self.enabled:
+            return None
+        entry = self.manifest['artifacts'].get(artifact)
+        if not entry or entry['hash'] != inputs_hash:
+            return None
+        stored_dir = os.path.join(self.artifacts_dir, artifact)
+        stored = [os.path.join(stored_dir, name) for name in entry['files']]
+        if not all(os.path.isfile(path) for path in stored):
+            return None
+        for path in stored:
+            shutil.copy(path, self.cfg_mgr.files)
+        self.logger.info('Unchanged, restored {0}'.format(artifact))
+        return list(entry['files'])
+
+    def store(self, artifact, inputs_hash, files):
+        """Keep the generated files of an artifact for the next runs
+        Args:
+            artifact: artifact name
+            inputs_hash: input_hash() of the artifact
+            files: names of the generated files in the files dir
+        """
+        if not self.enabled:
+            return
+        stored_dir = os.path.join(self.artifacts_dir, artifact)
+        if os.path.isdir(stored_dir):
+            shutil.rmtree(stored_dir)
+        os.makedirs(stored_dir)
+        stored = []
+        for name in files:
+            path = os.path.join(self.cfg_mgr.files, name)
+            # e.g. no pdf without graphviz
+            if os.path.isfile(path):
+                shutil.copy(path, stored_dir)
+                stored.append(name)
+        self.manifest['artifacts'][artifact] = {
+            'hash': inputs_hash, 'files': stored}
+
+    def changed(self, files):
+        """Files whose content differs from the last delivered run
+        Args:
+            files: names of the generated files in the files dir
+        """
+        if not self.enabled:
+            return list(files)
+        outputs = self.manifest['outputs']
+        return [name for name in files
+                if outputs.get(name) != self._output_hash(name)]
+
+    def _output_hash(self, name):
+        """sha1 of a file in the files dir, None if it is missing"""
+        path = os.path.join(self.cfg_mgr.files, name)
+        if not os.path.isfile(path):
+            return None
+        return file_hash(path)
+
+    def stage_outputs(self, files):
+        """Remember the content of files that passed the dry run until
+        their delivery is confirmed with record_delivered()
+        Args:
+            files: names of the generated files in the files dir
+        """
+        if not self.enabled:
+            return
+        for name in files:
+            output_hash = self._output_hash(name)
+            if output_hash:
+                self.manifest['pending'][name] = output_hash
+
+    def record_delivered(self):
+        """Mark the pending files as delivered, later runs do not dry run
+        or return them while their content is unchanged
+        Returns:
+            number of delivered files
+        """
+        pending = self.manifest['pending']
+        self.manifest['outputs'].update(pending)
+        self.manifest['pending'] = {}
+        return len(pending)
@@ -64,6 +64,8 @@ class ConfigManager(object):
         self.staging_it_table = config.get('Database', 'staging_it_table')
         self.prod_it_table = config.get('Database', 'prod_it_table')
         self.queue_name = config.get('Database', 'queue_name')
+        self.impala_pool_size = int(config.get('Database',
+                                               'impala_pool_size'))
         self.edge_node = config.get('Database', 'edge_node')
 
         # Workflows
@@ -166,8 +168,31 @@ class ConfigManager(object):
             config.get('Other', 'max_table_per_workflow'))
         self.parallel_dryrun_procs = int(config.get(
             'Other', 'parallel_dryrun_procs'))
+        self.remote_dryrun = config.get('Other', 'remote_dryrun') == 'True'
         self.parallel_sqoop_procs = int(config.get(
             'Other', 'parallel_sqoop_procs'))
+        self.parallel_workflow_procs = int(config.get(
+            'Other', 'parallel_workflow_procs'))
+        self.parallel_task_timeout = int(config.get(
+            'Other', 'parallel_task_timeout'))
+        self.parallel_task_retries = int(config.get(
+            'Other', 'parallel_task_retries'))
+        self.split_by_workers = int(config.get('Other', 'split_by_workers'))
+        self.catalog_stats = config.get('Other', 'catalog_stats') == 'True'
+        self.pipeline_scheduler = config.get('Other', 'pipeline_scheduler')
+        self.max_pipeline_tables = int(config.get(
+            'Other', 'max_pipeline_tables'))
+        self.workflow_backend = config.get('Other', 'workflow_backend')
+        self.workflow_lanes = int(config.get('Other', 'workflow_lanes'))
+        self.webhdfs_url = config.get('Other', 'webhdfs_url')
+        self.webhdfs_user = config.get('Other', 'webhdfs_user')
+        self.eval_server_socket = config.get('Other', 'eval_server_socket')
+        self.eval_server_pool_size = int(config.get(
+            'Other', 'eval_server_pool_size'))
+        self.ddl_cache_ttl = int(config.get('Other', 'ddl_cache_ttl'))
+        self.ddl_cache_max_entries = int(config.get(
+            'Other', 'ddl_cache_max_entries'))
+        self.build_manifest = config.get('Other', 'build_manifest') == 'True'
         self.domain_suffix = config.get('Other', 'domain_suffix')
         self.teradata_server = self.gen_dict(
             config.get('Other', 'teradata_server'))
@@ -0,0 +1,181 @@
+"""Persistent cache of source DDL query results.
+Sqoop eval results of DDL queries are kept in a sqlite file under the
+saves directory so that consecutive runs don't query the source
+databases again for unchanged tables.
+"""
+import cPickle
+import os
+import sqlite3
+import threading
+import time
+from ibis.custom_logging import get_logger
+
+CACHE_FILE = 'ddl_cache.db'
+# hits and misses of the process
+CACHE_STATS = {'hits': 0, 'misses': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(stat):
+    """Increment a cache counter"""
+    with _STATS_LOCK:
+        CACHE_STATS[stat] += 1
+
+
+def get_stats():
+    """Returns hits and misses of the process"""
+    with _STATS_LOCK:
+        return dict(CACHE_STATS)
+
+
+class DDLCache(object):
+    """On-disk cache of sqoop eval results keyed by jdbc url, database,
+    table and query. Entries expire after ttl seconds and the least
+    recently used entries are evicted above max_entries.
+    """
+
+    def __init__(self, cfg_mgr, path=None, ttl=None, max_entries=None):
+        """init
+        Args:
+            cfg_mgr: ibis.utilities.config_manager.ConfigManager
+            path: sqlite file, defaults to {saves}/ddl_cache.db
+            ttl: seconds an entry is valid, 0 disables the cache
+            max_entries: max number of cached results
+        """
+        self.cfg_mgr = cfg_mgr
+        self.logger = get_logger(self.cfg_mgr)
+        self.path = path or os.path.join(self.cfg_mgr.saves, CACHE_FILE)
+        self.ttl = self.cfg_mgr.ddl_cache_ttl if ttl is None else ttl
+        self.max_entries = max_entries or self.cfg_mgr.ddl_cache_max_entries
+        self._initialized = False
+
+    @property
+    def enabled(self):
+        """Cache is disabled with a ttl of 0"""
+        return self.ttl > 0
+
+    def _connect(self):
+        """Open the sqlite file, creates the cache table on first use"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ddl_cache ('
+                'jdbcurl TEXT, database_name TEXT, table_name TEXT, '
+                'query TEXT, result BLOB, created REAL, accessed REAL, '
+                'PRIMARY KEY (jdbcurl, database_name, table_name, query))')
+            conn.execute('CREATE INDEX IF NOT EXISTS ddl_cache_accessed '
+                         'ON ddl_cache (accessed)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, jdbcurl, database, table, query):
+        """Returns the cached result or None
+        Args:
+            jdbcurl: source jdbc url
+            database: source database
+            table: source table
+            query: DDL query run by sqoop eval
+        """
+        if not self.enabled:
+            return None
+        result = None
+        key = (jdbcurl, database.lower(), table.lower(), query)
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    'SELECT result, created FROM ddl_cache WHERE jdbcurl=? '
+                    'AND database_name=? AND table_name=? AND query=?',
+                    key).fetchone()
+                now = time.time()
+                if row and now - row[1] < self.ttl:
+                    result = cPickle.loads(str(row[0]))
+                    conn.execute(
+                        'UPDATE ddl_cache SET accessed=? WHERE jdbcurl=? '
+                        'AND database_name=? AND table_name=? AND query=?',
+                        (now,) + key)
+                    conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as ex:
+            self.logger.warning('DDL cache read failed: {0}'.format(ex))
+        if result is None:
+            _count('misses')
+        else:
+            _count('hits')
+            self.logger.info('DDL cache hit: {0}.{1}'.format(database, table))
+        return result
+
+    def put(self, jdbcurl, database, table, query, result):
+        """Cache a result and evict the least recently used entries
+        Args:
+            jdbcurl: source jdbc url
+            database: source database
+            table: source table
+            query: DDL query run by sqoop eval
+            result: sqoop eval result
+        """
+        if not self.enabled or not result:
+            return
+        now = time.time()
+        blob = sqlite3.Binary(cPickle.dumps(result, 2))
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO ddl_cache VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?)',
+                    (jdbcurl, database.lower(), table.lower(), query, blob,
+                     now, now))
+                conn.execute(
+                    'DELETE FROM ddl_cache WHERE created < ?',
+                    (now - self.ttl,))
+                conn.execute(
+                    'DELETE FROM ddl_cache WHERE rowid IN (SELECT rowid '
+                    'FROM ddl_cache ORDER BY accessed DESC LIMIT -1 '
+                    'OFFSET ?)', (self.max_entries,))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as ex:
+            self.logger.warning('DDL cache write failed: {0}'.format(ex))
+
+    def invalidate(self, database, table):
+        """Drop the cached results of a table for every jdbc url
+        Args:
+            database: source database
+            table: source table
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'DELETE FROM ddl_cache WHERE database_name=? AND '
+                    'table_name=?', (database.lower(), table.lower()))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as ex:
+            self.logger.warning('DDL cache invalidate failed: {0}'.format(ex))
+
+    def clear(self):
+        """Drop all cached results"""
+        if not os.path.exists(self.path):
+            return
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM ddl_cache')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def size(self):
+        """Number of cached results"""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM ddl_cache').fetchone()[0]
+        finally:
+            conn.close()
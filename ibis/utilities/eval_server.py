@@ -0,0 +1,399 @@
+"""Long lived sqoop-eval replacement.
+
+The eval server keeps one JVM and a pool of warm JDBC connections per
+(jdbc url, user) and answers queries sent over a local unix socket.
+Replies are rendered in the same ascii table format as sqoop-eval so the
+existing result parsers can be used as is. When the server is not running,
+EvalClient.eval returns None and callers fall back to sqoop-eval.
+"""
+import getpass
+import json
+import os
+import Queue
+import socket
+import SocketServer
+import subprocess
+import tempfile
+import threading
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+STATUS_UNAVAILABLE = 'unavailable'
+
+SOCKET_ENV_VAR = 'IBIS_EVAL_SOCKET'
+CONNECT_TIMEOUT = 2
+VALIDATION_TIMEOUT = 5
+NULL_VALUE = '(null)'
+
+# sqoop-eval is run with sqoop manager factories, the server needs the
+# actual JDBC driver classes for the same jdbc urls
+JDBC_DRIVERS = {
+    'teradata': 'com.teradata.jdbc.TeraDriver',
+    'oracle': 'oracle.jdbc.OracleDriver',
+    'db2': 'com.ibm.db2.jcc.DB2Driver',
+    'sqlserver': ['com.microsoft.sqlserver.jdbc.SQLServerDriver',
+                  'net.sourceforge.jtds.jdbc.Driver'],
+    'mysql': 'com.mysql.jdbc.Driver',
+    'postgresql': 'org.postgresql.Driver'}
+
+
+def get_socket_path(socket_path=None):
+    """Returns unix socket path of the eval server
+    Args:
+        socket_path: configured path. Empty value falls back to
+            $IBIS_EVAL_SOCKET and then to a per user file in tmp dir
+    """
+    if not socket_path:
+        socket_path = os.environ.get(SOCKET_ENV_VAR, '')
+    if not socket_path:
+        file_name = 'ibis_eval_{0}.sock'.format(getpass.getuser())
+        socket_path = os.path.join(tempfile.gettempdir(), file_name)
+    return socket_path
+
+
+def get_jdbc_driver(jdbc):
+    """Given a jdbc url get JDBC driver class name"""
+    driver = ''
+    for db_src, driver_name in JDBC_DRIVERS.items():
+        if db_src not in jdbc:
+            continue
+        if db_src == 'sqlserver':
+            driver = driver_name[1] if 'domain' in jdbc else driver_name[0]
+        else:
+            driver = driver_name
+    return driver
+
+
+def format_sqoop_table(labels, rows):
+    """Render a result set the way sqoop-eval prints it
+    Args:
+        labels: list of column labels
+        rows: list of rows. None values are printed as (null)
+    Returns:
+        ascii table string
+    """
+    rows = [[NULL_VALUE if val is None else val for val in row]
+            for row in rows]
+    widths = [len(label) for label in labels]
+    for row in rows:
+        for index, val in enumerate(row):
+            widths[index] = max(widths[index], len(val))
+
+    def _line(values):
+        cells = [' {0} '.format(val.ljust(widths[index]))
+                 for index, val in enumerate(values)]
+        return '|' + '|'.join(cells) + '|'
+
+    separator = '-' * (sum(widths) + 3 * len(widths) + 1)
+    lines = [separator, _line(labels), separator]
+    lines.extend([_line(row) for row in rows])
+    lines.append(separator)
+    return '\n'.join(lines) + '\n'
+
+
+class EvalClient(object):
+    """Sends sqoop-eval queries to a running EvalServer"""
+
+    def __init__(self, socket_path=None):
+        """init
+        Args:
+            socket_path: unix socket path of the server
+        """
+        self.socket_path = get_socket_path(socket_path)
+
+    def is_available(self):
+        """Checks if the server socket exists"""
+        return os.path.exists(self.socket_path)
+
+    def eval(self, jdbc, sql_stmt, db_username, password_file):
+        """Run query on the eval server
+        Args:
+            jdbc: JDBC Url
+            sql_stmt: sql statement to query against data source
+            db_username: username for source db
+            password_file: jceks#alias or password_file_path
+        Returns:
+            None if the server is unavailable, otherwise the same
+            (returncode, output, err) tuple as a sqoop-eval subprocess
+        """
+        if not self.is_available():
+            return None
+        request = {'jdbc': jdbc, 'query': sql_stmt, 'username': db_username,
+                   'password_file': password_file}
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(self.socket_path)
+            # queries can legitimately run for a long time
+            sock.settimeout(None)
+            sock.sendall(json.dumps(request) + '\n')
+            sock_file = sock.makefile('rb')
+            response = sock_file.readline()
+            sock_file.close()
+        except socket.error:
+            return None
+        finally:
+            sock.close()
+
+        try:
+            reply = json.loads(response)
+        except ValueError:
+            return None
+        if reply.get('status') not in [STATUS_OK, STATUS_ERROR]:
+            return None
+        return (reply['returncode'], reply['output'].encode('utf-8'),
+                reply['err'].encode('utf-8'))
+
+
+class ConnectionPool(object):
+    """Bounded pool of JDBC connections for one (jdbc url, user)"""
+
+    def __init__(self, connect, max_size):
+        """init
+        Args:
+            connect: function returning a new connection
+            max_size: max number of connections handed out at once
+        """
+        self.connect = connect
+        self.max_size = max_size
+        self.idle = Queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self):
+        """Returns a healthy connection, blocks if pool is exhausted"""
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self.idle.get_nowait()
+                except Queue.Empty:
+                    return self.connect()
+                if self.is_valid(conn):
+                    return conn
+                self.close(conn)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Returns a connection to the pool"""
+        try:
+            if broken:
+                self.close(conn)
+            else:
+                self.idle.put(conn)
+        finally:
+            self.slots.release()
+
+    def close_all(self):
+        """Closes all idle connections"""
+        while True:
+            try:
+                self.close(self.idle.get_nowait())
+            except Queue.Empty:
+                break
+
+    @classmethod
+    def is_valid(cls, conn):
+        """Health check of a pooled connection"""
+        try:
+            return bool(conn.isValid(VALIDATION_TIMEOUT))
+        except Exception:
+            return False
+
+    @classmethod
+    def close(cls, conn):
+        """Close connection ignoring errors"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class _EvalRequestHandler(SocketServer.StreamRequestHandler):
+    """One json request per line, one json reply per line"""
+
+    def handle(self):
+        """Handle request"""
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            reply = self.server.eval_server.handle(request)
+        except ValueError as err_exp:
+            reply = {'status': STATUS_UNAVAILABLE, 'returncode': 1,
+                     'output': '', 'err': str(err_exp)}
+        self.wfile.write(json.dumps(reply) + '\n')
+
+
+class _ThreadedUnixServer(SocketServer.ThreadingMixIn,
+                          SocketServer.UnixStreamServer):
+    """Threaded unix socket server"""
+    daemon_threads = True
+
+
+class EvalServer(object):
+    """Serves sqoop-eval queries from a warm JVM"""
+
+    def __init__(self, cfg_mgr, socket_path=None, pool_size=None):
+        """init
+        Args:
+            cfg_mgr: ConfigManager object
+            socket_path: unix socket path. Defaults to eval_server_socket
+            pool_size: max connections per (jdbc url, user)
+        """
+        self.cfg_mgr = cfg_mgr
+        self.socket_path = get_socket_path(
+            socket_path or cfg_mgr.eval_server_socket)
+        self.pool_size = pool_size or cfg_mgr.eval_server_pool_size
+        self.pools = {}
+        self.passwords = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.jpype = None
+
+    def start_jvm(self):
+        """Starts the JVM with hadoop and sqoop jdbc jars on classpath"""
+        import jpype
+        self.jpype = jpype
+        if not jpype.isJVMStarted():
+            class_path = '-Djava.class.path=' + self.get_class_path()
+            jpype.startJVM(jpype.getDefaultJVMPath(), class_path)
+
+    def get_class_path(self):
+        """hadoop classpath plus the sqoop jdbc jars"""
+        proc = subprocess.Popen(['hadoop', 'classpath', '--glob'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        output, _ = proc.communicate()
+        class_path = [path for path in output.strip().split(':') if path]
+        for env_var in ['SQOOPJARS', 'HADOOP_CLASSPATH']:
+            jars = os.environ.get(env_var, '').replace(',', ':')
+            class_path.extend([jar for jar in jars.split(':') if jar])
+        return ':'.join(class_path)
+
+    def attach_thread(self):
+        """JNI needs every server thread attached to the JVM"""
+        if not self.jpype.isThreadAttachedToJVM():
+            self.jpype.attachThreadToJVM()
+
+    def serve_forever(self):
+        """Start listening on the unix socket"""
+        self.start_jvm()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = _ThreadedUnixServer(self.socket_path,
+                                          _EvalRequestHandler)
+        self.server.eval_server = self
+        os.chmod(self.socket_path, 0600)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Close all pooled connections and remove the socket"""
+        for pool in self.pools.values():
+            pool.close_all()
+        if self.server:
+            self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def get_pool(self, jdbc, username, password_file):
+        """Returns the connection pool for (jdbc url, user)"""
+        key = (jdbc, username)
+        with self.lock:
+            if key not in self.pools:
+                def _connect():
+                    return self.connect(jdbc, username, password_file)
+                self.pools[key] = ConnectionPool(_connect, self.pool_size)
+            return self.pools[key]
+
+    def get_password(self, password_file):
+        """Resolve password from jceks#alias or hdfs password file"""
+        if password_file in self.passwords:
+            return self.passwords[password_file]
+        hadoop_conf = self.jpype.JClass('org.apache.hadoop.conf.Configuration')
+        conf = hadoop_conf()
+        if 'jceks' in password_file:
+            jceks, password_alias = password_file.split('#')
+            conf.set('hadoop.security.credential.provider.path', jceks)
+            password = ''.join(conf.getPassword(password_alias))
+        else:
+            hdfs_path = self.jpype.JClass('org.apache.hadoop.fs.Path')
+            io_utils = self.jpype.JClass('org.apache.commons.io.IOUtils')
+            path = hdfs_path(password_file)
+            stream = path.getFileSystem(conf).open(path)
+            try:
+                # sqoop does not strip the password file contents
+                password = io_utils.toString(stream, 'UTF-8')
+            finally:
+                stream.close()
+        self.passwords[password_file] = password
+        return password
+
+    def connect(self, jdbc, username, password_file):
+        """Open a new JDBC connection"""
+        java_class = self.jpype.JClass('java.lang.Class')
+        driver_manager = self.jpype.JClass('java.sql.DriverManager')
+        java_class.forName(get_jdbc_driver(jdbc))
+        password = self.get_password(password_file)
+        return driver_manager.getConnection(jdbc, username, password)
+
+    def run_query(self, conn, sql_stmt):
+        """Execute query and read every value with getString like sqoop
+        Returns:
+            column labels and rows
+        """
+        labels = []
+        rows = []
+        stmt = conn.createStatement()
+        try:
+            if stmt.execute(sql_stmt):
+                result_set = stmt.getResultSet()
+                meta = result_set.getMetaData()
+                num_cols = meta.getColumnCount()
+                labels = [unicode(meta.getColumnLabel(i))
+                          for i in range(1, num_cols + 1)]
+                while result_set.next():
+                    row = []
+                    for i in range(1, num_cols + 1):
+                        val = result_set.getString(i)
+                        row.append(None if val is None else unicode(val))
+                    rows.append(row)
+                result_set.close()
+        finally:
+            stmt.close()
+        return labels, rows
+
+    def handle(self, request):
+        """Run one eval request
+        Args:
+            request: dict with jdbc, query, username and password_file
+        Returns:
+            reply dict. Status unavailable tells the client to fall back
+            to sqoop-eval, status error is a failed query
+        """
+        reply = {'status': STATUS_OK, 'returncode': 0, 'output': '',
+                 'err': ''}
+        self.attach_thread()
+        try:
+            pool = self.get_pool(request['jdbc'], request['username'],
+                                 request['password_file'])
+            conn = pool.acquire()
+        except Exception as err_exp:
+            reply.update({'status': STATUS_UNAVAILABLE, 'returncode': 1,
+                          'err': str(err_exp)})
+            return reply
+
+        broken = False
+        try:
+            labels, rows = self.run_query(conn, request['query'])
+            reply['output'] = format_sqoop_table(labels, rows)
+        except Exception as err_exp:
+            broken = not ConnectionPool.is_valid(conn)
+            reply.update({'status': STATUS_ERROR, 'returncode': 1,
+                          'err': str(err_exp)})
+        finally:
+            pool.release(conn, broken)
+        return reply
@@ -0,0 +1,320 @@
+"""HDFS file system operations. Calls the WebHDFS or HttpFS REST api over
+a pooled http session when webhdfs_url is set, falls back to hadoop fs
+commands otherwise."""
+import getpass
+import posixpath
+import subprocess
+import tempfile
+import threading
+import urllib
+import requests
+from requests.adapters import HTTPAdapter
+from ibis.custom_logging import get_logger
+
+HTTP_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+POOL_SIZE = 10
+
+# one http session per WebHDFS url, shared by all clients of the process
+SESSIONS = {}
+SESSIONS_LOCK = threading.Lock()
+CLIENTS = {}
+
+
+def get_session(url):
+    """Returns the pooled http session of a WebHDFS url. Connections to the
+    namenode and the datanodes it redirects to are kept alive and reused
+    """
+    with SESSIONS_LOCK:
+        if url not in SESSIONS:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE,
+                                  pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            SESSIONS[url] = session
+        return SESSIONS[url]
+
+
+def get_hdfs(cfg_mgr):
+    """Returns the HDFS client of the environment. WebHdfs if webhdfs_url
+    is set and the namenode answers, CliHdfs otherwise. The client is
+    created once per process.
+    """
+    key = (cfg_mgr.webhdfs_url, cfg_mgr.webhdfs_user)
+    if key not in CLIENTS:
+        client = CliHdfs(cfg_mgr)
+        if cfg_mgr.webhdfs_url:
+            web_client = WebHdfs(cfg_mgr)
+            try:
+                web_client.status('/')
+                client = web_client
+            except requests.exceptions.RequestException as ex:
+                web_client.logger.warning(
+                    'WebHDFS {0} unavailable, using hadoop fs: {1}'.format(
+                        cfg_mgr.webhdfs_url, ex))
+        CLIENTS[key] = client
+    return CLIENTS[key]
+
+
+class CliHdfs(object):
+
+    """HDFS operations with hadoop fs commands"""
+
+    def __init__(self, cfg_mgr):
+        self.cfg_mgr = cfg_mgr
+        self.logger = get_logger(self.cfg_mgr)
+
+    def run(self, *args):
+        """Runs a hadoop fs command
+        Returns:
+            (return code, stdout)
+        """
+        command = ['hadoop', 'fs'] + list(args)
+        self.logger.info('Running: {0}'.format(' '.join(command)))
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        out, _ = proc.communicate()
+        return proc.returncode, out
+
+    def exists(self, path):
+        """True if the path exists"""
+        return self.run('-test', '-e', path)[0] == 0
+
+    def ls(self, path):
+        """Returns the paths in a directory"""
+        ret, out = self.run('-ls', path)
+        if ret != 0:
+            return []
+        # drwxr-xr-x   - user group          0 2017-03-28 07:41 /path
+        return [line.split()[-1] for line in out.splitlines()
+                if len(line.split()) >= 8]
+
+    def du(self, path):
+        """Returns the bytes used by a path"""
+        ret, out = self.run('-du', '-s', path)
+        if ret != 0 or not out.split() or not out.split()[0].isdigit():
+            return 0
+        return int(out.split()[0])
+
+    def mkdir(self, path):
+        """Creates a directory and its parents"""
+        return self.run('-mkdir', '-p', path)[0] == 0
+
+    def cp(self, src, dst):
+        """Copies a file, directory or glob into dst, overwriting files"""
+        return self.run('-cp', '-f', src, dst)[0] == 0
+
+    def put(self, local_path, hdfs_path):
+        """Uploads a local file, overwriting it"""
+        return self.run('-put', '-f', local_path, hdfs_path)[0] == 0
+
+    def chmod(self, path, permission):
+        """Sets the permission of a path and everything under it"""
+        return self.run('-chmod', '-R', permission, path)[0] == 0
+
+    def rm(self, path, recursive=False):
+        """Removes a file, or a directory if recursive"""
+        args = ['-rm', '-r', path] if recursive else ['-rm', path]
+        return self.run(*args)[0] == 0
+
+
+class WebHdfs(object):
+
+    """HDFS operations with the WebHDFS or HttpFS REST api. Reads and writes
+    go to the datanode the namenode redirects to, HttpFS redirects to
+    itself.
+    """
+
+    def __init__(self, cfg_mgr):
+        self.cfg_mgr = cfg_mgr
+        self.logger = get_logger(self.cfg_mgr)
+        self.url = cfg_mgr.webhdfs_url.rstrip('/')
+        self.session = get_session(self.url)
+        self.params = {}
+        self.auth = None
+        if cfg_mgr.webhdfs_user:
+            self.params['user.name'] = cfg_mgr.webhdfs_user
+        elif cfg_mgr.use_kerberos == 'True':
+            from requests_kerberos import HTTPKerberosAuth
+            self.auth = HTTPKerberosAuth()
+        else:
+            self.params['user.name'] = getpass.getuser()
+
+    def request(self, method, path, operation, **kwargs):
+        """Sends a WebHDFS request
+        Args:
+            method: http method
+            path: absolute HDFS path
+            operation: WebHDFS op
+            kwargs: query parameters. data and stream go to requests
+        Returns:
+            requests.Response
+        """
+        params = dict(self.params)
+        params['op'] = operation
+        data = kwargs.pop('data', None)
+        stream = kwargs.pop('stream', False)
+        params.update(kwargs)
+        url = self.url + urllib.quote(path)
+        response = self.session.request(
+            method, url, params=params, auth=self.auth, timeout=HTTP_TIMEOUT,
+            allow_redirects=False, stream=stream)
+        if response.status_code == 307:
+            # data goes to the datanode in the location
+            headers = {'Content-Type': 'application/octet-stream'}
+            response = self.session.request(
+                method, response.headers['Location'], data=data,
+                headers=headers, auth=self.auth, timeout=HTTP_TIMEOUT,
+                stream=stream)
+        return response
+
+    def check(self, response, action, path):
+        """Logs a failed request
+        Returns:
+            True if the request succeeded
+        """
+        if 200 <= response.status_code < 300:
+            return True
+        message = response.text
+        try:
+            message = response.json()['RemoteException']['message']
+        except (ValueError, KeyError, TypeError):
+            pass
+        self.logger.error('WebHDFS {0} {1} failed: {2} {3}'.format(
+            action, path, response.status_code, message))
+        return False
+
+    def status(self, path):
+        """Returns the FileStatus dict of a path or None if missing"""
+        response = self.request('GET', path, 'GETFILESTATUS')
+        if response.status_code == 404:
+            return None
+        if not self.check(response, 'status', path):
+            raise requests.exceptions.HTTPError(response.status_code,
+                                                response=response)
+        return response.json()['FileStatus']
+
+    def is_dir(self, path):
+        """True if the path is a directory"""
+        status = self.status(path)
+        return status is not None and status['type'] == 'DIRECTORY'
+
+    def exists(self, path):
+        """True if the path exists"""
+        return self.status(path) is not None
+
+    def list_status(self, path):
+        """Returns the FileStatus dicts of a directory"""
+        response = self.request('GET', path, 'LISTSTATUS')
+        if response.status_code == 404 or not self.check(
+                response, 'ls', path):
+            return []
+        return response.json()['FileStatuses']['FileStatus']
+
+    def ls(self, path):
+        """Returns the paths in a directory, or the path of a file"""
+        statuses = self.list_status(path)
+        return [posixpath.join(path, status['pathSuffix'])
+                if status['pathSuffix'] else path for status in statuses]
+
+    def glob(self, path):
+        """Expands a trailing * of a path"""
+        if posixpath.basename(path) != '*':
+            return [path] if self.exists(path) else []
+        return self.ls(posixpath.dirname(path))
+
+    def du(self, path):
+        """Returns the bytes used by a path"""
+        response = self.request('GET', path, 'GETCONTENTSUMMARY')
+        if response.status_code == 404 or not self.check(
+                response, 'du', path):
+            return 0
+        return response.json()['ContentSummary']['length']
+
+    def mkdir(self, path):
+        """Creates a directory and its parents"""
+        response = self.request('PUT', path, 'MKDIRS')
+        return self.check(response, 'mkdir', path) and \
+            response.json()['boolean']
+
+    def write(self, path, data, append=False):
+        """Writes data to a file, overwriting it unless append.
+        Args:
+            path: HDFS file path
+            data: str or file object
+            append: append to an existing file
+        """
+        if append:
+            response = self.request('POST', path, 'APPEND', data=data)
+        else:
+            response = self.request('PUT', path, 'CREATE', data=data,
+                                    overwrite='true')
+        return self.check(response, 'write', path)
+
+    def open(self, path):
+        """Returns an iterator over the content of a file"""
+        response = self.request('GET', path, 'OPEN', stream=True)
+        if not self.check(response, 'open', path):
+            raise requests.exceptions.HTTPError(response.status_code,
+                                                response=response)
+        return response.iter_content(CHUNK_SIZE)
+
+    def target(self, src, dst):
+        """Copies into a directory keep the source name"""
+        if dst.endswith('/') or self.is_dir(dst):
+            return posixpath.join(dst, posixpath.basename(src.rstrip('/')))
+        return dst
+
+    def put(self, local_path, hdfs_path):
+        """Uploads a local file, overwriting it"""
+        with open(local_path, 'rb') as file_h:
+            return self.write(self.target(local_path, hdfs_path), file_h)
+
+    def cp(self, src, dst):
+        """Copies a file, directory or glob into dst, overwriting files"""
+        sources = self.glob(src)
+        if not sources:
+            self.logger.error('WebHDFS cp {0}: no such file'.format(src))
+            return False
+        copied = True
+        for source in sources:
+            copied = self.copy(source, self.target(source, dst)) and copied
+        return copied
+
+    def copy(self, src, dst):
+        """Copies a file or a directory tree to dst"""
+        status = self.status(src)
+        if status is None:
+            return False
+        if status['type'] != 'DIRECTORY':
+            # spooled to a local file so the upload has a content length
+            with tempfile.TemporaryFile() as file_h:
+                for chunk in self.open(src):
+                    file_h.write(chunk)
+                file_h.seek(0)
+                return self.write(dst, file_h)
+        copied = self.mkdir(dst)
+        for child in self.list_status(src):
+            name = child['pathSuffix']
+            copied = self.copy(posixpath.join(src, name),
+                               posixpath.join(dst, name)) and copied
+        return copied
+
+    def chmod(self, path, permission):
+        """Sets the permission of a path and everything under it"""
+        response = self.request('PUT', path, 'SETPERMISSION',
+                                permission=permission)
+        changed = self.check(response, 'chmod', path)
+        for child in self.list_status(path):
+            if child['pathSuffix']:
+                changed = self.chmod(posixpath.join(
+                    path, child['pathSuffix']), permission) and changed
+        return changed
+
+    def rm(self, path, recursive=False):
+        """Removes a file, or a directory if recursive"""
+        response = self.request('DELETE', path, 'DELETE',
+                                recursive=str(recursive).lower())
+        return self.check(response, 'rm', path) and \
+            response.json()['boolean']
@@ -0,0 +1,98 @@
+"""Import time report of modules, like python3 -X importtime.
+Usage:
+    python -m ibis.utilities.import_time [--budget SECONDS]
+        [--path DIR] module [module ...]
+Prints the time spent importing every module, children before their
+parents, and fails when the imports take longer than the budget.
+"""
+import __builtin__
+import sys
+import time
+from argparse import ArgumentParser
+
+REPORT_HEADER = 'import time: self [us] | cumulative | imported package'
+REPORT_LINE = 'import time: {self_us:>9} | {cumulative_us:>10} | {name}'
+
+
+class ImportTimer(object):
+    """Times the imports run inside its context. Only imports that load
+    new modules are recorded"""
+
+    def __init__(self):
+        """init"""
+        # (depth, name, self us, cumulative us), children first
+        self.records = []
+        # cumulative us of the children of the imports being run
+        self._children = []
+        self._import = None
+
+    def __enter__(self):
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc_info):
+        __builtin__.__import__ = self._import
+
+    def _timed_import(self, name, *args, **kwargs):
+        """__import__ replacement"""
+        loaded = len(sys.modules)
+        self._children.append(0)
+        start = time.time()
+        try:
+            return self._import(name, *args, **kwargs)
+        finally:
+            cumulative = int((time.time() - start) * 1e6)
+            children = self._children.pop()
+            if len(sys.modules) > loaded:
+                self.records.append((len(self._children), name,
+                                     cumulative - children, cumulative))
+                if self._children:
+                    self._children[-1] += cumulative
+            elif self._children:
+                self._children[-1] += children
+
+    @property
+    def total(self):
+        """Seconds spent in the top level imports"""
+        return sum(record[3] for record in self.records
+                   if record[0] == 0) / 1e6
+
+    def report(self):
+        """Report lines in the python3 -X importtime format"""
+        lines = [REPORT_HEADER]
+        for depth, name, self_us, cumulative_us in self.records:
+            lines.append(REPORT_LINE.format(
+                self_us=self_us, cumulative_us=cumulative_us,
+                name='  ' * depth + name))
+        return lines
+
+
+def main(argv=None):
+    """Import the modules and print the report
+    Returns:
+        exit code, 1 when the budget is exceeded
+    """
+    parser = ArgumentParser(description='Import time report')
+    parser.add_argument('modules', nargs='+', help='modules to import')
+    parser.add_argument('--budget', type=float,
+                        help='fail when the imports take more seconds')
+    parser.add_argument('--path', action='append', default=[],
+                        help='directory added to sys.path, e.g. lib/ingest')
+    args = parser.parse_args(argv)
+    sys.path[:0] = args.path
+    with ImportTimer() as timer:
+        for module in args.modules:
+            __import__(module)
+    for line in timer.report():
+        print >> sys.stderr, line
+    print 'Imported {0} in {1:.3f}s'.format(', '.join(args.modules),
+                                            timer.total)
+    if args.budget is not None and timer.total > args.budget:
+        print 'Import time budget of {0}s exceeded'.format(args.budget)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,29 @@
 """IT table generation with auto load, mappers and split by calculation."""
-import gc
-from multiprocessing import Pool
+from cStringIO import StringIO
+from multiprocessing import Pool, TimeoutError as PoolTimeoutError
 import os
 import re
 import signal
 import subprocess
+import tempfile
 import time
 import traceback
-import numpy
 
 from ibis.custom_logging import get_logger
 from ibis.inventory.it_inventory import ITInventory
 from ibis.inventory.request_inventory import OPTIONAL_FIELDS
 from ibis.model.table import ItTable
+from ibis.utilities.eval_server import EvalClient
 from ibis.utilities.file_parser import parse_file_by_sections
 from ibis.utilities.sqoop_helper import ORACLE, DB2, TERADATA, SQLSERVER, \
-    MYSQL, POSTGRESQL
+    MYSQL, POSTGRESQL, SqoopTableParser
 
 REQ_KEYS = ['source_database_name', 'source_table_name', 'mappers', 'jdbcurl',
             'db_username', 'password_file']
 MAPPERS_ROW_COUNT_THRESHOLD = 250000
 # MAPPERS_ROW_COUNT_THRESHOLD = 250
+# seconds between checks for group by results, keeps SIGALRM deliverable
+SPLIT_BY_POLL_INTERVAL = 1
 
 
 def parallel_sqoop_output(info):
@@ -31,30 +34,33 @@ def parallel_sqoop_output(info):
     cfg_mgr, it_table, column_name, query = info[0], info[1], info[2], info[3]
     it_table_obj = ItTable(it_table, cfg_mgr)
     source_obj = SourceTable(cfg_mgr, it_table_obj)
-    returncode, output, err = source_obj.eval(query)
-    if returncode == 0:
-        _, groupby_counts = source_obj.fetch_rows_sqoop(output)
-    else:
+    returncode, _, groupby_counts, err = source_obj.eval_rows(
+        query, col_types=[int])
+    if returncode != 0:
         source_obj.logger.error(err)
         raise ValueError(err)
     # collect counts per bin, calculate relevant stats on them, and sort
     # to most preferred first
-    bin_counts = [int(item) for sublist in groupby_counts for item in sublist]
-    num_groups = len(bin_counts)
-    bin_counts_arr = numpy.array(bin_counts)
-    std_deviation = numpy.std(bin_counts_arr)
-    # print column_name, os.getpid(), os.getppid()
-    # memory_usage_ps()
+    bin_counts = [row[0] for row in groupby_counts]
     del groupby_counts
-    del bin_counts
-    del bin_counts_arr
-    gc.collect()
-    # memory_usage_ps()
-    # print '--' * 50
+    num_groups = len(bin_counts)
+    import numpy
+    std_deviation = numpy.std(numpy.array(bin_counts))
     col_quality_list.append((column_name, std_deviation, num_groups))
     return col_quality_list
 
 
+def _stats_number(value):
+    """Parse a catalog statistics value.
+    Returns: number or None for missing statistics (null, -1, 0)
+    """
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
 class RunningTooLongError(Exception):
     """If process runs for too long"""
 
@@ -93,15 +99,8 @@ class SourceTable(object):
         #    handler.close()
         #    self.logger.removeHandler(handler)
 
-    def eval(self, query):
-        """Fetch data for the query.
-        Args:
-            query: sql statement to query against data source
-        Returns:
-            returncode: 0 is success and anything else is failure
-            output: sqoop output as it is_primary_key
-            err: sqoop error if any
-        """
+    def _sqoop_eval_cmd(self, query):
+        """sqoop-eval command for a query"""
         if 'jceks' in self.password_file:
             jceks, password_alias = self.password_file.split('#')
             cmd_list = ['sqoop-eval',
@@ -116,11 +115,65 @@ class SourceTable(object):
                         self.jdbc_url, '--query', query, '--username',
                         self.user_name,
                         '--password-file', self.password_file]
-        proc = subprocess.Popen(cmd_list, stdout=subprocess.PIPE,
+        return cmd_list
+
+    def _server_eval(self, query):
+        """Run query on the eval server, None if it is unavailable"""
+        eval_client = EvalClient(self.cfg_mgr.eval_server_socket)
+        return eval_client.eval(self.jdbc_url, query, self.user_name,
+                                self.password_file)
+
+    def eval(self, query):
+        """Fetch data for the query.
+        Args:
+            query: sql statement to query against data source
+        Returns:
+            returncode: 0 is success and anything else is failure
+            output: sqoop output as it is_primary_key
+            err: sqoop error if any
+        """
+        result = self._server_eval(query)
+        if result is not None:
+            return result
+        proc = subprocess.Popen(self._sqoop_eval_cmd(query),
+                                stdout=subprocess.PIPE,
                                 stderr=subprocess.PIPE)
         output, err = proc.communicate()
         return proc.returncode, output, err
 
+    def eval_rows(self, query, strip_col_val=True, filter_columns=None,
+                  limit=None, col_types=None):
+        """Fetch data for the query, parsing rows while the sqoop output
+        pipe is read. See SqoopTableParser for args
+        Returns:
+            returncode: 0 is success and anything else is failure
+            labels: column labels
+            rows: row data
+            err: sqoop error if any
+        """
+        parser = SqoopTableParser(strip_col_val, filter_columns, limit,
+                                  col_types)
+        result = self._server_eval(query)
+        if result is not None:
+            returncode, output, err = result
+            labels, rows = parser.parse_all(StringIO(output))
+            return returncode, labels, rows, err
+
+        # sqoop-eval --verbose logs a lot, spool stderr to a file
+        # so that the stdout pipe can be read without a deadlock
+        err_file = tempfile.TemporaryFile()
+        proc = subprocess.Popen(self._sqoop_eval_cmd(query),
+                                stdout=subprocess.PIPE, stderr=err_file)
+        labels, rows = parser.parse_all(proc.stdout)
+        # drain rows past the limit
+        for _ in proc.stdout:
+            pass
+        proc.wait()
+        err_file.seek(0)
+        err = err_file.read()
+        err_file.close()
+        return proc.returncode, labels, rows, err
+
     def _clean_query_result(self, output):
         """Match characters between two | characters. Ex: | anything |.
         Args:
@@ -144,57 +197,8 @@ class SourceTable(object):
         Returns:
             column labels and row data
         """
-        # t1 = time.time()
-        # print 1
-        # humanize_bytes(sys.getsizeof(output))
-        raw_data = self._clean_query_result(output)
-        # memory_usage_ps()
-        del output
-        gc.collect()
-        # memory_usage_ps()
-        # t2 = time.time()
-        # print 2
-        # time_calc(t2, t1)
-        row_data = []
-        # memory_usage_ps()
-        for line in raw_data:
-            column_data = line.split('|')
-            # ignore the first and last items due to split
-            column_data = column_data[1:-1]
-            row_data.append(column_data)
-
-        # memory_usage_ps()
-        # t3 = time.time()
-        # print 3
-        # time_calc(t3, t2)
-        # first item is labels in table output
-        column_labels = row_data[0]
-        column_labels = [label.strip() for label in column_labels]
-        num_column_labels = len(column_labels)
-        # row data starts from second item in table output
-        row_values = row_data[1:]
-        # remove the extra space in the start and end of string
-        # which is inserted by sqoop output table
-        row_values = [[col_val[1:-1] for col_val in row] for row in row_values]
-        # t4 = time.time()
-        # print 4
-        # time_calc(t4, t3)
-        if filter_columns:
-            pop_columns = []
-            for i in range(num_column_labels):
-                if i not in filter_columns:
-                    pop_columns.append(i)
-            pop_columns.sort(reverse=True)
-            for index in pop_columns:
-                column_labels.pop(index)
-                temp_row_values = []
-                for row in row_values:
-                    row.pop(index)
-                    temp_row_values.append(row)
-                row_values = temp_row_values
-        if strip_col_val:
-            row_values = [[val.strip() for val in row] for row in row_values]
-        return column_labels, row_values
+        parser = SqoopTableParser(strip_col_val, filter_columns)
+        return parser.parse_all(StringIO(output))
 
     def build_row_count_query(self):
         """Return row count query."""
@@ -205,6 +209,9 @@ class SourceTable(object):
         """Fetch row count of source table.
         Returns: row count of table
         """
+        row_count = self.get_stats_row_count()
+        if row_count is not None:
+            return row_count
         row_count = -1
         query = self.build_row_count_query()
         returncode, output, err = self.eval(query)
@@ -217,6 +224,74 @@ class SourceTable(object):
 
         return row_count
 
+    def build_row_count_stats_query(self):
+        """Return catalog statistics row count query.
+        None if the db keeps no table statistics. Db specific methods
+        """
+        return None
+
+    def build_column_stats_query(self):
+        """Return catalog statistics distinct values query per column.
+        None if the db keeps no column statistics. Db specific methods
+        """
+        return None
+
+    def _eval_stats(self, query):
+        """Run a catalog statistics query.
+        Returns: row data, None if the query failed
+        """
+        row_data = None
+        returncode, output, err = self.eval(query)
+        if returncode == 0:
+            _, row_data = self.fetch_rows_sqoop(output)
+        else:
+            self.logger.warning(
+                'Catalog statistics query failed: {0}'.format(err))
+        return row_data
+
+    def get_stats_row_count(self):
+        """Fetch row count from catalog statistics.
+        Returns: row count, None if statistics are disabled or missing
+        """
+        query = self.build_row_count_stats_query()
+        if not self.cfg_mgr.catalog_stats or not query:
+            return None
+        row_data = self._eval_stats(query)
+        row_count = _stats_number(row_data[0][0]) if row_data else None
+        if row_count is None:
+            self.logger.info('Table: {0} - no row count statistics, '
+                             'counting rows'.format(self.table))
+        return row_count
+
+    def find_split_by_stats(self, column_types, num_mappers):
+        """Find split by column from catalog statistics.
+        Picks the column with the most distinct values, more than mappers
+        Returns: a split by column, '' if statistics are disabled or missing
+        """
+        query = self.build_column_stats_query()
+        if not self.cfg_mgr.catalog_stats or not query:
+            return ''
+        distinct_counts = {}
+        for row in self._eval_stats(query) or []:
+            num_distinct = _stats_number(row[1])
+            if num_distinct:
+                distinct_counts[row[0].upper()] = num_distinct
+        split_by_column = ''
+        max_distinct = int(num_mappers)
+        for row in column_types:
+            num_distinct = distinct_counts.get(row[0].upper(), 0)
+            if num_distinct > max_distinct:
+                split_by_column = row[0]
+                max_distinct = num_distinct
+        if split_by_column:
+            msg = "Found split by using statistics: '{0}', old: '{1}'"
+            self.logger.info(msg.format(split_by_column,
+                                        self.it_table_obj.split_by))
+        else:
+            self.logger.info('Table: {0} - no column statistics, running '
+                             'group by counts'.format(self.table))
+        return split_by_column
+
     def find_load(self, row_count):
         """Generate load string based on row count."""
         load = ''
@@ -347,7 +422,13 @@ class SourceTable(object):
                 self.logger.error(err)
                 raise ValueError(err)
 
-            col_quality_list = self.get_groupby_counts(column_types)
+            split_by_column = self.find_split_by_stats(column_types,
+                                                       num_mappers)
+            if split_by_column:
+                return split_by_column
+
+            col_quality_list = self.get_groupby_counts(column_types,
+                                                       num_mappers)
             if col_quality_list:
                 col_quality_list.sort(key=lambda item: item[1])
                 # make the distributions larger than the number of mappers
@@ -365,8 +446,13 @@ class SourceTable(object):
             self.logger.error(traceback.format_exc())
         return split_by_column
 
-    def get_groupby_counts(self, column_types):
-        """Fetch group by column count"""
+    def get_groupby_counts(self, column_types, num_mappers=None):
+        """Fetch group by column count
+        Columns are evaluated in parallel by split_by_workers processes
+        and their counts are collected in column order. With num_mappers,
+        stops at the first column having more groups than mappers and
+        returns the counts collected so far
+        """
         pool_info = []
         col_quality_list = []
         for row in column_types:
@@ -374,13 +460,43 @@ class SourceTable(object):
             query = self.build_group_by_count_query(column_name)
             pool_info.append((self.cfg_mgr, self.it_table_obj.get_meta_dict(),
                               column_name, query))
+        if not pool_info:
+            return col_quality_list
 
-        pool_obj = Pool(processes=1)
-        counts_list = pool_obj.map(parallel_sqoop_output, pool_info)
-        for each in counts_list:
-            col_quality_list = col_quality_list + each
-        # self.logger.info(len(counts_list))
-        pool_obj.terminate()
+        processes = max(1, min(self.cfg_mgr.split_by_workers, len(pool_info)))
+        pool_obj = Pool(processes=processes, initializer=os.setpgrp)
+        # every worker leads a process group holding its sqoop evals
+        worker_pids = [worker.pid for worker in pool_obj._pool]
+        try:
+            counts_iter = pool_obj.imap(parallel_sqoop_output, pool_info)
+            while True:
+                try:
+                    counts = counts_iter.next(SPLIT_BY_POLL_INTERVAL)
+                except PoolTimeoutError:
+                    continue
+                except StopIteration:
+                    break
+                except ValueError as err:
+                    self.logger.error(
+                        'Group by count failed: {0}'.format(err))
+                    continue
+                col_quality_list = col_quality_list + counts
+                if num_mappers and any(
+                        num_groups > int(num_mappers)
+                        for _, _, num_groups in counts):
+                    self.logger.info(
+                        'Table: {0} - split by candidate {1}, skipping '
+                        'remaining columns'.format(self.table, counts[0][0]))
+                    break
+        finally:
+            pool_obj.terminate()
+            pool_obj.join()
+            # terminate only stops the workers, not their sqoop evals
+            for pid in worker_pids:
+                try:
+                    os.killpg(pid, signal.SIGTERM)
+                except OSError:
+                    pass
         return col_quality_list
 
     def _find_primary_key(self):
@@ -433,6 +549,13 @@ class OracleTable(SourceTable):
         query = query.format(db=self.db, table=self.table)
         return query
 
+    def build_row_count_stats_query(self):
+        """Build catalog statistics row count query."""
+        query = ("SELECT NUM_ROWS FROM all_tables"
+                 " WHERE OWNER='{db}' AND TABLE_NAME='{table}'")
+        query = query.format(db=self.db, table=self.table)
+        return query
+
     def find_mappers(self, row_count, load=None):
         """Find mappers based on row count."""
         # OraOop connector requires at least two mappers.
@@ -603,6 +726,22 @@ class DB2Table(SourceTable):
                              table=self.table)
         return query
 
+    def build_row_count_stats_query(self):
+        """Build catalog statistics row count query."""
+        query = ("SELECT CARD FROM SYSCAT.TABLES "
+                 "WHERE TABSCHEMA = '{db}' AND TABNAME = '{table}'")
+        query = query.format(db=self.db,
+                             table=self.table)
+        return query
+
+    def build_column_stats_query(self):
+        """Build catalog statistics distinct values query."""
+        query = ("SELECT COLNAME, COLCARD FROM SYSCAT.COLUMNS "
+                 "WHERE TABSCHEMA = '{db}' AND TABNAME = '{table}'")
+        query = query.format(db=self.db,
+                             table=self.table)
+        return query
+
     def build_column_int_query(self):
         """Build query to get int or bigint columns."""
         query = ("SELECT NAME FROM SYSIBM.SYSCOLUMNS "
@@ -706,6 +845,24 @@ class TeradataTable(SourceTable):
                                                      table=self.table)
         return query
 
+    def build_row_count_stats_query(self):
+        """Build catalog statistics row count query."""
+        query = ("SELECT MAX(RowCount) FROM DBC.StatsV"
+                 " WHERE DatabaseName = '{db}' AND TableName = '{table}'")
+        query = query.format(db=self.db, table=self.table)
+        return query
+
+    def build_column_stats_query(self):
+        """Build catalog statistics distinct values query.
+        Multi column statistics are skipped
+        """
+        query = ("SELECT ColumnName, MAX(UniqueValueCount) FROM DBC.StatsV"
+                 " WHERE DatabaseName = '{db}' AND TableName = '{table}'"
+                 " AND ColumnName IS NOT NULL AND ColumnName NOT LIKE '%,%'"
+                 " GROUP BY ColumnName")
+        query = query.format(db=self.db, table=self.table)
+        return query
+
     def get_split(self):
 
         query = """select  databasename source_database_name,
@@ -841,6 +998,15 @@ class SqlServerTable(SourceTable):
         # print os.getpid()
         return query
 
+    def build_row_count_stats_query(self):
+        """Build catalog statistics row count query."""
+        query = ("SELECT MAX(sp.rows) FROM {database}.sys.stats AS s"
+                 " CROSS APPLY {database}.sys.dm_db_stats_properties("
+                 "s.object_id, s.stats_id) AS sp"
+                 " WHERE s.object_id = OBJECT_ID('{database}..{table}')")
+        query = query.format(database=self.db, table=self.table)
+        return query
+
     def get_split(self):
 
         db = self.db
@@ -943,6 +1109,27 @@ class PostgreSqlTable(SourceTable):
         # print os.getpid()
         return query
 
+    def build_row_count_stats_query(self):
+        """Build catalog statistics row count query."""
+        query = ("SELECT c.reltuples FROM pg_class c"
+                 " JOIN pg_namespace n ON n.oid = c.relnamespace"
+                 " WHERE n.nspname = '{db}' AND c.relname = '{table}'")
+        query = query.format(db=self.db.lower(), table=self.table.lower())
+        return query
+
+    def build_column_stats_query(self):
+        """Build catalog statistics distinct values query.
+        Negative n_distinct is a fraction of the row count
+        """
+        query = ("SELECT s.attname, CASE WHEN s.n_distinct < 0"
+                 " THEN -s.n_distinct * c.reltuples ELSE s.n_distinct END"
+                 " FROM pg_stats s JOIN pg_namespace n"
+                 " ON n.nspname = s.schemaname JOIN pg_class c"
+                 " ON c.relnamespace = n.oid AND c.relname = s.tablename"
+                 " WHERE s.schemaname = '{db}' AND s.tablename = '{table}'")
+        query = query.format(db=self.db.lower(), table=self.table.lower())
+        return query
+
     def get_split(self):
 
         db = self.db
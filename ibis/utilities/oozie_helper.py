@@ -2,7 +2,6 @@
 import json
 import os
 import requests
-from requests_kerberos import HTTPKerberosAuth
 from ibis.custom_logging import get_logger
 
 
@@ -17,6 +16,7 @@ class OozieAPi(object):
 
     def put_request(self, suffix_url, xml_file):
         """Make a oozie put request"""
+        from requests_kerberos import HTTPKerberosAuth
         status = False
         file_h = open(os.path.join(self.cfg_mgr.saves, xml_file))
         data = file_h.read()
@@ -1,11 +1,18 @@
 """Utilities for running code in parallel using multiprocessing"""
-import math
+import os
+import signal
+import time
+import traceback
 from multiprocessing import Pool
-import numpy as np
 from ibis.custom_logging import get_logger
-from ibis.utilities.sqoop_helper import SqoopHelper, SQOOP_CACHE
-from ibis.utilities.sqoop_helper import SQOOP_CACHE_VIEW
+from ibis.utilities import sqoop_helper
+from ibis.utilities.sqoop_helper import SqoopHelper
+from ibis.utilities.ddl_cache import DDLCache, get_stats
 from ibis.utilities.utilities import Utilities
+from ibis.utilities.workflow_validator import WorkflowValidator
+
+# seconds before the first retry, doubled on every retry
+RETRY_BACKOFF = 2
 
 
 def parallel_dryrun_workflows(info):
@@ -21,16 +28,160 @@ def parallel_dryrun_workflows(info):
     return status, workflow_name
 
 
-def get_split_num(size, max_pool_size):
-    """Returns ideal number of splits"""
-    splits = 1
-    if size > max_pool_size:
-        splits = math.ceil(float(size)/float(max_pool_size))
-    return splits
+class TaskTimeout(Exception):
+    """Task ran longer than the executor timeout"""
+    pass
+
+
+def _raise_timeout(signum, frame):
+    """SIGALRM handler of pool processes"""
+    raise TaskTimeout()
+
+
+def _init_worker():
+    """Pool initializer, the process leads a group holding the
+    subprocesses of its tasks"""
+    os.setpgrp()
+
+
+def _kill_task_children():
+    """Kill the subprocesses of the calling pool process, e.g. the sqoop
+    JVM of a timed out task"""
+    handler = signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        os.killpg(os.getpgrp(), signal.SIGTERM)
+    finally:
+        signal.signal(signal.SIGTERM, handler)
+
+
+def kill_pool(pool, worker_pids):
+    """Terminate a pool and the process groups of its workers
+    Args:
+        pool: multiprocessing.Pool created with _init_worker
+        worker_pids: pids of the pool processes
+    """
+    pool.terminate()
+    pool.join()
+    for pid in worker_pids:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+def _run_task(info):
+    """Run one executor task in a pool process.
+    For sake of multiprocessing.Pool, this needs to be a top level function
+    Args:
+        info: (index, func, args, timeout)
+    Returns:
+        index, success, result or error message
+    """
+    index, func, args, timeout = info
+    if timeout:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return index, True, func(args)
+    except TaskTimeout:
+        _kill_task_children()
+        return index, False, 'Timed out after {0} seconds'.format(timeout)
+    except Exception:
+        return index, False, traceback.format_exc()
+    finally:
+        if timeout:
+            signal.alarm(0)
+
+
+class ParallelExecutor(object):
+    """Streams tasks to a process pool with imap_unordered.
+    The pool is created per map call, so its processes see the state of
+    the parent at that time. A slow task only holds its own process.
+    Failed or timed out tasks are retried with exponential backoff.
+    """
+
+    def __init__(self, cfg_mgr, processes=None, timeout=None, retries=None,
+                 backoff=RETRY_BACKOFF, progress=None):
+        """init
+        Args:
+            cfg_mgr: ibis.utilities.config_manager.ConfigManager
+            processes: pool size, the parallel procs setting of the
+                       workload
+            timeout: seconds per task, 0 for no timeout
+            retries: times a failed task is run again
+            backoff: seconds before the first retry
+            progress: callable(done, total, success), called for
+                      every finished task
+        """
+        self.cfg_mgr = cfg_mgr
+        self.logger = get_logger(self.cfg_mgr)
+        if timeout is None:
+            timeout = self.cfg_mgr.parallel_task_timeout
+        if retries is None:
+            retries = self.cfg_mgr.parallel_task_retries
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.progress = progress or self.log_progress
+        if processes is None:
+            processes = max(self.cfg_mgr.parallel_dryrun_procs,
+                            self.cfg_mgr.parallel_sqoop_procs)
+        self.processes = processes
+
+    def log_progress(self, done, total, success):
+        """Default progress callback"""
+        self.logger.info('Parallel tasks completed: {0}/{1}'.format(
+            done, total))
+
+    def map(self, func, tasks):
+        """Run func(task) for every task in the pool
+        Args:
+            func: top level function
+            tasks: list of picklable func arguments
+        Returns:
+            list of (success, result) in the order of tasks.
+            result is the error message of a failed task
+        """
+        results = [None] * len(tasks)
+        if not tasks:
+            return results
+        pending = range(len(tasks))
+        done = 0
+        attempt = 0
+        pool = Pool(processes=min(self.processes, len(tasks)),
+                    initializer=_init_worker)
+        worker_pids = [worker.pid for worker in pool._pool]
+        try:
+            while pending:
+                if attempt:
+                    delay = self.backoff * 2 ** (attempt - 1)
+                    self.logger.warning(
+                        'Retrying {0} failed tasks in {1} seconds'.format(
+                            len(pending), delay))
+                    time.sleep(delay)
+                failed = []
+                infos = [(index, func, tasks[index], self.timeout)
+                         for index in pending]
+                for index, success, result in pool.imap_unordered(_run_task,
+                                                                  infos):
+                    if not success and attempt < self.retries:
+                        self.logger.warning('Task failed: {0}'.format(result))
+                        failed.append(index)
+                        continue
+                    if not success:
+                        self.logger.error('Task failed: {0}'.format(result))
+                    results[index] = (success, result)
+                    done += 1
+                    self.progress(done, len(tasks), success)
+                pending = failed
+                attempt += 1
+        finally:
+            kill_pool(pool, worker_pids)
+        return results
 
 
 class DryRunWorkflowManager(object):
-    """Dry run workflows in parallel"""
+    """Validate workflows and dry run them in parallel"""
 
     def __init__(self, cfg_mgr):
         """init"""
@@ -38,32 +189,37 @@ class DryRunWorkflowManager(object):
         self.logger = get_logger(self.cfg_mgr)
 
     def run_all(self, workflows):
-        """Dry run in parallel. Filter files and dry run xmls
+        """Validate the xmls against the oozie XSDs and the workflow graph.
+        Dry run them on oozie in parallel if remote_dryrun is enabled
         Args:
             workflows: generated files
         """
         status = True
-        pool_info = []
-        for file_name in workflows:
-            if '.xml' in file_name and 'props_job.xml' not in file_name:
-                pool_info.append(
-                    [self.cfg_mgr, file_name.replace('.xml', '')])
-
-        num_splits = get_split_num(
-            len(pool_info), self.cfg_mgr.parallel_dryrun_procs)
-        chunks = np.array_split(pool_info, num_splits)
-
-        for pool_chunk in chunks:
-            pool_obj = Pool(processes=len(pool_chunk))
-            result_list = pool_obj.map(parallel_dryrun_workflows, pool_chunk)
-            pool_obj.terminate()
-            for info in result_list:
-                if not info[0]:
-                    err_msg = 'Dry run failed: {0}'.format(info[1])
-                    self.logger.error(err_msg)
-                    status = status and False
-                else:
-                    status = status and True
+        xml_files = [file_name for file_name in workflows
+                     if '.xml' in file_name and
+                     'props_job.xml' not in file_name]
+        validator = WorkflowValidator(self.cfg_mgr)
+        for file_name in xml_files:
+            errors = validator.validate_file(file_name)
+            for error in errors:
+                self.logger.error('Validation failed: {0}: {1}'.format(
+                    file_name, error))
+            if errors:
+                status = False
+        if not status or not self.cfg_mgr.remote_dryrun:
+            return status
+
+        pool_info = [[self.cfg_mgr, file_name.replace('.xml', '')]
+                     for file_name in xml_files]
+        executor = ParallelExecutor(
+            self.cfg_mgr, self.cfg_mgr.parallel_dryrun_procs)
+        for success, info in executor.map(parallel_dryrun_workflows,
+                                          pool_info):
+            if not success or not info[0]:
+                err_msg = 'Dry run failed: {0}'.format(
+                    info[1] if success else info)
+                self.logger.error(err_msg)
+                status = False
         return status
 
 
@@ -94,48 +250,60 @@ class SqoopCacheManager(object):
 
     def cache_ddl_queries(self, tables):
         """Caches DDL queries"""
-        global SQOOP_CACHE
-
+        ddl_cache = DDLCache(self.cfg_mgr)
         pool_info = []
+        cache_keys = {}
         for tbl in tables:
             sqoop = SqoopHelper(self.cfg_mgr)
             query = sqoop.get_ddl_query(tbl.jdbcurl, tbl.database,
                                         tbl.table_name, tbl.schema)
+            result = ddl_cache.get(tbl.jdbcurl, tbl.database, tbl.table_name,
+                                   query)
+            if result is not None:
+                sqoop_helper.SQOOP_CACHE[query] = result
+                continue
+            cache_keys[query] = (tbl.jdbcurl, tbl.database, tbl.table_name,
+                                 query)
             pool_info.append([self.cfg_mgr, tbl.jdbcurl, query,
                               tbl.username, tbl.password_file])
 
-        num_splits = get_split_num(
-            len(pool_info), self.cfg_mgr.parallel_sqoop_procs)
-        chunks = np.array_split(pool_info, num_splits)
-
-        for pool_chunk in chunks:
-            pool_obj = Pool(processes=len(pool_chunk))
-            result_list = pool_obj.map(parallel_sqoop_output, pool_chunk)
-            pool_obj.terminate()
-            for info in result_list:
-                SQOOP_CACHE[info[0]] = info[1]
+        executor = ParallelExecutor(
+            self.cfg_mgr, self.cfg_mgr.parallel_sqoop_procs)
+        for success, info in executor.map(parallel_sqoop_output, pool_info):
+            if success:
+                sqoop_helper.SQOOP_CACHE[info[0]] = info[1]
+                ddl_cache.put(*(cache_keys[info[0]] + (info[1],)))
+        self.log_cache_stats()
 
     def cache_ddl_views(self, tables):
         """Caches DDL queries"""
-        global SQOOP_CACHE_VIEW
-
+        ddl_cache = DDLCache(self.cfg_mgr)
         pool_info = []
+        cache_keys = {}
         for tbl in tables:
             sqoop = SqoopHelper(self.cfg_mgr)
             if tbl.is_oracle:
                 query = sqoop.get_ddl_table_view(tbl.jdbcurl, tbl.database,
                                                  tbl.table_name)
+                result = ddl_cache.get(tbl.jdbcurl, tbl.database,
+                                       tbl.table_name, query)
+                if result is not None:
+                    sqoop_helper.SQOOP_CACHE_VIEW[query] = result
+                    continue
+                cache_keys[query] = (tbl.jdbcurl, tbl.database,
+                                     tbl.table_name, query)
                 pool_info.append([self.cfg_mgr, tbl.jdbcurl, query,
                                   tbl.username, tbl.password_file])
 
-        if len(pool_info) > 0:
-            num_splits = get_split_num(
-                len(pool_info), self.cfg_mgr.parallel_sqoop_procs)
-            chunks = np.array_split(pool_info, num_splits)
-
-            for pool_chunk in chunks:
-                pool_obj = Pool(processes=len(pool_chunk))
-                result_list = pool_obj.map(parallel_sqoop_output, pool_chunk)
-                pool_obj.terminate()
-                for info in result_list:
-                    SQOOP_CACHE_VIEW[info[0]] = info[1]
+        executor = ParallelExecutor(
+            self.cfg_mgr, self.cfg_mgr.parallel_sqoop_procs)
+        for success, info in executor.map(parallel_sqoop_output, pool_info):
+            if success:
+                sqoop_helper.SQOOP_CACHE_VIEW[info[0]] = info[1]
+                ddl_cache.put(*(cache_keys[info[0]] + (info[1],)))
+
+    def log_cache_stats(self):
+        """Log hits and misses of the ddl cache"""
+        stats = get_stats()
+        msg = 'DDL cache hits: {hits}, misses: {misses}'.format(**stats)
+        self.logger.info(msg)
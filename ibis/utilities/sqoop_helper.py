@@ -2,7 +2,10 @@
 import subprocess
 import re
 import sys
+from cStringIO import StringIO
 from ibis.custom_logging import get_logger
+from ibis.utilities.eval_server import EvalClient
+from ibis.utilities.ddl_cache import DDLCache
 
 ORACLE = 'oracle'
 DB2 = 'db2'
@@ -25,6 +28,88 @@ SQOOP_CACHE = {}
 SQOOP_CACHE_VIEW = {}
 
 
+class SqoopTableParser(object):
+    """Incremental parser for the ascii table printed by sqoop eval.
+    The first |...| line holds the column labels and every following
+    |...| line is a row. Lines are consumed one at a time so the output
+    never needs to be held in memory as a whole.
+    """
+
+    def __init__(self, strip_col_val=True, filter_columns=None, limit=None,
+                 col_types=None):
+        """init
+        Args:
+            strip_col_val: whether to strip spaces around column data
+            filter_columns: list of column indexes.
+                            Only those column data will be returned and
+                            rest all columns will be skipped
+            limit: max number of rows to return
+            col_types: list of callables, e.g. [str, int], converting the
+                       returned column values of every row
+        """
+        self.strip_col_val = strip_col_val
+        self.filter_columns = filter_columns
+        self.limit = limit
+        self.col_types = col_types
+        self.labels = []
+        self.columns = None
+        self._has_labels = False
+
+    @classmethod
+    def get_cells(cls, line):
+        """Cells of a |...| line, None for any other line"""
+        start = line.find('|')
+        end = line.rfind('|')
+        if start == -1 or end <= start:
+            return None
+        return line[start + 1:end].split('|')
+
+    def _set_labels(self, cells):
+        """Set column labels and the projected column indexes"""
+        if self.filter_columns:
+            self.columns = [index for index in range(len(cells))
+                            if index in self.filter_columns]
+            cells = [cells[index] for index in self.columns]
+        self.labels = [label.strip() for label in cells]
+        self._has_labels = True
+
+    def _convert(self, row):
+        """Apply col_types to row values"""
+        num_types = len(self.col_types)
+        return [self.col_types[index](val) if index < num_types else val
+                for index, val in enumerate(row)]
+
+    def parse(self, lines):
+        """Yield rows from an iterable of sqoop output lines"""
+        num_rows = 0
+        for line in lines:
+            if self.limit is not None and num_rows >= self.limit:
+                break
+            cells = self.get_cells(line)
+            if cells is None:
+                continue
+            if not self._has_labels:
+                self._set_labels(cells)
+                continue
+            if self.columns is not None:
+                cells = [cells[index] for index in self.columns]
+            if self.strip_col_val:
+                row = [val.strip() for val in cells]
+            else:
+                # remove the extra space in the start and end of string
+                # which is inserted by sqoop output table
+                row = [val[1:-1] for val in cells]
+            if self.col_types:
+                row = self._convert(row)
+            num_rows += 1
+            yield row
+
+    def parse_all(self, lines):
+        """Returns column labels and list of rows"""
+        rows = list(self.parse(lines))
+        return self.labels, rows
+
+
 class SqoopHelper(object):
     """Sqoop eval runner."""
 
@@ -66,7 +151,11 @@ class SqoopHelper(object):
 
         results = []
 
-        if self.get_sqoop_eval():
+        server_result = self.server_eval(jdbc, sql_stmt, db_username,
+                                         password_file)
+        if server_result is not None:
+            _, output, err = server_result
+        elif self.get_sqoop_eval():
             if 'jceks' in password_file:
                 try:
                     jceks, password_alias = password_file.split('#')
@@ -98,24 +187,32 @@ class SqoopHelper(object):
             proc = subprocess.Popen(cmd_list, stdout=subprocess.PIPE,
                                     stderr=subprocess.PIPE)
             output, err = proc.communicate()
-            if err:
-                # sqoop prints debug messages to stderr even if query succeeds
-                if 'updateCount=-1' not in err:
-                    self.logger.error(output)
-                    self.logger.error(err)
-                    raise ValueError('Failed on sqoop eval!')
-            re_expr = re.compile(r"\|.*\|")
-            cleaned_lines = re_expr.findall(output)
-            cleaned_lines = [line.split('|') for line in cleaned_lines]
-            results = [[y.strip() for y in c] for c in cleaned_lines]
-            # remove empty strings from result set
-            results = [x[1:-1] for x in results[1:]]
         else:
             msg = 'Warning sqoop-eval not available'
             self.logger.warning(msg)
             sys.exit("Error: Command not available - reason %s" % msg)
+
+        if err:
+            # sqoop prints debug messages to stderr even if query succeeds
+            if 'updateCount=-1' not in err:
+                self.logger.error(output)
+                self.logger.error(err)
+                raise ValueError('Failed on sqoop eval!')
+        _, results = SqoopTableParser().parse_all(StringIO(output))
         return results
 
+    def server_eval(self, jdbc, sql_stmt, db_username, password_file):
+        """Run query on the eval server, see ibis.utilities.eval_server
+        Returns:
+            None when the server is unavailable, otherwise
+            returncode, output and err of the query
+        """
+        client = EvalClient(self.cfg_mgr.eval_server_socket)
+        result = client.eval(jdbc, sql_stmt, db_username, password_file)
+        if result is not None:
+            self.logger.info('Eval server:  {stmt}'.format(stmt=sql_stmt))
+        return result
+
     def _eval(self, jdbc, sql_stmt, db_username, password_file):
         """Fetch data for the query.
         Args:
@@ -131,6 +228,11 @@ class SqoopHelper(object):
         src = self.get_jdbc_source(jdbc)
         driver = self.get_driver(jdbc)
 
+        server_result = self.server_eval(jdbc, sql_stmt, db_username,
+                                         password_file)
+        if server_result is not None:
+            return server_result
+
         if 'jceks' in password_file:
             jceks, password_alias = password_file.split('#')
             cmd_list = ['sqoop-eval',
@@ -220,6 +322,26 @@ class SqoopHelper(object):
         sql_stmt = sql_stmt.format(**params)
         return sql_stmt
 
+    def cached_eval(self, jdbc, database, tbl, sql_stmt, db_username,
+                    password_file):
+        """Run a DDL query through the on-disk ddl cache
+        Args:
+            jdbc: String JDBC url
+            database: String Name of database
+            tbl: String Name of table
+            sql_stmt: DDL query
+            db_username: String Database username
+            password_file: String path to password file
+        Returns:
+            sqoop eval result
+        """
+        ddl_cache = DDLCache(self.cfg_mgr)
+        result = ddl_cache.get(jdbc, database, tbl, sql_stmt)
+        if result is None:
+            result = self.eval(jdbc, sql_stmt, db_username, password_file)
+            ddl_cache.put(jdbc, database, tbl, sql_stmt, result)
+        return result
+
     def get_column_types(self, database, tbl, jdbc, db_username, password_file,
                          schema=None):
         """
@@ -247,8 +369,8 @@ class SqoopHelper(object):
                 self.logger.info('Sqoop cache hit!')
                 col_types = SQOOP_CACHE[sql_stmt]
             else:
-                col_types = self.eval(jdbc, sql_stmt, db_username,
-                                      password_file)
+                col_types = self.cached_eval(jdbc, database, tbl, sql_stmt,
+                                             db_username, password_file)
             if len(col_types) == 0:
                 err_msg = ('Failed: Query returned zero rows: {0}\n'
                            'Source table definition is not found in '
@@ -288,8 +410,9 @@ class SqoopHelper(object):
                 self.logger.info('Sqoop cache hit!')
                 object_types = SQOOP_CACHE_VIEW[sql_stmt]
             else:
-                object_types = self.eval(jdbc, sql_stmt, db_username,
-                                         password_file)
+                object_types = self.cached_eval(jdbc, database, tbl,
+                                                sql_stmt, db_username,
+                                                password_file)
         else:
             msg = 'Please provide a valid database source, {sources}'
             msg = msg.format(sources=VALID_SOURCES)
@@ -0,0 +1,80 @@
+"""Process-wide cache of compiled mako templates.
+Templates are compiled once per process and the compiled modules are
+kept under the saves directory, so that consecutive workflow
+generation runs don't parse the templates again.
+"""
+import hashlib
+import os
+import threading
+
+MODULE_DIR = 'mako_modules'
+# template lookups keyed by template directory
+LOOKUPS = {}
+# hits: compiled in this process, disk_hits: compiled module loaded from
+# disk, misses: template parsed and compiled
+CACHE_STATS = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+_LOCK = threading.Lock()
+
+
+def get_stats():
+    """Returns template cache stats of the process"""
+    with _LOCK:
+        return dict(CACHE_STATS)
+
+
+def log_cache_stats(logger):
+    """Log template cache stats"""
+    stats = get_stats()
+    if not any(stats.values()):
+        return
+    logger.info('Template cache hits: {hits}, compiled modules loaded: '
+                '{disk_hits}, compiled: {misses}'.format(**stats))
+
+
+def get_lookup(cfg_mgr, directory):
+    """Returns the TemplateLookup of a template directory
+    Args:
+        cfg_mgr: ibis.utilities.config_manager.ConfigManager
+        directory: template directory
+    """
+    with _LOCK:
+        lookup = LOOKUPS.get(directory)
+        if lookup is None:
+            from mako.lookup import TemplateLookup
+            module_dir = os.path.join(
+                cfg_mgr.saves, MODULE_DIR,
+                hashlib.md5(directory).hexdigest()[:12])
+            lookup = TemplateLookup(directories=[directory],
+                                    module_directory=module_dir,
+                                    format_exceptions=True)
+            LOOKUPS[directory] = lookup
+        return lookup
+
+
+def get_template(cfg_mgr, template_file):
+    """Returns the compiled mako template of a file
+    Args:
+        cfg_mgr: ibis.utilities.config_manager.ConfigManager
+        template_file: path of the template
+    """
+    directory, name = os.path.split(os.path.abspath(template_file))
+    lookup = get_lookup(cfg_mgr, directory)
+    uri = '/' + name
+    module_file = os.path.join(lookup.template_args['module_directory'],
+                               name + '.py')
+    if uri in lookup._collection:
+        stat = 'hits'
+    elif os.path.exists(module_file):
+        stat = 'disk_hits'
+    else:
+        stat = 'misses'
+    template = lookup.get_template(uri)
+    with _LOCK:
+        CACHE_STATS[stat] += 1
+    return template
+
+
+def clear():
+    """Drop the template lookups of the process"""
+    with _LOCK:
+        LOOKUPS.clear()
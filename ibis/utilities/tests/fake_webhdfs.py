@@ -0,0 +1,185 @@
+"""In memory WebHDFS stand in served over http for HDFS client tests."""
+import BaseHTTPServer
+import json
+import posixpath
+import SocketServer
+import threading
+import urllib
+import urlparse
+
+PREFIX = '/webhdfs/v1'
+
+
+class FakeWebHdfs(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    """WebHDFS namenode and datanode on a local port. CREATE, APPEND and
+    OPEN redirect to the same server like a namenode does.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           WebHdfsHandler)
+        self.url = 'http://127.0.0.1:{0}{1}'.format(self.server_address[1],
+                                                    PREFIX)
+        self.reset()
+
+    def reset(self):
+        """Empties the file system"""
+        self.files = {}
+        self.dirs = set(['/'])
+        self.permissions = {}
+        self.operations = []
+        self.connections = set()
+        self.mtimes = {}
+        self.clock = 0
+
+    def start(self):
+        """Serves requests in a daemon thread"""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """Stops serving and closes the socket"""
+        self.shutdown()
+        self.server_close()
+
+    def children(self, path):
+        """Names of the files and directories in a directory"""
+        names = set()
+        for child in list(self.files) + list(self.dirs):
+            if child != path and posixpath.dirname(child) == path:
+                names.add(posixpath.basename(child))
+        return sorted(names)
+
+    def status(self, path, suffix=''):
+        """FileStatus of a path"""
+        mtime = self.mtimes.get(path, 0)
+        if path in self.files:
+            return {'pathSuffix': suffix, 'type': 'FILE',
+                    'length': len(self.files[path]),
+                    'modificationTime': mtime}
+        return {'pathSuffix': suffix, 'type': 'DIRECTORY', 'length': 0,
+                'modificationTime': mtime}
+
+    def touch(self, path):
+        """Modifies a path and its directory, a logical clock stands in
+        for the time"""
+        self.clock += 1
+        self.mtimes[path] = self.clock
+        self.mtimes[posixpath.dirname(path)] = self.clock
+
+    def mkdirs(self, path):
+        """Creates a directory and its parents"""
+        while path not in self.dirs:
+            self.dirs.add(path)
+            self.touch(path)
+            path = posixpath.dirname(path)
+
+
+class WebHdfsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """Handles the WebHDFS operations used by ibis"""
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1  # one write per response, flushed by the base class
+
+    def log_message(self, *args):
+        """Keeps test output quiet"""
+        pass
+
+    def reply(self, code, body=None, headers=None):
+        """Sends a response, json unless body is a str"""
+        if body is not None and not isinstance(body, str):
+            body = json.dumps(body)
+        body = body or ''
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_found(self, path):
+        """FileNotFoundException reply"""
+        self.reply(404, {'RemoteException': {
+            'exception': 'FileNotFoundException',
+            'message': 'File does not exist: {0}'.format(path)}})
+
+    def read_body(self):
+        """Reads the request body"""
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def handle_operation(self):
+        """Dispatches on the op parameter"""
+        server = self.server
+        server.connections.add(self.client_address)
+        url = urlparse.urlparse(self.path)
+        path = urllib.unquote(url.path[len(PREFIX):]) or '/'
+        if path != '/':
+            path = path.rstrip('/')
+        params = dict(urlparse.parse_qsl(url.query))
+        operation = params.get('op')
+        server.operations.append((self.command, operation))
+        body = self.read_body()
+        exists = path in server.files or path in server.dirs
+        if operation in ('CREATE', 'APPEND', 'OPEN') and \
+                'datanode' not in params:
+            location = 'http://{0}:{1}{2}&datanode=true'.format(
+                server.server_address[0], server.server_address[1],
+                self.path)
+            self.reply(307, headers={'Location': location})
+        elif operation == 'CREATE':
+            server.mkdirs(posixpath.dirname(path))
+            server.files[path] = body
+            server.touch(path)
+            self.reply(201)
+        elif operation == 'APPEND':
+            if path not in server.files:
+                return self.not_found(path)
+            server.files[path] += body
+            server.touch(path)
+            self.reply(200)
+        elif not exists and operation not in ('MKDIRS', 'DELETE'):
+            self.not_found(path)
+        elif operation == 'OPEN':
+            self.reply(200, server.files[path],
+                       {'Content-Type': 'application/octet-stream'})
+        elif operation == 'GETFILESTATUS':
+            self.reply(200, {'FileStatus': server.status(path)})
+        elif operation == 'LISTSTATUS':
+            if path in server.files:
+                statuses = [server.status(path)]
+            else:
+                statuses = [server.status(posixpath.join(path, name), name)
+                            for name in server.children(path)]
+            self.reply(200, {'FileStatuses': {'FileStatus': statuses}})
+        elif operation == 'GETCONTENTSUMMARY':
+            length = sum(len(data) for name, data in server.files.items()
+                         if name == path or name.startswith(path + '/'))
+            self.reply(200, {'ContentSummary': {'length': length}})
+        elif operation == 'MKDIRS':
+            server.mkdirs(path)
+            self.reply(200, {'boolean': True})
+        elif operation == 'SETPERMISSION':
+            server.permissions[path] = params['permission']
+            self.reply(200)
+        elif operation == 'DELETE':
+            under = [name for name in list(server.files) + list(server.dirs)
+                     if name.startswith(path + '/')]
+            if not exists or (under and params.get('recursive') != 'true'):
+                return self.reply(200, {'boolean': False})
+            for name in under + [path]:
+                server.files.pop(name, None)
+                server.dirs.discard(name)
+            self.reply(200, {'boolean': True})
+        else:
+            self.reply(400, {'RemoteException': {
+                'message': 'Invalid op {0}'.format(operation)}})
+
+    do_GET = handle_operation
+    do_PUT = handle_operation
+    do_POST = handle_operation
+    do_DELETE = handle_operation
@@ -0,0 +1,118 @@
+"""Build manifest tests."""
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+import ibis
+from ibis.utilities.build_manifest import BuildManifest, GENERATOR_CODE, \
+    code_hash, tree_hash
+from ibis.utilities.config_manager import ConfigManager
+from ibis.settings import UNIT_TEST_ENV
+
+ROW = {'source_database_name': 'db', 'source_table_name': 'tbl'}
+DDL = [['COL1', 'VARCHAR2'], ['COL2', 'NUMBER']]
+
+
+class BuildManifestFunctionsTest(unittest.TestCase):
+    """Tests the build manifest"""
+
+    def setUp(self):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.cfg_mgr.build_manifest = True
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'build_manifest.json')
+        self.manifest = BuildManifest(self.cfg_mgr, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        """Write a generated file"""
+        with open(os.path.join(self.cfg_mgr.files, name), 'w') as file_h:
+            file_h.write(content)
+
+    def test_input_hash(self):
+        """test every input changes the hash"""
+        inputs_hash = self.manifest.input_hash(ROW, DDL)
+        self.assertEqual(inputs_hash, self.manifest.input_hash(ROW, DDL))
+        self.assertNotEqual(inputs_hash, self.manifest.input_hash(
+            dict(ROW, load='010001'), DDL))
+        self.assertNotEqual(inputs_hash, self.manifest.input_hash(
+            ROW, DDL + [['COL3', 'DATE']]))
+        self.cfg_mgr.queue_name = 'other_queue'
+        self.assertNotEqual(inputs_hash, self.manifest.input_hash(ROW, DDL))
+        # the files dir is new on every run
+        self.cfg_mgr.queue_name = ConfigManager(UNIT_TEST_ENV).queue_name
+        self.cfg_mgr.files = '/tmp/other_run/'
+        self.assertEqual(inputs_hash, self.manifest.input_hash(ROW, DDL))
+
+    def test_code_hash(self):
+        """test the generator code is part of the hash"""
+        inputs_hash = self.manifest.input_hash(ROW, DDL)
+        with patch('ibis.utilities.build_manifest._CODE_HASH',
+                   ['upgraded']):
+            self.assertNotEqual(inputs_hash,
+                                self.manifest.input_hash(ROW, DDL))
+        base_dir = os.path.dirname(os.path.abspath(ibis.__file__))
+        self.assertEqual(code_hash(), tree_hash(base_dir, GENERATOR_CODE,
+                                                ('.py',)))
+        self.write('a.py', 'a')
+        files_hash = tree_hash(self.cfg_mgr.files, ['a.py'])
+        self.write('a.py', 'b')
+        self.assertNotEqual(files_hash,
+                            tree_hash(self.cfg_mgr.files, ['a.py']))
+
+    def test_store_restore(self):
+        """test unchanged artifacts are restored in the next run"""
+        inputs_hash = self.manifest.input_hash(ROW, DDL)
+        self.write('db_tbl.xml', '<workflow/>')
+        self.write('db_tbl.ksh', 'ksh')
+        self.assertIsNone(self.manifest.restore('db_tbl', inputs_hash))
+        self.manifest.store('db_tbl', inputs_hash,
+                            ['db_tbl.xml', 'db_tbl.ksh'])
+        self.manifest.save()
+        os.remove(os.path.join(self.cfg_mgr.files, 'db_tbl.xml'))
+
+        manifest = BuildManifest(self.cfg_mgr, self.path)
+        self.assertIsNone(manifest.restore('db_tbl', 'other_hash'))
+        self.assertEqual(manifest.restore('db_tbl', inputs_hash),
+                         ['db_tbl.xml', 'db_tbl.ksh'])
+        with open(os.path.join(self.cfg_mgr.files, 'db_tbl.xml')) as file_h:
+            self.assertEqual(file_h.read(), '<workflow/>')
+
+        # nothing is restored when the manifest is disabled
+        self.cfg_mgr.build_manifest = False
+        disabled = BuildManifest(self.cfg_mgr, self.path)
+        self.assertIsNone(disabled.restore('db_tbl', inputs_hash))
+
+    def test_changed(self):
+        """test only files with new content are changed"""
+        self.write('a.xml', 'a')
+        self.write('b.xml', 'b')
+        self.assertEqual(self.manifest.changed(['a.xml', 'b.xml']),
+                         ['a.xml', 'b.xml'])
+        self.manifest.stage_outputs(['a.xml', 'b.xml'])
+        self.manifest.save()
+        # not delivered yet
+        manifest = BuildManifest(self.cfg_mgr, self.path)
+        self.assertEqual(manifest.changed(['a.xml', 'b.xml']),
+                         ['a.xml', 'b.xml'])
+        self.assertEqual(manifest.record_delivered(), 2)
+        manifest.save()
+        self.write('b.xml', 'b2')
+        manifest = BuildManifest(self.cfg_mgr, self.path)
+        self.assertEqual(manifest.changed(['a.xml', 'b.xml']), ['b.xml'])
+        self.assertEqual(manifest.record_delivered(), 0)
+
+    def test_broken_manifest(self):
+        """test a broken manifest file is an empty manifest"""
+        with open(self.path, 'w') as file_h:
+            file_h.write('{not json')
+        manifest = BuildManifest(self.cfg_mgr, self.path)
+        self.assertEqual(manifest.manifest,
+                         {'artifacts': {}, 'outputs': {}, 'pending': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
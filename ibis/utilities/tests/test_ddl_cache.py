@@ -0,0 +1,88 @@
+"""DDL cache tests."""
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+from ibis.utilities import ddl_cache
+from ibis.utilities.ddl_cache import DDLCache, get_stats
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.sqoop_helper import SqoopHelper
+from ibis.settings import UNIT_TEST_ENV
+
+JDBC = 'jdbc:oracle:thin:@//fake.oracle:1521/fake_servicename'
+DDL = [['COL1', 'VARCHAR2'], ['COL2', 'NUMBER']]
+
+
+class DDLCacheFunctionsTest(unittest.TestCase):
+    """Tests the on-disk ddl cache"""
+
+    def setUp(self):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'ddl_cache.db')
+        self.cache = DDLCache(self.cfg_mgr, self.path, ttl=3600,
+                              max_entries=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_put(self):
+        """test results survive a new cache object"""
+        stats = get_stats()
+        self.assertIsNone(self.cache.get(JDBC, 'DB', 'TBL', 'select 1'))
+        self.cache.put(JDBC, 'DB', 'TBL', 'select 1', DDL)
+        cache = DDLCache(self.cfg_mgr, self.path, ttl=3600)
+        self.assertEqual(cache.get(JDBC, 'db', 'tbl', 'select 1'), DDL)
+        self.assertIsNone(cache.get(JDBC, 'db', 'tbl', 'select 2'))
+        self.assertEqual(get_stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(get_stats()['misses'], stats['misses'] + 2)
+
+    def test_ttl(self):
+        """test expired results are not returned"""
+        with patch.object(ddl_cache.time, 'time', return_value=1000.0):
+            self.cache.put(JDBC, 'db', 'tbl', 'select 1', DDL)
+        with patch.object(ddl_cache.time, 'time', return_value=5000.0):
+            self.assertIsNone(self.cache.get(JDBC, 'db', 'tbl', 'select 1'))
+        disabled = DDLCache(self.cfg_mgr, self.path, ttl=0)
+        disabled.put(JDBC, 'db', 'tbl_2', 'select 1', DDL)
+        self.assertIsNone(disabled.get(JDBC, 'db', 'tbl_2', 'select 1'))
+
+    def test_lru_eviction(self):
+        """test least recently used result is evicted"""
+        with patch.object(ddl_cache.time, 'time', return_value=1000.0):
+            self.cache.put(JDBC, 'db', 'tbl_1', 'select 1', DDL)
+        with patch.object(ddl_cache.time, 'time', return_value=1001.0):
+            self.cache.put(JDBC, 'db', 'tbl_2', 'select 2', DDL)
+        with patch.object(ddl_cache.time, 'time', return_value=1002.0):
+            self.cache.get(JDBC, 'db', 'tbl_1', 'select 1')
+        with patch.object(ddl_cache.time, 'time', return_value=1003.0):
+            self.cache.put(JDBC, 'db', 'tbl_3', 'select 3', DDL)
+            self.assertEqual(self.cache.size(), 2)
+            self.assertIsNone(self.cache.get(JDBC, 'db', 'tbl_2', 'select 2'))
+            self.assertEqual(self.cache.get(JDBC, 'db', 'tbl_1', 'select 1'),
+                             DDL)
+
+    def test_invalidate(self):
+        """test invalidate drops every query of a table"""
+        self.cache.put(JDBC, 'db', 'tbl_1', 'select 1', DDL)
+        self.cache.put(JDBC, 'db', 'tbl_1', 'select 2', DDL)
+        self.cache.invalidate('DB', 'TBL_1')
+        self.assertEqual(self.cache.size(), 0)
+
+    @patch.object(SqoopHelper, 'eval', autospec=True)
+    def test_sqoop_helper_cached_eval(self, m_eval):
+        """test sqoop eval runs once per query"""
+        m_eval.return_value = DDL
+        self.cfg_mgr.saves = self.tmp_dir
+        self.cfg_mgr.ddl_cache_ttl = 3600
+        sqoop = SqoopHelper(self.cfg_mgr)
+        for _ in range(2):
+            result = sqoop.get_column_types('db', 'tbl', JDBC, 'user',
+                                            'password_file')
+            self.assertEqual(result, DDL)
+        self.assertEqual(m_eval.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Eval server tests."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from mock import patch, MagicMock
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.eval_server import EvalServer, EvalClient, \
+    ConnectionPool, format_sqoop_table, get_jdbc_driver, \
+    _ThreadedUnixServer, _EvalRequestHandler
+from ibis.utilities.sqoop_helper import SqoopHelper
+from ibis.settings import UNIT_TEST_ENV
+
+
+class EvalServerFunctionsTest(unittest.TestCase):
+    """Tests the eval server and client"""
+
+    def setUp(self):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'eval.sock')
+        self.eval_server = EvalServer(self.cfg_mgr, self.socket_path, 2)
+        self.eval_server.jpype = MagicMock()
+        self.server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+    def start_server(self):
+        """Serve on the tmp socket without starting a JVM"""
+        self.server = _ThreadedUnixServer(self.socket_path,
+                                          _EvalRequestHandler)
+        self.server.eval_server = self.eval_server
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def test_format_sqoop_table(self):
+        """test format matches sqoop-eval output"""
+        output = format_sqoop_table(['COLUMN_NAME', 'DATA_TYPE'],
+                                    [['FAKE_COL_1', 'VARCHAR2'],
+                                     ['COL', None]])
+        expected = ('---------------------------\n'
+                    '| COLUMN_NAME | DATA_TYPE |\n'
+                    '---------------------------\n'
+                    '| FAKE_COL_1  | VARCHAR2  |\n'
+                    '| COL         | (null)    |\n'
+                    '---------------------------\n')
+        self.assertEqual(output, expected)
+
+    def test_get_jdbc_driver(self):
+        """test jdbc driver lookup"""
+        jdbc = ('jdbc:jtds:sqlserver://fake.sqlserver:1433;'
+                'useNTLMv2=true;domain=fake_domain;database=TEST_DB')
+        self.assertEqual(get_jdbc_driver(jdbc),
+                         'net.sourceforge.jtds.jdbc.Driver')
+        jdbc = 'jdbc:oracle:thin:@//fake.oracle:1521/fake_servicename'
+        self.assertEqual(get_jdbc_driver(jdbc), 'oracle.jdbc.OracleDriver')
+
+    def test_client_unavailable(self):
+        """test client returns None without a server"""
+        client = EvalClient(self.socket_path)
+        self.assertIsNone(client.eval('jdbc:oracle', 'select 1', 'user',
+                                      '/user/dev/fake.password.file'))
+
+    def test_client_eval(self):
+        """test query round trip"""
+        self.eval_server.connect = MagicMock(return_value=MagicMock())
+        self.eval_server.run_query = MagicMock(
+            return_value=(['COUNT'], [['10']]))
+        self.start_server()
+        client = EvalClient(self.socket_path)
+        returncode, output, err = client.eval(
+            'jdbc:oracle', 'select count(*) from tbl', 'user',
+            '/user/dev/fake.password.file')
+        self.assertEqual(returncode, 0)
+        self.assertEqual(err, '')
+        self.assertIn('| 10    |', output)
+        # second query reuses the pooled connection
+        client.eval('jdbc:oracle', 'select 1', 'user',
+                    '/user/dev/fake.password.file')
+        self.assertEqual(self.eval_server.connect.call_count, 1)
+
+    def test_client_eval_query_error(self):
+        """test failed query is returned as sqoop error"""
+        self.eval_server.connect = MagicMock(return_value=MagicMock())
+        self.eval_server.run_query = MagicMock(
+            side_effect=ValueError('ORA-00942: table does not exist'))
+        self.start_server()
+        returncode, _, err = EvalClient(self.socket_path).eval(
+            'jdbc:oracle', 'select 1', 'user', 'jceks://fake#alias')
+        self.assertEqual(returncode, 1)
+        self.assertIn('ORA-00942', err)
+
+    def test_client_eval_connect_error(self):
+        """test connection failure falls back to sqoop"""
+        self.eval_server.connect = MagicMock(side_effect=ValueError('down'))
+        self.start_server()
+        result = EvalClient(self.socket_path).eval(
+            'jdbc:oracle', 'select 1', 'user', 'jceks://fake#alias')
+        self.assertIsNone(result)
+
+    def test_connection_pool(self):
+        """test broken connections are replaced"""
+        conn_1 = MagicMock()
+        conn_2 = MagicMock()
+        connect = MagicMock(side_effect=[conn_1, conn_2])
+        pool = ConnectionPool(connect, 1)
+        self.assertEqual(pool.acquire(), conn_1)
+        pool.release(conn_1)
+        self.assertEqual(pool.acquire(), conn_1)
+        pool.release(conn_1)
+        conn_1.isValid.return_value = False
+        self.assertEqual(pool.acquire(), conn_2)
+        self.assertTrue(conn_1.close.called)
+
+    @patch('ibis.utilities.sqoop_helper.subprocess.Popen', autospec=True)
+    def test_sqoop_helper_eval(self, m_popen):
+        """test SqoopHelper.eval uses the server when available"""
+        self.eval_server.connect = MagicMock(return_value=MagicMock())
+        self.eval_server.run_query = MagicMock(
+            return_value=(['COLUMN_NAME', 'DATA_TYPE'],
+                          [['FAKE_COL_1', 'VARCHAR2']]))
+        self.start_server()
+        self.cfg_mgr.eval_server_socket = self.socket_path
+        result = SqoopHelper(self.cfg_mgr).eval(
+            'jdbc:oracle:thin:@//fake.oracle:1521/fake_servicename',
+            'select * from test.test', 'fake_username',
+            '/user/dev/fake.password.file')
+        self.assertEqual(result, [['FAKE_COL_1', 'VARCHAR2']])
+        self.assertFalse(m_popen.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""HDFS client tests."""
+import os
+import unittest
+from mock import patch, MagicMock
+from ibis.utilities import hdfs
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.hdfs import CliHdfs, WebHdfs, get_hdfs
+from ibis.utilities.tests.fake_webhdfs import FakeWebHdfs
+from ibis.settings import UNIT_TEST_ENV
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class HdfsFunctionsTest(unittest.TestCase):
+
+    """Tests the WebHDFS client against a local stand in server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeWebHdfs()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        hdfs.SESSIONS.pop(cls.server.url).close()
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.cfg_mgr.webhdfs_url = self.server.url
+        self.cfg_mgr.webhdfs_user = 'ibis'
+        self.client = WebHdfs(self.cfg_mgr)
+
+    def tearDown(self):
+        hdfs.CLIENTS.clear()
+
+    def test_write(self):
+        """test create, append, open, ls and du"""
+        path = '/user/data/checks_balances/PBO_1'
+        self.assertTrue(self.client.write(path, 'a|1\n'))
+        self.assertTrue(self.client.write(path, 'b|2\n', append=True))
+        self.assertEqual(''.join(self.client.open(path)), 'a|1\nb|2\n')
+        self.assertTrue(self.client.exists('/user/data/checks_balances'))
+        self.assertFalse(self.client.exists('/user/data/missing'))
+        self.assertEqual(self.client.ls('/user/data/checks_balances'),
+                         [path])
+        self.assertEqual(self.client.ls('/user/data/missing'), [])
+        self.assertEqual(self.client.du('/user/data'), 8)
+        self.assertFalse(self.client.write('/user/missing', 'a',
+                                           append=True))
+
+    def test_put_chmod_rm(self):
+        """test put into a directory, chmod and rm"""
+        self.client.mkdir('/tmp')
+        local_path = os.path.join(BASE_DIR, 'fixtures/sample_wf.xml')
+        self.assertTrue(self.client.put(local_path, '/tmp/'))
+        with open(local_path) as file_h:
+            self.assertEqual(self.server.files['/tmp/sample_wf.xml'],
+                             file_h.read())
+        self.assertTrue(self.client.chmod('/tmp', '777'))
+        self.assertEqual(self.server.permissions, {
+            '/tmp': '777', '/tmp/sample_wf.xml': '777'})
+        self.assertTrue(self.client.rm('/tmp/sample_wf.xml'))
+        self.assertFalse(self.client.rm('/tmp/sample_wf.xml'))
+
+    def test_cp(self):
+        """test copying a glob of files and directories"""
+        backup = '/user/data/backup/mdm/tbl'
+        self.client.write(backup + '/gen/parquet_live.hql', 'live')
+        self.client.write(backup + '/incr_ingest_timestamp=1/part', 'p1')
+        self.client.mkdir('/user/data/mdm/tbl/live/')
+        self.assertTrue(self.client.cp(backup + '/gen/parquet_live.hql',
+                                       '/user/data/mdm/tbl/gen/'))
+        self.assertTrue(self.client.cp(backup + '/*',
+                                       '/user/data/mdm/tbl/live/'))
+        files = self.server.files
+        self.assertEqual(files['/user/data/mdm/tbl/gen/parquet_live.hql'],
+                         'live')
+        self.assertEqual(files['/user/data/mdm/tbl/live/gen/'
+                               'parquet_live.hql'], 'live')
+        self.assertEqual(files['/user/data/mdm/tbl/live/'
+                               'incr_ingest_timestamp=1/part'], 'p1')
+        self.assertFalse(self.client.cp('/user/data/missing/*', '/tmp'))
+        self.assertTrue(self.client.rm('/user/data/mdm/tbl/live/gen',
+                                       recursive=True))
+        self.assertFalse(self.client.exists('/user/data/mdm/tbl/live/gen'))
+
+    def test_session(self):
+        """test requests reuse the pooled connections"""
+        other = WebHdfs(self.cfg_mgr)
+        self.assertIs(other.session, self.client.session)
+        for num in range(10):
+            self.client.write('/tmp/file_{0}'.format(num), 'data')
+            other.exists('/tmp/file_{0}'.format(num))
+        self.assertEqual(len(self.server.operations), 30)
+        self.assertLess(len(self.server.connections), 5)
+
+    def test_get_hdfs(self):
+        """test the REST client falls back to hadoop fs"""
+        self.assertIsInstance(get_hdfs(self.cfg_mgr), WebHdfs)
+        hdfs.CLIENTS.clear()
+        self.cfg_mgr.webhdfs_url = 'http://127.0.0.1:1/webhdfs/v1'
+        self.assertIsInstance(get_hdfs(self.cfg_mgr), CliHdfs)
+        self.cfg_mgr.webhdfs_url = ''
+        self.assertIsInstance(get_hdfs(self.cfg_mgr), CliHdfs)
+
+    @patch('ibis.utilities.hdfs.subprocess.Popen')
+    def test_cli(self, m_popen):
+        """test hadoop fs output parsing"""
+        proc = MagicMock()
+        proc.returncode = 0
+        proc.communicate.return_value = (
+            'Found 2 items\n'
+            'drwxr-xr-x   - ibis ibis          0 2017-04-25 07:41 '
+            '/live/incr_ingest_timestamp=2017-04-25\n'
+            '-rw-r--r--   3 ibis ibis         10 2017-04-25 07:41 '
+            '/live/_SUCCESS\n', '')
+        m_popen.return_value = proc
+        client = CliHdfs(self.cfg_mgr)
+        self.assertEqual(client.ls('/live'), [
+            '/live/incr_ingest_timestamp=2017-04-25', '/live/_SUCCESS'])
+        proc.communicate.return_value = ('2222  6666  /live\n', '')
+        self.assertEqual(client.du('/live'), 2222)
+        self.assertTrue(client.rm('/live', recursive=True))
+        m_popen.assert_called_with(['hadoop', 'fs', '-rm', '-r', '/live'],
+                                   stdout=-1, stderr=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
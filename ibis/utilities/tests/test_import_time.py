@@ -0,0 +1,70 @@
+"""Import time tests."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import ibis
+from ibis.utilities.import_time import ImportTimer, REPORT_HEADER
+
+# imported by the subcommands that use them, never by the cli module
+HEAVY_MODULES = ['impala', 'thrift', 'numpy', 'pydot', 'mako',
+                 'requests_kerberos', 'kazoo']
+
+
+class ImportTimeFunctionsTest(unittest.TestCase):
+    """Tests the import time report"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        sys.path.insert(0, self.tmp_dir)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp_dir)
+        for name in ['timed_parent', 'timed_child']:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        """Write a module"""
+        with open(os.path.join(self.tmp_dir, name + '.py'), 'w') as file_h:
+            file_h.write(content)
+
+    def test_report(self):
+        """test children are reported before their parents"""
+        self.write('timed_child', 'import time\ntime.sleep(0.01)\n')
+        self.write('timed_parent', 'import timed_child\nimport os\n')
+        with ImportTimer() as timer:
+            module = __import__('timed_parent')
+        self.assertEqual(module.__name__, 'timed_parent')
+        self.assertEqual([record[:2] for record in timer.records],
+                         [(1, 'timed_child'), (0, 'timed_parent')])
+        child, parent = timer.records
+        self.assertGreaterEqual(child[3], 10000)
+        self.assertEqual(parent[3], parent[2] + child[3])
+        self.assertEqual(timer.total, parent[3] / 1e6)
+        report = timer.report()
+        self.assertEqual(report[0], REPORT_HEADER)
+        self.assertTrue(report[1].endswith('|   timed_child'))
+        self.assertTrue(report[2].endswith('| timed_parent'))
+        # nothing new is loaded the second time
+        with ImportTimer() as timer:
+            self.assertIs(__import__('timed_parent'), module)
+        self.assertEqual(timer.records, [])
+
+    def test_cli_imports(self):
+        """test the cli does not import the heavy dependencies"""
+        code = ('import sys\nimport ibis.driver.main\n'
+                'print sorted(set(name.split(".")[0] for name in sys.modules'
+                ' if sys.modules[name]))')
+        repo_dir = os.path.dirname(os.path.dirname(ibis.__file__))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=repo_dir)
+        imported = eval(output)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, imported)
+
+
+if __name__ == '__main__':
+    unittest.main()
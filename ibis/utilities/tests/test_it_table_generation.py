@@ -2,6 +2,11 @@
 
 import unittest
 import os
+import shutil
+import subprocess
+import tempfile
+import time
+from multiprocessing import TimeoutError as PoolTimeoutError
 from mock import patch, MagicMock
 from ibis.utilities.it_table_generation import SourceTable, OracleTable, \
     DB2Table, TeradataTable, SqlServerTable, MySQLTable, create, \
@@ -15,6 +20,24 @@ from ibis.inventory.it_inventory import ITInventory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+def slow_sqoop_output(info):
+    """COL_1 waits for the eval of COL_2, a child process that outlives
+    its pool worker unless it is killed"""
+    pid_file = os.path.join(info[1]['pid_dir'], 'eval.pid')
+    if info[2] == 'COL_1':
+        for _ in range(100):
+            if os.path.exists(pid_file):
+                break
+            time.sleep(0.05)
+        return [('COL_1', 0.5, 20)]
+    proc = subprocess.Popen(['sleep', '30'])
+    with open(pid_file + '.tmp', 'w') as pid_h:
+        pid_h.write(str(proc.pid))
+    os.rename(pid_file + '.tmp', pid_file)
+    proc.wait()
+    return [(info[2], 0.5, 20)]
+
+
 class SourceTableTest(unittest.TestCase):
     """Test SourceTable methods."""
 
@@ -105,18 +128,59 @@ class SourceTableTest(unittest.TestCase):
         self.assertEquals(column_labels, ["name"])
         self.assertEquals(row_values, [['Matt'], ['Mani'], ['Shiva']])
 
-    @patch.object(SourceTable, 'eval', autospec=True)
-    def test_parallel_sqoop_output(self, mock_eval):
+    @patch('ibis.utilities.it_table_generation.subprocess.Popen')
+    def test_parallel_sqoop_output(self, mock_popen):
         """Test generate it table."""
         with open(BASE_DIR + '/fixtures/eval_mock.txt',
                   'r') as file_h:
-            sqoop_eval_output = file_h.read()
-        mock_eval.return_value = (0, sqoop_eval_output, '')
+            sqoop_eval_lines = file_h.readlines()
+        proc = MagicMock()
+        proc.stdout = iter(sqoop_eval_lines)
+        proc.returncode = 0
+        mock_popen.return_value = proc
         info = [self.cfg_mgr, self.it_table,
                 'column_name', 'select column_name from table ']
         row_count = parallel_sqoop_output(info)
         self.assertEquals(row_count, [('column_name', 0.0, 1)])
 
+    @patch('ibis.utilities.it_table_generation.Pool')
+    def test_get_groupby_counts(self, mock_pool):
+        """Test group by counts stop at the first split by candidate."""
+        counts_iter = MagicMock()
+        counts_iter.next.side_effect = [
+            PoolTimeoutError(), [('COL_1', 0.5, 2)],
+            ValueError('sqoop failed'), [('COL_3', 1.5, 20)],
+            [('COL_4', 0.1, 30)]]
+        mock_pool.return_value.imap.return_value = counts_iter
+        mock_pool.return_value._pool = []
+        column_types = [['COL_{0}'.format(num)] for num in range(1, 6)]
+        result = self.src_obj.get_groupby_counts(column_types, '5')
+        self.assertEquals(result, [('COL_1', 0.5, 2), ('COL_3', 1.5, 20)])
+        mock_pool.assert_called_once_with(
+            processes=self.cfg_mgr.split_by_workers, initializer=os.setpgrp)
+        pool_info = mock_pool.return_value.imap.call_args[0][1]
+        self.assertEquals(len(pool_info), 5)
+        self.assertTrue(mock_pool.return_value.terminate.called)
+        self.assertEquals(self.src_obj.get_groupby_counts([], '5'), [])
+
+    @patch('ibis.utilities.it_table_generation.parallel_sqoop_output',
+           slow_sqoop_output)
+    def test_get_groupby_counts_kills_evals(self):
+        """Test the sqoop evals of skipped columns are killed."""
+        pid_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pid_dir)
+        self.src_obj.it_table_obj.get_meta_dict = lambda: {'pid_dir': pid_dir}
+        self.cfg_mgr.split_by_workers = 2
+        result = self.src_obj.get_groupby_counts([['COL_1'], ['COL_2']], '5')
+        self.assertEquals(result, [('COL_1', 0.5, 20)])
+        with open(os.path.join(pid_dir, 'eval.pid')) as pid_h:
+            pid = int(pid_h.read())
+        for _ in range(50):
+            if not os.path.exists('/proc/{0}'.format(pid)):
+                break
+            time.sleep(0.1)
+        self.assertFalse(os.path.exists('/proc/{0}'.format(pid)))
+
 
 class OracleTableTest(unittest.TestCase):
     """Test OracleTable methods."""
@@ -208,6 +272,50 @@ class DB2TableTest(unittest.TestCase):
         split_by_column = self.db2_obj.find_split_by_column(2)
         self.assertEqual(split_by_column, '3')
 
+    @patch.object(SourceTable, 'get_groupby_counts', autospec=True)
+    @patch.object(SourceTable, 'eval', autospec=True)
+    def test_find_split_by_stats(self, mock_eval, mock_group):
+        """Test split by from catalog statistics."""
+        with open(BASE_DIR + '/fixtures/eval_empty.txt',
+                  'r') as file_h:
+            sqoop_eval_nooutput = file_h.read()
+        with open(BASE_DIR + '/fixtures/db2_stats_eval_mock.txt',
+                  'r') as file_h:
+            sqoop_eval_stats = file_h.read()
+        column_types = [['KEY_1'], ['KEY_2'], ['KEY_3'], ['KEY_4']]
+        self.cfg_mgr.catalog_stats = True
+        mock_eval.return_value = (0, sqoop_eval_stats, '')
+        self.assertEqual(self.db2_obj.find_split_by_stats(column_types, 2),
+                         'KEY_3')
+        self.assertEqual(
+            self.db2_obj.find_split_by_stats(column_types, 5000), '')
+        mock_eval.side_effect = [(0, sqoop_eval_nooutput, ''),
+                                 (0, sqoop_eval_stats, ''),
+                                 (0, sqoop_eval_stats, '')]
+        self.assertEqual(self.db2_obj.find_split_by_column(2), 'KEY_5')
+        self.assertFalse(mock_group.called)
+        self.cfg_mgr.catalog_stats = False
+        self.assertEqual(self.db2_obj.find_split_by_stats(column_types, 2),
+                         '')
+
+    @patch.object(SourceTable, 'eval', autospec=True)
+    def test_get_table_count_stats(self, mock_eval):
+        """Test row count from catalog statistics."""
+        with open(BASE_DIR + '/fixtures/eval_mock.txt',
+                  'r') as file_h:
+            sqoop_eval_output = file_h.read()
+        self.cfg_mgr.catalog_stats = True
+        mock_eval.return_value = (0, sqoop_eval_output.replace(
+            '| 3 ', '| 1.5E7'), '')
+        self.assertEqual(self.db2_obj.get_table_count(), 15000000)
+        self.assertIn('SYSCAT.TABLES', mock_eval.call_args[0][1])
+        # missing statistics fall back to count(*)
+        mock_eval.side_effect = [
+            (0, sqoop_eval_output.replace('| 3 ', '| -1'), ''),
+            (0, sqoop_eval_output, '')]
+        self.assertEqual(self.db2_obj.get_table_count(), 3)
+        self.assertIn('COUNT(*)', mock_eval.call_args[0][1])
+
     @patch.object(SourceTable, 'get_groupby_counts', autospec=True)
     @patch.object(SourceTable, 'eval', autospec=True)
     def test_find_split_by_column_no(self, mock_eval, mock_group):
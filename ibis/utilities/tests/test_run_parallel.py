@@ -0,0 +1,187 @@
+"""Parallel executor tests."""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from mock import patch
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities import sqoop_helper
+from ibis.inventor.tests.fixture_workflow_generator import \
+    fake_fact_tbl_prop
+from ibis.model.table import ItTable
+from ibis.utilities.run_parallel import ParallelExecutor, \
+    DryRunWorkflowManager, SqoopCacheManager
+from ibis.utilities.workflow_validator import WorkflowValidator
+from ibis.settings import UNIT_TEST_ENV
+
+
+def square(num):
+    """Top level task"""
+    return num * num
+
+
+def fail_once(path):
+    """Fails on the first call for a path"""
+    if not os.path.exists(path):
+        open(path, 'w').close()
+        raise ValueError('first call')
+    return path
+
+
+def sleep(seconds):
+    """Slow task"""
+    time.sleep(seconds)
+    return seconds
+
+
+def sleep_in_child(pid_file):
+    """Slow task running in a subprocess"""
+    proc = subprocess.Popen(['sleep', '30'])
+    with open(pid_file, 'w') as pid_h:
+        pid_h.write(str(proc.pid))
+    proc.wait()
+    return pid_file
+
+
+def is_running(pid):
+    """True unless the process exited, zombies included"""
+    try:
+        with open('/proc/{0}/stat'.format(pid)) as stat_h:
+            return stat_h.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except IOError:
+        return False
+
+
+def cached(query):
+    """Task reading the sqoop cache of the pool process"""
+    return sqoop_helper.SQOOP_CACHE.get(query)
+
+
+class ParallelExecutorTest(unittest.TestCase):
+    """Tests the process pool executor"""
+
+    def setUp(self):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.progress = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def record_progress(self, done, total, success):
+        """progress callback"""
+        self.progress.append((done, total, success))
+
+    def test_map(self):
+        """test results keep the order of the tasks"""
+        executor = ParallelExecutor(self.cfg_mgr,
+                                    progress=self.record_progress)
+        results = executor.map(square, range(10))
+        self.assertEqual(results, [(True, num * num) for num in range(10)])
+        self.assertEqual(self.progress[-1], (10, 10, True))
+
+    def test_retry(self):
+        """test failed task is retried"""
+        paths = [os.path.join(self.tmp_dir, str(num)) for num in range(3)]
+        executor = ParallelExecutor(self.cfg_mgr, retries=1, backoff=0)
+        results = executor.map(fail_once, paths)
+        self.assertEqual(results, [(True, path) for path in paths])
+        executor = ParallelExecutor(self.cfg_mgr, retries=0, backoff=0)
+        success, err = executor.map(
+            fail_once, [os.path.join(self.tmp_dir, 'new')])[0]
+        self.assertFalse(success)
+        self.assertIn('first call', err)
+
+    def test_timeout(self):
+        """test slow task does not block the others"""
+        executor = ParallelExecutor(self.cfg_mgr, timeout=1, retries=0,
+                                    progress=self.record_progress)
+        results = executor.map(sleep, [5, 0])
+        self.assertEqual(results[0],
+                         (False, 'Timed out after 1 seconds'))
+        self.assertEqual(results[1], (True, 0))
+        # the fast task finished first
+        self.assertEqual(self.progress[0], (1, 2, True))
+
+    def test_timeout_kills_children(self):
+        """test the subprocess of a timed out task is killed"""
+        pid_file = os.path.join(self.tmp_dir, 'sleep.pid')
+        alive = []
+
+        def check_child(done, total, success):
+            """runs while the pool is still up"""
+            with open(pid_file) as pid_h:
+                pid = pid_h.read()
+            for _ in range(50):
+                if not is_running(pid):
+                    break
+                time.sleep(0.1)
+            alive.append(is_running(pid))
+
+        executor = ParallelExecutor(self.cfg_mgr, timeout=1, retries=0,
+                                    progress=check_child)
+        success, _ = executor.map(sleep_in_child, [pid_file])[0]
+        self.assertFalse(success)
+        self.assertEqual(alive, [False])
+
+    def test_map_state(self):
+        """test pool processes see the state of the parent at map time"""
+        executor = ParallelExecutor(self.cfg_mgr)
+        self.assertEqual(executor.map(cached, ['query']), [(True, None)])
+        sqoop_helper.SQOOP_CACHE['query'] = [['Col1', 'varchar']]
+        self.addCleanup(sqoop_helper.SQOOP_CACHE.pop, 'query')
+        self.assertEqual(executor.map(cached, ['query']),
+                         [(True, [['Col1', 'varchar']])])
+        self.assertEqual(executor.map(cached, []), [])
+
+    @patch.object(WorkflowValidator, 'validate_file', return_value=[])
+    @patch.object(ParallelExecutor, 'map', autospec=True)
+    def test_dryrun_run_all(self, m_map, m_validate):
+        """test dry run status"""
+        self.cfg_mgr.remote_dryrun = True
+        m_map.return_value = [(True, (True, 'wf_1')),
+                              (True, (False, 'wf_2'))]
+        manager = DryRunWorkflowManager(self.cfg_mgr)
+        self.assertFalse(manager.run_all(['wf_1.xml', 'wf_2.xml']))
+        m_map.return_value = [(True, (True, 'wf_1'))]
+        self.assertTrue(manager.run_all(['wf_1.xml', 'wf_1_props_job.xml']))
+        executor, _, tasks = m_map.call_args[0]
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(executor.processes,
+                         self.cfg_mgr.parallel_dryrun_procs)
+
+    @patch('ibis.utilities.run_parallel.DDLCache', autospec=True)
+    @patch.object(ParallelExecutor, 'map', autospec=True)
+    def test_sqoop_cache_processes(self, m_map, m_ddl_cache):
+        """test ddl queries run in a pool of parallel_sqoop_procs"""
+        m_map.return_value = []
+        m_ddl_cache.return_value.get.return_value = None
+        self.cfg_mgr.parallel_sqoop_procs = 3
+        self.cfg_mgr.parallel_dryrun_procs = 20
+        table = ItTable(fake_fact_tbl_prop, self.cfg_mgr)
+        manager = SqoopCacheManager(self.cfg_mgr)
+        manager.cache_ddl_queries([table])
+        manager.cache_ddl_views([table])
+        self.assertEqual(m_map.call_count, 2)
+        for call in m_map.call_args_list:
+            self.assertEqual(call[0][0].processes, 3)
+
+    @patch.object(WorkflowValidator, 'validate_file', autospec=True)
+    @patch.object(ParallelExecutor, 'map', autospec=True)
+    def test_dryrun_run_all_local(self, m_map, m_validate):
+        """test invalid workflows are not dry run on oozie"""
+        m_validate.return_value = ['Node "a" is not reachable']
+        manager = DryRunWorkflowManager(self.cfg_mgr)
+        self.cfg_mgr.remote_dryrun = True
+        self.assertFalse(manager.run_all(['wf_1.xml', 'wf_1_props_job.xml']))
+        self.assertEqual(m_validate.call_count, 1)
+        m_validate.return_value = []
+        self.cfg_mgr.remote_dryrun = False
+        self.assertTrue(manager.run_all(['wf_1.xml']))
+        self.assertFalse(m_map.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Template cache tests."""
+import os
+import shutil
+import tempfile
+import unittest
+from mock import MagicMock
+from ibis.utilities import template_cache
+from ibis.utilities.template_cache import get_template, get_stats, \
+    log_cache_stats
+from ibis.utilities.config_manager import ConfigManager
+from ibis.settings import UNIT_TEST_ENV
+
+
+class TemplateCacheFunctionsTest(unittest.TestCase):
+    """Tests the compiled mako template cache"""
+
+    def setUp(self):
+        self.cfg_mgr = ConfigManager(UNIT_TEST_ENV)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cfg_mgr.saves = os.path.join(self.tmp_dir, 'saves')
+        self.template_file = os.path.join(self.tmp_dir, 'test.xml.mako')
+        with open(self.template_file, 'w') as file_h:
+            file_h.write('<action name="${name}"/>')
+        template_cache.clear()
+
+    def tearDown(self):
+        template_cache.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_template(self):
+        """test templates are compiled once and reloaded from disk"""
+        stats = get_stats()
+        template = get_template(self.cfg_mgr, self.template_file)
+        self.assertEqual(template.render(name='wf'), '<action name="wf"/>')
+        self.assertIs(get_template(self.cfg_mgr, self.template_file),
+                      template)
+        # a new process finds the compiled module on disk
+        template_cache.clear()
+        template = get_template(self.cfg_mgr, self.template_file)
+        self.assertEqual(template.render(name='wf'), '<action name="wf"/>')
+        new_stats = get_stats()
+        self.assertEqual(new_stats['misses'], stats['misses'] + 1)
+        self.assertEqual(new_stats['hits'], stats['hits'] + 1)
+        self.assertEqual(new_stats['disk_hits'], stats['disk_hits'] + 1)
+
+    def test_log_cache_stats(self):
+        """test stats are logged"""
+        logger = MagicMock()
+        get_template(self.cfg_mgr, self.template_file)
+        log_cache_stats(logger)
+        self.assertIn('Template cache hits', logger.info.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
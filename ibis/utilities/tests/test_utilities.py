@@ -233,17 +233,22 @@ class UtilitiesFunctionsTest(unittest.TestCase):
         expected_str = open(_path).read()
         self.assertTrue(self.strings_equal(expected_str, test_str))
 
-    @patch('ibis.utilities.utilities.Utilities.run_subprocess', autospec=True)
-    def test_put_dry_workflow(self, m_run_subprocess):
+    @patch('ibis.utilities.utilities.get_hdfs', autospec=True)
+    def test_put_dry_workflow(self, m_get_hdfs):
         """test put dry workflow"""
-        m_run_subprocess.side_effect = (0, 0)
+        hdfs = m_get_hdfs.return_value
         self.assertTrue(self.utilities.put_dry_workflow('sample_workflow'))
+        hdfs.put.assert_called_once_with(os.path.join(
+            self.utilities.cfg_mgr.files, 'sample_workflow.xml'), '/tmp/')
+        hdfs.chmod.assert_called_once_with('/tmp/sample_workflow.xml', '777')
+        hdfs.put.return_value = False
+        self.assertFalse(self.utilities.put_dry_workflow('sample_workflow'))
 
-    @patch('ibis.utilities.utilities.Utilities.run_subprocess', autospec=True)
+    @patch('ibis.utilities.utilities.get_hdfs', autospec=True)
     @patch('ibis.utilities.utilities.subprocess.Popen', autospec=True)
-    def test_run_workflow(self, m_Popen, m_run_subprocess):
+    def test_run_workflow(self, m_Popen, m_get_hdfs):
         """test run workflow"""
-        m_run_subprocess.return_value = 0
+        m_get_hdfs.return_value.exists.return_value = True
         proc = MagicMock()
         proc.returncode = 0
         proc.communicate = MagicMock()
@@ -278,15 +283,12 @@ class UtilitiesFunctionsTest(unittest.TestCase):
         m_Popen.return_value = proc
         self.assertTrue(self.utilities.dryrun_workflow('sample_wf'))
 
-    @patch('ibis.utilities.utilities.subprocess.Popen', autospec=True)
-    def test_rm_dry_workflow(self, m_Popen):
+    @patch('ibis.utilities.utilities.get_hdfs', autospec=True)
+    def test_rm_dry_workflow(self, m_get_hdfs):
         """test rm dry workflow"""
-        proc = MagicMock()
-        proc.returncode = 0
-        proc.communicate = MagicMock()
-        proc.communicate.return_value = ('test_output', '')
-        m_Popen.return_value = proc
         self.assertEquals(self.utilities.rm_dry_workflow('sample_wf'), None)
+        m_get_hdfs.return_value.rm.assert_called_once_with(
+            '/tmp/sample_wf.xml')
 
     @patch('ibis.utilities.utilities.subprocess.Popen', autospec=True)
     @patch('ibis.utilities.oozie_helper.open')
@@ -0,0 +1,119 @@
+"""Workflow validator tests."""
+import os
+import unittest
+from ibis.utilities.config_manager import ConfigManager
+from ibis.utilities.workflow_validator import WorkflowValidator
+from ibis.settings import UNIT_TEST_ENV
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPECTED_DIR = os.path.join(BASE_DIR, '..', '..', 'inventor', 'tests',
+                            'expected_workflows')
+
+WORKFLOW = """<workflow-app name="test" xmlns="uri:oozie:workflow:0.4">
+    <start to="{start}"/>
+    <fork name="fork_1">
+        <path start="tbl_1"/>
+        <path start="tbl_2"/>
+    </fork>
+    <action name="tbl_1">
+        <shell xmlns="uri:oozie:shell-action:0.3">
+            {shell}
+        </shell>
+        <ok to="fork_1_join"/>
+        <error to="kill"/>
+    </action>
+    <action name="tbl_2">
+        <sub-workflow>
+            <app-path>/user/dev/oozie/workspace/wf.xml</app-path>
+            <propagate-configuration/>
+        </sub-workflow>
+        <ok to="{tbl_2_ok}"/>
+        <error to="kill"/>
+    </action>
+    <join name="fork_1_join" to="end"/>
+    <kill name="kill">
+        <message>failed</message>
+    </kill>
+    <end name="end"/>
+</workflow-app>
+"""
+SHELL = '<exec>run.sh</exec><env-var>a=1</env-var><file>run.sh</file>'
+
+
+class WorkflowValidatorFunctionsTest(unittest.TestCase):
+    """Tests the in process workflow validation"""
+
+    def setUp(self):
+        self.validator = WorkflowValidator(ConfigManager(UNIT_TEST_ENV))
+
+    def workflow(self, start='fork_1', shell=SHELL, tbl_2_ok='fork_1_join'):
+        """Returns the test workflow xml"""
+        return WORKFLOW.format(start=start, shell=shell, tbl_2_ok=tbl_2_ok)
+
+    def test_valid(self):
+        """test generated workflows are valid"""
+        self.assertEqual(self.validator.validate(self.workflow()), [])
+        for name in ['heavy_grouping.xml', 'light_grouping_odd.xml',
+                     'incremental_workflow.xml']:
+            self.assertEqual(self.validator.validate_file(
+                os.path.join(EXPECTED_DIR, name)), [])
+
+    def test_schema(self):
+        """test elements and attributes are checked against the XSDs"""
+        shell = '<env-var>a=1</env-var><exec>run.sh</exec>'
+        self.assertEqual(self.validator.validate(self.workflow(shell=shell)),
+                         ['Unexpected element <env-var> in <shell>'])
+        self.assertEqual(
+            self.validator.validate(self.workflow(start='1_fork')),
+            ['Invalid value "1_fork" of to of <start>',
+             'Start transitions to unknown node "1_fork"'])
+        xml = self.workflow().replace('<message>failed</message>', '')
+        self.assertEqual(self.validator.validate(xml),
+                         ['Missing elements in <kill name="kill">'])
+        self.assertIn('Malformed xml', self.validator.validate('<a>')[0])
+
+    def test_graph(self):
+        """test transitions, fork joins and reachability"""
+        errors = self.validator.validate(self.workflow(tbl_2_ok='tbl_3'))
+        self.assertEqual(errors, [
+            'Node "tbl_2" transitions to unknown node "tbl_3"'])
+        xml = self.workflow(tbl_2_ok='other_join').replace(
+            '<kill name', '<join name="other_join" to="end"/><kill name')
+        self.assertEqual(self.validator.validate(xml), [
+            'Fork "fork_1" paths end in different joins: fork_1_join, '
+            'other_join', 'Join "fork_1_join" has no fork',
+            'Join "other_join" has no fork'])
+        errors = self.validator.validate(self.workflow(tbl_2_ok='end'))
+        self.assertEqual(errors, [
+            'Fork "fork_1" path reaches end without a join'])
+        errors = self.validator.validate(self.workflow(start='tbl_1'))
+        self.assertEqual(errors, ['Node "fork_1" is not reachable',
+                                  'Node "tbl_2" is not reachable'])
+
+    def test_expected_workflows(self):
+        """test every expected workflow and action fixture is valid"""
+        for name in sorted(os.listdir(EXPECTED_DIR)):
+            if not name.endswith('.xml'):
+                continue
+            with open(os.path.join(EXPECTED_DIR, name), 'r') as xml_file:
+                xml = xml_file.read()
+            if '<workflow-app' in xml:
+                errors = self.validator.validate(xml)
+            else:
+                errors = self.validator.validate_actions(xml)
+            self.assertEqual(errors, [], name)
+
+    def test_validate_actions(self):
+        """test action fragments are checked against the XSDs"""
+        action = ('<action name="tbl_1"><shell xmlns="uri:oozie:shell-'
+                  'action:0.3">{0}</shell><ok to="end"/><error to="kill"/>'
+                  '</action>')
+        self.assertEqual(
+            self.validator.validate_actions(action.format(SHELL)), [])
+        shell = '<env-var>a=1</env-var><exec>run.sh</exec>'
+        self.assertEqual(self.validator.validate_actions(action.format(shell)),
+                         ['Unexpected element <env-var> in <shell>'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,10 @@ import itertools
 import getpass
 import re
 import requests
-from mako.template import Template
 from ibis.custom_logging import get_logger
+from ibis.utilities.hdfs import get_hdfs
 from ibis.utilities.oozie_helper import OozieAPi
+from ibis.utilities.template_cache import get_template
 
 try:
     # available only on linux
@@ -96,8 +97,8 @@ class Utilities(object):
             wf_props[prop_name] = prop_val
         # TODO: Move username to be a property
         wf_props["user.name"] = "fake_username"
-        template = Template(filename=self.cfg_mgr.job_config_xml_template,
-                            format_exceptions=True)
+        template = get_template(self.cfg_mgr,
+                                self.cfg_mgr.job_config_xml_template)
         xml = template.render(wf_props=wf_props)
         file_name = os.path.join(self.cfg_mgr.files,
                                  '{0}_props_job.xml'.format(workflow_name))
@@ -115,10 +116,7 @@ class Utilities(object):
         config_file = config_file.format(name=workflow_name)
         xml_file = os.path.join(self.cfg_mgr.oozie_workspace,
                                 '{name}.xml'.format(name=workflow_name))
-        path_exists_cmd = ['hadoop', 'fs', '-test', '-e', xml_file]
-        self.logger.info(" ".join(path_exists_cmd))
-        path_exists_ret = self.run_subprocess(path_exists_cmd)
-        if path_exists_ret != 0:
+        if not get_hdfs(self.cfg_mgr).exists(xml_file):
             self.logger.error('XML file missing in HDFS: {0}'.format(xml_file))
             return run
 
@@ -199,15 +197,9 @@ class Utilities(object):
         workflow_full_path = os.path.join(self.cfg_mgr.files,
                                           workflow_name + '.xml')
         workflow_hdfs_path = os.path.join(temp, workflow_name + '.xml')
-        put_cmd = ['hadoop', 'fs', '-put', '-f', workflow_full_path, temp]
-        self.logger.info('Running: {0}'.format(" ".join(put_cmd)))
-        put_status = self.run_subprocess(put_cmd)
-        chmod_status = 1
-        if put_status == 0:
-            chmod_status = self.run_subprocess(
-                ['hadoop', 'fs', '-chmod', '-R', '777',
-                 workflow_hdfs_path])
-        status = (put_status == 0 and chmod_status == 0)
+        hdfs = get_hdfs(self.cfg_mgr)
+        status = hdfs.put(workflow_full_path, temp) and \
+            hdfs.chmod(workflow_hdfs_path, '777')
         if status:
             self.logger.info(
                 'Put workflow to hdfs: {0}'.format(workflow_hdfs_path))
@@ -299,12 +291,7 @@ class Utilities(object):
         temp_folder = 'tmp'
         temp = '/' + temp_folder + '/'
         file_path = temp + workflow_name + '.xml'
-        rm_cmd = ['hadoop', 'fs', '-rm', file_path]
-        proc = subprocess.Popen(rm_cmd, stdin=subprocess.PIPE,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE)
-        _, err = proc.communicate()
-        if proc.returncode != 0:
+        if not get_hdfs(self.cfg_mgr).rm(file_path):
             self.logger.warning('hdfs rm {0} failed!'.format(file_path))
         else:
             self.logger.info('success: hdfs rm {0}'.format(file_path))
@@ -321,8 +308,8 @@ class Utilities(object):
         output_file = os.path.join(self.cfg_mgr.files,
                                    '{name}.ksh'.format(name=job_name))
         with open(output_file, "wb") as file_out:
-            template = Template(filename=self.cfg_mgr.korn_shell_template,
-                                format_exceptions=True)
+            template = get_template(self.cfg_mgr,
+                                    self.cfg_mgr.korn_shell_template)
             ksh_text = template.render(job_name=job_name,
                                        saved_loc=self.cfg_mgr.saves,
                                        oozie_url=oozie_url,
@@ -2,7 +2,6 @@
 import os
 import re
 from defusedxml.minidom import parseString
-import pydot
 
 # List of colours
 # http://wingraphviz.sourceforge.net/wingraphviz/language/colorname.htm
@@ -153,6 +152,7 @@ class VizOozie(object):
         dot_output.close()
         png = os.path.join(self.cfg_mgr.files, name + '.pdf')
         # Write out the pdf file - note that there are many other options
+        import pydot
         graph = pydot.graph_from_dot_file(dot)
         graph.write(png, format='pdf')
 
@@ -0,0 +1,434 @@
+"""In-process validation of generated oozie workflows.
+Workflows are checked against the oozie XSDs bundled in resources/xsd
+and for graph integrity: transitions to existing nodes, forks with a
+matching join and no unreachable nodes. Only the subset of XML schema
+used by the bundled XSDs is supported.
+"""
+import glob
+import os
+import re
+from defusedxml.ElementTree import parse, fromstring, ParseError
+from pkg_resources import resource_filename
+
+XS = '{http://www.w3.org/2001/XMLSchema}'
+WORKFLOW_TAG = 'workflow-app'
+WORKFLOW_NAMESPACE = 'uri:oozie:workflow:0.4'
+# node elements of a workflow and their transition attributes
+NODE_TAGS = ['decision', 'fork', 'join', 'kill', 'action', 'end']
+# compiled schemas keyed by target namespace
+SCHEMAS = {}
+
+
+def split_tag(tag):
+    """Returns (namespace, local name) of an element tag"""
+    if tag.startswith('{'):
+        namespace, name = tag[1:].split('}', 1)
+        return namespace, name
+    return '', tag
+
+
+def type_name(qname):
+    """Strip the namespace prefix of a type reference"""
+    return qname.rsplit(':', 1)[-1] if qname else None
+
+
+class XsdSchema(object):
+
+    """Validator of one XSD. Supports sequence, choice, element, any,
+    attribute and simple types restricted by pattern or enumeration."""
+
+    def __init__(self, path):
+        root = parse(path).getroot()
+        self.path = path
+        self.namespace = root.get('targetNamespace')
+        self.elements = {}
+        self.complex_types = {}
+        self.simple_types = {}
+        # first declaration of every element name, nested ones included
+        self.declarations = {}
+        for decl in root.iter(XS + 'element'):
+            self.declarations.setdefault(decl.get('name'), decl)
+        for child in root:
+            name = child.get('name')
+            if child.tag == XS + 'element':
+                self.elements[name] = child
+            elif child.tag == XS + 'complexType':
+                self.complex_types[name] = child
+            elif child.tag == XS + 'simpleType':
+                self.simple_types[name] = child
+
+    def validate(self, element, schemas):
+        """Returns the list of errors of a top level element
+        Args:
+            element: xml element in the schema namespace
+            schemas: dict of namespace to XsdSchema for nested elements
+        """
+        _, name = split_tag(element.tag)
+        declaration = self.elements.get(name)
+        if declaration is None:
+            return ['Unknown element <{0}> in {1}'.format(
+                name, self.namespace)]
+        errors = []
+        self._validate_element(element, declaration, schemas, errors)
+        return errors
+
+    def validate_nested(self, element, schemas):
+        """Returns the list of errors of an element declared inside a top
+        level element, e.g. a workflow <action>"""
+        _, name = split_tag(element.tag)
+        declaration = self.declarations.get(name)
+        if declaration is None:
+            return ['Unknown element <{0}> in {1}'.format(
+                name, self.namespace)]
+        errors = []
+        self._validate_element(element, declaration, schemas, errors)
+        return errors
+
+    def _complex_type(self, declaration):
+        """complexType of an element declaration or None for simple types"""
+        inline = declaration.find(XS + 'complexType')
+        if inline is not None:
+            return inline
+        return self.complex_types.get(type_name(declaration.get('type')))
+
+    def _check_simple(self, value, qname, where, errors):
+        """Check a text or attribute value against a simple type"""
+        simple_type = self.simple_types.get(type_name(qname))
+        if simple_type is None:
+            return
+        restriction = simple_type.find(XS + 'restriction')
+        patterns = [facet.get('value') for facet in
+                    restriction.findall(XS + 'pattern')]
+        enums = [facet.get('value') for facet in
+                 restriction.findall(XS + 'enumeration')]
+        if patterns and not any(re.match('(?:{0})$'.format(pattern), value)
+                                for pattern in patterns):
+            errors.append('Invalid value "{0}" of {1}'.format(value, where))
+        if enums and value not in enums:
+            errors.append('Invalid value "{0}" of {1}'.format(value, where))
+
+    def _validate_element(self, element, declaration, schemas, errors):
+        """Validate attributes and content of an element"""
+        _, name = split_tag(element.tag)
+        where = '<{0} name="{1}">'.format(name, element.get('name')) \
+            if element.get('name') else '<{0}>'.format(name)
+        complex_type = self._complex_type(declaration)
+        if complex_type is None:
+            if len(element):
+                errors.append('Unexpected child elements in {0}'.format(
+                    where))
+            else:
+                self._check_simple((element.text or '').strip(),
+                                   declaration.get('type'), where, errors)
+            return
+        simple_content = complex_type.find(XS + 'simpleContent')
+        attr_parent = complex_type
+        if simple_content is not None:
+            attr_parent = simple_content.find(XS + 'extension')
+        attributes = dict((attr.get('name'), attr) for attr in
+                          attr_parent.findall(XS + 'attribute'))
+        for attr_name, attr in attributes.iteritems():
+            value = element.get(attr_name)
+            if value is None:
+                if attr.get('use') == 'required':
+                    errors.append('Missing attribute "{0}" in {1}'.format(
+                        attr_name, where))
+            else:
+                self._check_simple(value, attr.get('type'),
+                                   '{0} of {1}'.format(attr_name, where),
+                                   errors)
+        for attr_name in element.keys():
+            if split_tag(attr_name)[0] == '' and attr_name not in attributes:
+                errors.append('Unexpected attribute "{0}" in {1}'.format(
+                    attr_name, where))
+        children = list(element)
+        particle = None
+        for child in complex_type:
+            if child.tag in (XS + 'sequence', XS + 'choice'):
+                particle = child
+        if particle is None:
+            if children:
+                errors.append('Unexpected child elements in {0}'.format(
+                    where))
+            return
+        reached = self._match(particle, children, 0)
+        if len(children) not in reached:
+            position = max(reached) if reached else 0
+            if position < len(children):
+                errors.append('Unexpected element <{0}> in {1}'.format(
+                    split_tag(children[position].tag)[1], where))
+            else:
+                errors.append('Missing elements in {0}'.format(where))
+            return
+        declarations = {}
+        for decl in particle.iter(XS + 'element'):
+            declarations.setdefault(decl.get('name'), decl)
+        for child in children:
+            namespace, child_name = split_tag(child.tag)
+            if namespace == self.namespace and child_name in declarations:
+                self._validate_element(child, declarations[child_name],
+                                       schemas, errors)
+            elif namespace in schemas:
+                errors.extend(schemas[namespace].validate(child, schemas))
+
+    def _match_once(self, particle, children, pos):
+        """Positions reached after one occurrence of a particle"""
+        tag = particle.tag
+        if tag == XS + 'element':
+            if pos < len(children) and children[pos].tag == \
+                    '{{{0}}}{1}'.format(self.namespace, particle.get('name')):
+                return set([pos + 1])
+            return set()
+        if tag == XS + 'any':
+            if pos >= len(children):
+                return set()
+            namespace, _ = split_tag(children[pos].tag)
+            allowed = particle.get('namespace', '##any')
+            if allowed == '##any' or \
+                    (allowed == '##other' and namespace != self.namespace) or \
+                    namespace in allowed.split():
+                return set([pos + 1])
+            return set()
+        if tag == XS + 'sequence':
+            positions = set([pos])
+            for item in particle:
+                if item.tag == XS + 'annotation':
+                    continue
+                reached = set()
+                for position in positions:
+                    reached |= self._match(item, children, position)
+                positions = reached
+            return positions
+        if tag == XS + 'choice':
+            reached = set()
+            for item in particle:
+                if item.tag != XS + 'annotation':
+                    reached |= self._match(item, children, pos)
+            return reached
+        return set()
+
+    def _match(self, particle, children, start):
+        """Positions reached after minOccurs to maxOccurs occurrences of a
+        particle, starting at a child position"""
+        min_occurs = int(particle.get('minOccurs', 1))
+        max_occurs = particle.get('maxOccurs', '1')
+        max_occurs = None if max_occurs == 'unbounded' else int(max_occurs)
+        reached = set([start]) if min_occurs == 0 else set()
+        frontier = set([start])
+        count = 0
+        while frontier and (max_occurs is None or count < max_occurs):
+            count += 1
+            next_frontier = set()
+            for position in frontier:
+                next_frontier |= self._match_once(particle, children,
+                                                  position)
+            frontier = next_frontier
+            if count >= min_occurs:
+                frontier -= reached
+                reached |= frontier
+        return reached
+
+
+def load_schemas():
+    """Returns dict of namespace to XsdSchema of the bundled XSDs. The
+    XSDs are parsed once per process"""
+    if not SCHEMAS:
+        xsd_dir = os.path.dirname(resource_filename('resources.xsd',
+                                                    '__init__.py'))
+        for path in sorted(glob.glob(os.path.join(xsd_dir, '*.xsd'))):
+            schema = XsdSchema(path)
+            SCHEMAS[schema.namespace] = schema
+    return SCHEMAS
+
+
+class WorkflowValidator(object):
+
+    """Validates workflow xml against the oozie XSDs and the workflow
+    graph, without hadoop or oozie round trips."""
+
+    def __init__(self, cfg_mgr, schemas=None):
+        """init
+        Args:
+            cfg_mgr: ibis.utilities.config_manager.ConfigManager
+            schemas: dict of namespace to XsdSchema, the bundled XSDs
+                by default
+        """
+        self.cfg_mgr = cfg_mgr
+        self.schemas = schemas if schemas is not None else load_schemas()
+
+    def validate_file(self, workflow_file):
+        """Returns the list of errors of a workflow file
+        Args:
+            workflow_file: workflow xml name in cfg_mgr.files or a path
+        """
+        path = workflow_file
+        if not os.path.isabs(path):
+            path = os.path.join(self.cfg_mgr.files, workflow_file)
+        try:
+            with open(path, 'r') as file_h:
+                return self.validate(file_h.read())
+        except IOError as ex:
+            return ['Cannot read {0}: {1}'.format(path, ex)]
+
+    def validate(self, xml):
+        """Returns the list of errors of a workflow xml string"""
+        try:
+            root = fromstring(xml)
+        except ParseError as ex:
+            return ['Malformed xml: {0}'.format(ex)]
+        namespace, name = split_tag(root.tag)
+        if name != WORKFLOW_TAG:
+            return ['Root element <{0}> is not <{1}>'.format(
+                name, WORKFLOW_TAG)]
+        schema = self.schemas.get(namespace)
+        if schema is None:
+            return ['No schema bundled for namespace "{0}"'.format(
+                namespace)]
+        errors = schema.validate(root, self.schemas)
+        return errors + self.check_graph(root)
+
+    def validate_actions(self, xml, namespace=WORKFLOW_NAMESPACE):
+        """Returns the schema errors of workflow nodes without their
+        workflow-app, e.g. the actions of ActionBuilder.gen_full_table_ingest.
+        Transitions are not checked, they lead out of the fragment
+        Args:
+            xml: one or more workflow nodes
+            namespace: workflow namespace of the nodes
+        """
+        try:
+            root = fromstring('<nodes xmlns="{0}">{1}</nodes>'.format(
+                namespace, xml))
+        except ParseError as ex:
+            return ['Malformed xml: {0}'.format(ex)]
+        schema = self.schemas.get(namespace)
+        if schema is None:
+            return ['No schema bundled for namespace "{0}"'.format(
+                namespace)]
+        errors = []
+        for element in root:
+            errors.extend(schema.validate_nested(element, self.schemas))
+        return errors
+
+    def check_graph(self, root):
+        """Returns the graph errors of a workflow: unknown transitions,
+        forks without a single matching join and unreachable nodes"""
+        errors = []
+        nodes = {}
+        start = None
+        for element in root:
+            namespace, tag = split_tag(element.tag)
+            if tag == 'start':
+                start = element.get('to')
+            elif tag in NODE_TAGS:
+                name = element.get('name')
+                if name in nodes:
+                    errors.append('Duplicate node "{0}"'.format(name))
+                nodes[name] = (tag, element)
+        transitions = dict((name, self._transitions(tag, element))
+                           for name, (tag, element) in nodes.iteritems())
+        for name, targets in sorted(transitions.iteritems()):
+            for target in targets:
+                if target not in nodes:
+                    errors.append('Node "{0}" transitions to unknown node '
+                                  '"{1}"'.format(name, target))
+        if start not in nodes:
+            errors.append('Start transitions to unknown node "{0}"'.format(
+                start))
+            return errors
+        reachable = set()
+        pending = [start]
+        while pending:
+            name = pending.pop()
+            if name in reachable or name not in nodes:
+                continue
+            reachable.add(name)
+            pending.extend(transitions[name])
+        for name in sorted(set(nodes) - reachable):
+            errors.append('Node "{0}" is not reachable'.format(name))
+        joins = {}
+        fork_joins = {}
+        for name in sorted(nodes):
+            if nodes[name][0] == 'fork':
+                join = self._fork_join(name, nodes, transitions, errors,
+                                       fork_joins)
+                if join is not None:
+                    if join in joins:
+                        errors.append('Join "{0}" of fork "{1}" is also the '
+                                      'join of fork "{2}"'.format(
+                                          join, name, joins[join]))
+                    joins[join] = name
+        for name in sorted(nodes):
+            if nodes[name][0] == 'join' and name not in joins:
+                errors.append('Join "{0}" has no fork'.format(name))
+        return errors
+
+    @staticmethod
+    def _transitions(tag, element):
+        """Names of the nodes a node transitions to"""
+        if tag == 'action':
+            return [child.get('to') for child in element
+                    if split_tag(child.tag)[1] in ('ok', 'error')]
+        if tag == 'fork':
+            return [child.get('start') for child in element]
+        if tag == 'join':
+            return [element.get('to')]
+        if tag == 'decision':
+            return [child.get('to') for child in element.iter()
+                    if split_tag(child.tag)[1] in ('case', 'default')]
+        return []
+
+    def _ok_transitions(self, name, nodes):
+        """Transitions followed inside a fork: error transitions may
+        leave the fork"""
+        tag, element = nodes[name]
+        if tag == 'action':
+            return [child.get('to') for child in element
+                    if split_tag(child.tag)[1] == 'ok']
+        return self._transitions(tag, element)
+
+    def _fork_join(self, fork, nodes, transitions, errors, fork_joins,
+                   stack=()):
+        """Returns the join all paths of a fork end in or None
+        Args:
+            fork: fork node name
+            nodes: dict of node name to (tag, element)
+            transitions: dict of node name to transitions
+            errors: list the errors are added to
+            fork_joins: dict of fork to its join, for nested forks
+            stack: outer forks of the fork
+        """
+        if fork in fork_joins:
+            return fork_joins[fork]
+        if fork in stack:
+            errors.append('Fork "{0}" is nested in itself'.format(fork))
+            return None
+        found = set()
+        for path_start in transitions[fork]:
+            pending = [path_start]
+            seen = set()
+            while pending:
+                name = pending.pop()
+                if name in seen or name not in nodes:
+                    continue
+                seen.add(name)
+                tag = nodes[name][0]
+                if tag == 'join':
+                    found.add(name)
+                elif tag == 'end':
+                    errors.append('Fork "{0}" path reaches end without a '
+                                  'join'.format(fork))
+                elif tag == 'fork':
+                    join = self._fork_join(name, nodes, transitions, errors,
+                                           fork_joins, stack + (fork,))
+                    if join is not None:
+                        pending.extend(transitions[join])
+                elif tag != 'kill':
+                    pending.extend(self._ok_transitions(name, nodes))
+        join = list(found)[0] if len(found) == 1 else None
+        if not found:
+            errors.append('Fork "{0}" has no join'.format(fork))
+        elif join is None:
+            errors.append('Fork "{0}" paths end in different joins: '
+                          '{1}'.format(fork, ', '.join(sorted(found))))
+        fork_joins[fork] = join
+        return join
@@ -49,6 +49,13 @@ run_unit_tests() {
 		echo ' test cases failed'
 		exit 1
 	fi
+	# cli startup import time budget
+	( cd $ibis_home && python -m ibis.utilities.import_time --budget 1 ibis.driver.main 2> $cur_dir/import_time.txt )
+	if [ $? -gt 0 ]
+	then
+		echo ' import time budget exceeded, see import_time.txt'
+		exit 1
+	fi
 	coverage run --branch --source="ibis" --omit="*test*,ibis/features/*,ibis/setup.py,ibis/__main__.py,*__init__.py*,ibis/import_version.py,ibis/ibis/settings.py,ibis/ibis/utilities/run_parallel.py,ibis/ibis/utilities/gitlab.py,ibis/ibis/ingest/import_prep.py" $ibis_home/ibis_test_suite.py
 	coverage report
 	coverage xml
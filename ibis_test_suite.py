@@ -7,11 +7,16 @@ from ibis.driver.tests.test_driver import DriverFunctionsTest
 from ibis.driver.tests.test_main import MainFunctionsTest
 from ibis.inventor.tests.test_workflow_generator \
     import WorkflowGeneratorFunctionsTest
+from ibis.inventor.tests.test_dag_workflow_generator \
+    import DagWorkflowGeneratorFunctionsTest
 from ibis.inventor.tests.test_action_builder import ActionBuilderFunctionsTest
 from ibis.inventor.tests.test_dsl_parser import DSLParserTest
+from ibis.inventor.tests.test_benchmark_workflow_generator \
+    import BenchmarkWorkflowGeneratorTest
 from ibis.inventory.tests.test_request_inventory \
     import request_inventory_test_suite
-from ibis.inventory.tests.test_inventory import InventoryFunctionsTest
+from ibis.inventory.tests.test_inventory import InventoryFunctionsTest, \
+    ImpalaConnectionPoolTest
 from ibis.inventory.tests.test_it_inventory import ITInventoryFunctionsTest
 from ibis.inventory.tests.test_cb_inventory import CBInventoryFunctionsTest
 from ibis.inventory.tests.test_perf_inventory import PerfInventoryTest
@@ -28,6 +33,17 @@ from ibis.model.tests.test_subwf_action import SubWFActionFunctionsTest
 from ibis.model.tests.test_table import tableSuiteTest
 from ibis.utilities.tests.test_utilities import UtilitiesFunctionsTest
 from ibis.utilities.tests.test_sqoop_helper import SqoopHelperFunctionsTest
+from ibis.utilities.tests.test_eval_server import EvalServerFunctionsTest
+from ibis.utilities.tests.test_ddl_cache import DDLCacheFunctionsTest
+from ibis.utilities.tests.test_build_manifest import \
+    BuildManifestFunctionsTest
+from ibis.utilities.tests.test_import_time import ImportTimeFunctionsTest
+from ibis.utilities.tests.test_run_parallel import ParallelExecutorTest
+from ibis.utilities.tests.test_template_cache import \
+    TemplateCacheFunctionsTest
+from ibis.utilities.tests.test_workflow_validator import \
+    WorkflowValidatorFunctionsTest
+from ibis.utilities.tests.test_hdfs import HdfsFunctionsTest
 from ibis.utilities.tests.test_vizoozie import VizOozieTest
 from ibis.utilities.tests.test_it_table_generation \
     import it_table_gen_test_suite
@@ -43,11 +59,13 @@ from lib.ingest.tests.test_pre_quality_assurance_export \
     import qa_pre_test_suite_export
 from lib.ingest.tests.test_quality_assurance_export import qa_test_suite_export
 from lib.ingest.tests.test_oozie_ws_helper import oozie_ws_helper_test_suite
+from lib.ingest.tests.test_oozie_client import OozieClientTest
 from lib.ingest.tests.test_zookeeper_remove_locks \
     import ZookeeperLocksFunctionsTest
 from lib.ingest.tests.test_impala_utils import ImpalaUtilsFunctionsTest
 from lib.ingest.tests.test_import_prep import ImportPrepFunctionsTest
-from lib.ingest.tests.test_py_hdfs import PyHDFSTest
+from lib.ingest.tests.test_py_hdfs import PyHDFSTest, WebHdfsTest
+from lib.ingest.tests.test_sqoop_utils import SqoopUtilsFunctionsTest
 
 
 def remove_pyc_files():
@@ -76,11 +94,19 @@ if __name__ == '__main__':
     test_classes_to_run = [ActionBuilderFunctionsTest, ForkActionFunctionsTest,
                            HiveActionFunctionsTest, JoinActionFunctionsTest,
                            ShellActionFunctionsTest, SqoopActionFunctionsTest,
-                           InventoryFunctionsTest, ITInventoryFunctionsTest,
-                           SqoopHelperFunctionsTest, FileParserTest,
+                           InventoryFunctionsTest, ImpalaConnectionPoolTest,
+                           ITInventoryFunctionsTest,
+                           SqoopHelperFunctionsTest, EvalServerFunctionsTest,
+                           DDLCacheFunctionsTest, BuildManifestFunctionsTest,
+                           ImportTimeFunctionsTest, ParallelExecutorTest,
+                           TemplateCacheFunctionsTest,
+                           WorkflowValidatorFunctionsTest, HdfsFunctionsTest,
+                           FileParserTest,
                            UtilitiesFunctionsTest, VizOozieTest,
                            ParquetOptTimeFunctionsTest,
                            DriverFunctionsTest, WorkflowGeneratorFunctionsTest,
+                           DagWorkflowGeneratorFunctionsTest,
+                           BenchmarkWorkflowGeneratorTest,
                            AutoInventoryFunctionsTest,
                            CBInventoryFunctionsTest, ConfigManagerTest,
                            AuthTestTest, 
@@ -88,7 +114,9 @@ if __name__ == '__main__':
                            MainFunctionsTest, SubWFActionFunctionsTest,
                            SSHActionFunctionsTest, ImpalaUtilsFunctionsTest,
                            TestChecksBalancesExportManager, DSLParserTest,
-                           PyHDFSTest, ImportPrepFunctionsTest,
+                           PyHDFSTest, WebHdfsTest, SqoopUtilsFunctionsTest,
+                           OozieClientTest,
+                           ImportPrepFunctionsTest,
                            PerfInventoryTest, Test_freq_ingest]
 
     # test_classes_to_run = []
@@ -16,6 +16,7 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_ingest_path"config_env.sh
     hadoop fs -get "$hdfs_ingest_path"shell_utils.sh
     hadoop fs -get "$hdfs_ingest_path"sqoop_utils.py
+    hadoop fs -get "$hdfs_ingest_path"eval_client.py
     hadoop fs -get "$hdfs_ingest_path"sql_queries.py
     hadoop fs -get "$hdfs_ingest_path"impala_utils.py
     hadoop fs -get "$hdfs_ingest_path"zookeeper_remove_locks.py
@@ -27,6 +27,7 @@ fetch_hdfs_files() {
     hadoop fs -get "${hdfs_export_path}"shell_utils.sh
     hadoop fs -get "${hdfs_export_path}"config_env.sh
     hadoop fs -get "${hdfs_export_path}"sqoop_utils.py
+    hadoop fs -get "${hdfs_export_path}"eval_client.py
     hadoop fs -get "${hdfs_export_path}"py_hdfs.py
     hadoop fs -get /user/dev/scratch/fake.keytab
 }
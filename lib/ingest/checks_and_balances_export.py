@@ -1,251 +1,18 @@
 """Insert workflow run time stats to default.oozie_checks_balances table"""
 import sys
-import json
 import re
 import os
 import datetime
-from subprocess import Popen, PIPE
-import subprocess
 
-import requests
-from requests_kerberos import HTTPKerberosAuth
-from py_hdfs import PyHDFS
+from py_hdfs import PyHDFS, get_batch_writer, flush_batch_writers
+from oozie_client import Action, Workflow, Job, OozieClient
 from impala_utils import ImpalaConnect
 
 _PIPE = '|'
 
 
-class Action(object):
-    """Action model"""
-
-    def __init__(self, action_json):
-        self.__dict__.update(json.loads(action_json))
-
-    def get_status(self):
-        return self.status
-
-    def get_retries(self):
-        return self.retries
-
-    def get_transition(self):
-        return self.transition
-
-    def get_stats(self):
-        return self.stats
-
-    def get_start_time(self):
-        return self.startTime
-
-    def get_to_string(self):
-        return self.toString
-
-    def get_cred(self):
-        return self.cred
-
-    def get_error_message(self):
-        return self.errorMessage
-
-    def get_error_code(self):
-        return self.errorCode
-
-    def get_console_url(self):
-        return self.consoleUrl
-
-    def get_external_id(self):
-        return self.externalId
-
-    def get_external_status(self):
-        return self.externalStatus
-
-    def get_conf(self):
-        return self.conf
-
-    def get_type(self):
-        return self.type
-
-    def get_tracker_uri(self):
-        return self.trackerUri
-
-    def get_external_child_ids(self):
-        return self.externalChildIDs
-
-    def get_end_time(self):
-        return self.endTime
-
-    def get_data(self):
-        return self.data
-
-    def get_id(self):
-        return self.id
-
-    def get_name(self):
-        return self.name
-
-    def __eq__(self, other):
-        if type(other) is type(self):
-            return self.__dict__ == other.__dict__
-        return False
-
-
-class Workflow(object):
-    """Workflow model"""
-
-    def __init__(self, workflow_json):
-        self.__dict__.update(json.loads(workflow_json))
-
-    def get_status(self):
-        return self.status
-
-    def get_run(self):
-        return self.run
-
-    def get_start_time(self):
-        return self.startTime
-
-    def get_app_name(self):
-        return self.appName
-
-    def get_last_modified(self):
-        return self.lastModTime
-
-    def get_actions(self):
-        actions = []
-        for act in self.actions:
-            actions.append(Action(json.dumps(act)))
-        return actions
-
-    def get_acl(self):
-        return self.acl
-
-    def get_app_path(self):
-        return self.appPath
-
-    def get_external_id(self):
-        return self.externalId
-
-    def get_console_url(self):
-        return self.consoleUrl
-
-    def get_conf(self):
-        return self.conf
-
-    def get_parent_id(self):
-        return self.parentId
-
-    def get_created_time(self):
-        return self.createdTime
-
-    def get_to_string(self):
-        return self.toString
-
-    def get_end_time(self):
-        return self.endTime
-
-    def get_id(self):
-        return self.id
-
-    def get_group(self):
-        return self.group
-
-    def get_user(self):
-        return self.user
-
-    def __eq__(self, other):
-        if type(other) is type(self):
-            return self.__dict__ == other.__dict__
-        return False
-
-
-class Job(object):
-    """Job model"""
-
-    def __init__(self, job_json):
-        self.__dict__.update(json.loads(job_json))
-
-    def get_offset(self):
-        return self.offset
-
-    def get_total(self):
-        return self.total
-
-    def get_len(self):
-        return self.len
-
-    def get_workflows(self):
-        workflows = []
-        for job in self.workflows:
-            workflows.append(Workflow(json.dumps(job)))
-        return workflows
-
-    def __eq__(self, other):
-        if type(other) is type(self):
-            return self.__dict__ == other.__dict__
-        return False
-
-
-class ChecksBalancesExportHelper(object):
-    def __init__(self, oozie_url):
-        self.oozie_url = oozie_url
-
-    def get_jobs(self, name=None, user=None, group=None, status=None,
-                 offset=1, length=50, job_type='wf'):
-        """Retrieve all jobs or filtered jobs
-        :param name:String The application name from the
-        workflow/coordinator/bundle definition
-        :param user:String The user that submitted the job
-        :param group:String The group for the job
-        :param status:String The status of the job (KILLED, SUCCEEDED, RUNNING)
-        :param offset:Int Parameter can be used for pagination
-        :param length:Int Parameter can be used for pagination
-        :param job_type:String Parameter for job type (wf,
-        coordinator or bundle)
-        :return status_code:Int, job:Job
-        """
-        job = None
-        # Create query
-        query = 'jobs'
-        if name or user or group or status or offset or length or job_type:
-            query += '?filter='
-            if name:
-                query += 'name={name}&'.format(name=name)
-            if user:
-                query += 'user={user}&'.format(user=user)
-            if group:
-                query += 'group={group}&'.format(group=group)
-            if status:
-                query += 'status={status}&'.format(status=status)
-            if offset:
-                query += 'offset={offset}&'.format(offset=offset)
-            if length:
-                query += 'len={length}&'.format(length=length)
-            if job_type:
-                query += 'jobtype={job_type}'.format(job_type=job_type)
-
-        r = requests.get(self.oozie_url + query, auth=HTTPKerberosAuth())
-
-        if r.status_code == 200:  # OK
-            my_json = json.dumps(r.json())
-            job = Job(my_json)
-        else:
-            print "Error retrieving all jobs. Error code: {status}".format(
-                status=r.status_code)
-        return r.status_code, job
-
-    def get_job(self, id_val):
-        """Retrieve job with provided id
-        :param id_val:String
-        :return workflow_job:Workflow"""
-        workflow_job = None
-        query = 'job/' + id_val
-        r = requests.get(self.oozie_url + query, auth=HTTPKerberosAuth())
-        if r.status_code == 200:  # OK
-            my_json = json.dumps(r.json())
-            workflow_job = Workflow(my_json)
-        else:
-            err_msg = "Error retrieving job, {id_val}. Error code: {status}"
-            err_msg = err_msg.format(id_val=id_val, status=r.status_code)
-            print err_msg
-        return r.status_code, workflow_job
+# kept for callers of the former per module client
+ChecksBalancesExportHelper = OozieClient
 
 
 class ChecksBalancesExport(object):
@@ -313,7 +80,7 @@ class ChecksBalancesExportManager(object):
 
     def __init__(self, host, oozie_url, chk_bal_exp_dir):
         self.host = host
-        self.ooz = ChecksBalancesExportHelper(oozie_url)
+        self.ooz = OozieClient(oozie_url)
         self.pyhdfs = PyHDFS(chk_bal_exp_dir)
 
     def get_workflow_job(self, app_name, start_time=None):
@@ -328,7 +95,9 @@ class ChecksBalancesExportManager(object):
         :return job: Job
         """
         workflow_job = None
-        status, job = self.ooz.get_jobs(name=app_name)
+        # the listing is newest first, the latest run is the first job
+        max_jobs = None if start_time else 1
+        status, job = self.ooz.get_jobs(name=app_name, max_jobs=max_jobs)
 
         if status != 200:
             # Not OK
@@ -654,79 +423,31 @@ class ChecksBalancesExportManager(object):
             print 'Expecting an export action.'
         return stats
 
-    def get_parquet_size(self, table_name, target_dir):
-        """Finds the parquet size. REQUIRES hadoop fs"""
+    def get_data_dir(self, target_dir):
+        """Live directory of a table target dir"""
         if target_dir.startswith('/user/data/incrementals'):
-            data_dir = "/user/data/" + "/".join(
+            return "/user/data/" + "/".join(
                 target_dir.split('/')[4:]) + '/live'
-        else:
-            data_dir = '/user/data/' + target_dir + '/live'
-
-        # Check if the dir exists
-        dir_status = subprocess.call(["hadoop", "fs", "-test", "-e", data_dir])
-        if dir_status == 0:
-            proc = Popen(['hadoop', 'fs', '-ls', data_dir], stdout=PIPE)
-            out, err = proc.communicate()
-
-            # note all new ingestions have this partition, including
-            # full ingest-onlys
-            incr_ingest = "/incr_ingest_timestamp="
-            date_list = []
-            full_ingests = []
-            output = out.split('\n')
-
-            for line in output:
-                all_date = line.split(incr_ingest)
-                if len(all_date) > 1:
-                    try:
-                        date_list.append(
-                            datetime.datetime.strptime(all_date[1],
-                                                       '%Y-%m-%d'))
-                    except ValueError:
-                        if all_date[1].startswith('full_'):
-                            full_ingests.append(all_date[1])
-
-            if len(date_list) > 0:
-                # take the max date as the directory to get the size of
-                # by using the datetime, you can just call max(date)
-                # see here for best way to format a date:
-                # http://stackoverflow.com/questions/10624937/convert-
-                # datetime-object-to-a-string-of-date-only-in-python
-                parquet_dir = data_dir + incr_ingest + '{:%Y-%m-%d}'.format(
-                    max(date_list))
-            elif len(full_ingests) > 0:
-                # Only full ingests, take size of entire /live dir
-                parquet_dir = data_dir
-            else:
-                parquet_dir = data_dir
+        return '/user/data/' + target_dir + '/live'
+
+    def get_parquet_sizes(self, target_dirs):
+        """Finds the parquet size of several tables with a single listing
+        and summary pass over WebHDFS or hadoop fs. The latest
+        incr_ingest_timestamp partition is sized, the whole live dir if
+        there are only full ingests
+        :param target_dirs: List[String] target dirs of the tables
+        :return sizes: {target_dir: String size, 0 if the dir is missing}
+        """
+        data_dirs = dict((target_dir, self.get_data_dir(target_dir))
+                         for target_dir in target_dirs)
+        sizes = self.pyhdfs.get_sizes(sorted(set(data_dirs.values())))
+        return dict((target_dir, str(sizes[data_dir])
+                     if data_dir in sizes else 0)
+                    for target_dir, data_dir in data_dirs.items())
 
-            parq_size = 0
-            try:
-                proc = Popen(['hadoop', 'fs', '-du', '-s', parquet_dir],
-                             stdout=PIPE)
-                out, err = proc.communicate()
-                # 235583051  706749153  /user/data/mdm/member/fake_database/
-                # fake_mem_tablename_risk_fact/live
-                try:
-                    parq_size = out.split()
-                    if parq_size:
-                        parq_size = parq_size[len(parq_size) - 3]
-                    if not parq_size.isdigit():
-                        parq_size = 0
-                except IndexError as ie:
-                    parq_size = 0
-                    err_msg = "Parquet Size error found in oozie_ws_help.get" \
-                              "_parquet_size - reason %s"
-                    err_msg = err_msg % ie.message
-                    raise Exception(err_msg)
-            except OSError:
-                parq_size = None
-                err_msg = "OS Parquet Size error found in oozie_ws_help." \
-                          "get_parquet_size - reason %s"
-                err_msg = err_msg % ie.message
-                raise Exception(err_msg)
-            return parq_size
-        return 0
+    def get_parquet_size(self, table_name, target_dir):
+        """Finds the parquet size of a table with WebHDFS or hadoop fs"""
+        return self.get_parquet_sizes([target_dir])[target_dir]
 
     def get_success_or_failure(self, action_list):
         """
@@ -758,7 +479,7 @@ class ChecksBalancesExportManager(object):
 
         # For each distinct table find required values and create
         #  ChecksBalances object
-        cb_records = []
+        all_records = []
         for table_name in sorted_actions.keys():
             records = {}
             for key in parser.keys():
@@ -771,14 +492,27 @@ class ChecksBalancesExportManager(object):
             records['parquet_time'] = self.get_parquet_time(table_name,
                                                             sorted_actions[
                                                                 table_name])
-            records['parquet_size'] = self.get_parquet_size(table_name,
-                                                            records[
-                                                                'directory'])
             records['success'] = self.get_success_or_failure(
                 sorted_actions[table_name])
+            all_records.append(records)
+        # sizes of all tables of the workflow in one pass
+        sizes = self.get_parquet_sizes(
+            [rec['directory'] for rec in all_records])
+        cb_records = []
+        for records in all_records:
+            records['parquet_size'] = sizes[records['directory']]
             cb_records.append(ChecksBalancesExport(**records))
         return cb_records
 
+    def get_writer(self):
+        """Batch writer of the checks balances export table, one record
+        per table partition"""
+        return get_batch_writer(
+            self.pyhdfs.hdfs_base_dir,
+            lambda: ImpalaConnect.invalidate_metadata(
+                self.host, 'ibis.checks_balances_export'),
+            replace=True)
+
     def update_checks_balances(self, workflow, start_time=None):
         """Given a workflow app name, query oozie api for workflow job,
         update checks_balances table with records
@@ -792,20 +526,12 @@ class ChecksBalancesExportManager(object):
                 self.update_old_cb_table(
                     record.domain, record.table_name, record)
 
-            # We need to perform INVALIDATE METADATA to reflect Hive
-            # file-based operations in Impala.
-            ImpalaConnect.invalidate_metadata(self.host,
-                                              'ibis.checks_balances_export')
-
     def update_old_cb_table(self, domain, table_name, record):
         """Update current_repull value in ibis.checks_balances """
         # File-based insert/update operation
         pipe_seperated_value = self.prepares_data(record)
-        self.pyhdfs.insert_update(
-            self.get_dir_path(
-                domain,
-                table_name),
-            pipe_seperated_value)
+        self.get_writer().add(pipe_seperated_value,
+                              self.get_dir_path(domain, table_name))
 
     def prepares_data(self, record):
         pipe_seperated_value = str(record.directory) + _PIPE
@@ -867,4 +593,5 @@ if __name__ == "__main__":
         CHK_BAL_EXP_DIR)
     app_name = export_cb_mgr.check_if_workflow(app_name)
     export_cb_mgr.update_checks_balances(app_name)
+    flush_batch_writers()
     ImpalaConnect.close_conn()
@@ -0,0 +1,69 @@
+"""Client for the ibis eval server.
+Standalone copy of ibis.utilities.eval_server.EvalClient because the
+lib/ingest scripts are fetched one by one from hdfs.
+"""
+import getpass
+import json
+import os
+import socket
+import tempfile
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+SOCKET_ENV_VAR = 'IBIS_EVAL_SOCKET'
+CONNECT_TIMEOUT = 2
+
+
+def get_socket_path():
+    """Returns $IBIS_EVAL_SOCKET or the per user default socket path"""
+    socket_path = os.environ.get(SOCKET_ENV_VAR, '')
+    if not socket_path:
+        file_name = 'ibis_eval_{0}.sock'.format(getpass.getuser())
+        socket_path = os.path.join(tempfile.gettempdir(), file_name)
+    return socket_path
+
+
+class EvalClient(object):
+    """Sends sqoop-eval queries to a running eval server"""
+
+    def __init__(self, socket_path=None):
+        """init"""
+        self.socket_path = socket_path or get_socket_path()
+
+    def eval(self, jdbc, sql_stmt, db_username, password_file):
+        """Run query on the eval server
+        Args:
+            jdbc: JDBC Url
+            sql_stmt: sql statement to query against data source
+            db_username: username for source db
+            password_file: jceks#alias or password_file_path
+        Returns:
+            None if the server is unavailable, otherwise the same
+            (returncode, output, err) tuple as a sqoop eval subprocess
+        """
+        if not os.path.exists(self.socket_path):
+            return None
+        request = {'jdbc': jdbc, 'query': sql_stmt, 'username': db_username,
+                   'password_file': password_file}
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(self.socket_path)
+            sock.settimeout(None)
+            sock.sendall(json.dumps(request) + '\n')
+            sock_file = sock.makefile('rb')
+            response = sock_file.readline()
+            sock_file.close()
+        except socket.error:
+            return None
+        finally:
+            sock.close()
+
+        try:
+            reply = json.loads(response)
+        except ValueError:
+            return None
+        if reply.get('status') not in [STATUS_OK, STATUS_ERROR]:
+            return None
+        return (reply['returncode'], reply['output'].encode('utf-8'),
+                reply['err'].encode('utf-8'))
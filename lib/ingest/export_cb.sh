@@ -26,6 +26,7 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_export_path"impala_utils.py
     hadoop fs -get "$hdfs_export_path"checks_and_balances_export.py
     hadoop fs -get "$hdfs_export_path"py_hdfs.py
+    hadoop fs -get "$hdfs_export_path"oozie_client.py
 }
 
 setup_env_vars() {
@@ -2,35 +2,180 @@
 
 import sys
 import os
+import Queue
+import threading
 from impala.dbapi import connect
+from thrift.transport.TTransport import TTransportException
 
 
-IMPALA_CONN = None
-HIVE_CONN = None
+IMPALA_POOL = None
+HIVE_POOL = None
+POOL_SIZE = 4
+_POOL_LOCK = threading.Lock()
+# tables invalidated by run_query(..., invalidate_once=True)
+INVALIDATED_TABLES = set()
+
+
+class ConnectionPool(object):
+    """Bounded pool of impyla connections. A thread keeps its connection
+    until release(). Standalone copy of
+    ibis.inventory.inventory.ImpalaConnectionPool because the lib/ingest
+    scripts are fetched one by one from hdfs.
+    """
+
+    def __init__(self, max_size, **connect_args):
+        """init"""
+        self.connect_args = connect_args
+        self.idle = Queue.Queue()
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = set()
+
+    def _new_connection(self):
+        """Open a new connection"""
+        conn = connect(**self.connect_args)
+        with self.lock:
+            self.connections.add(conn)
+        return conn
+
+    def get(self):
+        """Returns the connection of the current thread"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            return conn
+        self.slots.acquire()
+        try:
+            while conn is None:
+                try:
+                    conn = self.idle.get_nowait()
+                except Queue.Empty:
+                    conn = self._new_connection()
+                    break
+                if not self.is_valid(conn):
+                    self.close(conn)
+                    conn = None
+        except Exception:
+            self.slots.release()
+            raise
+        self.local.conn = conn
+        return conn
+
+    def release(self):
+        """Returns the connection of the current thread to the pool"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return
+        self.local.conn = None
+        self.idle.put(conn)
+        self.slots.release()
+
+    def reconnect(self):
+        """Replace the broken connection of the current thread"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return self.get()
+        self.close(conn)
+        try:
+            self.local.conn = self._new_connection()
+        except Exception:
+            self.local.conn = None
+            self.slots.release()
+            raise
+        return self.local.conn
+
+    def cursor(self):
+        """Returns a cursor, reconnects once on a lost connection"""
+        try:
+            return self.get().cursor()
+        except TTransportException:
+            return self.reconnect().cursor()
+
+    def execute(self, cur, query, configuration):
+        """cursor.execute, reconnects once on a lost connection.
+        Returns the cursor the query ran on"""
+        try:
+            cur.execute(query, configuration=configuration)
+        except TTransportException:
+            cur = self.reconnect().cursor()
+            cur.execute(query, configuration=configuration)
+        return cur
+
+    def close_all(self):
+        """Close every connection opened by the pool"""
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            self.close(conn)
+        self.local.conn = None
+
+    @classmethod
+    def is_valid(cls, conn):
+        """Health check of an idle connection"""
+        try:
+            cur = conn.cursor()
+            cur.execute('select 1')
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def close(self, conn):
+        """Close connection ignoring errors"""
+        with self.lock:
+            self.connections.discard(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_impala_pool(host_name):
+    """Returns the impala connection pool of the process"""
+    global IMPALA_POOL
+    with _POOL_LOCK:
+        if IMPALA_POOL is None:
+            IMPALA_POOL = ConnectionPool(POOL_SIZE, host=host_name,
+                                         port=25003, timeout=600,
+                                         use_kerberos=True)
+    return IMPALA_POOL
+
+
+def get_hive_pool(host_name):
+    """Returns the hive connection pool of the process"""
+    global HIVE_POOL
+    with _POOL_LOCK:
+        if HIVE_POOL is None:
+            HIVE_POOL = ConnectionPool(POOL_SIZE, host=host_name,
+                                       port=25006, timeout=600,
+                                       use_kerberos=True,
+                                       kerberos_service_name='hive')
+    return HIVE_POOL
 
 
 class ImpalaConnect(object):
     """Runs query on impala"""
 
     @classmethod
-    def run_query(cls, host_name, table, query, op='select'):
+    def run_query(cls, host_name, table, query, op='select',
+                  invalidate_once=False):
         """Execute a impala query.
         Args:
             host_name: host name for impala connection
             table: database.table
             query: impala query
-            op: indicator for select"""
-        global IMPALA_CONN
-
+            op: indicator for select
+            invalidate_once: invalidate metadata of table only on the
+                first query of the run instead of before every query"""
         result = ''
-        if not IMPALA_CONN:
-            IMPALA_CONN = connect(host=host_name, port=25003, timeout=600,
-                                  use_kerberos=True)
-        cur = IMPALA_CONN.cursor()
+        pool = get_impala_pool(host_name)
+        cur = pool.cursor()
         # Can't invalidate something that doesn't yet exist
         if op != "create":
-            ImpalaConnect.invalidate_metadata(host_name, table)
-        cur.execute(query, configuration={'request_pool': 'ingestion'})
+            if not invalidate_once or table not in INVALIDATED_TABLES:
+                ImpalaConnect.invalidate_metadata(host_name, table)
+                INVALIDATED_TABLES.add(table)
+        cur = pool.execute(cur, query, {'request_pool': 'ingestion'})
 
         if cur:
             if op == 'select':
@@ -44,9 +189,11 @@ class ImpalaConnect(object):
         """Close impala connection. impyla lib issue
         - close conn at the end of script.
         """
-        global IMPALA_CONN
-        if IMPALA_CONN:
-            IMPALA_CONN.close()
+        global IMPALA_POOL
+        with _POOL_LOCK:
+            if IMPALA_POOL:
+                IMPALA_POOL.close_all()
+                IMPALA_POOL = None
 
     @classmethod
     def invalidate_metadata(cls, host_name, table):
@@ -56,14 +203,9 @@ class ImpalaConnect(object):
             host_name: host name for impala connection
             table: database.table
         """
-        global IMPALA_CONN
-
-        if not IMPALA_CONN:
-            IMPALA_CONN = connect(host=host_name, port=25003, timeout=600,
-                                  use_kerberos=True)
-        cur = IMPALA_CONN.cursor()
-        cur.execute('invalidate metadata ' + table + ';',
-                    configuration={'request_pool': 'ingestion'})
+        pool = get_impala_pool(host_name)
+        cur = pool.execute(pool.cursor(), 'invalidate metadata ' + table +
+                           ';', {'request_pool': 'ingestion'})
 
         if not cur:
             raise "Hive connection - cursor is none"
@@ -80,16 +222,10 @@ class HiveConnect(object):
             table: database.table
             query: hive query
             op: indicator for select"""
-        global HIVE_CONN
-
         result = ''
-        if not HIVE_CONN:
-            HIVE_CONN = connect(host=host_name, port=25006, timeout=600,
-                                use_kerberos=True,
-                                kerberos_service_name='hive')
-        cur = HIVE_CONN.cursor()
-        cur.execute(
-            query, configuration={'mapred.job.queue.name': 'ingestion'})
+        pool = get_hive_pool(host_name)
+        cur = pool.execute(pool.cursor(), query,
+                           {'mapred.job.queue.name': 'ingestion'})
 
         if cur:
             if op == 'select':
@@ -103,9 +239,11 @@ class HiveConnect(object):
         """Close hive connection. impyla lib issue -
         close conn at the end of script.
         """
-        global HIVE_CONN
-        if HIVE_CONN:
-            HIVE_CONN.close()
+        global HIVE_POOL
+        with _POOL_LOCK:
+            if HIVE_POOL:
+                HIVE_POOL.close_all()
+                HIVE_POOL = None
 
 
 if __name__ == '__main__':
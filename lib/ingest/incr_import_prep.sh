@@ -19,6 +19,7 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_ingest_path"config_env.sh > /dev/null 2>&1
     hadoop fs -get "$hdfs_ingest_path"shell_utils.sh > /dev/null 2>&1
     hadoop fs -get "$hdfs_ingest_path"sqoop_utils.py > /dev/null 2>&1
+    hadoop fs -get "$hdfs_ingest_path"eval_client.py > /dev/null 2>&1
     hadoop fs -get "$hdfs_ingest_path"impala_utils.py > /dev/null 2>&1
     hadoop fs -get "$hdfs_ingest_path"import_prep.py > /dev/null 2>&1
     hadoop fs -get "$hdfs_ingest_path"sql_queries.py > /dev/null 2>&1
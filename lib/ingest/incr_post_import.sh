@@ -19,6 +19,7 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_ingest_path"config_env.sh
     hadoop fs -get "$hdfs_ingest_path"shell_utils.sh
     hadoop fs -get "$hdfs_ingest_path"sqoop_utils.py
+    hadoop fs -get "$hdfs_ingest_path"eval_client.py
     hadoop fs -get "$hdfs_ingest_path"sql_queries.py
     hadoop fs -get "$hdfs_ingest_path"impala_utils.py
     hadoop fs -get "$hdfs_ingest_path"parquet_opt_ddl_time.py
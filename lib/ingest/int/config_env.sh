@@ -9,9 +9,19 @@ export hive2_host=fake.int.hive
 export hive2_jdbc_url=jdbc:hive2://fake.int.hive:25006/default
 export zookeeper_hosts=fake.int.zookeeper1,fake.int.zookeeper2,fake.int.zookeeper3
 export oozie_url=http://fake.int.oozie:25007/oozie/v2/
+export WEBHDFS_URL=http://fake.int.namenode:50070/webhdfs/v1
+export WEBHDFS_USER=
+export HDFS_BATCH_ROWS=1000
+export HDFS_BATCH_BYTES=8388608
+export HDFS_BATCH_SECONDS=300
+export OOZIE_CACHE_DIR=/tmp/ibis_oozie_cache
+export OOZIE_THREADS=4
 
 export QA_RESULTS_DIR=/user/hive/warehouse/ibis.db/qa_resultsv2
 export QA_EXP_RESULTS_DIR=/user/hive/warehouse/ibis.db/qa_export_results
+export QA_SAMPLE_SIZE=5
+export QA_SAMPLE_MODE=block
+export QA_SAMPLE_PERCENT=1
 export CHK_BAL_DIR=/user/dev/data/checks_balances
 export CHK_BAL_EXP_DIR=/user/dev/data/checks_balances_export
 export CHK_BAL_AUDIT_DIR=/user/dev/data/checks_balances_audit
@@ -26,6 +26,7 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_ingest_path"oozie_ws_helper.py
     hadoop fs -get "$hdfs_ingest_path"impala_utils.py
     hadoop fs -get "$hdfs_ingest_path"py_hdfs.py
+    hadoop fs -get "$hdfs_ingest_path"oozie_client.py
 }
 
 setup_env_vars() {
@@ -0,0 +1,364 @@
+"""Oozie web services client shared by checks and balances and QA. Jobs
+are listed page by page over a pooled http session and the details of
+finished workflows are cached in memory and on disk."""
+import hashlib
+import json
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from requests_kerberos import HTTPKerberosAuth
+from py_hdfs import get_session
+
+HTTP_TIMEOUT = 60
+PAGE_LEN = 100
+THREADS = 4
+# a workflow job in these states does not change anymore
+FINISHED = ('SUCCEEDED', 'KILLED', 'FAILED')
+
+
+def load(model_json):
+    """Returns the attributes of a model from a json string or the dict
+    of a parsed response"""
+    if isinstance(model_json, basestring):
+        return json.loads(model_json)
+    return model_json
+
+
+class Action(object):
+    """Action model"""
+
+    def __init__(self, action_json):
+        self.__dict__.update(load(action_json))
+
+    def get_status(self):
+        return self.status
+
+    def get_retries(self):
+        return self.retries
+
+    def get_transition(self):
+        return self.transition
+
+    def get_stats(self):
+        return self.stats
+
+    def get_start_time(self):
+        return self.startTime
+
+    def get_to_string(self):
+        return self.toString
+
+    def get_cred(self):
+        return self.cred
+
+    def get_error_message(self):
+        return self.errorMessage
+
+    def get_error_code(self):
+        return self.errorCode
+
+    def get_console_url(self):
+        return self.consoleUrl
+
+    def get_external_id(self):
+        return self.externalId
+
+    def get_external_status(self):
+        return self.externalStatus
+
+    def get_conf(self):
+        return self.conf
+
+    def get_type(self):
+        return self.type
+
+    def get_tracker_uri(self):
+        return self.trackerUri
+
+    def get_external_child_ids(self):
+        return self.externalChildIDs
+
+    def get_end_time(self):
+        return self.endTime
+
+    def get_data(self):
+        return self.data
+
+    def get_id(self):
+        return self.id
+
+    def get_name(self):
+        return self.name
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.__dict__ == other.__dict__
+        return False
+
+
+class Workflow(object):
+    """Workflow model"""
+
+    def __init__(self, workflow_json):
+        self.__dict__.update(load(workflow_json))
+
+    def get_status(self):
+        return self.status
+
+    def get_run(self):
+        return self.run
+
+    def get_start_time(self):
+        return self.startTime
+
+    def get_app_name(self):
+        return self.appName
+
+    def get_last_modified(self):
+        return self.lastModTime
+
+    def get_actions(self):
+        actions = []
+        for act in self.actions:
+            actions.append(Action(act))
+        return actions
+
+    def get_acl(self):
+        return self.acl
+
+    def get_app_path(self):
+        return self.appPath
+
+    def get_external_id(self):
+        return self.externalId
+
+    def get_console_url(self):
+        return self.consoleUrl
+
+    def get_conf(self):
+        return self.conf
+
+    def get_parent_id(self):
+        return self.parentId
+
+    def get_created_time(self):
+        return self.createdTime
+
+    def get_to_string(self):
+        return self.toString
+
+    def get_end_time(self):
+        return self.endTime
+
+    def get_id(self):
+        return self.id
+
+    def get_group(self):
+        return self.group
+
+    def get_user(self):
+        return self.user
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.__dict__ == other.__dict__
+        return False
+
+
+class Job(object):
+    """Job model"""
+
+    def __init__(self, job_json):
+        self.__dict__.update(load(job_json))
+
+    def get_offset(self):
+        return self.offset
+
+    def get_total(self):
+        return self.total
+
+    def get_len(self):
+        return self.len
+
+    def get_workflows(self):
+        workflows = []
+        for job in self.workflows:
+            workflows.append(Workflow(job))
+        return workflows
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.__dict__ == other.__dict__
+        return False
+
+
+class OozieClient(object):
+
+    """Oozie web services client. Pages of a job listing and details of
+    several jobs are fetched in a bounded thread pool. Finished workflow
+    jobs are cached under OOZIE_CACHE_DIR so the checks and balances and
+    QA actions of a workflow fetch them once.
+    """
+
+    def __init__(self, oozie_url, cache_dir=None, threads=None):
+        """
+        :param oozie_url: String e.g. http://oozie:25007/oozie/v2/
+        :param cache_dir: String job cache directory, OOZIE_CACHE_DIR by
+            default. Empty disables the disk cache
+        :param threads: Int max concurrent requests, OOZIE_THREADS by
+            default
+        """
+        self.oozie_url = oozie_url
+        self.session = get_session(oozie_url)
+        self.auth = HTTPKerberosAuth()
+        if cache_dir is None:
+            cache_dir = os.environ.get('OOZIE_CACHE_DIR', '')
+        if cache_dir:
+            # job ids are only unique within an oozie server
+            cache_dir = os.path.join(cache_dir,
+                                     hashlib.md5(oozie_url).hexdigest())
+        self.cache_dir = cache_dir
+        self.threads = threads or int(os.environ.get('OOZIE_THREADS',
+                                                     THREADS))
+        self.cache = {}
+
+    def get(self, query, params=None):
+        """Sends a GET request on the pooled session
+        :param query:String path under the oozie url
+        :param params:Dict query parameters
+        :return status_code:Int, parsed json or None
+        """
+        response = self.session.get(self.oozie_url + query, params=params,
+                                    auth=self.auth, timeout=HTTP_TIMEOUT)
+        if response.status_code == 200:
+            return response.status_code, response.json()
+        return response.status_code, None
+
+    def map(self, func, items):
+        """Calls func on every item, concurrently in a thread pool of at
+        most self.threads threads
+        :return results in the order of items
+        """
+        if len(items) < 2:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(self.threads, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def get_jobs(self, name=None, user=None, group=None, status=None,
+                 offset=1, length=PAGE_LEN, job_type='wf', max_jobs=None):
+        """Retrieve all jobs or filtered jobs. Follows the pagination of
+        the listing, pages after the first one are fetched concurrently
+        :param name:String The application name from the
+        workflow/coordinator/bundle definition
+        :param user:String The user that submitted the job
+        :param group:String The group for the job
+        :param status:String The status of the job (KILLED, SUCCEEDED, RUNNING)
+        :param offset:Int First job of the listing
+        :param length:Int Jobs per page
+        :param job_type:String Parameter for job type (wf,
+        coordinator or bundle)
+        :param max_jobs:Int Stop after this many jobs, all jobs if None
+        :return status_code:Int, job:Job
+        """
+        filters = []
+        for key, value in (('name', name), ('user', user), ('group', group),
+                           ('status', status)):
+            if value:
+                filters.append('{0}={1}'.format(key, value))
+        offset = offset or 1
+        length = length or PAGE_LEN
+        if max_jobs:
+            length = min(length, max_jobs)
+        params = {'offset': offset, 'len': length}
+        if filters:
+            params['filter'] = ';'.join(filters)
+        if job_type:
+            params['jobtype'] = job_type
+
+        def get_page(page_offset):
+            """Jobs of the page at page_offset"""
+            return self.get('jobs', dict(params, offset=page_offset))
+
+        status_code, first_page = get_page(offset)
+        if status_code != 200:
+            print "Error retrieving all jobs. Error code: {status}".format(
+                status=status_code)
+            return status_code, None
+        workflows = list(first_page.get('workflows', []))
+        total = first_page.get('total', len(workflows))
+        last = total if not max_jobs else min(total, offset + max_jobs - 1)
+        pages = self.map(get_page, range(offset + length, last + 1, length))
+        for page_status, page in pages:
+            if page_status != 200:
+                print "Error retrieving all jobs. Error code: {status}".\
+                    format(status=page_status)
+                return page_status, None
+            workflows.extend(page.get('workflows', []))
+        if max_jobs:
+            workflows = workflows[:max_jobs]
+        return status_code, Job({'offset': offset, 'len': len(workflows),
+                                 'total': total, 'workflows': workflows})
+
+    def get_job(self, id_val):
+        """Retrieve job with provided id, from the cache if it finished
+        :param id_val:String
+        :return status_code:Int, workflow_job:Workflow"""
+        job_json = self.get_cached(id_val)
+        if job_json is not None:
+            return 200, Workflow(job_json)
+        status_code, job_json = self.get('job/' + id_val)
+        if status_code != 200:
+            err_msg = "Error retrieving job, {id_val}. Error code: {status}"
+            print err_msg.format(id_val=id_val, status=status_code)
+            return status_code, None
+        if job_json.get('status') in FINISHED:
+            self.set_cached(id_val, job_json)
+        return status_code, Workflow(job_json)
+
+    def get_job_list(self, id_vals):
+        """Retrieve the jobs with provided ids concurrently
+        :param id_vals:List[String]
+        :return List[(status_code:Int, workflow_job:Workflow)] in the order
+        of id_vals"""
+        return self.map(self.get_job, list(id_vals))
+
+    def cache_path(self, id_val):
+        """File of a cached job"""
+        return os.path.join(self.cache_dir,
+                            id_val.replace('/', '_') + '.json')
+
+    def get_cached(self, id_val):
+        """Returns the cached json of a finished job or None"""
+        if id_val in self.cache:
+            return self.cache[id_val]
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.cache_path(id_val)) as file_h:
+                job_json = json.load(file_h)
+        except (IOError, ValueError):
+            return None
+        self.cache[id_val] = job_json
+        return job_json
+
+    def set_cached(self, id_val, job_json):
+        """Caches the json of a finished job"""
+        self.cache[id_val] = job_json
+        if not self.cache_dir:
+            return
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # renamed into place, concurrent readers never see half a file
+            file_h = tempfile.NamedTemporaryFile(dir=self.cache_dir,
+                                                 delete=False)
+            with file_h:
+                json.dump(job_json, file_h)
+            os.rename(file_h.name, self.cache_path(id_val))
+        except (IOError, OSError) as ex:
+            print 'Failed to cache oozie job {0}: {1}'.format(id_val, ex)
@@ -718,6 +718,43 @@ class ConnectionManager(object):
         hql = self.construct_hql(select_hql, create_hql, rpc_method)
         return hql
 
+    def get_parquet_stage_sql(self, parquet_file):
+        """Impala sql to load the parquet stage table straight from the
+        parquet files written by sqoop. The casts of the DDL type mapping
+        run in a single CREATE TABLE AS, there is no avro schema nor hive
+        rewrite
+        Args:
+            parquet_file: one of the sqoop parquet files, impala takes the
+                ingest table schema from it
+        """
+        select_hql = self.ddl_types.get_select_hql()
+        ingest_tbl = '`{0}`.`{1}`'.format(*self.ingest_tbl.split('.'))
+        stage_tbl = '`{0}`.`{1}`'.format(*self.parquet_stage_tbl.split('.'))
+        sql = (
+            "SET PARQUET_FILE_SIZE=268435456;\n\n"
+            "CREATE DATABASE IF NOT EXISTS `ingest`;\n\n"
+            "DROP TABLE IF EXISTS {ingest_tbl};\n\n"
+            "CREATE EXTERNAL TABLE {ingest_tbl} "
+            "LIKE PARQUET 'hdfs://{parquet_file}' "
+            "STORED AS PARQUET "
+            "LOCATION 'hdfs:///user/data/ingest/{target_dir}';\n\n"
+            "CREATE DATABASE IF NOT EXISTS `parquet_stage`;\n\n"
+            "DROP TABLE IF EXISTS {stage_tbl};\n\n"
+            "CREATE TABLE {stage_tbl}\n"
+            "PARTITIONED BY (incr_ingest_timestamp)\n"
+            "STORED AS PARQUET LOCATION "
+            "'hdfs:///user/data/{target_dir}/stage/'\n"
+            "AS SELECT {select_column_hql},\n"
+            " 'full_{partition_name}' AS `incr_ingest_timestamp`\n"
+            " FROM {ingest_tbl};\n\n"
+            "DROP TABLE {ingest_tbl};\n")
+        sql = sql.format(ingest_tbl=ingest_tbl, stage_tbl=stage_tbl,
+                         parquet_file=parquet_file,
+                         target_dir=self.target_dir,
+                         select_column_hql=select_hql,
+                         partition_name=self.partition_name)
+        return sql
+
     def get_incremental_hql(self):
         """Wrapper for building incremental ingestion hql"""
         select_column_hql = self.ddl_types.get_select_hql()
@@ -1057,7 +1094,7 @@ def main():
     hive2_jdbc_url = sys.argv[3]  # Hive jdbc_url
     ingest_time = sys.argv[4]  # ingest_time
 
-    # Either "full_load" or "incremental"
+    # Either "full_load", "parquet_load" or "incremental"
     # - currently only processing "incremental"
     rpc_method = sys.argv[5]
     queue_name = sys.argv[6]
@@ -1103,6 +1140,19 @@ def main():
         with open("parquet_live.hql", "a") as fileh:
             fileh.write(create_parquet_live_hql)
             print 'SUCCESS: created parquet_live.hql file'
+    elif rpc_method == 'parquet_load':
+        # full load from the parquet files of a sqoop --as-parquetfile
+        parquet_file = sys.argv[7]
+        parquet_stage_sql = conn_mgr.get_parquet_stage_sql(parquet_file)
+        create_parquet_live_hql = conn_mgr.create_parquet_live()
+
+        with open("parquet_stage.sql", "wb") as fileh:
+            fileh.write(parquet_stage_sql)
+            print 'SUCCESS: created parquet_stage.sql file'
+        with open("parquet_live.hql", "a") as fileh:
+            fileh.write(create_parquet_live_hql)
+            print 'SUCCESS: created parquet_live.hql file'
+        rpc_method = 'full_load'
     else:
         print 'Error: Unknown rpc_method:{0}'.format(rpc_method)
 
@@ -1,21 +1,116 @@
 """Save rows to hive table by manipulating files"""
+import atexit
+import collections
 import subprocess
 import os.path
+import re
+import time
+import posixpath
+import urllib
+import urlparse
 from random import choice
 import string
 from string import ascii_uppercase
+import requests
+from requests.adapters import HTTPAdapter
+from multiprocessing.pool import ThreadPool
 
 BASE_HDFS_CMD = ['hadoop', 'fs']
 HDFS_PUT_CMD = ['-put', '-f']
 HDFS_APPEND_CMD = ['-appendToFile']
 
+HTTP_TIMEOUT = 60
+POOL_SIZE = 10
+# one http session per WebHDFS or oozie url, shared by all clients of the
+# process
+SESSIONS = {}
+CLIENTS = {}
 
-class PyHDFS(object):
+# bounds of a batch of buffered rows
+BATCH_ROWS = 1000
+BATCH_BYTES = 8 * 1024 * 1024
+BATCH_SECONDS = 300
+# one batch writer per table directory, shared by all tables of the process
+WRITERS = {}
 
-    """Helper class performs Hadoop file system operations"""
+INCR_PARTITION = '/incr_ingest_timestamp='
+DATE_PARTITION = re.compile(r'\d{4}-\d{2}-\d{2}$')
 
-    def __init__(self, hdfs_base_dir):
-        self.hdfs_base_dir = hdfs_base_dir
+
+def get_session(url):
+    """Returns the pooled http session of a REST url"""
+    if url not in SESSIONS:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE,
+                              pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        SESSIONS[url] = session
+    return SESSIONS[url]
+
+
+def pool_map(func, items):
+    """Calls func on every item, concurrently in a thread pool of at most
+    POOL_SIZE threads, as many as the pooled session keeps connections
+    :return results in the order of items
+    """
+    if len(items) < 2:
+        return [func(item) for item in items]
+    pool = ThreadPool(min(POOL_SIZE, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def norm_path(path):
+    """Path without scheme, authority and duplicate slashes"""
+    return posixpath.normpath(urlparse.urlparse(path).path)
+
+
+def latest_partition(data_dir, entries):
+    """Picks the path to size from the listing of a live directory. All
+    new ingestions have an incr_ingest_timestamp partition, the latest
+    dated one is sized. Only full ingests, the whole live directory is.
+
+    :param data_dir: live directory
+    :param entries: child paths of data_dir
+    :return path
+    """
+    dated = []
+    for path in entries:
+        all_date = path.split(INCR_PARTITION)
+        if len(all_date) > 1 and DATE_PARTITION.match(all_date[1]):
+            dated.append(all_date[1])
+    if dated:
+        return data_dir + INCR_PARTITION + max(dated)
+    return data_dir
+
+
+def get_hdfs():
+    """Returns WebHdfs if WEBHDFS_URL is set and the namenode answers,
+    CliHdfs otherwise. The client is created once per process.
+    """
+    url = os.environ.get('WEBHDFS_URL', '')
+    user = os.environ.get('WEBHDFS_USER', '')
+    if (url, user) not in CLIENTS:
+        client = CliHdfs()
+        if url:
+            web_client = WebHdfs(url, user)
+            try:
+                web_client.exists('/')
+                client = web_client
+            except requests.exceptions.RequestException as ex:
+                print 'WebHDFS {0} unavailable, using hadoop fs: {1}'.format(
+                    url, ex)
+        CLIENTS[(url, user)] = client
+    return CLIENTS[(url, user)]
+
+
+class CliHdfs(object):
+
+    """HDFS operations with hadoop fs commands"""
 
     def execute(self, *args):
         """Method executes HDFS command via subprocess.
@@ -33,12 +128,73 @@ class PyHDFS(object):
         (response, error_msg) = proc.communicate()
         return (response, proc.returncode, error_msg)
 
-    def execute_with_echo(self, filepath, data, is_append=False):
+    def exists(self, path):
+        """True if the path exists"""
+        return self.execute('-test', '-e', path)[1] == 0
+
+    def ls(self, path):
+        """Returns the paths in a directory"""
+        response, return_code, _ = self.execute('-ls', path)
+        if return_code:
+            return []
+        # drwxr-xr-x   - user group          0 2017-03-28 07:41 /path
+        return [line.split()[-1] for line in response.splitlines()
+                if len(line.split()) >= 8]
+
+    def du(self, path):
+        """Returns the bytes used by a path"""
+        response, return_code, _ = self.execute('-du', '-s', path)
+        # 235583051  706749153  /user/data/mdm/member/fake_database/live
+        if return_code or not response.split() or \
+                not response.split()[0].isdigit():
+            return 0
+        return int(response.split()[0])
+
+    def ls_many(self, paths):
+        """Lists several directories with a single hadoop fs command
+
+        :param paths: directories
+        :return {path: [child path]}, missing and empty directories are
+            left out
+        """
+        listings = {}
+        if not paths:
+            return listings
+        requested = dict((norm_path(path), path) for path in paths)
+        # a missing directory fails the command, the others are listed
+        response, _, _ = self.execute('-ls', *paths)
+        for line in (response or '').splitlines():
+            # drwxr-xr-x   - user group          0 2017-03-28 07:41 /path
+            fields = line.split()
+            if len(fields) < 8:
+                continue
+            parent = requested.get(posixpath.dirname(norm_path(fields[-1])))
+            if parent is not None:
+                listings.setdefault(parent, []).append(fields[-1])
+        return listings
+
+    def du_many(self, paths):
+        """Returns the bytes used by several paths with a single hadoop fs
+        command, 0 for the paths that failed"""
+        sizes = dict((path, 0) for path in paths)
+        if not paths:
+            return sizes
+        requested = dict((norm_path(path), path) for path in paths)
+        response, _, _ = self.execute('-du', '-s', *paths)
+        for line in (response or '').splitlines():
+            # 235583051  706749153  /user/data/mdm/member/fake_database/live
+            fields = line.split()
+            if len(fields) >= 2 and fields[0].isdigit() and \
+                    norm_path(fields[-1]) in requested:
+                sizes[requested[norm_path(fields[-1])]] = int(fields[0])
+        return sizes
+
+    def write(self, path, data, is_append=False):
         """Method executes HDFS command via subprocess. It uses
         echo to post the data into stdout to avoid writing the
         data into a file every time.
 
-        :param filepath: Path of HDFS data file
+        :param path: Path of HDFS data file
         :param data: Data to be updated/inserted
         :param is_append: Flag determines insert or update data
         """
@@ -57,22 +213,166 @@ class PyHDFS(object):
         hdfs_cmd.append('row_data.txt')
 
         # destination file
-        hdfs_cmd.append(self.hdfs_base_dir + filepath)
+        hdfs_cmd.append(path)
         proc_hdfs = subprocess.Popen(
             hdfs_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
             shell=False)
         (response, error_msg) = proc_hdfs.communicate()
         return (response, proc_hdfs.returncode, error_msg)
 
-    def get_file(self, filepath, *options):
-        """Returns file name for the given file path"""
-        opts_as_str = self.tuple_to_string(options)
-        response, return_code, error_msg = self.execute(
-            '-ls', opts_as_str, self.hdfs_base_dir + filepath + '/*')
-        if not return_code:
-            return os.path.basename(response), return_code, error_msg
+
+class WebHdfs(object):
+
+    """HDFS operations with the WebHDFS or HttpFS REST api on a pooled
+    http session"""
+
+    def __init__(self, url, user=''):
+        self.url = url.rstrip('/')
+        self.session = get_session(self.url)
+        self.params = {}
+        self.auth = None
+        if user:
+            self.params['user.name'] = user
         else:
-            return response, return_code, error_msg
+            from requests_kerberos import HTTPKerberosAuth
+            self.auth = HTTPKerberosAuth()
+
+    def request(self, method, path, operation, data=None, **params):
+        """Sends a WebHDFS request, data goes to the redirect location
+
+        :param method: http method
+        :param path: absolute HDFS path
+        :param operation: WebHDFS op
+        :param data: file content
+        :param params: query parameters
+        """
+        params.update(self.params)
+        params['op'] = operation
+        response = self.session.request(
+            method, self.url + urllib.quote(path), params=params,
+            auth=self.auth, timeout=HTTP_TIMEOUT, allow_redirects=False)
+        if response.status_code == 307:
+            headers = {'Content-Type': 'application/octet-stream'}
+            response = self.session.request(
+                method, response.headers['Location'], data=data,
+                headers=headers, auth=self.auth, timeout=HTTP_TIMEOUT)
+        return response
+
+    def exists(self, path):
+        """True if the path exists"""
+        response = self.request('GET', path, 'GETFILESTATUS')
+        if response.status_code != 404:
+            response.raise_for_status()
+        return response.status_code == 200
+
+    def list_status(self, path):
+        """Returns the FileStatus dicts of a directory"""
+        response = self.request('GET', path, 'LISTSTATUS')
+        if response.status_code != 200:
+            return []
+        return response.json()['FileStatuses']['FileStatus']
+
+    def ls(self, path):
+        """Returns the paths in a directory"""
+        return [posixpath.join(path, status['pathSuffix'])
+                if status['pathSuffix'] else path
+                for status in self.list_status(path)]
+
+    def ls_many(self, paths):
+        """Lists several directories with concurrent requests
+
+        :param paths: directories
+        :return {path: [child path]}, missing and empty directories are
+            left out
+        """
+        listings = {}
+        for path, statuses in zip(paths, pool_map(self.list_status, paths)):
+            entries = [posixpath.join(path, status['pathSuffix'])
+                       for status in statuses if status['pathSuffix']]
+            if entries:
+                listings[path] = entries
+        return listings
+
+    def du(self, path):
+        """Returns the bytes used by a path"""
+        response = self.request('GET', path, 'GETCONTENTSUMMARY')
+        if response.status_code != 200:
+            return 0
+        return response.json()['ContentSummary']['length']
+
+    def du_many(self, paths):
+        """Returns the bytes used by several paths with concurrent
+        requests"""
+        return dict(zip(paths, pool_map(self.du, paths)))
+
+    def write(self, path, data, is_append=False):
+        """Writes data to a file, overwriting it unless is_append
+
+        :param path: Path of HDFS data file
+        :param data: Data to be updated/inserted
+        :param is_append: Flag determines insert or update data
+        """
+        response = None
+        if is_append:
+            response = self.request('POST', path, 'APPEND', data=data)
+        if response is None or response.status_code == 404:
+            # hadoop fs -appendToFile creates missing files
+            response = self.request('PUT', path, 'CREATE', data=data,
+                                    overwrite='true')
+        if 200 <= response.status_code < 300:
+            return ('', 0, None)
+        return (response.text, response.status_code, response.reason)
+
+
+class PyHDFS(object):
+
+    """Helper class performs Hadoop file system operations"""
+
+    def __init__(self, hdfs_base_dir):
+        self.hdfs_base_dir = hdfs_base_dir
+        self.hdfs = get_hdfs()
+
+    def execute(self, *args):
+        """Method executes HDFS command via subprocess.
+
+        :param args: Optional arguments
+        """
+        return CliHdfs().execute(*args)
+
+    def execute_with_echo(self, filepath, data, is_append=False):
+        """Writes the data to a file under the base dir with WebHDFS or
+        hadoop fs.
+
+        :param filepath: Path of HDFS data file
+        :param data: Data to be updated/inserted
+        :param is_append: Flag determines insert or update data
+        """
+        return self.hdfs.write(self.hdfs_base_dir + filepath, data,
+                               is_append)
+
+    def get_file(self, filepath):
+        """Returns file name for the given file path"""
+        paths = self.hdfs.ls(self.hdfs_base_dir + filepath)
+        if paths:
+            return os.path.basename(paths[-1]), 0, None
+        return '', 1, 'No files in {0}'.format(filepath)
+
+    def get_sizes(self, data_dirs):
+        """Returns the bytes used by the latest partition of several live
+        directories in one pass. The directories are listed together, the
+        partition of each is picked from its listing and the partitions
+        are summarized together.
+
+        :param data_dirs: live directories of tables
+        :return {data_dir: bytes}, missing and empty directories are
+            left out
+        """
+        listings = self.hdfs.ls_many(data_dirs)
+        targets = dict((data_dir, latest_partition(data_dir, entries))
+                       for data_dir, entries in listings.items())
+        sizes = self.hdfs.du_many(sorted(set(targets.values())))
+        return dict((data_dir, sizes[path])
+                    for data_dir, path in targets.items())
 
     def insert_update(self, filepath, data, is_append=False):
         """Inserts or updates data into HDFS data file.
@@ -81,10 +381,11 @@ class PyHDFS(object):
         :param data: Data to be updated/inserted
         :param is_append: Flag determines insert or update data
         """
+        filename = ''
         if filepath:
             response, _, _ = self.get_file(filepath)
             filename = response.strip()
-        else:
+        if not filename:
             filename = self.gen_random_filename()
 
         filepath = filepath + '/' + filename
@@ -103,3 +404,101 @@ class PyHDFS(object):
         """Generates random file name"""
         return 'PBO_' + (''.join(choice(ascii_uppercase +
                                         string.digits) for _ in range(10)))
+
+
+class BatchWriter(object):
+
+    """Buffers rows of a hive table in memory and writes them in batches
+    with one file per partition and a single on_flush call, the
+    INVALIDATE METADATA of the table, per batch. A batch is written when
+    max_rows or max_bytes are buffered, when the oldest row is max_seconds
+    old or on flush.
+    """
+
+    def __init__(self, pyhdfs, on_flush=None, replace=False,
+                 max_rows=BATCH_ROWS, max_bytes=BATCH_BYTES,
+                 max_seconds=BATCH_SECONDS):
+        """
+        :param pyhdfs: PyHDFS of the table directory
+        :param on_flush: called once after a batch is written
+        :param replace: a partition holds only its last row, the file of
+            the partition is overwritten. Rows are appended otherwise
+        """
+        self.pyhdfs = pyhdfs
+        self.on_flush = on_flush
+        self.replace = replace
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.partitions = collections.OrderedDict()
+        self.started = None
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.partitions.values())
+
+    def size(self):
+        """Bytes buffered"""
+        return sum(len(row) + 1 for rows in self.partitions.values()
+                   for row in rows)
+
+    def add(self, row, partition=''):
+        """Buffers a row, writes the batch if it is full
+
+        :param row: delimited row
+        :param partition: partition dir under the table dir, e.g.
+            /domain=member/table=db_tbl
+        """
+        if self.started is None:
+            self.started = time.time()
+        if self.replace:
+            self.partitions.pop(partition, None)
+            self.partitions[partition] = [row]
+        else:
+            self.partitions.setdefault(partition, []).append(row)
+        if len(self) >= self.max_rows or self.size() >= self.max_bytes or \
+                time.time() - self.started >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows, one file per partition"""
+        partitions = self.partitions
+        self.partitions = collections.OrderedDict()
+        self.started = None
+        if not partitions:
+            return
+        for partition, rows in partitions.items():
+            data = '\n'.join(rows)
+            if self.replace:
+                response = self.pyhdfs.insert_update(partition, data)
+            else:
+                response = self.pyhdfs.insert_update(partition, data,
+                                                     is_append=True)
+            if response and response[1]:
+                print 'Failed to write {0} rows to {1}{2}: {3}'.format(
+                    len(rows), self.pyhdfs.hdfs_base_dir, partition,
+                    response[2])
+        if self.on_flush is not None:
+            self.on_flush()
+
+
+def get_batch_writer(hdfs_base_dir, on_flush=None, replace=False):
+    """Returns the batch writer of a table directory. Rows of all tables
+    and workflows of the process go to the same writer. Batch bounds are
+    read from HDFS_BATCH_ROWS, HDFS_BATCH_BYTES and HDFS_BATCH_SECONDS.
+    """
+    if hdfs_base_dir not in WRITERS:
+        WRITERS[hdfs_base_dir] = BatchWriter(
+            PyHDFS(hdfs_base_dir), on_flush, replace,
+            int(os.environ.get('HDFS_BATCH_ROWS', BATCH_ROWS)),
+            int(os.environ.get('HDFS_BATCH_BYTES', BATCH_BYTES)),
+            int(os.environ.get('HDFS_BATCH_SECONDS', BATCH_SECONDS)))
+    return WRITERS[hdfs_base_dir]
+
+
+def flush_batch_writers():
+    """Writes the rows buffered by all batch writers"""
+    for writer in WRITERS.values():
+        writer.flush()
+
+
+atexit.register(flush_batch_writers)
@@ -3,6 +3,7 @@ Compares the following between source and target tables:
 1. Compares row counts
 2. Compares DDL
 3. Compares random rows from source and fetches corresponding rows from hive
+4. Compares per bucket checksums of source and hive tables
 It
 also does:
 Validates DDL and sample data from target table
@@ -17,6 +18,7 @@ import datetime
 import decimal
 import math
 import json
+import random
 from abc import ABCMeta, abstractmethod
 from itertools import izip, ifilter
 import voluptuous
@@ -24,7 +26,7 @@ import sql_queries
 from sqoop_utils import SqoopUtils
 from impala_utils import ImpalaConnect
 from oozie_ws_helper import ChecksBalancesManager
-from py_hdfs import PyHDFS
+from py_hdfs import get_batch_writer, flush_batch_writers
 
 
 LOG_FILE = 'qa.log'
@@ -41,6 +43,82 @@ TERADATA = 'teradata'
 SQL_SERVER = 'sql_server'
 MY_SQL = 'mysql'
 POSTGRESQL = 'postgresql'
+# max sampled rows looked up in hive with one query
+FETCH_ROWS_BATCH_SIZE = 25
+# random rows sampling, overridden by QA_SAMPLE_SIZE, QA_SAMPLE_MODE and
+# QA_SAMPLE_PERCENT env variables
+SAMPLE_SIZE = 5
+SAMPLE_PERCENT = 1.0
+# full table sort with a random order
+SAMPLE_ORDER = 'order'
+# vendor block/page sampling, no sort
+SAMPLE_BLOCK = 'block'
+# random ranges of the split by column, falls back to block sampling
+SAMPLE_KEY_RANGE = 'key_range'
+SAMPLE_MODES = (SAMPLE_ORDER, SAMPLE_BLOCK, SAMPLE_KEY_RANGE)
+# number of key ranges the split by span is cut into, per sampled row
+KEY_RANGE_SLICES = 100
+# checksum reconciliation: buckets per split by range, max drill down depth,
+# mismatching buckets of a range drilled into, total bucket queries and
+# relative tolerance of float sums
+RECONCILE_BUCKETS = 16
+RECONCILE_MAX_DEPTH = 4
+RECONCILE_MAX_MISMATCHES = 4
+RECONCILE_MAX_QUERIES = 32
+RECONCILE_TOLERANCE = decimal.Decimal('0.000001')
+
+
+def build_checksum_query(table, aggregates, split_by=None, key_range=None,
+                         width=None):
+    """Build the bucket checksum query of a table.
+    Without split_by the whole table is one bucket, else the key_range of
+    split_by is cut into buckets of width keys.
+    Args:
+        table: table name
+        aggregates: aggregate column expressions
+        split_by: numeric split by column
+        key_range: (min key, max key) of split_by
+        width: number of keys per bucket
+    """
+    columns = ', '.join(['COUNT(*)'] + aggregates)
+    if not split_by:
+        return "SELECT 0, {0} FROM {1}".format(columns, table)
+    bucket = "FLOOR(({0} - {1}) / {2})".format(split_by, key_range[0], width)
+    query = ("SELECT {0}, {1} FROM {2} WHERE {3} BETWEEN {4} AND {5} "
+             "GROUP BY {0}")
+    return query.format(bucket, columns, table, split_by, key_range[0],
+                        key_range[1])
+
+
+def _checksum_value(value):
+    """Normalize a sqoop or impala aggregate value"""
+    if value is None or str(value).strip() in ('(null)', ''):
+        return None
+    return decimal.Decimal(str(value).strip())
+
+
+def checksums_by_bucket(rows):
+    """Map bucket number to its checksums"""
+    checksums = {}
+    for row in rows:
+        bucket = long(_checksum_value(row[0]))
+        checksums[bucket] = [_checksum_value(value) for value in row[1:]]
+    return checksums
+
+
+def checksums_match(src_checksums, target_checksums):
+    """Compare checksums of a bucket, float sums within tolerance"""
+    if src_checksums is None or target_checksums is None:
+        return src_checksums == target_checksums
+    for src_val, target_val in izip(src_checksums, target_checksums):
+        if src_val == target_val:
+            continue
+        if src_val is None or target_val is None:
+            return False
+        largest = max(abs(src_val), abs(target_val))
+        if abs(src_val - target_val) > largest * RECONCILE_TOLERANCE:
+            return False
+    return True
 
 
 class LogHandler(object):
@@ -52,7 +130,13 @@ class LogHandler(object):
         self.host = host
         self.buffer_logs = []
         self.qa_status_log = ''
-        self.pyhdfs = PyHDFS(qa_results_tbl_path)
+        # rows of all tables of the run are written in batches with a
+        # single INVALIDATE METADATA to reflect Hive file-based operations
+        # in Impala
+        self.writer = get_batch_writer(
+            qa_results_tbl_path,
+            lambda: ImpalaConnect.invalidate_metadata(
+                self.host, 'ibis.qa_resultsv2'))
 
     def info(self, log):
         """Print to stdout."""
@@ -94,14 +178,8 @@ class LogHandler(object):
         with open(LOG_FILE, 'wb') as file_h:
             file_h.write(log_txt)
 
-        # File-based insert operation
-        self.pyhdfs.insert_update('',
-                                  self.prepares_data(format_data),
-                                  is_append=True)
-
-        # We need to perform INVALIDATE METADATA to reflect Hive
-        # file-based operations in Impala.
-        ImpalaConnect.invalidate_metadata(self.host, 'ibis.qa_resultsv2')
+        # File-based insert operation, written with the next batch
+        self.writer.add(self.prepares_data(format_data))
 
         msg = '\n' + '#' * 100
         msg += ("\nFor QA results: Run query in Impala: "
@@ -175,12 +253,22 @@ class SourceTable(SqoopUtils):
 
     column_count = 0
     row_count = 0
+    sample_size = SAMPLE_SIZE
+    sample_mode = SAMPLE_BLOCK
+    sample_percent = SAMPLE_PERCENT
+    split_by = ''
+    # trimmed string length, used by checksum reconciliation
+    string_length_expr = 'LENGTH(TRIM({0}))'
 
     @property
     def rand_rows_num(self):
         """Number of random rows to fetch."""
-        rows_num = 5
-        return rows_num
+        return self.sample_size
+
+    @property
+    def sample_table(self):
+        """Table name used in sampling queries."""
+        return self.table
 
     def __init__(self, sqoop_jars, jdbc_url, connection_factories,
                  user_name, jceks, password_alias, table, schema):
@@ -270,23 +358,130 @@ class SourceTable(SqoopUtils):
             raise ValueError('Error in get ddl')
         return ddl_list
 
+    def set_sampling(self, sample_mode=None, sample_size=None,
+                     sample_percent=None, split_by=None):
+        """Set random rows sampling strategy.
+        Args:
+            sample_mode: one of SAMPLE_MODES
+            sample_size: number of random rows to fetch
+            sample_percent: percent of table blocks sampled
+            split_by: split by column of the table, used by key_range
+        """
+        if sample_mode in SAMPLE_MODES:
+            self.sample_mode = sample_mode
+        elif sample_mode:
+            logger.info('Unknown sample mode: {0}, using {1}'.format(
+                sample_mode, self.sample_mode))
+        if sample_size:
+            self.sample_size = int(sample_size)
+        if sample_percent:
+            self.sample_percent = float(sample_percent)
+        if split_by and split_by != 'no-split':
+            self.split_by = split_by
+
+    def build_sample_queries(self, ddl_objs):
+        """Random rows queries to try, cheapest first.
+        The last one is the full table sort of build_rand_rows_query
+        """
+        queries = []
+        if self.sample_mode == SAMPLE_KEY_RANGE:
+            queries.append(self.build_key_range_query(ddl_objs))
+        if self.sample_mode in (SAMPLE_BLOCK, SAMPLE_KEY_RANGE):
+            queries.append(self.build_block_sample_query(ddl_objs))
+        queries = [query for query in queries if query]
+        queries.append(self.build_rand_rows_query(ddl_objs))
+        return queries
+
     def get_rand_rows(self, src_ddls, filter_columns=None):
-        """Select random rows from source."""
+        """Select random rows from source.
+        Sampling queries that fail or return no rows fall back to the
+        next query
+        """
         msg = "Random rows validation for {0} rows:".format(self.rand_rows_num)
         logger.info(msg)
-        rand_rows = []
-        rand_rows_query = self.build_rand_rows_query(src_ddls)
-        returncode, output, err = self.eval(rand_rows_query)
-        # print 'src rand rows', output
-        if returncode == 0:
-            _, rand_rows = self.fetch_rows_sqoop(output, strip_col_val=True,
-                                                 filter_columns=filter_columns)
-        else:
-            logger.error(output)
+        queries = self.build_sample_queries(src_ddls)
+        for rand_rows_query in queries[:-1]:
+            returncode, _, rand_rows, err = self.eval_rows(
+                rand_rows_query, strip_col_val=True,
+                filter_columns=filter_columns)
+            if returncode == 0 and rand_rows:
+                return rand_rows
+            msg = 'Sampling returned no rows, falling back: {0} {1}'
+            logger.info(msg.format(rand_rows_query, err))
+        returncode, _, rand_rows, err = self.eval_rows(
+            queries[-1], strip_col_val=True, filter_columns=filter_columns)
+        if returncode != 0:
             logger.error(err)
             raise ValueError('Error in get rand rows')
         return rand_rows
 
+    def build_limit_query(self, selected_columns, condition):
+        """Build a query fetching rand_rows_num rows matching condition.
+        Db specific methods
+        """
+        query = "SELECT {0} FROM {1} WHERE {2} LIMIT {3}"
+        return query.format(selected_columns, self.sample_table, condition,
+                            self.rand_rows_num)
+
+    def build_block_sample_query(self, ddl_objs):
+        """Build the query sampling table blocks instead of sorting.
+        None if the db has no block sampling. Db specific methods
+        """
+        return None
+
+    def get_key_range(self):
+        """Fetch min and max of the split by column.
+        Returns: (min, max) or None if split by is missing or not numeric
+        """
+        if not self.split_by:
+            return None
+        query = "SELECT MIN({0}), MAX({0}) FROM {1}".format(
+            self.split_by, self.sample_table)
+        returncode, output, err = self.eval(query)
+        if returncode != 0:
+            logger.info('Key range lookup failed: {0}'.format(err))
+            return None
+        _, rows = self.fetch_rows_sqoop(output)
+        try:
+            return long(rows[0][0]), long(rows[0][1])
+        except (IndexError, ValueError):
+            logger.info('Split by {0} is not numeric'.format(self.split_by))
+            return None
+
+    def get_checksums(self, aggregates, split_by=None, key_range=None,
+                      width=None):
+        """Fetch count and aggregate checksums per bucket.
+        Returns: dict of bucket number to list of checksums
+        """
+        query = build_checksum_query(self.sample_table, aggregates, split_by,
+                                     key_range, width)
+        returncode, output, err = self.eval(query)
+        if returncode != 0:
+            logger.error(output)
+            logger.error(err)
+            raise ValueError('Error in get checksums')
+        _, rows = self.fetch_rows_sqoop(output)
+        return checksums_by_bucket(rows)
+
+    def build_key_range_query(self, ddl_objs):
+        """Build the query fetching rows of random split by ranges.
+        Uses the split by index instead of scanning the table
+        """
+        key_range = self.get_key_range()
+        if not key_range:
+            return None
+        min_key, max_key = key_range
+        width = max(1, (max_key - min_key) /
+                    (self.rand_rows_num * KEY_RANGE_SLICES))
+        conditions = []
+        for _ in range(self.rand_rows_num):
+            start = random.randint(min_key, max_key)
+            conditions.append('{0} BETWEEN {1} AND {2}'.format(
+                self.split_by, start, start + width))
+        selected_columns = SourceTable.build_rand_rows_query(self, ddl_objs)
+        return self.build_limit_query(selected_columns,
+                                      '(' + ' OR '.join(conditions) + ')')
+
     @abstractmethod
     def build_rand_rows_query(self, ddl_objs):
         """Abstract method.
@@ -360,10 +555,21 @@ class TargetTable(object):
         row_count = -1
         count_query = "SELECT COUNT(*) FROM {0};".format(self.table)
         output = ImpalaConnect.run_query(self.impala_host, self.table,
-                                         count_query)
+                                         count_query, invalidate_once=True)
         row_count = output[0][0]
         return int(row_count)
 
+    def get_checksums(self, aggregates, split_by=None, key_range=None,
+                      width=None):
+        """Fetch count and aggregate checksums per bucket.
+        Returns: dict of bucket number to list of checksums
+        """
+        query = build_checksum_query(self.table, aggregates, split_by,
+                                     key_range, width)
+        rows = ImpalaConnect.run_query(self.impala_host, self.table, query,
+                                       invalidate_once=True)
+        return checksums_by_bucket(rows)
+
     def set_column_props(self, ddl):
         """Set column names and count."""
         ddl_list = []
@@ -399,7 +605,7 @@ class TargetTable(object):
         ddl_list = []
         ddl_query = self.build_ddl_query()
         output = ImpalaConnect.run_query(
-            self.impala_host, self.table, ddl_query)
+            self.impala_host, self.table, ddl_query, invalidate_once=True)
         # print 'output', output
         ddl_list = self.set_column_props(output)
         # sort the list of ddl objects as source and target ddl output
@@ -430,10 +636,10 @@ class TargetTable(object):
                         selected_columns.append(ddlObj.column_name)
         return column_names, selected_columns
 
-    def _build_fetch_row_query(self, src_ddls, target_ddls, src_row, src_obj):
-        """Build impala query for fetching rows from hive using
-        source sql row data."""
-        target_columns, selected_columns = self.get_column_names(target_ddls)
+    def _build_where_condition(self, src_ddls, target_ddls, src_row,
+                               src_obj):
+        """Build impala where condition matching source sql row data."""
+        target_columns, _ = self.get_column_names(target_ddls)
         numeric_columns, _ = self.get_column_names(
             target_ddls, data_types=TargetTable.NUMERIC_TYPES)
         char_columns, _ = self.get_column_names(target_ddls,
@@ -482,32 +688,82 @@ class TargetTable(object):
                 where_columns.append(condition)
 
         where_condition = ' and '.join(where_columns)
-        selected_columns_statement = ', '.join(selected_columns)
+        return where_condition.strip()
+
+    def _build_fetch_rows_query(self, target_ddls, conditions):
+        """Build one impala query for fetching the rows of several source
+        rows. Every source row gets a boolean match column so that the
+        fetched rows can be mapped back to the source rows.
+        Args:
+            target_ddls: list of ColumnDDL
+            conditions: where conditions of the source rows
+        """
+        _, selected_columns = self.get_column_names(target_ddls)
+        match_columns = []
+        for index, condition in enumerate(conditions):
+            match_columns.append(
+                "COALESCE(({0}), false) AS ibis_qa_match_{1}".format(
+                    condition, index))
+        or_condition = ' or '.join(
+            ['({0})'.format(condition) for condition in conditions])
         query = "SELECT {0} FROM {1} WHERE {2};".format(
-            selected_columns_statement, self.table, where_condition.strip())
+            ', '.join(selected_columns + match_columns), self.table,
+            or_condition)
         return query
 
+    def fetch_rows_batch(self, source_ddls, target_ddls, source_rows,
+                         src_obj):
+        """Fetch hive rows of several source rows with one query.
+        Returns:
+            list of fetched hive rows for every source row
+        """
+        matches = [[] for _ in source_rows]
+        conditions = []
+        row_indexes = []
+        for index, src_row in enumerate(source_rows):
+            condition = self._build_where_condition(source_ddls, target_ddls,
+                                                    src_row, src_obj)
+            if condition:
+                conditions.append(condition)
+                row_indexes.append(index)
+        if not conditions:
+            return matches
+
+        query = self._build_fetch_rows_query(target_ddls, conditions)
+        target_data = ImpalaConnect.run_query(
+            self.impala_host, self.table, query, invalidate_once=True)
+        num_columns = len(target_ddls)
+        for target_row in target_data:
+            for match_index, is_match in enumerate(target_row[num_columns:]):
+                if is_match:
+                    matches[row_indexes[match_index]].append(
+                        target_row[:num_columns])
+        return matches
+
     def get_corresponding_rows(self, source_ddls, target_ddls,
-                               source_rand_rows, src_obj):
-        """Fetch rows from source then query the hive tables for same rows."""
+                               source_rand_rows, src_obj,
+                               batch_size=FETCH_ROWS_BATCH_SIZE):
+        """Fetch rows from source then query the hive tables for same rows.
+        Source rows are looked up batch_size rows per impala query.
+        """
         target_rows = []
         success_count = 0
 
-        for cnt, src_row in enumerate(source_rand_rows):
+        fetched_rows = []
+        for start in range(0, len(source_rand_rows), batch_size):
+            fetched_rows.extend(self.fetch_rows_batch(
+                source_ddls, target_ddls,
+                source_rand_rows[start:start + batch_size], src_obj))
+
+        for cnt, target_col_data in enumerate(fetched_rows):
             if cnt - success_count > 10:
                 failed_msg = ("Hive rand rows. Too many rows failed to fetch."
                               " Iterated:{0} Succeded:{1}")
                 failed_msg = failed_msg.format(cnt, success_count)
                 raise ValueError(failed_msg)
 
-            query = self._build_fetch_row_query(source_ddls, target_ddls,
-                                                src_row, src_obj)
-            target_col_data = ImpalaConnect.run_query(self.impala_host,
-                                                      self.table, query)
             if target_col_data:
                 if len(target_col_data) == 1:
-                    # print query
-                    # print '\t', target_col_data
                     logger.info('One row fetched')
                     target_rows.append(target_col_data[0])
                     success_count += 1
@@ -517,14 +773,10 @@ class TargetTable(object):
                     logger.error(err_msg)
                     target_rows.append([])
             else:
-                # print src_row
-                # print query
-                # print '\t', target_col_data
                 err_msg = "Hive rand rows: No rows fetched from " \
                           "hive: {0}".format(target_col_data)
                 logger.error(err_msg)
                 target_rows.append([])
-            # print '\n'
         return target_rows
 
 
@@ -627,6 +879,21 @@ class OracleTable(SourceTable):
                              self.rand_rows_num + 1)
         return query
 
+    def build_block_sample_query(self, ddl_objs):
+        """Build the query sampling table blocks."""
+        selected_columns = SourceTable.build_rand_rows_query(self, ddl_objs)
+        query = ("SELECT {0} FROM {1} SAMPLE BLOCK ({2}) "
+                 "WHERE ROWNUM < {3}")
+        query = query.format(selected_columns, self.table,
+                             self.sample_percent, self.rand_rows_num + 1)
+        return query
+
+    def build_limit_query(self, selected_columns, condition):
+        """Build a query fetching rand_rows_num rows matching condition."""
+        query = "SELECT {0} FROM {1} WHERE {2} AND ROWNUM < {3}"
+        return query.format(selected_columns, self.table, condition,
+                            self.rand_rows_num + 1)
+
 
 class DB2Table(SourceTable):
     """DB2 specific methods."""
@@ -668,6 +935,22 @@ class DB2Table(SourceTable):
         query = query.format(selected_columns)
         return query
 
+    def build_block_sample_query(self, ddl_objs):
+        """Build the query sampling table pages."""
+        selected_columns = SourceTable.build_rand_rows_query(self, ddl_objs)
+        query = ("SELECT {0}, RAND() AS IDX FROM {1} TABLESAMPLE SYSTEM ({2})"
+                 " FETCH FIRST {3} ROWS ONLY")
+        query = query.format(selected_columns, self.table,
+                             self.sample_percent, self.rand_rows_num)
+        return query
+
+    def build_limit_query(self, selected_columns, condition):
+        """Build a query fetching rand_rows_num rows matching condition."""
+        query = ("SELECT {0}, RAND() AS IDX FROM {1} WHERE {2}"
+                 " FETCH FIRST {3} ROWS ONLY")
+        return query.format(selected_columns, self.table, condition,
+                            self.rand_rows_num)
+
     def get_rand_rows(self, src_ddls):
         """Select random rows from db2. Ignore the last column."""
         # ignore the last item which is RAND()
@@ -695,6 +978,8 @@ class TeraDataTable(SourceTable):
         TargetTable.DOUBLE: ['f'],
         TargetTable.SMALLINT: ['i2'], TargetTable.BIGINT: ['i8']}
 
+    string_length_expr = 'CHARACTER_LENGTH(TRIM({0}))'
+
     def __init__(self, *args):
         """Init teradata table."""
         super(self.__class__, self).__init__(*args)
@@ -723,6 +1008,12 @@ class TeraDataTable(SourceTable):
         query = query.format(selected_columns, self.table, self.rand_rows_num)
         return query
 
+    def build_limit_query(self, selected_columns, condition):
+        """Build a query fetching rand_rows_num rows matching condition."""
+        query = "SELECT TOP {0} {1} FROM {2} WHERE {3}"
+        return query.format(self.rand_rows_num, selected_columns, self.table,
+                            condition)
+
 
 class MSSqlTable(SourceTable):
     """Microsoft SQL server specific methods."""
@@ -753,6 +1044,9 @@ class MSSqlTable(SourceTable):
         TargetTable.SMALLINT: [SMALLINT], TargetTable.TINYINT: [TINYINT],
         TargetTable.BIGINT: [BIGINT]}
 
+    # LEN ignores trailing spaces
+    string_length_expr = 'LEN(LTRIM({0}))'
+
     def __init__(self, *args):
         """Init MSSQL table."""
         super(self.__class__, self).__init__(*args)
@@ -811,6 +1105,26 @@ class MSSqlTable(SourceTable):
                              full_table_name)
         return query
 
+    @property
+    def sample_table(self):
+        """Table name used in sampling queries."""
+        return self.database_name + '.' + self.schema + '.' + self.table_name
+
+    def build_block_sample_query(self, ddl_objs):
+        """Build the query sampling table pages."""
+        selected_columns = SourceTable.build_rand_rows_query(self, ddl_objs)
+        query = ("SELECT TOP {0} {1} FROM {2} TABLESAMPLE SYSTEM "
+                 "({3} PERCENT)")
+        query = query.format(self.rand_rows_num, selected_columns,
+                             self.sample_table, self.sample_percent)
+        return query
+
+    def build_limit_query(self, selected_columns, condition):
+        """Build a query fetching rand_rows_num rows matching condition."""
+        query = "SELECT TOP {0} {1} FROM {2} WHERE {3}"
+        return query.format(self.rand_rows_num, selected_columns,
+                            self.sample_table, condition)
+
 
 class PostgreSql(SourceTable):
     """Microsoft SQL server specific methods."""
@@ -895,12 +1209,22 @@ class PostgreSql(SourceTable):
         #  self).build_rand_rows_query(ddl_objs)
         selected_columns = super(self.__class__,
                                  self).build_rand_rows_query(ddl_objs)
-        full_table_name = self.database_name + '.' + self.schema + '.' + \
-            self.table_name
-        query = ("SELECT TOP {0} {1} FROM {2} ORDER "
-                 "BY NEWID()")
-        query = query.format(self.rand_rows_num, selected_columns,
-                             full_table_name)
+        query = "SELECT {0} FROM {1} ORDER BY RANDOM() LIMIT {2}"
+        query = query.format(selected_columns, self.sample_table,
+                             self.rand_rows_num)
+        return query
+
+    @property
+    def sample_table(self):
+        """Table name used in sampling queries."""
+        return self.database_name + '.' + self.schema + '.' + self.table_name
+
+    def build_block_sample_query(self, ddl_objs):
+        """Build the query sampling table rows without a sort."""
+        selected_columns = SourceTable.build_rand_rows_query(self, ddl_objs)
+        query = "SELECT {0} FROM {1} TABLESAMPLE BERNOULLI ({2}) LIMIT {3}"
+        query = query.format(selected_columns, self.sample_table,
+                             self.sample_percent, self.rand_rows_num)
         return query
 
 
@@ -1047,6 +1371,9 @@ class TableValidation(object):
         else:
             raise ValueError("Unrecognized source found"
                              "in: '{0}'".format(params['jdbc_url']))
+        self.src_obj.set_sampling(
+            params.get('sample_mode'), params.get('sample_size'),
+            params.get('sample_percent'), params.get('split_by'))
 
         msg = "Evaluating Source: {0} and Hive: {1} tables. Type: {2}"
         msg = msg.format(self.source_table, self.target_table, self.src_type)
@@ -1396,6 +1723,130 @@ class TableValidation(object):
 
         return status
 
+    def build_checksum_aggregates(self, src_ddls, target_ddls):
+        """Build per column aggregates computed on both sides.
+        Numeric columns are summed, char columns sum their trimmed length
+        and other columns count their non null values. Hash functions
+        differ across databases, so they are not used.
+        Returns: source aggregates, target aggregates
+        """
+        src_aggregates = []
+        target_aggregates = []
+        for src_ddl, target_ddl in izip(src_ddls, target_ddls):
+            src_col = src_ddl.column_name
+            target_col = target_ddl.column_name
+            if target_ddl.data_type in TargetTable.NUMERIC_TYPES:
+                aggregate = 'SUM(CAST({0} AS DECIMAL(38,6)))'
+                src_aggregates.append(aggregate.format(src_col))
+                target_aggregates.append(aggregate.format(target_col))
+            elif target_ddl.data_type in [TargetTable.CHAR,
+                                          TargetTable.VARCHAR]:
+                src_aggregates.append('SUM({0})'.format(
+                    self.src_obj.string_length_expr.format(src_col)))
+                # impala LENGTH counts bytes, CHAR_LENGTH characters
+                target_aggregates.append(
+                    'SUM(CHAR_LENGTH(TRIM({0})))'.format(target_col))
+            else:
+                src_aggregates.append('COUNT({0})'.format(src_col))
+                target_aggregates.append('COUNT({0})'.format(target_col))
+        return src_aggregates, target_aggregates
+
+    def reconcile_buckets(self, src_aggregates, target_aggregates, key_range):
+        """Compare bucket checksums of a split by key range and drill
+        down into mismatching buckets, level by level. A range is
+        reported as is once it has more than RECONCILE_MAX_MISMATCHES
+        mismatching buckets, RECONCILE_MAX_DEPTH is reached or the
+        RECONCILE_MAX_QUERIES sqoop evals are spent.
+        Returns: list of mismatching (min key, max key) ranges
+        """
+        src_split_by = self.src_obj.split_by
+        target_split_by = SourceTable.convert_special_chars(
+            src_split_by).lower()
+        mismatches = []
+        queries = 0
+        ranges = [key_range]
+        for depth in range(RECONCILE_MAX_DEPTH + 1):
+            next_ranges = []
+            for min_key, max_key in ranges:
+                if queries >= RECONCILE_MAX_QUERIES:
+                    mismatches.append((min_key, max_key))
+                    continue
+                # ceil, so that RECONCILE_BUCKETS buckets cover the range
+                width = max(1, (max_key - min_key + RECONCILE_BUCKETS) /
+                            RECONCILE_BUCKETS)
+                src_checksums = self.src_obj.get_checksums(
+                    src_aggregates, src_split_by, (min_key, max_key), width)
+                target_checksums = self.target_obj.get_checksums(
+                    target_aggregates, target_split_by, (min_key, max_key),
+                    width)
+                queries += 1
+                buckets = []
+                for bucket in sorted(set(src_checksums) |
+                                     set(target_checksums)):
+                    if not checksums_match(src_checksums.get(bucket),
+                                           target_checksums.get(bucket)):
+                        low = min_key + bucket * width
+                        buckets.append((low, min(max_key, low + width - 1)))
+                if len(buckets) > RECONCILE_MAX_MISMATCHES:
+                    mismatches.append((min_key, max_key))
+                    continue
+                for low, high in buckets:
+                    if high > low and depth < RECONCILE_MAX_DEPTH:
+                        next_ranges.append((low, high))
+                    else:
+                        mismatches.append((low, high))
+            ranges = next_ranges
+        if queries >= RECONCILE_MAX_QUERIES:
+            logger.info('Checksum query budget of {0} spent, mismatched '
+                        'ranges may be coarse'.format(RECONCILE_MAX_QUERIES))
+        return sorted(mismatches)
+
+    def checksums_reconcile(self, src_ddls, target_ddls):
+        """Compare whole table checksums of source and target tables,
+        then split by key ranges of a mismatching table.
+        """
+        logger.info('Checksum reconciliation:')
+        src_aggregates, target_aggregates = self.build_checksum_aggregates(
+            src_ddls, target_ddls)
+        src_checksums = self.src_obj.get_checksums(src_aggregates)
+        target_checksums = self.target_obj.get_checksums(target_aggregates)
+        if checksums_match(src_checksums.get(0), target_checksums.get(0)):
+            logger.info('Checksums match. Rows: {0}'.format(
+                src_checksums[0][0]))
+            return True
+
+        err_msg = 'FAILED. Table checksums, source: {0} hive: {1}'
+        logger.error(err_msg.format(src_checksums.get(0),
+                                    target_checksums.get(0)))
+        key_range = self.src_obj.get_key_range()
+        if key_range:
+            mismatches = self.reconcile_buckets(
+                src_aggregates, target_aggregates, key_range)
+            for low, high in mismatches:
+                logger.error('Mismatched {0} range: {1} - {2}'.format(
+                    self.src_obj.split_by, low, high))
+        else:
+            logger.info('No numeric split by to locate mismatched rows')
+        return False
+
+    def start_reconciliation(self):
+        """Start validating full table checksums"""
+        if not self.src_obj:
+            return True
+        logger.info('QA checksum reconciliation')
+        qa_stages = {}
+
+        source_ddls = self.src_obj.get_ddl()
+        target_ddls = self.target_obj.get_ddl()
+        self.ddl_bool = self.ddl_matches(source_ddls, target_ddls)
+        qa_stages['ddl'] = self.ddl_bool
+
+        self.rows_bool = self.checksums_reconcile(source_ddls, target_ddls)
+        qa_stages['checksums'] = self.rows_bool
+
+        logger.qa_status(qa_stages)
+        return self.ddl_bool and self.rows_bool
+
     def start_incremental(self, full_target_table, action):
         """Start validating tables for incremental"""
         if not self.src_obj:
@@ -1506,7 +1957,13 @@ def main():
         'oozie_url': sys.argv[11],
         'workflow_name': sys.argv[12],
         'impala_host': os.environ['IMPALA_HOST'],
-        'qa_results_tbl_path': sys.argv[13]
+        'qa_results_tbl_path': sys.argv[13],
+        'sample_size': os.environ.get('QA_SAMPLE_SIZE', SAMPLE_SIZE),
+        'sample_mode': os.environ.get('QA_SAMPLE_MODE', SAMPLE_BLOCK),
+        'sample_percent': os.environ.get('QA_SAMPLE_PERCENT',
+                                         SAMPLE_PERCENT),
+        # exported from the cached it table row
+        'split_by': os.environ.get('split_by', '')
     }
 
     source_table = args['database'] + '.' + args['table_name']
@@ -1545,6 +2002,12 @@ def main():
                 print 'Data sampling failed'
                 print traceback.format_exc()
                 bool_status = True
+        elif args['ingestion_type'] == 'full_ingest_reconciliation':
+            target_table = 'parquet_stage.{database}_{table_name}'
+            target_table = target_table.format(
+                database=database, table_name=table_name)
+            val_obj = TableValidation(source_table, target_table, args)
+            bool_status = val_obj.start_reconciliation()
         elif args['ingestion_type'] == 'incremental':
             incr_target_table = 'parquet_stage.{database}_{table_name}'
             incr_target_table = incr_target_table.format(
@@ -1576,6 +2039,7 @@ def main():
         logger.error(traceback.format_exc())
         logger.insert_hive()
 
+    flush_batch_writers()
     ImpalaConnect.close_conn()
     sys.exit(exit_code)
 
@@ -28,7 +28,9 @@ fetch_hdfs_files() {
     hadoop fs -get "$hdfs_ingest_path"config_env.sh
     hadoop fs -get "$hdfs_ingest_path"oozie_ws_helper.py
     hadoop fs -get "$hdfs_ingest_path"sqoop_utils.py
+    hadoop fs -get "$hdfs_ingest_path"eval_client.py
     hadoop fs -get "$hdfs_ingest_path"py_hdfs.py
+    hadoop fs -get "$hdfs_ingest_path"oozie_client.py
     hadoop fs -get /user/dev/scratch/fake.keytab
 }
 
@@ -15,7 +15,7 @@ from abc import ABCMeta
 from sqoop_utils import SqoopUtils
 from impala_utils import ImpalaConnect
 from checks_and_balances_export import ChecksBalancesExportManager
-from py_hdfs import PyHDFS
+from py_hdfs import get_batch_writer, flush_batch_writers
 
 
 LOG_FILE = 'qa.log'
@@ -43,7 +43,13 @@ class LogHandler(object):
         self.host = host
         self.buffer_logs = []
         self.qa_status_log = ''
-        self.pyhdfs = PyHDFS(qa_exp_results_tbl_path)
+        # rows of all tables of the run are written in batches with a
+        # single INVALIDATE METADATA to reflect Hive file-based operations
+        # in Impala
+        self.writer = get_batch_writer(
+            qa_exp_results_tbl_path,
+            lambda: ImpalaConnect.invalidate_metadata(
+                self.host, 'ibis.qa_export_results'))
 
     def info(self, log):
         """Print to stdout."""
@@ -87,14 +93,8 @@ class LogHandler(object):
         with open(LOG_FILE, 'w') as file_h:
             file_h.write(log_txt)
 
-        # File-based insert operation
-        self.pyhdfs.insert_update('',
-                                  self.prepares_data(format_data),
-                                  is_append=True)
-
-        # We need to perform INVALIDATE METADATA to reflect Hive
-        # file-based operations in Impala.
-        ImpalaConnect.invalidate_metadata(self.host, 'ibis.qa_export_results')
+        # File-based insert operation, written with the next batch
+        self.writer.add(self.prepares_data(format_data))
 
         msg = '\n' + '#' * 100
         msg += ("\nFor QA results: Run query in Impala: "
@@ -401,6 +401,7 @@ def main():
         logger.error(traceback.format_exc())
         logger.insert_hive()
 
+    flush_batch_writers()
     ImpalaConnect.close_conn()
     sys.exit(exit_code)
 
@@ -2,6 +2,91 @@
 import os
 import subprocess
 import re
+import tempfile
+from cStringIO import StringIO
+from eval_client import EvalClient
+
+
+class SqoopTableParser(object):
+    """Incremental parser for the ascii table printed by sqoop eval.
+    The first |...| line holds the column labels and every following
+    |...| line is a row. Lines are consumed one at a time so the output
+    never needs to be held in memory as a whole.
+    """
+
+    def __init__(self, strip_col_val=True, filter_columns=None, limit=None,
+                 col_types=None):
+        """init
+        Args:
+            strip_col_val: whether to strip spaces around column data
+            filter_columns: list of column indexes.
+                            Only those column data will be returned and
+                            rest all columns will be skipped
+            limit: max number of rows to return
+            col_types: list of callables, e.g. [str, int], converting the
+                       returned column values of every row
+        """
+        self.strip_col_val = strip_col_val
+        self.filter_columns = filter_columns
+        self.limit = limit
+        self.col_types = col_types
+        self.labels = []
+        self.columns = None
+        self._has_labels = False
+
+    @classmethod
+    def get_cells(cls, line):
+        """Cells of a |...| line, None for any other line"""
+        start = line.find('|')
+        end = line.rfind('|')
+        if start == -1 or end <= start:
+            return None
+        return line[start + 1:end].split('|')
+
+    def _set_labels(self, cells):
+        """Set column labels and the projected column indexes"""
+        if self.filter_columns:
+            self.columns = [index for index in range(len(cells))
+                            if index in self.filter_columns]
+            cells = [cells[index] for index in self.columns]
+        self.labels = [label.strip() for label in cells]
+        self._has_labels = True
+
+    def _convert(self, row):
+        """Apply col_types to row values"""
+        num_types = len(self.col_types)
+        return [self.col_types[index](val) if index < num_types else val
+                for index, val in enumerate(row)]
+
+    def parse(self, lines):
+        """Yield rows from an iterable of sqoop output lines"""
+        num_rows = 0
+        for line in lines:
+            if self.limit is not None and num_rows >= self.limit:
+                break
+            cells = self.get_cells(line)
+            if cells is None:
+                continue
+            if not self._has_labels:
+                self._set_labels(cells)
+                continue
+            if self.columns is not None:
+                cells = [cells[index] for index in self.columns]
+            if self.strip_col_val:
+                row = [val.strip() for val in cells]
+            else:
+                # remove the extra space in the start and end of string
+                # which is inserted by sqoop output table
+                row = [val[1:-1] for val in cells]
+            if self.col_types:
+                row = self._convert(row)
+            num_rows += 1
+            yield row
+
+    def parse_all(self, lines):
+        """Returns column labels and list of rows"""
+        rows = list(self.parse(lines))
+        return self.labels, rows
 
 
 class SqoopUtils(object):
@@ -21,8 +106,17 @@ class SqoopUtils(object):
         self.password = password
         self.connection_factories = connection_factories
 
-    def eval(self, query):
-        """Sqoop relational db data for a query."""
+    def _server_eval(self, query):
+        """Run query on the eval server, None if it is unavailable"""
+        if self.jceks == 'None':
+            password_file = self.password
+        else:
+            password_file = self.jceks + '#' + self.password
+        return EvalClient().eval(self.jdbc_url, query, self.user_name,
+                                 password_file)
+
+    def _sqoop_params(self, query):
+        """sqoop eval command for a query"""
         if self.jceks == 'None':
             sqoop_params = ["sqoop", "eval",
                             "-libjars", self.jars,
@@ -40,13 +134,57 @@ class SqoopUtils(object):
                             "--connect", self.jdbc_url,
                             "--query", query, "--username", self.user_name,
                             "--password-alias", self.password]
-        proc = subprocess.Popen(sqoop_params, stdin=subprocess.PIPE,
+        return sqoop_params
+
+    def eval(self, query):
+        """Sqoop relational db data for a query.
+        Runs on the eval server when available, sqoop eval otherwise
+        """
+        result = self._server_eval(query)
+        if result is not None:
+            return result
+
+        proc = subprocess.Popen(self._sqoop_params(query),
+                                stdin=subprocess.PIPE,
                                 stdout=subprocess.PIPE,
                                 stderr=subprocess.PIPE)
 
         output, err = proc.communicate()
         return proc.returncode, output, err
 
+    def eval_rows(self, query, strip_col_val=True, filter_columns=None,
+                  limit=None, col_types=None):
+        """Sqoop relational db data for a query and parse the rows while
+        reading the sqoop output pipe. See SqoopTableParser for args
+        Returns:
+            returncode, column labels, rows and sqoop error if any
+        """
+        parser = SqoopTableParser(strip_col_val, filter_columns, limit,
+                                  col_types)
+        result = self._server_eval(query)
+        if result is not None:
+            returncode, output, err = result
+            labels, rows = parser.parse_all(StringIO(output))
+            return returncode, labels, rows, err
+
+        # sqoop eval --verbose logs a lot, spool stderr to a file
+        # so that the stdout pipe can be read without a deadlock
+        err_file = tempfile.TemporaryFile()
+        proc = subprocess.Popen(self._sqoop_params(query),
+                                stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                stderr=err_file)
+        proc.stdin.close()
+        labels, rows = parser.parse_all(proc.stdout)
+        # drain rows past the limit
+        for _ in proc.stdout:
+            pass
+        proc.wait()
+        err_file.seek(0)
+        err = err_file.read()
+        err_file.close()
+        return proc.returncode, labels, rows, err
+
     def _clean_query_result(self, output):
         """Match characters between two | characters. Ex: | anything |."""
         pattern = re.compile('\|.*\|')
@@ -64,39 +202,5 @@ class SqoopUtils(object):
         Returns:
             column labels and row data
         """
-        raw_data = self._clean_query_result(output)
-        row_data = []
-        for line in raw_data:
-            column_data = line.split('|')
-            # ignore the first and last items due to split
-            column_data = column_data[1:-1]
-            row_data.append(column_data)
-
-        # first item is labels in table output
-        column_labels = row_data[0]
-        column_labels = [label.strip() for label in column_labels]
-        num_column_labels = len(column_labels)
-        # row data starts from second item in table output
-        row_values = row_data[1:]
-        # remove the extra space in the start and end of string
-        # which is inserted by sqoop output table
-        row_values = [[col_val[1:-1] for col_val in row] for row in row_values]
-
-        if filter_columns:
-            pop_columns = []
-            for i in range(num_column_labels):
-                if i not in filter_columns:
-                    pop_columns.append(i)
-            pop_columns.sort(reverse=True)
-            for index in pop_columns:
-                column_labels.pop(index)
-                temp_row_values = []
-                for row in row_values:
-                    row.pop(index)
-                    temp_row_values.append(row)
-                row_values = temp_row_values
-
-        if strip_col_val:
-            row_values = [[val.strip() for val in row] for row in row_values]
-
-        return column_labels, row_values
+        parser = SqoopTableParser(strip_col_val, filter_columns)
+        return parser.parse_all(StringIO(output))
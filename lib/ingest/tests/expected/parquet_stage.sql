@@ -0,0 +1,62 @@
+SET PARQUET_FILE_SIZE=268435456;
+
+CREATE DATABASE IF NOT EXISTS `ingest`;
+
+DROP TABLE IF EXISTS `ingest`.`database_test_table_test`;
+
+CREATE EXTERNAL TABLE `ingest`.`database_test_table_test` LIKE PARQUET 'hdfs:///user/data/ingest/hdfs_test/part.parquet' STORED AS PARQUET LOCATION 'hdfs:///user/data/ingest/hdfs_test';
+
+CREATE DATABASE IF NOT EXISTS `parquet_stage`;
+
+DROP TABLE IF EXISTS `parquet_stage`.`database_test_table_test`;
+
+CREATE TABLE `parquet_stage`.`database_test_table_test`
+PARTITIONED BY (incr_ingest_timestamp)
+STORED AS PARQUET LOCATION 'hdfs:///user/data/hdfs_test/stage/'
+AS SELECT CAST(`FAKE_COL_1` AS CHAR(3)) AS `FAKE_COL_1`,
+ CAST(`FAKE_COL_2` AS DOUBLE) AS `FAKE_COL_2`,
+ CAST(`FAKE_COL_3` AS TIMESTAMP) AS `FAKE_COL_3`,
+ CAST(`FAKE_COL_4` AS BIGINT) AS `FAKE_COL_4`,
+ CAST(`FAKE_COL_5` AS VARCHAR(10)) AS `FAKE_COL_5`,
+ CAST(`FAKE_COL_6` AS TIMESTAMP) AS `FAKE_COL_6`,
+ CAST(`FAKE_COL_7` AS INT) AS `FAKE_COL_7`,
+ CAST(`FAKE_COL_8` AS DECIMAL(22,2)) AS `FAKE_COL_8`,
+ CAST(`FAKE_COL_9` AS DECIMAL(13,2)) AS `FAKE_COL_9`,
+ CAST(`FAKE_COL_10` AS VARCHAR(4)) AS `FAKE_COL_10`,
+ CAST(`FAKE_COL_11` AS VARCHAR(64000)) AS `FAKE_COL_11`,
+ CAST(`FAKE_COL_12` AS CHAR(2)) AS `FAKE_COL_12`,
+ CAST(`FAKE_COL_13` AS STRING) AS `FAKE_COL_13`,
+ CAST(`FAKE_COL_14` AS STRING) AS `FAKE_COL_14`,
+ CAST(`FAKE_COL_15` AS STRING) AS `FAKE_COL_15`,
+ CAST(`FAKE_COL_16` AS STRING) AS `FAKE_COL_16`,
+ CAST(`FAKE_COL_17` AS STRING) AS `FAKE_COL_17`,
+ CAST(`FAKE_COL_18` AS STRING) AS `FAKE_COL_18`,
+ CAST(`FAKE_COL_18_MONTH` AS STRING) AS `FAKE_COL_18_MONTH`,
+ CAST(`FAKE_COL_19` AS TIMESTAMP) AS `FAKE_COL_19`,
+ CAST(`FAKE_COL_20` AS TIMESTAMP) AS `FAKE_COL_20`,
+ CAST(`FAKE_COL_21` AS TIMESTAMP) AS `FAKE_COL_21`,
+ CAST(`FAKE_COL_22` AS VARCHAR(2)) AS `FAKE_COL_22`,
+ CAST(`FAKE_COL_23` AS BIGINT) AS `FAKE_COL_23`,
+ CAST(`FAKE_COL_24` AS STRING) AS `FAKE_COL_24`,
+ CAST(`FAKE_COL_25` AS STRING) AS `FAKE_COL_25`,
+ CAST(`FAKE_COL_26` AS STRING) AS `FAKE_COL_26`,
+ CAST(`FAKE_COL_27` AS INT) AS `FAKE_COL_27`,
+ CAST(`FAKE_COL_28` AS INT) AS `FAKE_COL_28`,
+ CAST(`FAKE_COL_29` AS SMALLINT) AS `FAKE_COL_29`,
+ CAST(`FAKE_COL_30` AS DOUBLE) AS `FAKE_COL_30`,
+ CAST(`FAKE_COL_31` AS INT) AS `FAKE_COL_31`,
+ CAST(`FAKE_COL_32` AS CHAR(1)) AS `FAKE_COL_32`,
+ CAST(`FAKE_COL_33` AS STRING) AS `FAKE_COL_33`,
+ CAST(`FAKE_COL_34` AS STRING) AS `FAKE_COL_34`,
+ CAST(`FAKE_COL_35` AS CHAR(2)) AS `FAKE_COL_35`,
+ CAST(`FAKE_COL_36` AS TIMESTAMP) AS `FAKE_COL_36`,
+ CAST(`FAKE_COL_37` AS TIMESTAMP) AS `FAKE_COL_37`,
+ CAST(`FAKE_COL_38` AS STRING) AS `FAKE_COL_38`,
+ CAST(`FAKE_COL_39` AS STRING) AS `FAKE_COL_39`,
+ CAST(`FAKE_COL_40` AS STRING) AS `FAKE_COL_40`,
+ CAST(`FAKE_COL_41` AS STRING) AS `FAKE_COL_41`,
+ '2016-01-01 16:47:56' AS `ingest_timestamp`,
+ 'full_20160101164756' AS `incr_ingest_timestamp`
+ FROM `ingest`.`database_test_table_test`;
+
+DROP TABLE `ingest`.`database_test_table_test`;
@@ -6,7 +6,9 @@ from mock.mock import patch
 from lib.ingest.checks_and_balances_export import ChecksBalancesExportManager
 from lib.ingest.checks_and_balances_export import ChecksBalancesExport
 from lib.ingest.checks_and_balances_export import ChecksBalancesExportHelper
-from lib.ingest.py_hdfs import PyHDFS
+from lib.ingest import py_hdfs
+from lib.ingest.impala_utils import ImpalaConnect
+from lib.ingest.py_hdfs import PyHDFS, flush_batch_writers
 from lib.ingest.checks_and_balances_export import Workflow, Action, Job
 
 
@@ -65,6 +67,14 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         self.host = 'fake.dev.edgenode'
         self.oozie_url = 'http://fake.dev.edgenode:11000/oozie/v2/'
         self.chk_bal_exp_dir = '/user/dev/data/checks_balances'
+        # writers of the shared directories are kept per test
+        py_hdfs.WRITERS.clear()
+        # no test opens a real impala connection from the shared pool
+        connect_patcher = patch('lib.ingest.impala_utils.connect',
+                                autospec=True)
+        connect_patcher.start()
+        self.addCleanup(connect_patcher.stop)
+        self.addCleanup(ImpalaConnect.close_conn)
         self.ooz = MagicMock(spec=ChecksBalancesExportHelper)
         self.cb_manager = ChecksBalancesExportManager(self.host,
                                                       self.oozie_url,
@@ -134,7 +144,7 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         print tables
         self.assertFalse(tables, Workflow(one_job_json))
 
-    @patch("lib.ingest.checks_and_balances_export.requests.get")
+    @patch("lib.ingest.py_hdfs.requests.Session.get")
     def test_get_workflow_job(self, m_get):
         response = MagicMock()
         response.status_code = 200
@@ -195,17 +205,17 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         print tables
         self.assertTrue(tables, Workflow(one_job_json))
 
-    @patch("subprocess.call")
-    @patch("lib.ingest.checks_and_balances_export.Popen")
-    def test_get_parquet_size(self, mock2, mock1):
+    @patch("lib.ingest.py_hdfs.CliHdfs.execute")
+    def test_get_parquet_size(self, m_execute):
         # Test using local json
-        mock1.return_value = 0
-        mock2.return_value.communicate.return_value = ('/incr_ingest_timestamp\
-        =2017-04-25 /incr_ingest_timestamp=2017-04-25 /incr_ingest_timestamp\
-        =2017-04-25 /incr_ingest_timestamp=2017-04-25', 'error')
+        m_execute.side_effect = [
+            ('drwxr-xr-x   - ibis ibis   0 2017-04-25 07:41 /user/data/'
+             'live/incr_ingest_timestamp=full_2017-04-25', 0, None),
+            ('du: error', 1, None)]
         tables = self.cb_manager.get_parquet_size(
             "test", '/user/data/incrementals')
-        self.assertEquals(tables, 0)
+        self.assertEquals(tables, '0')
+        m_execute.assert_called_with('-du', '-s', '/user/data//live')
 
     def test_sort_actions(self):
         """Tests that all actions in a workflow gets sorted by table name"""
@@ -240,12 +250,12 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         print len(sorted_actions['test'])
         self.assertEquals(len(sorted_actions['test']), 6)
 
-    @patch.object(ChecksBalancesExportManager, "get_parquet_size")
+    @patch.object(ChecksBalancesExportManager, "get_parquet_sizes")
     def test_get_records(self, mocked_object):
         """Tests the implementation for getting checks_balances
         objects per table for each workflow Job"""
         # Test using local json
-        mocked_object.return_value = '55'
+        mocked_object.side_effect = lambda dirs: dict.fromkeys(dirs, '55')
         expected = [ChecksBalancesExport(**{
             'parquet_size': '55',
             'export_timestamp': 'Tue, 07 Feb 2017 05:23:09 GMT',
@@ -258,7 +268,7 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         self.assertEquals(expected,
                           self.cb_manager.get_records(self.sample_workflow))
 
-        mocked_object.return_value = '55'
+        mocked_object.side_effect = lambda dirs: dict.fromkeys(dirs, '55')
         cb1 = ChecksBalancesExport(**{
             'parquet_size': '55',
             'export_timestamp': 'Tue, 07 Feb 2017 05:23:09 GMT',
@@ -310,9 +320,10 @@ class TestChecksBalancesExportManager(unittest.TestCase):
         self.assertEquals('2',
                           self.cb_manager.get_success_or_failure(action_list))
 
+    @patch("lib.ingest.checks_and_balances_export.ImpalaConnect")
     @patch.object(ChecksBalancesExportManager, "get_records")
     @patch(
-        "lib.ingest.py_hdfs.PyHDFS.execute",
+        "lib.ingest.py_hdfs.CliHdfs.execute",
         return_value=(
             'Success',
             0,
@@ -323,7 +334,8 @@ class TestChecksBalancesExportManager(unittest.TestCase):
             'Success',
             0,
             None))
-    def test_update_checks_balances(self, mock_records, mock1, mock2):
+    def test_update_checks_balances(self, mock_records, mock1, mock2,
+                                    m_impala):
         checks = ChecksBalancesExport('domain', 'db', 'table_name',
                                       export_timestamp='', row_count=0,
                                       push_time=0, directory='null',
@@ -331,10 +343,17 @@ class TestChecksBalancesExportManager(unittest.TestCase):
                                       parquet_size=0, success='1')
         return_val = []
         return_val.append(checks)
-        mock1.return_value = return_val
+        mock2.return_value = return_val
         self.cb_manager.update_checks_balances("workflow")
-
-    @patch("lib.ingest.checks_and_balances_export.requests.get")
+        self.cb_manager.update_checks_balances("workflow")
+        self.assertFalse(mock_records.called)
+        flush_batch_writers()
+        # one file write and invalidate for both workflows
+        self.assertEqual(mock_records.call_count, 1)
+        m_impala.invalidate_metadata.assert_called_once_with(
+            self.cb_manager.host, 'ibis.checks_balances_export')
+
+    @patch("lib.ingest.py_hdfs.requests.Session.get")
     def test_get_jobs(self, m_get):
         response = MagicMock()
         response.status_code = 200
@@ -351,9 +370,10 @@ class TestChecksBalancesExportManager(unittest.TestCase):
                                  job_type='workf')
         self.assertEqual(r, 200)
 
+    @patch("lib.ingest.checks_and_balances_export.ImpalaConnect")
     @patch.object(PyHDFS, "insert_update")
     @patch.object(ChecksBalancesExportManager, 'get_records')
-    def test_update_checks_balances_N(self, m_get, m_pyhdfs):
+    def test_update_checks_balances_N(self, m_get, m_pyhdfs, m_impala):
         mock_return = [ChecksBalancesExport(**{
             'parquet_size': '55',
             'export_timestamp': 'Wed, 30 Sep 2015 18:51:53 GMT',
@@ -368,6 +388,7 @@ class TestChecksBalancesExportManager(unittest.TestCase):
             '|null|null|null|0|null'
         m_get.return_value = mock_return
         self.cb_manager.update_checks_balances('app_name')
+        flush_batch_writers()
         m_get.assert_called_once_with("app_name")
         m_pyhdfs.assert_called_once_with(call_expected_param1,
                                          call_expected_param2)
@@ -2,8 +2,10 @@
 import unittest
 import os
 import logging
-from mock import patch
-from lib.ingest.impala_utils import ImpalaConnect, HiveConnect
+from mock import patch, MagicMock
+from thrift.transport.TTransport import TTransportException
+from lib.ingest.impala_utils import ImpalaConnect, HiveConnect, \
+    ConnectionPool, INVALIDATED_TABLES
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,6 +16,8 @@ class ImpalaUtilsFunctionsTest(unittest.TestCase):
 
     def setUp(self):
         logging.basicConfig()
+        ImpalaConnect.close_conn()
+        HiveConnect.close_conn()
 
     @patch('lib.ingest.impala_utils.connect', autospec=True)
     def test_impala_run_query(self, m_connect):
@@ -27,6 +31,19 @@ class ImpalaUtilsFunctionsTest(unittest.TestCase):
             op='create')
         self.assertEqual(result, '')
 
+    @patch.object(ImpalaConnect, 'invalidate_metadata')
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
+    def test_impala_run_query_invalidate_once(self, m_connect, m_invalidate):
+        """test table metadata is invalidated once per run"""
+        INVALIDATED_TABLES.clear()
+        for _ in range(3):
+            ImpalaConnect.run_query('test_host', 'database.table',
+                                    'select 1;', invalidate_once=True)
+        self.assertEqual(m_invalidate.call_count, 1)
+        ImpalaConnect.run_query('test_host', 'database.table', 'select 1;')
+        self.assertEqual(m_invalidate.call_count, 2)
+        INVALIDATED_TABLES.clear()
+
     @patch('lib.ingest.impala_utils.connect', autospec=True)
     def test_hive_run_query(self, m_connect):
         """test hive run query"""
@@ -39,6 +56,20 @@ class ImpalaUtilsFunctionsTest(unittest.TestCase):
             op='create')
         self.assertEqual(result, '')
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
+    def test_pool_execute_reconnect(self, m_connect):
+        """test query is retried on a new connection"""
+        conn_1 = MagicMock()
+        conn_2 = MagicMock()
+        m_connect.side_effect = [conn_1, conn_2]
+        conn_1.cursor().execute.side_effect = TTransportException()
+        pool = ConnectionPool(1, host='test_host')
+        cur = pool.execute(pool.cursor(), 'select 1;', {})
+        self.assertEqual(cur, conn_2.cursor())
+        self.assertTrue(conn_1.close.called)
+        self.assertEqual(pool.get(), conn_2)
+        pool.close_all()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,134 @@
+"""Tests for the oozie web services client"""
+import shutil
+import tempfile
+import threading
+import unittest
+from mock import MagicMock, patch
+from lib.ingest.oozie_client import OozieClient, Workflow
+
+OOZIE_URL = 'http://fake.dev.edgenode:11000/oozie/v2/'
+
+
+def response(status_code, body=None):
+    """Mock http response"""
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.json.return_value = body
+    return resp
+
+
+def jobs_page(params, total):
+    """Page of a listing of total workflow jobs"""
+    ids = range(params['offset'], min(params['offset'] + params['len'],
+                                      total + 1))
+    return response(200, {
+        'offset': params['offset'], 'len': params['len'], 'total': total,
+        'workflows': [{'id': 'job_{0}'.format(num), 'status': 'SUCCEEDED'}
+                      for num in ids]})
+
+
+class OozieClientTest(unittest.TestCase):
+    """Test the paginated, cached oozie client"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.client = OozieClient(OOZIE_URL, cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    @patch('lib.ingest.py_hdfs.requests.Session.get')
+    def test_get_jobs(self, m_get):
+        threads = {}
+
+        def get(url, params=None, **kwargs):
+            threads[params['offset']] = threading.current_thread()
+            return jobs_page(params, 250)
+
+        m_get.side_effect = get
+        status, job = self.client.get_jobs(name='app', user='ibis')
+        self.assertEqual(status, 200)
+        self.assertEqual(job.get_total(), 250)
+        self.assertEqual([wf.get_id() for wf in job.get_workflows()],
+                         ['job_{0}'.format(num) for num in range(1, 251)])
+        offsets = sorted(call[1]['params']['offset']
+                         for call in m_get.call_args_list)
+        self.assertEqual(offsets, [1, 101, 201])
+        params = m_get.call_args_list[0][1]['params']
+        self.assertEqual(params['filter'], 'name=app;user=ibis')
+        self.assertEqual(params['jobtype'], 'wf')
+        # pages after the first one come from the thread pool
+        self.assertIs(threads[1], threading.current_thread())
+        self.assertIsNot(threads[101], threading.current_thread())
+        self.assertIsNot(threads[201], threading.current_thread())
+
+    @patch('lib.ingest.py_hdfs.requests.Session.get')
+    def test_get_jobs_max_jobs(self, m_get):
+        m_get.side_effect = lambda url, params=None, **kwargs: \
+            jobs_page(params, 250)
+        status, job = self.client.get_jobs(name='app', max_jobs=1)
+        self.assertEqual(status, 200)
+        self.assertEqual([wf.get_id() for wf in job.get_workflows()],
+                         ['job_1'])
+        self.assertEqual(m_get.call_count, 1)
+        self.assertEqual(m_get.call_args[1]['params']['len'], 1)
+
+        m_get.reset_mock()
+        status, job = self.client.get_jobs(name='app', length=50,
+                                           max_jobs=120)
+        self.assertEqual(len(job.get_workflows()), 120)
+        self.assertEqual(m_get.call_count, 3)
+
+    @patch('lib.ingest.py_hdfs.requests.Session.get')
+    def test_get_jobs_error(self, m_get):
+        def get(url, params=None, **kwargs):
+            if params['offset'] > 1:
+                return response(500)
+            return jobs_page(params, 250)
+
+        m_get.side_effect = get
+        self.assertEqual(self.client.get_jobs(name='app'), (500, None))
+        m_get.side_effect = None
+        m_get.return_value = response(401)
+        self.assertEqual(self.client.get_jobs(name='app'), (401, None))
+
+    @patch('lib.ingest.py_hdfs.requests.Session.get')
+    def test_get_job_cache(self, m_get):
+        finished = {'id': 'wf_1', 'status': 'SUCCEEDED', 'actions': []}
+        running = {'id': 'wf_2', 'status': 'RUNNING', 'actions': []}
+        m_get.side_effect = lambda url, **kwargs: response(
+            200, finished if url.endswith('wf_1') else running)
+        self.assertEqual(self.client.get_job('wf_1'),
+                         (200, Workflow(finished)))
+        self.assertEqual(self.client.get_job('wf_1'),
+                         (200, Workflow(finished)))
+        self.client.get_job('wf_2')
+        self.client.get_job('wf_2')
+        self.assertEqual(m_get.call_count, 3)
+
+        # another process reads the finished job from the disk cache
+        other = OozieClient(OOZIE_URL, cache_dir=self.cache_dir)
+        self.assertEqual(other.get_job('wf_1'), (200, Workflow(finished)))
+        self.assertEqual(m_get.call_count, 3)
+        no_cache = OozieClient(OOZIE_URL, cache_dir='')
+        no_cache.get_job('wf_1')
+        self.assertEqual(m_get.call_count, 4)
+
+        m_get.side_effect = None
+        m_get.return_value = response(404)
+        self.assertEqual(self.client.get_job('wf_3'), (404, None))
+
+    @patch('lib.ingest.py_hdfs.requests.Session.get')
+    def test_get_job_list(self, m_get):
+        m_get.side_effect = lambda url, **kwargs: response(
+            200, {'id': url.split('/')[-1], 'status': 'SUCCEEDED'})
+        jobs = self.client.get_job_list(['wf_{0}'.format(num)
+                                         for num in range(10)])
+        self.assertEqual([job.get_id() for _, job in jobs],
+                         ['wf_{0}'.format(num) for num in range(10)])
+        self.assertEqual(m_get.call_count, 10)
+        self.assertEqual(self.client.get_job_list([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,8 @@ import os
 import json
 from lib.ingest.oozie_ws_helper import OozieWSHelper, Workflow, Job, Action, \
     ChecksBalancesManager, ChecksBalances
-from lib.ingest.py_hdfs import PyHDFS
+from lib.ingest import py_hdfs
+from lib.ingest.py_hdfs import PyHDFS, flush_batch_writers
 from mock.mock import patch
 from mock import MagicMock
 
@@ -83,6 +84,8 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         self.oozie_url = 'http://fake.dev.edgenode:11000/oozie/v2/'
         self.impala_host = 'fake.dev.impala'
         self.chk_bal_dir = '/user/dev/data/checks_balances'
+        # writers of the shared directories are kept per test
+        py_hdfs.WRITERS.clear()
         self.ooz = MagicMock(spec=OozieWSHelper)
         self.cb_manager = ChecksBalancesManager(self.impala_host,
                                                 self.oozie_url,
@@ -156,13 +159,12 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         self.assertTrue('fake_mem_tablename' in sorted_actions.keys())
         self.assertEquals(len(sorted_actions['fake_mem_tablename']), 6)
 
-    @patch("lib.ingest.oozie_ws_helper.ChecksBalancesManager.get_parquet_size",
-           autospec=True)
+    @patch.object(ChecksBalancesManager, "get_parquet_sizes", autospec=True)
     def test_get_records_special_chars(self, mocked_object):
         """Tests that all actions in a workflow gets sorted by table name
         if table has special characters in table name
         """
-        mocked_object.return_value = '55'
+        mocked_object.side_effect = lambda _, dirs: dict.fromkeys(dirs, '55')
         _path = os.path.join(
             BASE_DIR, 'fixtures/special_char_table_oozie_job.json')
         with open(_path, 'r') as content_file:
@@ -185,13 +187,12 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         self.assertEquals(cb_rec.avro_size, '22028190')
         self.assertEquals(cb_rec.success, '0')
 
-    @patch("lib.ingest.oozie_ws_helper.ChecksBalancesManager.get_parquet_size",
-           autospec=True)
+    @patch.object(ChecksBalancesManager, "get_parquet_sizes", autospec=True)
     def test_get_records(self, mocked_object):
         """Tests the implementation for getting checks_balances
         objects per table for each workflow Job"""
         # Test using local json
-        mocked_object.return_value = '55'
+        mocked_object.side_effect = lambda _, dirs: dict.fromkeys(dirs, '55')
         expected = [ChecksBalances(**{
             'parquet_size': '55',
             'ingest_timestamp': 'Wed, 30 Sep 2015 18:51:53 GMT',
@@ -205,7 +206,7 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         self.assertEquals(expected,
                           self.cb_manager.get_records(self.sample_workflow))
 
-        mocked_object.return_value = '251'
+        mocked_object.side_effect = lambda _, dirs: dict.fromkeys(dirs, '251')
         cb1 = ChecksBalances(**{
             'parquet_size': '251',
             'ingest_timestamp': 'Tue, 29 Sep 2015 20:14:41 GMT',
@@ -261,21 +262,51 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         self.assertEquals('2',
                           self.cb_manager.get_success_or_failure(action_list))
 
-    @patch("subprocess.call")
-    @patch("lib.ingest.oozie_ws_helper.Popen")
-    def test_get_parquet_size(self, mock2, mock1):
-        # Test using local json
-        mock1.return_value = 0
-        mock2.return_value.communicate.side_effect = [('/incr_ingest_timestamp\
-        =2017-04-25 /incr_ingest_timestamp=2017-04-25 /incr_ingest_timestamp\
-        =2017-04-25 /incr_ingest_timestamp=2017-04-25', 'error'),
-                                                      ('2222 2222 /ingest/',
-                                                       'error')]
+    @patch("lib.ingest.py_hdfs.CliHdfs.execute")
+    def test_get_parquet_size(self, m_execute):
+        ls_out = ('Found 2 items\n'
+                  'drwxr-xr-x   - ibis ibis   0 2017-04-25 07:41 /user/data/'
+                  'ingest/live/incr_ingest_timestamp=2017-04-24\n'
+                  'drwxr-xr-x   - ibis ibis   0 2017-04-25 07:41 /user/data/'
+                  'ingest/live/incr_ingest_timestamp=2017-04-25\n')
+        partition = '/user/data/ingest/live/incr_ingest_timestamp=2017-04-25'
+        m_execute.side_effect = [(ls_out, 0, None),
+                                 ('2222 2222 ' + partition, 0, None)]
         tables = self.cb_manager.get_parquet_size(
-            "test", '/user/data/incrementals')
+            "test", '/user/data/incrementals/ingest')
         self.assertEquals(tables, '2222')
-
-    @patch("lib.ingest.oozie_ws_helper.requests.get")
+        m_execute.assert_called_with('-du', '-s', partition)
+        m_execute.side_effect = None
+        m_execute.return_value = ('', 1, None)
+        self.assertEquals(self.cb_manager.get_parquet_size(
+            "test", 'mdm/missing'), 0)
+
+    @patch("lib.ingest.py_hdfs.CliHdfs.execute")
+    def test_get_parquet_sizes(self, m_execute):
+        """Tests all tables are sized with one ls and one du"""
+        ls_out = ('drwxr-xr-x   - ibis ibis   0 2017-04-25 07:41 /user/data/'
+                  'mdm/a/live/incr_ingest_timestamp=2017-04-24\n'
+                  'drwxr-xr-x   - ibis ibis   0 2017-04-26 07:41 /user/data/'
+                  'mdm/a/live/incr_ingest_timestamp=2017-04-26\n'
+                  'drwxr-xr-x   - ibis ibis   0 2017-04-25 07:41 /user/data/'
+                  'mdm/b/live/incr_ingest_timestamp=full_2017-04-25\n')
+        du_out = ('10  30  /user/data/mdm/a/live/'
+                  'incr_ingest_timestamp=2017-04-26\n'
+                  '20  60  /user/data/mdm/b/live\n')
+        m_execute.side_effect = [(ls_out, 1, None), (du_out, 0, None)]
+        sizes = self.cb_manager.get_parquet_sizes(
+            ['mdm/a', 'mdm/b', 'mdm/missing'])
+        self.assertEquals(sizes, {'mdm/a': '10', 'mdm/b': '20',
+                                  'mdm/missing': 0})
+        self.assertEquals(m_execute.call_count, 2)
+        m_execute.assert_any_call(
+            '-ls', '/user/data/mdm/a/live', '/user/data/mdm/b/live',
+            '/user/data/mdm/missing/live')
+        m_execute.assert_called_with(
+            '-du', '-s', '/user/data/mdm/a/live/incr_ingest_timestamp='
+            '2017-04-26', '/user/data/mdm/b/live')
+
+    @patch("lib.ingest.py_hdfs.requests.Session.get")
     def test_check_if_workflow(self, m_get):
         response = MagicMock()
         response.status_code = 200
@@ -295,7 +326,7 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
         app_name = self.cb_manager.check_if_workflow("test")
         self.assertEqual(app_name.actions, one_action.actions)
 
-    @patch("lib.ingest.oozie_ws_helper.requests.get")
+    @patch("lib.ingest.py_hdfs.requests.Session.get")
     def test_get_jobs(self, m_get):
         response = MagicMock()
         response.status_code = 200
@@ -312,7 +343,7 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
                                  job_type='workf')
         self.assertEqual(r, 200)
 
-    @patch("lib.ingest.oozie_ws_helper.requests.get")
+    @patch("lib.ingest.py_hdfs.requests.Session.get")
     def test_get_workflow_job(self, m_get):
         response = MagicMock()
         response.status_code = 200
@@ -333,9 +364,10 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
                                                     '2015-09-30T19:00:29.000Z')
         self.assertEqual(app_name.actions, one_action.actions)
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
     @patch.object(PyHDFS, "insert_update")
     @patch.object(ChecksBalancesManager, 'get_records')
-    def test_update_checks_balances(self, m_get, m_pyhdfs):
+    def test_update_checks_balances(self, m_get, m_pyhdfs, m_connect):
         mock_return = [ChecksBalances(**{
             'parquet_size': '55',
             'ingest_timestamp': 'Wed, 30 Sep 2015 18:51:53 GMT',
@@ -351,6 +383,7 @@ class ChecksBalancesManagerFunctionsTest(unittest.TestCase):
             '|null|null|null|0|null'
         m_get.return_value = mock_return
         self.cb_manager.update_checks_balances('app_name')
+        flush_batch_writers()
         m_get.assert_called_once_with("app_name")
         m_pyhdfs.assert_called_once_with(call_expected_param1,
                                          call_expected_param2)
@@ -105,6 +105,54 @@ class ParquetOptTimeFunctionsTest(unittest.TestCase):
         self.assertTrue(self.compare_xml(expected_create_table_hql,
                                          test_create_hql))
 
+    @patch('lib.ingest.parquet_opt_ddl_time.ConnectionManager', autospec=True)
+    @patch('lib.ingest.parquet_opt_ddl_time.sys', autospec=True)
+    @patch('lib.ingest.parquet_opt_ddl_time.os', autospec=True)
+    @patch('lib.ingest.parquet_opt_ddl_time.open')
+    def test_main_parquet_load(self, m_open, m_os, m_sys, m_cm):
+        """test main method for the direct to parquet load"""
+        m_sys.argv = ['test_arg0', 'test_arg1', 'test_arg2', 'test_arg3',
+                      'test_arg4', 'parquet_load', 'test_arg6',
+                      '/user/data/ingest/hdfs_test/part.parquet']
+        cm_methods = MagicMock()
+        cm_methods.get_parquet_stage_sql.return_value = 'test_stage_sql'
+        cm_methods.create_parquet_live.return_value = 'test_live_hql'
+        cm_methods.create_externaltable.return_value = \
+            ('views', 'invalidate', 'info')
+        m_cm.return_value = cm_methods
+        main()
+        cm_methods.get_parquet_stage_sql.assert_called_once_with(
+            '/user/data/ingest/hdfs_test/part.parquet')
+        # views of a full load
+        cm_methods.create_externaltable.assert_called_once_with('full_load')
+        self.assertFalse(cm_methods.get_hql.called)
+        self.assertEquals(m_open.call_count, 5)
+        self.assertEquals(m_open.call_args_list[0][0][0], 'parquet_stage.sql')
+
+    @patch.object(ConnectionManager, 'sqoop_eval', autospec=True)
+    @patch.object(ConnectionManager, 'get_schema', autospec=True)
+    def test_get_parquet_stage_sql(self, m_schema, m_sqoop_eval):
+        """test the impala CTAS of the parquet stage table"""
+        with open(BASE_DIR + '/fixtures/ddl_td_avro_parquet.txt',
+                  'r') as file_h:
+            sqoop_eval_output = file_h.read()
+            m_sqoop_eval.return_value = sqoop_eval_output
+        m_schema.return_value = DDLTypes(
+            input_mapping=sqoop_eval_output, data_source="td",
+            ingest_timestamp="2016-01-01 16:47:56")
+
+        self.conn_mgr = ConnectionManager(
+            'database_test', 'table_test', '', 'domain', 'jdbc_url_conn_test',
+            'connect_factories', 'username', 'password', 'view', 'int',
+            'domain', 'impala_host_name', '2016-01-01 16:47:56', 'hdfs_test',
+            'jars_test', 'jdbc_test', 'ingestion')
+
+        test_sql = self.conn_mgr.get_parquet_stage_sql(
+            '/user/data/ingest/hdfs_test/part.parquet')
+        with open(BASE_DIR + '/expected/parquet_stage.sql', 'r') as file_h:
+            expected_sql = file_h.read()
+        self.assertTrue(self.compare_xml(expected_sql, test_sql))
+
     @patch.object(ConnectionManager, 'sqoop_eval', autospec=True)
     @patch.object(ConnectionManager, 'get_schema', autospec=True)
     def test_get_full_hql_for_incremental(self, m_schema, m_sqoop_eval):
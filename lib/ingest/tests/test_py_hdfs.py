@@ -1,6 +1,10 @@
+import posixpath
 import unittest
 from mock import patch
-from lib.ingest.py_hdfs import PyHDFS
+from ibis.utilities.tests.fake_webhdfs import FakeWebHdfs
+from lib.ingest import py_hdfs
+from lib.ingest.py_hdfs import PyHDFS, CliHdfs, WebHdfs, get_hdfs, \
+    BatchWriter
 
 BASE_DIR = '/user/dev/data/checks_balances/'
 
@@ -38,15 +42,18 @@ class PyHDFSTest(unittest.TestCase):
     def tearDown(self):
         self.pyhdfs = None
 
-    @patch('lib.ingest.py_hdfs.PyHDFS.execute',
-           return_value=('Ok Response', 0, None))
+    @patch('lib.ingest.py_hdfs.CliHdfs.execute',
+           return_value=('-rw-r--r--   3 ibis ibis    10 2017-03-28 07:41 '
+                         '/user/dev/data/checks_balances/user/PBO_1', 0,
+                         None))
     def test_get_file(self, mock_execute):
         res = self.pyhdfs.get_file('/user', )
-        self.assertEqual(res[0], 'Ok Response')
+        self.assertEqual(res[0], 'PBO_1')
+        mock_execute.assert_called_with('-ls', BASE_DIR + '/user')
 
     @patch('lib.ingest.py_hdfs.PyHDFS.execute_with_echo',
            return_value=('Execute Response', 0, None))
-    @patch('lib.ingest.py_hdfs.PyHDFS.execute',
+    @patch('lib.ingest.py_hdfs.CliHdfs.execute',
            return_value=('Get File Response', 0, None))
     def test_insert_update(self, mock_execute_with_echo, mock_execute):
         res = self.pyhdfs.insert_update('/user', 'sample data')
@@ -76,5 +83,103 @@ class PyHDFSTest(unittest.TestCase):
         result = self.pyhdfs.execute_with_echo('-ls', '2017-03-28 07:41')
         self.assertEquals(0, result[1])
 
+
+class WebHdfsTest(unittest.TestCase):
+    """Test PyHDFS with the WebHDFS client"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeWebHdfs()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        py_hdfs.SESSIONS.pop(cls.server.url).close()
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset()
+        self.pyhdfs = PyHDFS(BASE_DIR)
+        self.pyhdfs.hdfs = WebHdfs(self.server.url, 'ibis')
+
+    def tearDown(self):
+        py_hdfs.CLIENTS.clear()
+
+    def test_insert_update(self):
+        dir_path = 'domain=dom/table=db_tbl'
+        self.assertEqual(self.pyhdfs.insert_update('', 'a|1\n')[1], 0)
+        self.server.mkdirs(BASE_DIR + dir_path)
+        self.pyhdfs.execute_with_echo(dir_path + '/PBO_1', 'b|2\n')
+        self.assertEqual(self.pyhdfs.get_file(dir_path)[0], 'PBO_1')
+        self.assertEqual(self.pyhdfs.insert_update(dir_path, 'c|3\n')[1], 0)
+        self.assertEqual(self.server.files[BASE_DIR + dir_path + '/PBO_1'],
+                         'c|3\n')
+        self.assertEqual(len(self.server.files), 2)
+        self.assertEqual(self.pyhdfs.hdfs.du(BASE_DIR), 8)
+
+    def test_batch_writer(self):
+        flushes = []
+        writer = BatchWriter(self.pyhdfs, lambda: flushes.append(1),
+                             max_rows=3)
+        writer.add('a|1')
+        writer.add('b|2', '/domain=dom')
+        self.assertEqual(self.server.files, {})
+        writer.add('c|3')
+        # one new file per partition and one invalidate per batch
+        self.assertEqual(sorted(self.server.files.values()),
+                         ['a|1\nc|3', 'b|2'])
+        self.assertEqual(flushes, [1])
+        writer.flush()
+        self.assertEqual(flushes, [1])
+
+    def test_batch_writer_replace(self):
+        flushes = []
+        partition = '/domain=dom/table=db_tbl'
+        self.server.files[BASE_DIR + partition + '/PBO_1'] = 'old'
+        self.server.mkdirs(BASE_DIR + partition)
+        writer = BatchWriter(self.pyhdfs, lambda: flushes.append(1),
+                             replace=True, max_bytes=100)
+        writer.add('wf_1|tbl', partition)
+        writer.add('wf_2|tbl', partition)
+        self.assertEqual(len(writer), 1)
+        writer.flush()
+        self.assertEqual(self.server.files, {
+            BASE_DIR + partition + '/PBO_1': 'wf_2|tbl'})
+        writer.add('x' * 100, partition)
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(flushes, [1, 1])
+
+    def test_get_sizes(self):
+        live_a = '/user/data/mdm/a/live'
+        live_b = '/user/data/mdm/b/live'
+        self.server.files[live_a + '/incr_ingest_timestamp=2017-04-24/p'] = \
+            'a' * 4
+        self.server.files[live_a + '/incr_ingest_timestamp=2017-04-26/p'] = \
+            'a' * 6
+        self.server.files[live_b + '/incr_ingest_timestamp=full_1/p'] = 'b'
+        for path in list(self.server.files):
+            self.server.mkdirs(posixpath.dirname(path))
+        sizes = self.pyhdfs.get_sizes([live_a, live_b, '/user/missing'])
+        self.assertEqual(sizes, {live_a: 6, live_b: 1})
+        # the latest dated partition, else the whole live directory
+        self.pyhdfs.hdfs.write(live_b + '/incr_ingest_timestamp=full_2/p',
+                               'bb')
+        del self.server.operations[:]
+        sizes = self.pyhdfs.get_sizes([live_a, live_b])
+        self.assertEqual(sizes, {live_a: 6, live_b: 3})
+        self.assertEqual(sorted(self.server.operations), [
+            ('GET', 'GETCONTENTSUMMARY'), ('GET', 'GETCONTENTSUMMARY'),
+            ('GET', 'LISTSTATUS'), ('GET', 'LISTSTATUS')])
+
+    def test_get_hdfs(self):
+        with patch.dict('os.environ', {'WEBHDFS_URL': self.server.url,
+                                       'WEBHDFS_USER': 'ibis'}):
+            self.assertIsInstance(get_hdfs(), WebHdfs)
+        with patch.dict('os.environ', {
+                'WEBHDFS_URL': 'http://127.0.0.1:1/webhdfs/v1',
+                'WEBHDFS_USER': 'ibis'}):
+            self.assertIsInstance(get_hdfs(), CliHdfs)
+
+
 if __name__ == "__main__":
     unittest.main()
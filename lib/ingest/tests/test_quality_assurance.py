@@ -4,16 +4,18 @@ Usage: run nose2 in the current directory
 """
 import unittest
 import os
+from decimal import Decimal
 from mock import patch, MagicMock
 from lib.ingest.quality_assurance import ColumnDDL, SourceTable, \
     OracleTable, TeraDataTable, MSSqlTable, PostgreSql, \
-    TargetTable, TableValidation
+    TargetTable, TableValidation, build_checksum_query, checksums_match
 from lib.ingest.tests.fixtures.qa_impala_ddl import DDL_TD
 from lib.ingest.tests.fixtures.qa_data_sample_sqlserver import \
     DATA_SAMPLE_HIVE_DDL, DATA_SAMPLE_HIVE_ROWS
 from lib.ingest.oozie_ws_helper import Workflow, ChecksBalancesManager
 from lib.ingest import quality_assurance
 from lib.ingest.py_hdfs import PyHDFS
+from lib.ingest.sqoop_utils import SqoopTableParser
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -97,6 +99,19 @@ class TargetTableTest(unittest.TestCase):
         self.assertEqual(ddl_list[0].precision, None)
         self.assertEqual(ddl_list[0].scale, None)
 
+    def test_build_fetch_rows_query(self):
+        """test batched query flags every source row"""
+        target_ddls = [ColumnDDL('col_a', 'varchar', '5'),
+                       ColumnDDL('col_b', 'int', None)]
+        query = self.ttObj._build_fetch_rows_query(
+            target_ddls, ["col_a='a'", "col_a='b'"])
+        expected = ("SELECT TRIM(col_a), col_b, "
+                    "COALESCE((col_a='a'), false) AS ibis_qa_match_0, "
+                    "COALESCE((col_a='b'), false) AS ibis_qa_match_1 "
+                    "FROM qa.fake_database_fake_cen_tablename "
+                    "WHERE (col_a='a') or (col_a='b');")
+        self.assertEqual(query, expected)
+
 
 class OracleTableTest(unittest.TestCase):
     """test."""
@@ -209,6 +224,46 @@ class OracleTableTest(unittest.TestCase):
         self.assertEqual(varchar2_test.scale, None)
 
 
+    @patch('lib.ingest.quality_assurance.logger')
+    @patch.object(SourceTable, 'eval_rows', autospec=True)
+    def test_get_rand_rows_sampling(self, m_eval_rows, m_logger):
+        """test block sampling falls back to the random order query"""
+        ddls = [ColumnDDL('col_1', 'number', '10'),
+                ColumnDDL('col_2', 'varchar2', '20')]
+        m_eval_rows.side_effect = [(0, ['COL_1', 'COL_2'], [], ''),
+                                   (0, ['COL_1', 'COL_2'], [['1', 'a']], '')]
+        self.ora_obj.set_sampling('block', 3, 2)
+        self.assertEqual(self.ora_obj.get_rand_rows(ddls), [['1', 'a']])
+        queries = [args[0][1] for args in m_eval_rows.call_args_list]
+        self.assertEqual(queries[0], 'SELECT col_1, col_2 FROM '
+                                     'test_db.test_table_name SAMPLE BLOCK '
+                                     '(2.0) WHERE ROWNUM < 4')
+        self.assertIn('DBMS_RANDOM.VALUE', queries[1])
+        self.ora_obj.set_sampling('order')
+        self.assertEqual(len(self.ora_obj.build_sample_queries(ddls)), 1)
+
+    @patch('lib.ingest.quality_assurance.logger')
+    @patch.object(SourceTable, 'eval', autospec=True)
+    def test_build_key_range_query(self, m_eval, m_logger):
+        """test key range sampling on the split by column"""
+        ddls = [ColumnDDL('col_1', 'number', '10')]
+        m_eval.return_value = (
+            0, '\n--------------\n| MIN | MAX |\n--------------\n'
+               '| 1   | 100000 |\n--------------\n', '')
+        self.ora_obj.set_sampling('key_range', 2, split_by='COL_1')
+        queries = self.ora_obj.build_sample_queries(ddls)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(queries[0].count('COL_1 BETWEEN'), 2)
+        self.assertTrue(queries[0].endswith('AND ROWNUM < 3'))
+        self.assertIn('SAMPLE BLOCK', queries[1])
+        m_eval.return_value = (
+            0, '\n--------------\n| MIN | MAX |\n--------------\n'
+               '| a   | z   |\n--------------\n', '')
+        self.assertEqual(len(self.ora_obj.build_sample_queries(ddls)), 2)
+        self.ora_obj.split_by = ''
+        self.assertIsNone(self.ora_obj.build_key_range_query(ddls))
+
+
 class TeraDataTableTest(unittest.TestCase):
     """test."""
 
@@ -291,6 +346,15 @@ class MSSqlTableTest(unittest.TestCase):
         self.assertEqual(len(ddls), 20)
 
 
+    def test_build_block_sample_query(self):
+        """test sql server block sampling"""
+        ddls = [ColumnDDL('col_1', 'int', '10,0')]
+        self.assertEqual(
+            self.sql_obj.build_block_sample_query(ddls),
+            'SELECT TOP 5 col_1 FROM test_db.dbo.test_table_name '
+            'TABLESAMPLE SYSTEM (1.0 PERCENT)')
+
+
 class PostgreSqlTest(unittest.TestCase):
     """test."""
 
@@ -349,6 +413,17 @@ class PostgreSqlTest(unittest.TestCase):
         self.assertEqual(vals, 4)
 
 
+    def test_build_sample_queries(self):
+        """test postgresql sampling queries"""
+        ddls = [ColumnDDL('col_1', 'int', '10,0')]
+        self.assertEqual(
+            self.sql_obj.build_sample_queries(ddls),
+            ['SELECT col_1 FROM test_db.dbo.test_table_name '
+             'TABLESAMPLE BERNOULLI (1.0) LIMIT 5',
+             'SELECT col_1 FROM test_db.dbo.test_table_name '
+             'ORDER BY RANDOM() LIMIT 5'])
+
+
 class TableValidationTest(unittest.TestCase):
     """test."""
 
@@ -401,6 +476,105 @@ class TableValidationTest(unittest.TestCase):
         bool_test = self.table_val_obj.count_matches(100, 98)
         self.assertTrue(bool_test)
 
+    def test_build_checksum_query(self):
+        """test bucket checksum query"""
+        self.assertEqual(build_checksum_query('db.tbl', ['COUNT(col_1)']),
+                         'SELECT 0, COUNT(*), COUNT(col_1) FROM db.tbl')
+        query = build_checksum_query('db.tbl', ['COUNT(col_1)'], 'id',
+                                     (10, 41), 2)
+        self.assertEqual(query, 'SELECT FLOOR((id - 10) / 2), COUNT(*), '
+                                'COUNT(col_1) FROM db.tbl WHERE id BETWEEN '
+                                '10 AND 41 GROUP BY FLOOR((id - 10) / 2)')
+
+    def test_checksums_match(self):
+        """test checksum comparison"""
+        self.assertTrue(checksums_match([Decimal('10'), Decimal('1.0')],
+                                        [Decimal('10'), Decimal('1.0000001')]))
+        self.assertFalse(checksums_match([Decimal('10'), None],
+                                         [Decimal('10'), Decimal('0')]))
+        self.assertFalse(checksums_match([Decimal('10')], None))
+
+    @patch('lib.ingest.quality_assurance.logger')
+    def test_build_checksum_aggregates(self, m_logger):
+        """test per column aggregates"""
+        src_ddls = [ColumnDDL('id', 'number', '10,0'),
+                    ColumnDDL('name', 'varchar2', '20'),
+                    ColumnDDL('created', 'date', '7')]
+        target_ddls = [ColumnDDL('id', 'decimal', '10,0'),
+                       ColumnDDL('name', 'varchar', '20'),
+                       ColumnDDL('created', 'timestamp', None)]
+        src_aggs, target_aggs = \
+            self.table_val_obj.build_checksum_aggregates(src_ddls,
+                                                         target_ddls)
+        self.assertEqual(src_aggs, ['SUM(CAST(id AS DECIMAL(38,6)))',
+                                    'SUM(LENGTH(TRIM(name)))',
+                                    'COUNT(created)'])
+        self.assertEqual(target_aggs, ['SUM(CAST(id AS DECIMAL(38,6)))',
+                                       'SUM(CHAR_LENGTH(TRIM(name)))',
+                                       'COUNT(created)'])
+
+    @patch.object(SourceTable, 'get_key_range', autospec=True)
+    @patch.object(TargetTable, 'get_checksums', autospec=True)
+    @patch.object(SourceTable, 'get_checksums', autospec=True)
+    @patch('lib.ingest.quality_assurance.logger')
+    def test_checksums_reconcile(self, m_logger, m_src_checksums,
+                                 m_target_checksums, m_key_range):
+        """test mismatching buckets are drilled down to the key"""
+
+        def checksums(keys):
+            """bucket checksums of a set of keys"""
+            def _checksums(_, aggregates, split_by=None, key_range=None,
+                           width=None):
+                buckets = {}
+                for key in keys:
+                    if not split_by:
+                        bucket = 0
+                    elif key_range[0] <= key <= key_range[1]:
+                        bucket = (key - key_range[0]) / width
+                    else:
+                        continue
+                    counts = buckets.setdefault(bucket, [Decimal(0)])
+                    counts[0] += 1
+                return buckets
+            return _checksums
+
+        src_ddls = [ColumnDDL('id', 'number', '10,0')]
+        target_ddls = [ColumnDDL('id', 'decimal', '10,0')]
+        m_key_range.return_value = (1, 100)
+        self.table_val_obj.src_obj.split_by = 'ID'
+        m_src_checksums.side_effect = checksums(range(1, 101))
+        m_target_checksums.side_effect = checksums(range(1, 101))
+        self.assertTrue(self.table_val_obj.checksums_reconcile(
+            src_ddls, target_ddls))
+        self.assertFalse(m_key_range.called)
+
+        m_src_checksums.side_effect = checksums(range(1, 101))
+        m_target_checksums.side_effect = checksums(
+            [key for key in range(1, 101) if key != 42])
+        self.assertFalse(self.table_val_obj.checksums_reconcile(
+            src_ddls, target_ddls))
+        m_logger.error.assert_called_with('Mismatched ID range: 42 - 42')
+        _, split_by, _, _ = m_target_checksums.call_args[0][1:]
+        self.assertEqual(split_by, 'id')
+
+        # too many mismatching buckets: the range is not drilled into
+        m_src_checksums.reset_mock()
+        m_src_checksums.side_effect = checksums(range(1, 101))
+        m_target_checksums.side_effect = checksums(range(1, 101, 2))
+        self.assertFalse(self.table_val_obj.checksums_reconcile(
+            src_ddls, target_ddls))
+        m_logger.error.assert_called_with('Mismatched ID range: 1 - 100')
+        self.assertEqual(m_src_checksums.call_count, 2)
+
+        # query budget spent: the bucket is reported as is
+        m_src_checksums.side_effect = checksums(range(1, 101))
+        m_target_checksums.side_effect = checksums(
+            [key for key in range(1, 101) if key != 42])
+        with patch('lib.ingest.quality_assurance.RECONCILE_MAX_QUERIES', 1):
+            self.assertFalse(self.table_val_obj.checksums_reconcile(
+                src_ddls, target_ddls))
+        m_logger.error.assert_called_with('Mismatched ID range: 36 - 42')
+
     @patch('lib.ingest.quality_assurance.ImpalaConnect', autospec=True)
     @patch.object(SourceTable, 'eval', autospec=True)
     @patch('lib.ingest.quality_assurance.logger')
@@ -418,31 +592,43 @@ class TableValidationTest(unittest.TestCase):
         self.assertTrue(table_val_obj.start_full_ingest_qa())
 
     @patch('lib.ingest.quality_assurance.ImpalaConnect', autospec=True)
+    @patch.object(SourceTable, 'eval_rows', autospec=True)
     @patch.object(SourceTable, 'eval', autospec=True)
     @patch('lib.ingest.quality_assurance.logger')
-    def test_start_data_sampling(self, m_logger, m_eval, mock_impala_conn):
+    def test_start_data_sampling(self, m_logger, m_eval, m_eval_rows,
+                                 mock_impala_conn):
         """test data sampling qa for sqlserver"""
         _path = BASE_DIR + '/fixtures/qa_data_sample_ddl_sqlserver.txt'
         with open(_path, 'r') as file_handler:
             sqoop_ddl = file_handler.read()
         _path = BASE_DIR + '/fixtures/qa_data_sample_rows_sqlserver.txt'
         with open(_path, 'r') as file_handler:
-            sqoop_rows = file_handler.read()
-        m_eval.side_effect = [(0, sqoop_ddl, ''), (0, sqoop_rows, '')]
+            sqoop_rows = file_handler.readlines()
+
+        def _eval_rows(_, query, **kwargs):
+            """parse the sample rows like sqoop output pipe"""
+            labels, rows = SqoopTableParser(**kwargs).parse_all(sqoop_rows)
+            return 0, labels, rows, ''
+
+        m_eval.side_effect = [(0, sqoop_ddl, '')]
+        m_eval_rows.side_effect = _eval_rows
+        # one batched query, each hive row flags the source row it matches
+        hive_rows = [rows[0] + tuple(index == match for match in range(3))
+                     for index, rows in enumerate(DATA_SAMPLE_HIVE_ROWS)]
         mock_impala_conn.run_query.side_effect = [DATA_SAMPLE_HIVE_DDL,
-                                                  DATA_SAMPLE_HIVE_ROWS[0],
-                                                  DATA_SAMPLE_HIVE_ROWS[1],
-                                                  DATA_SAMPLE_HIVE_ROWS[2]]
+                                                  hive_rows]
         self.params['jdbc_url'] = ('jdbc:sqlserver://fake.sqlserver:1433;database=FAKE_DATABASE')
         table_val_obj = TableValidation(
             'parquet_stage.db_table', 'domain.db_table', self.params)
         self.assertTrue(table_val_obj.start_data_sampling())
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
     @patch.object(PyHDFS, "insert_update")
     @patch.object(TableValidation, 'start_incremental', return_value=False)
     @patch.object(ChecksBalancesManager, "check_if_workflow")
     @patch('os.environ', return_value='IMPALA_HOST')
-    def test_check_if_workflow(self, m_impala_host, m_get, m_incr, m_pyhdfs):
+    def test_check_if_workflow(self, m_impala_host, m_get, m_incr, m_pyhdfs,
+                               m_connect):
         with open(os.path.join(BASE_DIR,
                                'fixtures/test_job_action.json'), 'r') as \
                 content_file:
@@ -461,10 +647,11 @@ class TableValidationTest(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 quality_assurance.main()
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
     @patch.object(PyHDFS, "insert_update")
     @patch.object(TableValidation, 'start_full_ingest_qa', return_value=False)
     @patch('os.environ', return_value='IMPALA_HOST')
-    def test_full_ingest(self, m_impala_host, m_incr, m_pyhdfs):
+    def test_full_ingest(self, m_impala_host, m_incr, m_pyhdfs, m_connect):
         args = """commandname database table_name jars jdbc_url
          connection_factories user_name password_file domain
          full_ingest schema oozie_url workflow_name
@@ -478,10 +665,12 @@ class TableValidationTest(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 quality_assurance.main()
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
     @patch.object(PyHDFS, "insert_update")
     @patch.object(TableValidation, 'start_data_sampling', return_value=False)
     @patch('os.environ', return_value='IMPALA_HOST')
-    def test_main_start_data_sampling(self, m_impala_host, m_incr, m_pyhdfs):
+    def test_main_start_data_sampling(self, m_impala_host, m_incr, m_pyhdfs,
+                                      m_connect):
         args = """commandname database table_name jars jdbc_url
          connection_factories user_name password_file domain
          standalone_qa_sampling schema oozie_url workflow_name
@@ -287,11 +287,13 @@ class TableValidationTest(unittest.TestCase):
         action = 'new_action'
         self.assertFalse(table_val_obj.start_data_sampling(action))
 
+    @patch('lib.ingest.impala_utils.connect', autospec=True)
     @patch.object(TableValidation, "start_data_sampling", return_value=False)
     @patch.object(ChecksBalancesExportManager, "check_if_workflow_actions")
     @patch.object(PyHDFS, "insert_update")
     @patch('os.environ', return_value='IMPALA_HOST')
-    def test_insert_hive(self, m_impala_host, m_pyhdfs, m_get, m_sam):
+    def test_insert_hive(self, m_impala_host, m_pyhdfs, m_get, m_sam,
+                         m_connect):
         args = """test source_database_name source_table_name database
         target_table jars jdbc_url connection_factories user_name
          jceks password_alias host_name domain target_schema
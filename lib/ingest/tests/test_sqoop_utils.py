@@ -0,0 +1,80 @@
+"""Tests for sqoop_utils.py"""
+import unittest
+import os
+from mock import patch, MagicMock
+from lib.ingest.sqoop_utils import SqoopUtils, SqoopTableParser
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SqoopUtilsFunctionsTest(unittest.TestCase):
+    """Tests."""
+
+    def setUp(self):
+        self.sqoop_obj = SqoopUtils('jars', 'jdbc:oracle:thin:@//fake',
+                                    'com.quest.oraoop.OraOopManagerFactory',
+                                    'fake_username', 'None',
+                                    '/user/dev/fake.password.file')
+        with open(BASE_DIR + '/fixtures/ddl_ora.txt', 'r') as file_handler:
+            self.sqoop_output = file_handler.read()
+
+    def test_parse_all(self):
+        """test parser labels and rows"""
+        labels, rows = SqoopTableParser().parse_all(
+            self.sqoop_output.splitlines(True))
+        self.assertEqual(len(labels), 7)
+        self.assertEqual(labels[1], 'DATA_TYPE')
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0], ['FAKE_COL_1', 'VARCHAR2', '2', '(null)',
+                                   '(null)', 'Y', '2'])
+
+    def test_parse_filter_columns(self):
+        """test column projection keeps column order"""
+        parser = SqoopTableParser(filter_columns=[2, 0])
+        labels, rows = parser.parse_all(self.sqoop_output.splitlines(True))
+        self.assertEqual(labels, ['COLUMN_NAME', 'DATA_LENGTH'])
+        self.assertEqual(rows[0], ['FAKE_COL_1', '2'])
+
+    def test_parse_limit_and_types(self):
+        """test row limit and typed rows"""
+        parser = SqoopTableParser(filter_columns=[0, 2], limit=2,
+                                  col_types=[str, int])
+        _, rows = parser.parse_all(self.sqoop_output.splitlines(True))
+        self.assertEqual(rows, [['FAKE_COL_1', 2], ['FAKE_COL_2', 2]])
+
+    def test_fetch_rows_sqoop(self):
+        """test fetch rows matches the regex based cleanup"""
+        for strip_col_val in [True, False]:
+            for filter_columns in [None, [1], [0, 3, 6]]:
+                expected_rows = []
+                for line in self.sqoop_obj._clean_query_result(
+                        self.sqoop_output):
+                    cells = [val[1:-1] for val in line.split('|')[1:-1]]
+                    if filter_columns:
+                        cells = [cells[i] for i in filter_columns]
+                    if strip_col_val:
+                        cells = [val.strip() for val in cells]
+                    expected_rows.append(cells)
+                _, rows = self.sqoop_obj.fetch_rows_sqoop(
+                    self.sqoop_output, strip_col_val, filter_columns)
+                self.assertEqual(rows, expected_rows[1:])
+
+    @patch('lib.ingest.sqoop_utils.subprocess.Popen', autospec=True)
+    def test_eval_rows(self, m_popen):
+        """test rows are read from the sqoop output pipe"""
+        proc = MagicMock()
+        proc.stdout = iter(self.sqoop_output.splitlines(True))
+        proc.returncode = 0
+        m_popen.return_value = proc
+        returncode, labels, rows, err = self.sqoop_obj.eval_rows(
+            'select * from fake', limit=3)
+        self.assertEqual(returncode, 0)
+        self.assertEqual(len(labels), 7)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(err, '')
+        self.assertTrue(proc.wait.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -33,7 +33,8 @@ setup(
     package_data={
         # If any package contains *.txt or *.rst files, include them:
         '': ['*.properties', '*.xml', '*.ksh', '*.mako',
-             '*.sh', '*.hql', '*.wld', '*txt', '*.feature'],
+             '*.sh', '*.hql', '*.wld', '*txt', '*.feature',
+             '*.xsd'],
     },
     data_files=[('.', ['README.md', '__main__.py'])],
 